@@ -0,0 +1,334 @@
+"""按天并行生成行程模块(长行程不再由一次LLM生成全部天数)"""
+
+import asyncio
+import json
+import logging
+import math
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .prompt import DAY_PLAN_PROMPT, TRIP_SUGGESTIONS_PROMPT
+from ..config import get_settings
+from ..models.schemas import POIInfo, TripPlan, TripRequest, WeatherInfo
+from ..services.amap_parser import parse_pois, parse_weather
+from ..services.amap_service import get_amap_service
+from ..services.circuit_breaker import CircuitOpenError
+from ..services.geo_service import get_geo_service, weighted_centroid
+from ..services.plan_repair import get_plan_repairer, to_int
+from ..services.poi_store import get_poi_store, search_local_poi
+
+logger = logging.getLogger(__name__)
+
+# 每天安排的景点数量
+ATTRACTIONS_PER_DAY = 3
+# 不作为景点候选的POI类型
+_NON_ATTRACTION_TYPES = ("住宿服务", "餐饮服务")
+
+
+def allocate_to_days(pois: List[POIInfo], days: int, per_day: int = ATTRACTIONS_PER_DAY) -> List[List[POIInfo]]:
+    """
+    把候选景点按地理位置分配到每一天
+    以所有候选的中心为原点按方位角排序后依次切分, 每天的景点集中在同一方向, 减少当天往返
+    Args:
+        pois: 候选景点(按相关度排序)
+        days: 天数
+        per_day: 每天最多的景点数
+    Returns:
+        每天的景点列表
+    """
+    pois = pois[:days * per_day]
+    if not pois:
+        return [[] for _ in range(days)]
+
+    center = weighted_centroid([p.location for p in pois])
+    lng = np.array([p.location.longitude for p in pois])
+    lat = np.array([p.location.latitude for p in pois])
+    angles = np.arctan2(lat - center.latitude, (lng - center.longitude) * math.cos(math.radians(center.latitude)))
+    order = np.argsort(angles, kind="stable")
+
+    groups = np.array_split(order, days)
+    return [[pois[int(i)] for i in group] for group in groups]
+
+
+class DayPlanner:
+    """按天并行生成行程
+
+    1. 景点/天气/酒店三个助手并发调研(不经过监督者);
+    2. 景点候选按地理位置分配到每一天;
+    3. 每天一次LLM调用, 并发数受day_synthesis_concurrency限制, 每天受agent_step_timeout限制;
+    4. 在代码中组装TripPlan, 预算由PlanRepairer根据明细计算。
+    整个规划超时时, fallback_plan不调用LLM, 直接用已有数据生成简要行程。
+    """
+
+    def __init__(self, multi_agents):
+        """
+        初始化
+        Args:
+            multi_agents: 已初始化的多智能体系统
+        """
+        self.multi_agents = multi_agents
+        self.settings = get_settings()
+
+    async def plan(self, request: TripRequest, tool_messages: List[Any]) -> Optional[TripPlan]:
+        """
+        生成旅行计划
+        某个助手失败或超时时跳过它的结果(如没有天气/酒店), 某一天重试后仍失败时只列出景点,
+        这些情况下返回的计划标记为部分计划
+        Args:
+            request: 旅行请求
+            tool_messages: 收集各助手的工具调用结果(每个助手完成后立即加入, 整体超时后降级计划仍可使用)
+        Returns:
+            旅行计划, 生成失败时为None
+        """
+        preferences = ",".join(request.preferences) or "热门景点"
+        queries = {
+            "attraction_agent": f"搜索{request.city}的{preferences}相关景点,需要安排{request.travel_days}天,每天{ATTRACTIONS_PER_DAY}个景点",
+            "weather_agent": f"查询{request.city}的天气",
+            "hotel_agent": f"搜索{request.city}的{request.accommodation}",
+        }
+
+        async def run_research(name: str, query: str) -> Tuple[str, List[Any]]:
+            text, messages = await self.multi_agents.run_agent(getattr(self.multi_agents, name), query)
+            tool_messages.extend(messages)
+            return text, messages
+
+        results = await asyncio.gather(
+            *(run_research(name, query) for name, query in queries.items()),
+            return_exceptions=True
+        )
+        partial = False
+        research: Dict[str, Tuple[str, List[Any]]] = {}
+        for name, result in zip(queries, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"⚠️  {name}运行失败, 跳过: {type(result).__name__} {str(result)}")
+                result, partial = ("", []), True
+            research[name] = result
+        attraction_text, attraction_messages = research["attraction_agent"]
+        weather_text, weather_messages = research["weather_agent"]
+        hotel_text, _ = research["hotel_agent"]
+
+        weather = self._cache_weather(request.city, weather_messages)
+        candidates = self._attraction_candidates(attraction_messages) or self._local_candidates(request)
+        groups = allocate_to_days(candidates, request.travel_days)
+        logger.info(f"🧩 按天并行生成: {len(candidates)}个候选景点分配到{request.travel_days}天")
+
+        context = f"attraction_agent:\n{attraction_text or '无'}\n\nhotel_agent:\n{hotel_text or '无'}"
+        semaphore = asyncio.Semaphore(max(1, self.settings.day_synthesis_concurrency))
+        start = date.fromisoformat(request.start_date)
+
+        async def generate(index: int) -> Optional[Dict[str, Any]]:
+            # 单天生成失败时重试一次, 只影响这一天; LLM熔断时不再重试
+            for attempt in range(2):
+                try:
+                    async with semaphore:
+                        return await asyncio.wait_for(
+                            self._generate_day(
+                                request, index, (start + timedelta(days=index)).isoformat(),
+                                groups[index], weather, context
+                            ),
+                            timeout=self.settings.agent_step_timeout
+                        )
+                except (ValueError, asyncio.TimeoutError) as e:
+                    logger.warning(f"⚠️  第{index + 1}天生成失败(第{attempt + 1}次): {type(e).__name__} {str(e)}")
+                except CircuitOpenError as e:
+                    logger.warning(f"⚠️  第{index + 1}天生成失败: {str(e)}")
+                    break
+            return None
+
+        results = await asyncio.gather(
+            *(generate(i) for i in range(request.travel_days)),
+            asyncio.wait_for(self._suggestions(request, weather_text), timeout=self.settings.agent_step_timeout),
+            return_exceptions=True
+        )
+        day_results, suggestions = results[:-1], results[-1]
+
+        days = []
+        for index, result in enumerate(day_results):
+            if not isinstance(result, dict):
+                # 这一天只保留分配的景点, 不再等待LLM
+                result = self._skeleton_day(request, index, (start + timedelta(days=index)).isoformat(), groups[index])
+                partial = True
+            days.append(result)
+
+        data = {
+            "city": request.city,
+            "start_date": request.start_date,
+            "end_date": request.end_date,
+            "days": days,
+            "weather_info": [],
+            "overall_suggestions": suggestions if isinstance(suggestions, str) else "",
+            "budget": {"total_transportation": sum(to_int(d.pop("transportation_cost", 0)) for d in days)}
+        }
+        trip_plan, errors = get_plan_repairer().repair(data, request, weather)
+        if errors:
+            logger.warning(f"⚠️  按天生成的计划校验失败: {errors}")
+            return None
+        if partial:
+            trip_plan.partial = True
+        return trip_plan
+
+    def fallback_plan(self, request: TripRequest, tool_messages: List[Any]) -> Optional[TripPlan]:
+        """
+        降级计划: 不调用LLM, 用已完成的工具调用结果、本地POI数据和天气缓存生成只包含景点和酒店的简要行程
+        Args:
+            request: 旅行请求
+            tool_messages: 超时/失败前已完成的工具调用结果
+        Returns:
+            部分旅行计划, 没有任何候选景点时为None
+        """
+        weather = self._cache_weather(request.city, tool_messages)
+        candidates = self._attraction_candidates(tool_messages) or self._local_candidates(request)
+        if not candidates:
+            return None
+
+        groups = allocate_to_days(candidates, request.travel_days)
+        start = date.fromisoformat(request.start_date)
+        data = {
+            "city": request.city,
+            "start_date": request.start_date,
+            "end_date": request.end_date,
+            "days": [
+                self._skeleton_day(request, i, (start + timedelta(days=i)).isoformat(), groups[i])
+                for i in range(request.travel_days)
+            ],
+            "weather_info": [],
+            "overall_suggestions": "行程生成超时或上游服务不可用, 以下是根据已有数据生成的简要行程(未包含餐饮安排)",
+        }
+        trip_plan, errors = get_plan_repairer().repair(data, request, weather)
+        if trip_plan is None:
+            logger.warning(f"⚠️  降级计划校验失败: {errors}")
+            return None
+
+        # 酒店从本地POI数据中选择离每天景点最近的
+        pois = [p for msg in tool_messages for p in parse_pois(msg)]
+        for keyword in (request.accommodation, "酒店"):
+            pois.extend(search_local_poi(keyword, request.city))
+        trip_plan = get_geo_service().assign_hotels(
+            trip_plan, get_geo_service().hotels_from_pois(pois), request.accommodation
+        )
+        trip_plan.partial = True
+        return trip_plan
+
+    @staticmethod
+    def _cache_weather(city: str, messages: List[Any]) -> List[WeatherInfo]:
+        """天气助手的查询结果写入天气缓存, 返回该城市缓存的天气"""
+        amap_service = get_amap_service()
+        for msg in messages:
+            if "maps_weather" in (getattr(msg, "name", None) or ""):
+                amap_service.cache_weather(city, parse_weather(msg))
+        return amap_service.get_cached_weather(city)
+
+    @staticmethod
+    def _local_candidates(request: TripRequest) -> List[POIInfo]:
+        """景点助手没有结果时, 从本地POI数据中按偏好查找候选景点"""
+        candidates, seen = [], set()
+        for keyword in [*request.preferences, "景点"]:
+            for poi in search_local_poi(keyword, request.city):
+                if poi.name not in seen and not any(t in poi.type for t in _NON_ATTRACTION_TYPES):
+                    seen.add(poi.name)
+                    candidates.append(poi)
+        return candidates
+
+    @staticmethod
+    def _skeleton_day(request: TripRequest, index: int, day_date: str, attractions: List[POIInfo]) -> Dict[str, Any]:
+        """只包含分配到这一天的景点的简要行程(LLM不可用时使用)"""
+        return {
+            "date": day_date,
+            "day_index": index,
+            "description": f"游览{'、'.join(p.name for p in attractions)}" if attractions else "自由活动",
+            "transportation": request.transportation,
+            "accommodation": request.accommodation,
+            "attractions": [
+                {
+                    "name": p.name,
+                    "address": p.address,
+                    "location": {"longitude": p.location.longitude, "latitude": p.location.latitude},
+                    "visit_duration": 120,
+                    "description": p.type,
+                    "category": p.type.split(";")[0] or "景点",
+                }
+                for p in attractions
+            ],
+            "meals": [],
+        }
+
+    @staticmethod
+    def _attraction_candidates(messages: List[Any]) -> List[POIInfo]:
+        """景点助手的搜索结果, 多个关键词的结果交替排列, 去掉住宿/餐饮和重名的POI"""
+        results = [
+            [p for p in parse_pois(msg) if not any(t in p.type for t in _NON_ATTRACTION_TYPES)]
+            for msg in messages if "maps_text_search" in (getattr(msg, "name", None) or "")
+        ]
+        candidates, seen = [], set()
+        for rank in range(max((len(r) for r in results), default=0)):
+            for pois in results:
+                if rank < len(pois) and pois[rank].name not in seen:
+                    seen.add(pois[rank].name)
+                    candidates.append(pois[rank])
+        return candidates
+
+    async def _generate_day(
+        self,
+        request: TripRequest,
+        index: int,
+        day_date: str,
+        attractions: List[POIInfo],
+        weather: List[WeatherInfo],
+        research: str
+    ) -> Dict[str, Any]:
+        """生成一天的行程, 返回这一天的dict(由PlanRepairer统一修复)"""
+        day_weather = next((w for w in weather if w.date == day_date), None)
+        restaurants = []
+        if attractions:
+            center = weighted_centroid([p.location for p in attractions])
+            restaurants = [poi for poi, _ in get_poi_store().search_radius(center, 3000, "餐饮", limit=6)]
+
+        prompt = DAY_PLAN_PROMPT.format(
+            city=request.city,
+            day_number=index + 1,
+            day_index=index,
+            date=day_date,
+            travel_days=request.travel_days,
+            transportation=request.transportation,
+            accommodation=request.accommodation,
+            preferences=",".join(request.preferences) or "无",
+            free_text_input=request.free_text_input or "无",
+            weather=f"{day_weather.day_weather} {day_weather.night_temp}~{day_weather.day_temp}℃" if day_weather else "未知",
+            attractions=self._pois_json(attractions) if attractions else "无(请从其他调研结果中选择)",
+            restaurants=self._pois_json(restaurants) if restaurants else "无",
+            research=research
+        )
+        result = await self.multi_agents.llm.ainvoke([{"role": "user", "content": prompt}])
+        data = json.loads(self.multi_agents._extract_json(result.content))
+        if not isinstance(data, dict):
+            raise ValueError("结果不是JSON对象")
+        data["day_index"] = index
+        return data
+
+    async def _suggestions(self, request: TripRequest, weather_text: str) -> str:
+        """生成总体建议(与每天的行程并发生成)"""
+        prompt = TRIP_SUGGESTIONS_PROMPT.format(
+            city=request.city,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            travel_days=request.travel_days,
+            transportation=request.transportation,
+            accommodation=request.accommodation,
+            preferences=",".join(request.preferences) or "无",
+            weather=weather_text or "未知"
+        )
+        result = await self.multi_agents.llm.ainvoke([{"role": "user", "content": prompt}])
+        return str(result.content).strip()
+
+    @staticmethod
+    def _pois_json(pois: List[POIInfo]) -> str:
+        """候选POI列表转换为提示词中的JSON"""
+        return json.dumps([
+            {
+                "name": p.name,
+                "type": p.type,
+                "address": p.address,
+                "location": {"longitude": p.location.longitude, "latitude": p.location.latitude}
+            }
+            for p in pois
+        ], ensure_ascii=False)
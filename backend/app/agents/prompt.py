@@ -53,9 +53,12 @@ HOTEL_AGENT_PROMPT = """你是酒店推荐专家。你的任务是根据城市
 用户: "搜索北京的酒店"
 你的回复: [TOOL_CALL:amap_maps_text_search:keywords=酒店,city=北京]
 
+如果已知景点坐标,可以先使用local_nearby_search工具在本地数据中查找景点附近的酒店
+(参数: location为"经度,纬度", radius为搜索半径(米), keywords为"酒店"),本地没有结果时再使用maps_text_search搜索。
+
 **要求：**
-1. keywords可能是酒店的类型,如“经济型酒店”、“五星级酒店”等,如果工具返回多个酒店则选择第一个
-2. 每天推荐一个具体的酒店,
+1. keywords可能是酒店的类型,如“经济型酒店”、“五星级酒店”等
+2. 请完整列出工具返回的候选酒店(名称、地址、经纬度、类型),系统会根据每天景点的位置自动选择距离最近的酒店
 
 **注意:**
 1. 必须使用工具,不要直接回答
@@ -142,7 +145,7 @@ PLANNER_AGENT_PROMPT = """
 1. weather_info数组必须包含每一天的天气信息
 2. 温度必须是纯数字(不要带°C等单位)
 3. 每天安排2-3个景点
-4. 考虑景点之间的距离和游览时间
+4. 景点的游览顺序由系统根据经纬度自动优化,你只需为每天挑选景点并考虑游览时间,无需推算景点之间的距离和先后顺序
 5. 每天必须包含早中晚三餐
 6. 提供实用的旅行建议
 7. **必须包含预算信息**:
@@ -162,4 +165,102 @@ PLANNER_AGENT_PROMPT = """
 **重要提示:**
 你必须整合其他助手的回答来生成你的回答，不允许你凭空编造!
 
-"""
\ No newline at end of file
+"""
+PLAN_REPAIR_PROMPT = """下面的旅行计划JSON存在系统无法自动修复的问题,请只修正列出的问题,其余内容保持不变。
+
+**问题列表:**
+{errors}
+
+**原始计划:**
+```json
+{plan}
+```
+
+**要求:**
+1. 只返回修正后的完整JSON,放在```json代码块中
+2. 不要修改没有问题的字段,不要编造新的景点、酒店或天气信息
+"""
+
+DAY_REPLAN_PROMPT = """请重新规划{city}旅行计划中的第{day_number}天({date})。
+
+**旅行信息:**
+- 交通方式:{transportation}
+- 住宿:{accommodation}
+- 偏好:{preferences}
+- 额外要求:{free_text_input}
+- 当天天气:{weather}
+
+**本次修改要求:**
+{instruction}
+
+**其他天已安排的景点(不要重复):**
+{other_attractions}
+
+**当前这一天的安排:**
+```json
+{current_day}
+```
+
+**可选的景点和餐饮(来自之前的调研结果,请优先从中选择):**
+{research}
+
+**要求:**
+1. 只返回这一天的JSON,格式与当前这一天的安排相同,放在```json代码块中
+2. 安排2-3个景点,包含早中晚三餐,景点和餐饮的经纬度必须来自调研结果,不要编造
+3. 景点的游览顺序和酒店由系统自动优化,无需考虑
+"""
+
+DAY_PLAN_PROMPT = """请为{city}旅行计划的第{day_number}天({date})生成详细行程。
+
+**旅行信息:**
+- 总天数:{travel_days}天
+- 交通方式:{transportation}
+- 住宿:{accommodation}
+- 偏好:{preferences}
+- 额外要求:{free_text_input}
+- 当天天气:{weather}
+
+**分配给这一天的景点(系统已按地理位置分组,请从中选择2-3个):**
+{attractions}
+
+**这一天景点附近的餐厅(可选):**
+{restaurants}
+
+**其他调研结果:**
+{research}
+
+请严格按照以下JSON格式返回这一天的行程,放在```json代码块中:
+```json
+{{
+  "date": "{date}",
+  "day_index": {day_index},
+  "description": "当天行程概述",
+  "transportation": "{transportation}",
+  "accommodation": "{accommodation}",
+  "attractions": [
+    {{"name": "景点名称", "address": "详细地址", "location": {{"longitude": 116.397128, "latitude": 39.916527}},
+     "visit_duration": 120, "description": "景点描述", "category": "景点类别", "ticket_price": 60}}
+  ],
+  "meals": [
+    {{"type": "breakfast", "name": "早餐推荐", "description": "早餐描述", "estimated_cost": 30}},
+    {{"type": "lunch", "name": "午餐推荐", "description": "午餐描述", "estimated_cost": 50}},
+    {{"type": "dinner", "name": "晚餐推荐", "description": "晚餐描述", "estimated_cost": 80}}
+  ],
+  "transportation_cost": 30
+}}
+```
+
+**要求:**
+1. 景点和餐厅的名称、地址、经纬度必须来自上面的候选,不要编造
+2. 温度和费用必须是纯数字;transportation_cost为当天市内交通的预估费用(元)
+3. 景点的游览顺序和酒店由系统自动安排,无需考虑
+"""
+
+TRIP_SUGGESTIONS_PROMPT = """请为以下旅行给出3-5条简洁实用的总体建议(纯文本,不超过200字):
+- 城市:{city}
+- 日期:{start_date}至{end_date},共{travel_days}天
+- 交通方式:{transportation}
+- 住宿:{accommodation}
+- 偏好:{preferences}
+- 天气:{weather}
+"""
@@ -0,0 +1,295 @@
+"""局部重新规划模块(只重新运行受影响的助手和天)"""
+
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+from .prompt import DAY_REPLAN_PROMPT
+from ..models.schemas import PlanDiff, TripPlan, TripPlanPatch, TripRequest
+from ..services.amap_parser import parse_pois
+from ..services.circuit_breaker import CircuitOpenError
+from ..services.geo_service import get_geo_service
+from ..services.itinerary_optimizer import get_itinerary_optimizer
+from ..services.plan_diff import diff_plans
+from ..services.plan_repair import get_plan_repairer, missing_parts
+from ..services.poi_store import search_local_poi
+from ..services.route_matrix import get_route_matrix_service
+
+logger = logging.getLogger(__name__)
+
+# 修改后需要重新规划整个行程的字段
+FULL_REPLAN_FIELDS = ("city", "start_date", "end_date", "travel_days")
+# 检查点中各助手回答的消息名称
+AGENT_NAMES = ("attraction_agent", "weather_agent", "hotel_agent")
+
+
+class Replanner:
+    """局部重新规划
+
+    读取保存的计划和检查点线程中各助手的调研结果, 根据修改内容判断受影响的助手和天:
+    - 偏好变化: 重新运行景点助手(只查询新偏好), 重新规划受影响的天
+    - 住宿变化: 重新运行酒店助手, 按距离重新选择每天的酒店, 不需要重新规划行程
+    - 交通方式变化: 直接更新字段
+    - 指定天/修改要求/额外要求变化: 只重新规划对应的天(每天一次LLM调用, 并发执行)
+    城市或日期变化时重新规划整个行程。
+    """
+
+    def __init__(self, multi_agents):
+        """
+        初始化
+        Args:
+            multi_agents: 已初始化的多智能体系统
+        """
+        self.multi_agents = multi_agents
+
+    async def replan(self, plan_id: str, patch: TripPlanPatch) -> Tuple[TripPlan, PlanDiff, List[int], List[str]]:
+        """
+        局部重新规划
+        Args:
+            plan_id: 计划ID
+            patch: 修改内容
+        Returns:
+            (新计划, 与旧计划的差异, 重新规划的天, 重新运行的助手)
+        """
+        record = self.multi_agents.load_plan(plan_id)
+        if record is None:
+            raise KeyError(plan_id)
+        request: TripRequest = record["request"]
+        old_plan: TripPlan = record["plan"]
+
+        updates = patch.model_dump(exclude_none=True, exclude={"days", "instruction"})
+        new_request = request.model_copy(update=updates)
+
+        if any(field in updates and updates[field] != getattr(request, field) for field in FULL_REPLAN_FIELDS):
+            logger.info("🔄 城市或日期发生变化, 重新规划整个行程")
+            new_plan = await self.multi_agents.plan_trip(new_request, plan_id=plan_id, thread_id=uuid.uuid4().hex)
+            if new_plan is None:
+                raise ValueError("重新规划失败")
+            return new_plan, diff_plans(old_plan, new_plan), list(range(len(new_plan.days))), list(AGENT_NAMES)
+
+        agents, days = self.affected(request, new_request, patch, old_plan)
+        logger.info(f"🔄 局部重新规划: 助手={sorted(agents) or '无'}, 天={sorted(days) or '无'}")
+
+        research = await self._research_context(record["thread_id"], new_request)
+        hotel_messages: List[Any] = []
+        if "attraction_agent" in agents:
+            added = [p for p in new_request.preferences if p not in request.preferences] or new_request.preferences
+            text, _ = await self.multi_agents.run_agent(
+                self.multi_agents.attraction_agent,
+                f"搜索{new_request.city}的{','.join(added)}相关景点和餐厅"
+            )
+            research = f"{research}\n\nattraction_agent(新偏好):\n{text}"
+        if "hotel_agent" in agents:
+            _, hotel_messages = await self.multi_agents.run_agent(
+                self.multi_agents.hotel_agent,
+                f"搜索{new_request.city}的{new_request.accommodation}"
+            )
+
+        indexes = sorted(days)
+        new_days = await asyncio.gather(*(
+            self._replan_day_with_retry(new_request, old_plan, index, patch.instruction, research)
+            for index in indexes
+        ))
+        # 重试后仍失败的天保留原来的安排, 不算作重新规划
+        failed = {index for index, day in zip(indexes, new_days) if day is None}
+        if failed:
+            logger.warning(f"⚠️  以下天重新规划失败, 保留原来的安排: {sorted(i + 1 for i in failed)}")
+        days -= failed
+
+        data = old_plan.model_dump()
+        for index, day in zip(indexes, new_days):
+            if day is None:
+                continue
+            # 新的一天沿用原来的酒店, 稍后按距离重新选择
+            if not isinstance(day.get("hotel"), dict):
+                day["hotel"] = data["days"][index].get("hotel")
+            data["days"][index] = day
+        if new_request.transportation != request.transportation:
+            for day in data["days"]:
+                day["transportation"] = new_request.transportation
+        if new_request.accommodation != request.accommodation:
+            for day in data["days"]:
+                day["accommodation"] = new_request.accommodation
+
+        new_plan, errors = get_plan_repairer().repair(data, new_request, old_plan.weather_info)
+        if new_plan is None:
+            raise ValueError(f"重新规划的计划校验失败: {errors}")
+
+        new_plan = self._update_hotels(new_plan, old_plan, days, hotel_messages, new_request.accommodation)
+        # 酒店变化的天也需要重新计算路线
+        hotel_changed = {
+            i for i, (old_day, new_day) in enumerate(zip(old_plan.days, new_plan.days))
+            if (old_day.hotel and old_day.hotel.name) != (new_day.hotel and new_day.hotel.name)
+        }
+        new_plan = self._optimize_days(new_plan, days | hotel_changed)
+        if self.multi_agents.settings.route_matrix_enabled:
+            # 交通方式变化时所有天的路线类型都可能变化; 未变化的路段直接命中缓存
+            route_days = None if new_request.transportation != request.transportation else days | hotel_changed
+            new_plan = await get_route_matrix_service().annotate_plan(new_plan, route_days)
+
+        # 按新计划重新判断缺少的部分, 不沿用旧计划的标记; 有天重新规划失败时也标记为部分计划
+        missing = missing_parts(new_plan)
+        new_plan = new_plan.model_copy(update={"partial": bool(missing or failed), "missing": missing})
+
+        self.multi_agents.save_plan(plan_id, new_request, new_plan, record["thread_id"])
+        return new_plan, diff_plans(old_plan, new_plan), sorted(days), sorted(agents)
+
+    @staticmethod
+    def affected(
+        request: TripRequest,
+        new_request: TripRequest,
+        patch: TripPlanPatch,
+        plan: TripPlan
+    ) -> Tuple[Set[str], Set[int]]:
+        """
+        判断受影响的助手和天
+        Returns:
+            (需要重新运行的助手, 需要重新规划的天)
+        """
+        all_days = set(range(len(plan.days)))
+        requested = {d for d in patch.days or [] if d in all_days}
+        agents: Set[str] = set()
+        days: Set[int] = set(requested)
+
+        if new_request.preferences != request.preferences:
+            agents.add("attraction_agent")
+            days |= requested or all_days
+        if new_request.accommodation != request.accommodation:
+            agents.add("hotel_agent")
+        if patch.instruction or new_request.free_text_input != request.free_text_input:
+            days |= requested or all_days
+        return agents, days
+
+    async def _research_context(self, thread_id: Optional[str], request: TripRequest) -> str:
+        """
+        之前的调研结果: 检查点线程中各助手的最终回答 + 本地POI存储中的候选景点
+        Args:
+            thread_id: 检查点线程ID
+            request: 旅行请求
+        Returns:
+            调研结果文本
+        """
+        parts = []
+        if thread_id and self.multi_agents.app is not None:
+            try:
+                state = await self.multi_agents.app.aget_state({"configurable": {"thread_id": thread_id}})
+                for msg in state.values.get("messages", []):
+                    if getattr(msg, "type", None) == "ai" and getattr(msg, "name", None) in AGENT_NAMES and msg.content:
+                        parts.append(f"{msg.name}:\n{msg.content}")
+            except Exception as e:
+                logger.warning(f"⚠️  读取检查点失败: {str(e)}")
+
+        candidates = {}
+        for keyword in [*request.preferences, "景点", "餐饮"]:
+            for poi in search_local_poi(keyword, request.city, limit=10):
+                candidates.setdefault(poi.name, {
+                    "name": poi.name,
+                    "type": poi.type,
+                    "address": poi.address,
+                    "location": {"longitude": poi.location.longitude, "latitude": poi.location.latitude}
+                })
+        if candidates:
+            parts.append("本地POI数据:\n" + json.dumps(list(candidates.values()), ensure_ascii=False))
+        return "\n\n".join(parts) or "无"
+
+    async def _replan_day_with_retry(
+        self,
+        request: TripRequest,
+        plan: TripPlan,
+        index: int,
+        instruction: Optional[str],
+        research: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        重新规划一天(与按天生成相同: 受agent_step_timeout限制, 失败时重试一次, LLM熔断时不再重试)
+        Returns:
+            这一天的dict, 重试后仍失败时为None
+        """
+        for attempt in range(2):
+            try:
+                return await asyncio.wait_for(
+                    self._replan_day(request, plan, index, instruction, research),
+                    timeout=self.multi_agents.settings.agent_step_timeout
+                )
+            except (ValueError, asyncio.TimeoutError) as e:
+                logger.warning(f"⚠️  第{index + 1}天重新规划失败(第{attempt + 1}次): {type(e).__name__} {str(e)}")
+            except CircuitOpenError as e:
+                logger.warning(f"⚠️  第{index + 1}天重新规划失败: {str(e)}")
+                break
+        return None
+
+    async def _replan_day(
+        self,
+        request: TripRequest,
+        plan: TripPlan,
+        index: int,
+        instruction: Optional[str],
+        research: str
+    ) -> Dict[str, Any]:
+        """重新规划一天, 返回这一天的dict(由PlanRepairer统一修复)"""
+        day = plan.days[index]
+        weather = next((w for w in plan.weather_info if w.date == day.date), None)
+        other_attractions = [a.name for d in plan.days if d.day_index != index for a in d.attractions]
+        current = day.model_dump(exclude={"hotel", "travel_distance", "travel_duration", "routes", "city", "transfer"})
+
+        prompt = DAY_REPLAN_PROMPT.format(
+            city=request.city,
+            day_number=index + 1,
+            date=day.date,
+            transportation=request.transportation,
+            accommodation=request.accommodation,
+            preferences=",".join(request.preferences) or "无",
+            free_text_input=request.free_text_input or "无",
+            weather=f"{weather.day_weather} {weather.night_temp}~{weather.day_temp}℃" if weather else "未知",
+            instruction=instruction or "按新的偏好和要求调整这一天的安排",
+            other_attractions=",".join(other_attractions) or "无",
+            current_day=json.dumps(current, ensure_ascii=False, indent=2),
+            research=research
+        )
+        result = await self.multi_agents.llm.ainvoke([{"role": "user", "content": prompt}])
+        data = json.loads(self.multi_agents._extract_json(result.content))
+        if not isinstance(data, dict):
+            raise ValueError(f"第{index + 1}天的重新规划结果不是JSON对象")
+        data["day_index"] = index
+        return data
+
+    @staticmethod
+    def _update_hotels(
+        plan: TripPlan,
+        old_plan: TripPlan,
+        days: Set[int],
+        hotel_messages: List[Any],
+        accommodation: str
+    ) -> TripPlan:
+        """
+        重新选择酒店: 住宿偏好变化时所有天使用新的候选酒店;
+        否则只为重新规划的天在原计划的酒店中选择最近的
+        """
+        geo_service = get_geo_service()
+        if hotel_messages:
+            pois = [p for msg in hotel_messages for p in parse_pois(msg)]
+            candidates = geo_service.hotels_from_pois(pois)
+            return geo_service.assign_hotels(plan, candidates, accommodation) if candidates else plan
+        if not days:
+            return plan
+
+        candidates = [d.hotel for d in old_plan.days if d.hotel and d.hotel.location]
+        subset = plan.model_copy(update={"days": [plan.days[i] for i in sorted(days)]})
+        subset = geo_service.assign_hotels(subset, candidates, accommodation)
+        updated = list(plan.days)
+        for day in subset.days:
+            updated[day.day_index] = day
+        return plan.model_copy(update={"days": updated})
+
+    @staticmethod
+    def _optimize_days(plan: TripPlan, days: Set[int]) -> TripPlan:
+        """只重新优化指定的天, 其余天的顺序和距离保持不变"""
+        optimizer = get_itinerary_optimizer()
+        updated = list(plan.days)
+        for index in days:
+            updated[index] = optimizer.optimize_day(updated[index])
+        return plan.model_copy(update={
+            "days": updated,
+            "total_travel_distance": round(sum(d.travel_distance for d in updated), 1)
+        })
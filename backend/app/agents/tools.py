@@ -1,35 +1,219 @@
 import asyncio
+import json
 import logging
-logging.basicConfig(
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler('test.log', encoding='utf-8'),  # 写入文件
-        # logging.StreamHandler()  # 同时输出到控制台（可选）
-    ]
-)
-logger = logging.getLogger(__name__)
-from typing import Dict,List,Any
-from langchain_core.tools import BaseTool
-from langchain_mcp_adapters.client import MultiServerMCPClient
+from contextvars import ContextVar
+from typing import TYPE_CHECKING,Dict,List,Any,Tuple
 from ..config import get_settings
+from ..logging_config import log_payload
+from ..models.schemas import Location
+from ..services.amap_parser import parse_pois
+from ..services.amap_quota import QuotaExceededError, amap_api_keys, get_quota_manager
+from ..services.cache import create_cache
+from ..services.circuit_breaker import CircuitOpenError, get_breaker
+from ..services.concurrency import SingleFlight, get_limiter
+from ..services.poi_store import get_poi_store, local_poi_hit
+from ..services.readiness import get_readiness
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from langchain_core.tools import BaseTool
 
 _tools = None
 settings = get_settings()
 
-async def get_tools() -> List[BaseTool]:
-    global _tools
+# 持有MCP会话的后台任务(每个高德Key一个会话, 会话保持打开, 每次工具调用不再重新启动MCP Server)
+_session_tasks: List[asyncio.Task] = []
+_session_stop = None
+_tools_lock = asyncio.Lock()
+
+# 搜索结果会写入本地POI存储的工具
+POI_SEARCH_TOOLS = ("maps_text_search", "maps_around_search")
+
+# MCP工具调用结果缓存: (工具名, 参数) -> 返回内容
+_tool_cache = create_cache("tool_result", maxsize=4096, ttl=settings.tool_cache_ttl)
+
+# 合并并发的相同工具调用(批量规划时多个请求会同时查询同一城市)
+_tool_flight = SingleFlight()
+
+# 为True时跳过本地POI索引和工具结果缓存, 直接调用高德(用于缓存预热刷新数据)
+bypass_local_cache: ContextVar[bool] = ContextVar("bypass_local_cache", default=False)
+
+
+def get_tool_cache():
+    """获取工具调用结果缓存"""
+    return _tool_cache
+
+
+def tool_cache_key(tool_name: str, kwargs: Dict[str, Any]) -> str:
+    """工具调用结果的缓存键"""
+    return f"{tool_name}:{json.dumps(kwargs, sort_keys=True, ensure_ascii=False)}"
+
+
+def _with_result_cache(tool: "BaseTool") -> "BaseTool":
+    """
+    包装MCP工具: 相同参数的调用在有效期内直接返回缓存结果,
+    并发的相同调用只请求一次高德, 同时调用高德的数量受amap_max_concurrency限制
+    """
+    call_tool = tool.coroutine
+    ttl = settings.weather_cache_ttl if "maps_weather" in tool.name else None
+
+    async def call_and_cache(key: str, kwargs: Dict[str, Any]):
+        async with get_limiter("amap"):
+            result = await call_tool(**kwargs)
+        content = result[0] if isinstance(result, tuple) else result
+        _tool_cache.set(key, content, ttl=ttl)
+        return result
+
+    async def call_tool_with_cache(**kwargs):
+        key = tool_cache_key(tool.name, kwargs)
+        if not bypass_local_cache.get():
+            cached = _tool_cache.get(key)
+            if cached is not None:
+                return cached, None
+
+        try:
+            return await _tool_flight.do(key, lambda: call_and_cache(key, kwargs))
+        except (asyncio.TimeoutError, CircuitOpenError, QuotaExceededError) as e:
+            # 超时、熔断或配额用完时把错误作为工具结果返回(不缓存), 助手可以跳过这部分信息继续规划
+            reason = "调用超时" if isinstance(e, asyncio.TimeoutError) else str(e)
+            logger.warning(f"⚠️  工具{tool.name}{reason}")
+            return f"工具{tool.name}暂时不可用({reason}),请不要重试,直接基于已有信息继续", None
+
+    tool.coroutine = call_tool_with_cache
+    return tool
+
+
+def _with_quota(tool: "BaseTool", coroutines: List[Any]) -> "BaseTool":
+    """
+    包装MCP工具: 调用前在配额管理中预约(选择当天配额未用完的Key, 超出QPS时排队等待),
+    使用该Key的MCP会话调用, 通过熔断检查、实际发出时才计入用量; 每次调用受tool_call_timeout限制, 连续失败时熔断。
+    高德返回QPS超限时稍后重试, 返回当日配额用完时换一个Key重试
+    Args:
+        tool: 第一个Key的MCP工具(作为对外的工具)
+        coroutines: 各Key的MCP会话中同名工具的调用函数, 下标与配额管理中的Key一致
+    """
+    async def call_tool_with_quota(**kwargs):
+        manager = get_quota_manager()
+        tried: Tuple[int, ...] = ()
+        for _ in range(3):
+            index = await manager.acquire(tool.name, exclude=tried)
+
+            async def send():
+                manager.record_sent(index, tool.name)
+                return await asyncio.wait_for(coroutines[index](**kwargs), settings.tool_call_timeout)
+
+            result = await get_breaker("amap").call(send)
+            content = result[0] if isinstance(result, tuple) else result
+            problem = manager.report(index, tool.name, content)
+            if problem is None:
+                return result
+            if problem == "daily":
+                tried += (index,)
+        raise QuotaExceededError(f"高德{tool.name}限流, 重试后仍失败")
+
+    tool.coroutine = call_tool_with_quota
+    return tool
+
+
+def _with_poi_ingest(tool: "BaseTool") -> "BaseTool":
+    """
+    包装POI搜索工具: 调用结果写入本地POI存储,后续的查询可以直接在本地完成
+    关键词搜索在本地结果满一页, 或该城市该关键词已从高德导入过且未过期时不再调用高德
+    """
+    call_tool = tool.coroutine
+
+    async def call_tool_and_ingest(**kwargs):
+        if "keywords" in kwargs and "city" in kwargs and not bypass_local_cache.get():
+            local = local_poi_hit(kwargs["keywords"], kwargs["city"])
+            if local:
+                return _pois_to_json([(poi, None) for poi in local]), None
+
+        result = await call_tool(**kwargs)
+        content = result[0] if isinstance(result, tuple) else result
+        pois = parse_pois(content)
+        if pois:
+            store = get_poi_store()
+            store.bulk_load(pois, kwargs.get("city", ""))
+            if "keywords" in kwargs and "city" in kwargs:
+                store.mark_covered(kwargs["keywords"], kwargs["city"])
+        return result
+
+    tool.coroutine = call_tool_and_ingest
+    return tool
+
+
+async def local_nearby_search(location: str, radius: int = 1000, keywords: str = "") -> str:
+    """
+    在本地POI数据中搜索坐标附近的POI(如景点附近的酒店、餐厅),比高德周边搜更快。
+    Args:
+        location: 中心点经纬度坐标,格式为"经度,纬度" (例如："116.397128,39.916527")
+        radius: 搜索半径(米)
+        keywords: 类型或名称关键词,如"酒店"、"餐饮"、"景点"
+    Returns:
+        JSON格式的POI列表,包含距离(米);本地没有数据时返回空列表
+    """
+    lng, lat = (float(v) for v in location.split(",")[:2])
+    results = get_poi_store().search_radius(Location(longitude=lng, latitude=lat), radius, keywords)
+    return _pois_to_json(results)
+
+
+def _pois_to_json(results: List[Any]) -> str:
+    """把(POI, 距离)列表转换为与高德搜索结果相同格式的JSON"""
+    pois = []
+    for poi, distance in results:
+        item = {**poi.model_dump(), "location": f"{poi.location.longitude},{poi.location.latitude}"}
+        if distance is not None:
+            item["distance"] = round(distance)
+        pois.append(item)
+    return json.dumps({"pois": pois}, ensure_ascii=False)
+
+
+def get_local_tools() -> List["BaseTool"]:
+    """本地实现的工具(不经过MCP)"""
+    from langchain_core.tools import StructuredTool
+
+    return [StructuredTool.from_function(coroutine=local_nearby_search, name="local_nearby_search")]
+
+async def _hold_mcp_session(client, tools_future: asyncio.Future, stop: asyncio.Event) -> None:
+    """
+    打开MCP会话并保持到stop被设置
+    stdio会话的上下文必须在同一个任务中进入和退出, 所以由单独的任务持有
+    """
+    from langchain_mcp_adapters.tools import load_mcp_tools
+
+    try:
+        async with client.session("amap-mcp-server") as session:
+            tools = await load_mcp_tools(session)
+            tools_future.set_result(tools)
+            await stop.wait()
+    except Exception as e:
+        if not tools_future.done():
+            tools_future.set_exception(e)
+        else:
+            # 会话中途断开(如MCP Server退出), 实例不再就绪
+            logger.error(f"❌ MCP会话断开: {str(e)}")
+            get_readiness().mark_failed("mcp_tools", f"MCP会话断开: {str(e)}")
+    finally:
+        if not tools_future.done():
+            tools_future.cancel()
+
+
+def _mcp_client(api_key: str):
+    """创建使用指定高德Key的MCP客户端"""
+    from langchain_mcp_adapters.client import MultiServerMCPClient
 
     # streamable_http方式
     # client = MultiServerMCPClient({
     #     # 高德地图MCP Server
     #     "amap-maps-streamableHTTP": {
-    #         "url": f"https://mcp.amap.com/mcp?key={settings.amap_api_key}",
+    #         "url": f"https://mcp.amap.com/mcp?key={api_key}",
     #         "transport": "streamable_http"
     #     }
     # })
 
     # stdio方式
-    client = MultiServerMCPClient({
+    return MultiServerMCPClient({
         # 高德地图MCP Server
         "amap-mcp-server": {
             "command": "uvx",
@@ -37,15 +221,67 @@ async def get_tools() -> List[BaseTool]:
                 "amap-mcp-server"
             ],
             "env": {
-                "AMAP_MAPS_API_KEY": settings.amap_api_key
+                "AMAP_MAPS_API_KEY": api_key
             },
             "transport": "stdio"
         }
     })
 
-    _tools = await client.get_tools()
-    # print(f"✅ 成功获取 {len(_tools)} 个工具")
-    # print(f"🔍 工具列表:\n" + "\n".join(t.name for t in _tools))
-    # print(f"tools:\n\n" + "\n\n".join(str(tool) for tool in tools) + "\n")
-    logger.info(f"tools:\n\n" + "\n\n".join(str(tool) for tool in _tools) + "\n")
-    return _tools
\ No newline at end of file
+
+async def get_tools() -> List["BaseTool"]:
+    global _tools, _session_tasks, _session_stop
+
+    if _tools is not None:
+        return _tools
+
+    async with _tools_lock:
+        if _tools is not None:
+            return _tools
+
+        # 每个高德Key打开一个MCP会话(MCP客户端在第一次获取工具时才加载)
+        api_keys = amap_api_keys() or [settings.amap_api_key]
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in api_keys]
+        _session_stop = asyncio.Event()
+        _session_tasks = [
+            asyncio.create_task(_hold_mcp_session(_mcp_client(key), future, _session_stop))
+            for key, future in zip(api_keys, futures)
+        ]
+        try:
+            tools_by_key = await asyncio.gather(*futures)
+        except Exception as e:
+            get_readiness().mark_failed("mcp_tools", str(e))
+            _session_stop.set()
+            raise
+
+        # 对外只暴露第一个会话的工具, 调用时由配额管理选择使用哪个Key的会话
+        tools = tools_by_key[0]
+        tools = [
+            _with_quota(t, [{x.name: x for x in key_tools}[t.name].coroutine for key_tools in tools_by_key])
+            for t in tools
+        ]
+        tools = [_with_poi_ingest(t) if any(n in t.name for n in POI_SEARCH_TOOLS) else t for t in tools]
+        tools = [_with_result_cache(t) for t in tools]
+        tools.extend(get_local_tools())
+        _tools = tools
+        get_readiness().mark_ready("mcp_tools", f"{len(_tools)}个工具, {len(api_keys)}个高德Key")
+        logger.debug(f"🔍 工具列表: {', '.join(t.name for t in _tools)}")
+        # 完整的工具描述很长, 只在DEBUG级别按采样率记录
+        log_payload(logger, "工具描述", _tools)
+        return _tools
+
+
+async def close_tools() -> None:
+    """关闭所有MCP会话"""
+    global _tools, _session_tasks, _session_stop
+
+    if _session_tasks:
+        _session_stop.set()
+        for task in _session_tasks:
+            try:
+                await asyncio.wait_for(task, timeout=5)
+            except (asyncio.TimeoutError, Exception):
+                task.cancel()
+        _session_tasks = []
+        _session_stop = None
+    _tools = None
@@ -0,0 +1,201 @@
+"""响应压缩中间件(brotli/gzip)"""
+
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # 未安装brotli时只使用gzip
+    brotli = None
+
+# 不压缩的内容类型(已压缩的图片/视频, 以及需要逐条推送的SSE)
+SKIP_CONTENT_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip", "text/event-stream")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    按Accept-Encoding选择压缩算法: 优先br, 其次gzip
+    Args:
+        accept_encoding: 请求头Accept-Encoding
+    Returns:
+        br / gzip / None(不压缩)
+    """
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """流式压缩器: 每个响应块压缩后立即flush, NDJSON等流式响应不会被缓冲"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31: 输出带gzip头和尾的数据
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """压缩一块数据并flush"""
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """结束压缩流"""
+        if self.encoding == "br":
+            return self._br.finish()
+        return self._gz.flush(zlib.Z_FINISH)
+
+
+def _strip_etag_suffix(tag: str) -> str:
+    """去掉压缩时加在ETag上的编码后缀: "abc-br" -> "abc\""""
+    for suffix in ("-br\"", "-gzip\""):
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + "\""
+    return tag
+
+
+class CompressionMiddleware:
+    """响应压缩中间件
+
+    - 按Accept-Encoding选择brotli(已安装brotli时)或gzip, 小于minimum_size的响应不压缩;
+    - 压缩后的响应使用不同的强ETag(原ETag加上-br/-gzip后缀), 请求的If-None-Match在交给
+      路由之前去掉后缀, 路由仍按未压缩内容的ETag比较;
+    - 流式响应逐块压缩并flush。
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 5, brotli_quality: int = 4):
+        """
+        初始化
+        Args:
+            app: ASGI应用
+            minimum_size: 最小压缩大小(字节)
+            gzip_level: gzip压缩级别(1~9)
+            brotli_quality: brotli压缩质量(0~11)
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        # 客户端保存的是压缩后响应的ETag, 路由按未压缩内容比较
+        client_tags: List[str] = []
+        if "if-none-match" in headers:
+            client_tags = [tag.strip() for tag in headers["if-none-match"].split(",")]
+            raw_headers: List[Tuple[bytes, bytes]] = [
+                (k, v) for k, v in scope["headers"] if k != b"if-none-match"
+            ]
+            raw_headers.append((b"if-none-match", ", ".join(_strip_etag_suffix(t) for t in client_tags).encode("latin-1")))
+            scope = dict(scope, headers=raw_headers)
+
+        responder = _CompressionResponder(self, encoding, client_tags, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """单个响应的压缩状态"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, client_tags: List[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.client_tags = client_tags
+        self._send = send
+        self.start: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or content_type.startswith(SKIP_CONTENT_TYPES)
+            )
+            if message["status"] == 304:
+                self._fix_not_modified_etag(message)
+                self.passthrough = True
+            return
+
+        if message_type != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.start is not None:
+            # 第一个响应块: 决定是否压缩
+            start, self.start = self.start, None
+            body: bytes = message.get("body", b"")
+            more_body: bool = message.get("more_body", False)
+            if self.passthrough or (not more_body and len(body) < self.middleware.minimum_size):
+                await self._send(start)
+                await self._send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers and headers["etag"].endswith("\""):
+                headers["ETag"] = headers["etag"][:-1] + f"-{self.encoding}\""
+            if not more_body:
+                compressed = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(compressed))
+                await self._send(start)
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+            del headers["Content-Length"]
+            await self._send(start)
+            await self._send({"type": "http.response.body", "body": self.compressor.compress(body), "more_body": True})
+            return
+
+        if self.compressor is None:
+            await self._send(message)
+            return
+        body = self.compressor.compress(message.get("body", b""))
+        if message.get("more_body", False):
+            await self._send({"type": "http.response.body", "body": body, "more_body": True})
+        else:
+            await self._send({"type": "http.response.body", "body": body + self.compressor.finish()})
+
+    def _fix_not_modified_etag(self, message: Message) -> None:
+        """304响应返回客户端发来的(带编码后缀的)ETag, 与客户端缓存的响应一致"""
+        headers = MutableHeaders(raw=message["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        etag: Any = headers.get("etag")
+        if etag is None:
+            return
+        for tag in self.client_tags:
+            if _strip_etag_suffix(tag[2:] if tag.startswith("W/") else tag) == etag:
+                headers["ETag"] = tag
+                return
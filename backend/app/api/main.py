@@ -1,14 +1,35 @@
 """FastAPI主应用"""
 
+import asyncio
+import logging
+from pathlib import Path
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from ..config import get_settings, validate_config, print_config
-from .routes import trip, poi, map as map_routes
-from ..agents.tools import get_tools
+from ..logging_config import dropped_logs, setup_logging, stop_logging
+from .compression import CompressionMiddleware
+from .profiling import ProfilingMiddleware
+from .request_id import RequestIdMiddleware
+from .routes import trip, poi, admin, map as map_routes
+from ..agents.tools import get_tools, close_tools
+from ..agents.multi_agents import get_multi_agents, close_multi_agents, checkpoint_memory_status
+from ..services.poi_store import get_poi_store
+from ..services.prewarm_service import get_prewarm_service
+from ..services.readiness import get_readiness
+from ..services.circuit_breaker import breaker_status
+from ..services.llm_metrics import get_llm_metrics
+from ..services.llm_hedging import hedging_status
+from ..services.llm_endpoints import endpoint_status
+from ..services.llm_service import resolve_llm_config, ROLES
 
 # 获取配置
 settings = get_settings()
 
+# 日志由后台线程输出(在导入其他模块打印日志之前初始化)
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # 创建FastAPI应用
 app = FastAPI(
     title= settings.app_name,
@@ -28,17 +49,54 @@ app.add_middleware(
 )
 
 
+# 响应压缩(旅行计划等较大的JSON响应)
+if settings.response_compression:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_size,
+        gzip_level=settings.gzip_level,
+        brotli_quality=settings.brotli_quality
+    )
+
+# 按请求性能分析(仅管理员显式开启的请求, 包含压缩耗时)
+app.add_middleware(ProfilingMiddleware, admin_token=settings.admin_token)
+
+# 请求ID(最外层, 压缩和路由中的日志都带有请求ID)
+app.add_middleware(RequestIdMiddleware)
+
 # 注册路由
 app.include_router(trip.router, prefix="/api")
 app.include_router(map_routes.router, prefix="/api")
 app.include_router(poi.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
+
+# 后台初始化任务
+_init_task = None
+
+
+async def init_agents():
+    """预热MCP会话、LLM、智能体、状态图和检查点存储, 完成后开始缓存预热"""
+    while True:
+        try:
+            tools = await get_tools()
+            logger.info(f"✅ 成功获取 {len(tools)} 个工具")
+            await get_multi_agents()
+            logger.info("✅ 多智能体系统已就绪")
+            break
+        except Exception as e:
+            if settings.startup_mode == "eager":
+                raise
+            # 后台模式下失败后定时重试, /readyz在此期间返回503
+            logger.error(f"❌ 后台初始化失败, {settings.startup_retry_interval}秒后重试: {str(e)}")
+            await asyncio.sleep(settings.startup_retry_interval)
+
+    # 后台预热热门城市的缓存
+    get_prewarm_service().start()
 
 @app.on_event("startup")
 async def startup_event():
     """应用启动事件"""
-    print("\n" + "="*60)
-    print(f"🚀 {settings.app_name} v{settings.app_version}")
-    print("="*60)
+    logger.info(f"🚀 {settings.app_name} v{settings.app_version}")
 
     # 打印配置信息
     print_config()
@@ -46,18 +104,27 @@ async def startup_event():
     # 验证配置
     try:
         validate_config()
-        print("\n✅ 配置验证通过")
+        logger.info("✅ 配置验证通过")
     except ValueError as e:
-        print(f"\n❌ 配置验证失败:\n{e}")
-        print("\n请检查.env文件并确保所有必要的配置项都已设置")
+        logger.error(f"❌ 配置验证失败: {e}. 请检查.env文件并确保所有必要的配置项都已设置")
         raise
 
-    print("\n" + "="*60)
-    print("📚 API文档: http://localhost:8000/docs")
-    print("📖 ReDoc文档: http://localhost:8000/redoc")
+    logger.info("📚 API文档: http://localhost:8000/docs  📖 ReDoc文档: http://localhost:8000/redoc")
+
+    # 导入本地POI数据
+    if settings.poi_data_dir:
+        store = get_poi_store()
+        for path in sorted(Path(settings.poi_data_dir).glob("*")):
+            if path.suffix in (".jsonl", ".csv"):
+                store.load_file(str(path), city=path.stem)
 
     # print("CORS origins:", settings.get_cors_origins_list())
-    tools = await get_tools()
+    global _init_task
+    if settings.startup_mode == "eager":
+        await init_agents()
+    else:
+        # 先开始监听端口, 工具和智能体在后台初始化
+        _init_task = asyncio.create_task(init_agents())
 
     # print(f"✅ 成功获取 {len(tools)} 个工具\n")
     # print(f"🔍 工具列表:\n" + "\n".join(t.name for t in tools))
@@ -66,9 +133,15 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭事件"""
-    print("\n" + "="*60)
-    print("👋 应用正在关闭...")
-    print("="*60 + "\n")
+    if _init_task is not None and not _init_task.done():
+        _init_task.cancel()
+    await get_prewarm_service().stop()
+    await close_multi_agents()
+    await close_tools()
+
+    logger.info("👋 应用正在关闭...")
+    # 输出队列中剩余的日志
+    stop_logging()
 
 @app.get("/")
 async def root():
@@ -90,6 +163,42 @@ async def health():
         "version": settings.app_version
     }
 
+@app.get("/livez")
+async def livez():
+    """存活检查(进程能响应即可, 不检查依赖)"""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readyz():
+    """就绪检查: 所有组件预热完成后返回200, 否则返回503(附带高德/LLM熔断器状态和丢弃的日志数量)"""
+    readiness = get_readiness()
+    return JSONResponse(
+        status_code=200 if readiness.is_ready() else 503,
+        content={**readiness.status(), "breakers": breaker_status(), "dropped_logs": dropped_logs()}
+    )
+
+@app.get("/metrics/llm")
+async def llm_metrics():
+    """各角色的LLM调用指标(模型、调用次数、延迟分位数、token用量)、对冲请求统计和各LLM服务的健康状态"""
+    return {
+        "models": {role: resolve_llm_config(role)[0] for role in ROLES},
+        "roles": get_llm_metrics().snapshot(),
+        "hedging": hedging_status(),
+        "endpoints": endpoint_status()
+    }
+
+@app.get("/metrics/checkpoint")
+async def checkpoint_metrics():
+    """检查点指标: 序列化(写入字节数相对默认序列化器的减少比例、去重的工具结果数量、平均写入耗时)和内存检查点的占用"""
+    from ..services.checkpoint_serde import get_checkpoint_serde
+
+    serde = get_checkpoint_serde()
+    return {
+        "serializer": settings.checkpoint_serializer,
+        "stats": serde.stats() if serde is not None else None,
+        "memory": checkpoint_memory_status()
+    }
+
 # if __name__ == "__main__":
 #     import uvicorn
 
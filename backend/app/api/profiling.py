@@ -0,0 +1,79 @@
+"""请求性能分析中间件(仅管理员显式开启的请求)"""
+
+import hmac
+import logging
+from urllib.parse import parse_qs
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..logging_config import request_id_var
+
+logger = logging.getLogger(__name__)
+
+_TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def is_admin(token: str, admin_token: str) -> bool:
+    """管理员令牌是否正确(未配置管理员令牌时总是False)"""
+    return bool(admin_token) and hmac.compare_digest(token.encode("utf-8"), admin_token.encode("utf-8"))
+
+
+class ProfilingMiddleware:
+    """按请求性能分析中间件
+
+    请求带有X-Profile: 1请求头或profile=1查询参数, 并且X-Admin-Token是管理员令牌时, 在采样分析器下运行该请求,
+    响应头X-Profile-ID返回分析ID, 结果通过 /api/admin/profiles/{分析ID} 下载。
+    其他请求只检查一次请求头和查询字符串。
+    """
+
+    def __init__(self, app: ASGIApp, admin_token: str):
+        """
+        初始化
+        Args:
+            app: ASGI应用
+            admin_token: 管理员令牌
+        """
+        self.app = app
+        self.admin_token = admin_token
+
+    def _requested(self, scope: Scope, headers: Headers) -> bool:
+        """请求是否要求分析"""
+        if headers.get("x-profile", "").lower() in _TRUE_VALUES:
+            return True
+        query = scope.get("query_string", b"")
+        if b"profile=" not in query:
+            return False
+        values = parse_qs(query.decode("latin-1")).get("profile", [])
+        return any(v.lower() in _TRUE_VALUES for v in values)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.admin_token:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if not self._requested(scope, headers):
+            await self.app(scope, receive, send)
+            return
+        if not is_admin(headers.get("x-admin-token", ""), self.admin_token):
+            logger.warning(f"⚠️  请求要求性能分析但管理员令牌不正确, 按普通请求处理: {scope['path']}")
+            await self.app(scope, receive, send)
+            return
+
+        # 只有开启分析时才导入(会注册LangChain回调钩子)
+        from ..services.request_profiler import get_request_profiler
+
+        profiler = get_request_profiler()
+        profile = profiler.start(scope["method"], scope["path"], request_id_var.get())
+        status_code = 0
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["X-Profile-ID"] = profile.id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop(profile, status_code)
@@ -0,0 +1,31 @@
+"""请求ID中间件"""
+
+import uuid
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..logging_config import request_id_var
+
+
+class RequestIdMiddleware:
+    """为每个请求设置请求ID(沿用请求头X-Request-ID, 没有时生成), 写入日志并在响应头中返回"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("x-request-id") or uuid.uuid4().hex[:16]
+        token = request_id_var.set(request_id[:64])
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id_var.get()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
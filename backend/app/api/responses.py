@@ -0,0 +1,82 @@
+"""响应序列化模块(快速JSON响应和强ETag)"""
+
+import hashlib
+import json
+from typing import Any, Optional
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # 未安装orjson时使用标准库json
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """orjson无法直接序列化的对象(pydantic模型)"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    序列化为JSON字节串
+    Args:
+        content: pydantic模型, 或包含pydantic模型的dict/list
+    Returns:
+        UTF-8编码的JSON
+    """
+    if isinstance(content, BaseModel):
+        # pydantic的Rust序列化器直接输出JSON, 不经过中间dict
+        return content.model_dump_json().encode("utf-8")
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """快速JSON响应
+
+    直接返回这个响应时FastAPI不再按response_model重新校验和序列化返回值:
+    pydantic模型用model_dump_json序列化, dict/list用orjson序列化。
+    用于返回整份旅行计划这类较大的响应。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def etag_for(body: bytes) -> str:
+    """响应内容的强ETag(内容哈希)"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match是否匹配(弱比较: 忽略W/前缀)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in tags)
+
+
+def etag_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    """
+    带强ETag的JSON响应: 请求的If-None-Match与内容的ETag相同时返回304(不含响应体)
+    Args:
+        request: 请求
+        content: 响应内容(pydantic模型或dict)
+        status_code: 内容未变化以外的状态码
+    Returns:
+        响应
+    """
+    body = dumps(content)
+    etag = etag_for(body)
+    # 每次都向服务端确认, 内容未变化时只返回304
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
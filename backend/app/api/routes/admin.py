@@ -0,0 +1,77 @@
+"""管理API路由(需要管理员令牌)"""
+
+import logging
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from ..profiling import is_admin
+from ..responses import FastJSONResponse
+from ...config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def require_admin(x_admin_token: str = Header("", description="管理员令牌")) -> None:
+    """检查管理员令牌(未配置ADMIN_TOKEN时管理API不可用)"""
+    if not is_admin(x_admin_token, get_settings().admin_token):
+        raise HTTPException(status_code=403, detail="需要管理员令牌")
+
+
+router = APIRouter(prefix="/admin", tags=["管理"], dependencies=[Depends(require_admin)])
+
+
+def _load_profile(profile_id: str):
+    """读取分析结果, 不存在(或已过期)时返回404"""
+    from ...services.request_profiler import get_request_profiler
+
+    saved = get_request_profiler().get(profile_id)
+    if saved is None:
+        raise HTTPException(status_code=404, detail=f"分析结果不存在或已过期: {profile_id}")
+    return saved
+
+
+@router.get(
+    "/profiles",
+    summary="最近的请求分析",
+    description="本进程最近完成的请求分析(分析ID、路径、状态码、耗时)"
+)
+async def list_profiles():
+    """最近的请求分析"""
+    from ...services.request_profiler import get_request_profiler
+
+    return {"profiles": get_request_profiler().recent()}
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    summary="请求分析结果",
+    description="采样汇总(自身时间最多的函数、等待I/O的比例)、状态图各节点/LLM/工具的耗时和asyncio任务跟踪"
+)
+async def get_profile(profile_id: str):
+    """
+    请求分析结果
+    Args:
+        profile_id: 分析ID(分析请求的响应头X-Profile-ID)
+    Returns:
+        分析结果
+    """
+    return FastJSONResponse(_load_profile(profile_id)["summary"])
+
+
+@router.get(
+    "/profiles/{profile_id}/collapsed",
+    summary="下载折叠栈",
+    description="折叠栈格式的采样结果, 可用flamegraph.pl或speedscope生成火焰图",
+    response_class=PlainTextResponse
+)
+async def download_collapsed(profile_id: str):
+    """
+    下载折叠栈
+    Args:
+        profile_id: 分析ID
+    Returns:
+        折叠栈文本
+    """
+    return PlainTextResponse(
+        _load_profile(profile_id)["collapsed"],
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'}
+    )
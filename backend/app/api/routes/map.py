@@ -1,15 +1,23 @@
 """地图服务API路由"""
 
-from fastapi import APIRouter, HTTPException, Query
+import logging
+from fastapi import APIRouter, HTTPException, Query, Request
 from typing import Optional
 from ...models.schemas import (
+    Location,
     POISearchRequest,
     POISearchResponse,
     RouteRequest,
     RouteResponse,
     WeatherResponse
 )
+from ..responses import etag_response
+from ...services.amap_quota import get_quota_manager
 from ...services.amap_service import get_amap_service
+from ...services.prewarm_service import get_prewarm_service
+from ...services.readiness import get_readiness
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/map",tags=["地图服务"])
 
@@ -20,9 +28,11 @@ router = APIRouter(prefix="/map",tags=["地图服务"])
     description="根据关键词搜索POI(兴趣点)"
 )
 async def search_poi(
+    request: Request,
     keywords: str = Query(...,description="搜索关键词",example="故宫"),
     city: str = Query(...,description="城市名称",example="北京"),
-    citylimit: bool = Query(True,description="是否限制在城市范围内")
+    citylimit: bool = Query(True,description="是否限制在城市范围内"),
+    poi_type: str = Query("",alias="type",description="POI类型过滤,如风景名胜、住宿服务")
 ):
     """
     搜索POI
@@ -30,6 +40,7 @@ async def search_poi(
         keywords: 搜索关键词
         city: 城市
         citylimit: 是否限制在城市范围内
+        poi_type: POI类型过滤
     Returns:
         POI搜索结果
     """
@@ -38,21 +49,117 @@ async def search_poi(
         service = get_amap_service()
 
         # 搜索POI
-        pois = service.search_poi(keywords,city,citylimit)
+        pois = await service.search_poi(keywords,city,citylimit,poi_type)
 
-        return POISearchResponse(
+        return etag_response(request, POISearchResponse(
             success=True,
             message="POI搜索成功",
             data=pois
-        )
+        ))
 
     except Exception as e:
-        print(f"❌ POI搜索失败: {str(e)}")
+        logger.error(f"❌ POI搜索失败: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"POI搜索失败:{str(e)}"
         )
     
+@router.get(
+    "/poi/nearby",
+    response_model=POISearchResponse,
+    summary="周边搜索POI",
+    description="搜索坐标附近的POI,优先使用本地POI存储"
+)
+async def search_nearby(
+    request: Request,
+    longitude: float = Query(...,description="经度",example=116.397128),
+    latitude: float = Query(...,description="纬度",example=39.916527),
+    radius: int = Query(1000,description="搜索半径(米)",ge=1,le=50000),
+    keywords: str = Query("",description="类型/名称关键词",example="酒店")
+):
+    """
+    周边搜索POI
+    Args:
+        longitude: 经度
+        latitude: 纬度
+        radius: 搜索半径(米)
+        keywords: 类型/名称关键词
+    Returns:
+        POI搜索结果
+    """
+    try:
+        service = get_amap_service()
+
+        pois = await service.search_nearby(
+            Location(longitude=longitude, latitude=latitude),
+            radius=radius,
+            keywords=keywords
+        )
+
+        return etag_response(request, POISearchResponse(
+            success=True,
+            message="周边搜索成功",
+            data=pois
+        ))
+
+    except Exception as e:
+        logger.error(f"❌ 周边搜索失败: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"周边搜索失败:{str(e)}"
+        )
+
+@router.get(
+    "/poi/bounds",
+    response_model=POISearchResponse,
+    summary="矩形范围搜索POI",
+    description="搜索地图可视范围内的POI(只查询本地POI存储,不调用高德)"
+)
+async def search_in_bounds(
+    request: Request,
+    min_lng: float = Query(...,description="最小经度",ge=-180,le=180,example=116.38),
+    min_lat: float = Query(...,description="最小纬度",ge=-90,le=90,example=39.90),
+    max_lng: float = Query(...,description="最大经度",ge=-180,le=180,example=116.42),
+    max_lat: float = Query(...,description="最大纬度",ge=-90,le=90,example=39.93),
+    keywords: str = Query("",description="类型/名称关键词",example="景点"),
+    limit: int = Query(100,description="最大返回数量",ge=1,le=500)
+):
+    """
+    矩形范围搜索POI
+    Args:
+        min_lng: 最小经度
+        min_lat: 最小纬度
+        max_lng: 最大经度
+        max_lat: 最大纬度
+        keywords: 类型/名称关键词
+        limit: 最大返回数量
+    Returns:
+        POI搜索结果
+    """
+    if min_lng > max_lng or min_lat > max_lat:
+        raise HTTPException(
+            status_code=400,
+            detail="矩形范围无效: 最小经纬度不能大于最大经纬度"
+        )
+
+    try:
+        service = get_amap_service()
+
+        pois = service.search_in_bounds(min_lng, min_lat, max_lng, max_lat, keywords, limit)
+
+        return etag_response(request, POISearchResponse(
+            success=True,
+            message="范围搜索成功",
+            data=pois
+        ))
+
+    except Exception as e:
+        logger.error(f"❌ 范围搜索失败: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"范围搜索失败:{str(e)}"
+        )
+
 @router.get(
     "/weather",
     response_model=WeatherResponse,
@@ -60,6 +167,7 @@ async def search_poi(
     description="查询指定城市的天气"
 )
 async def get_weather(
+    request: Request,
     city: str = Query(..., description= "城市名称", example= "北京")
 ):
     """
@@ -74,17 +182,17 @@ async def get_weather(
         service = get_amap_service()
 
         # 查询天气
-        weather = service.get_weather(city)
+        weather = await service.get_weather(city)
 
-        # 返回响应
-        return WeatherResponse(
+        # 返回响应(内容未变化时返回304)
+        return etag_response(request, WeatherResponse(
             success=True,
             message="天气查询成功",
             data=weather
-        )
+        ))
 
     except Exception as e:
-        print(f"❌ 天气查询失败: {str(e)}")
+        logger.error(f"❌ 天气查询失败: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"天气查询失败：{str(e)}"
@@ -109,7 +217,7 @@ async def plan_route(request: RouteRequest):
         service = get_amap_service()
 
         # 路线规划
-        route = service.plan_route(
+        route = await service.plan_route(
             origin_address=request.origin_address,
             destination_address=request.destination_address,
             origin_city=request.origin_city,
@@ -117,19 +225,48 @@ async def plan_route(request: RouteRequest):
             route_type=request.route_type
         )
 
-        # 生成响应 
-        return RouteResponse(
-            success=True,
-            message="路线规划成功",
-            data=route
-        )
     except Exception as e:
-        print(f"❌ 路线规划失败: {str(e)}")
+        logger.error(f"❌ 路线规划失败: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"路线规划失败:{str(e)}"
         )
 
+    if route is None:
+        raise HTTPException(
+            status_code=502,
+            detail="路线规划失败:高德未返回可用的路线"
+        )
+
+    # 生成响应 
+    return RouteResponse(
+        success=True,
+        message="路线规划成功",
+        data=route
+    )
+
+@router.get(
+    "/prewarm",
+    summary="缓存预热状态",
+    description="查看各城市的缓存预热进度和数据新鲜度"
+)
+async def prewarm_status():
+    """
+    缓存预热状态
+    """
+    return get_prewarm_service().status()
+
+@router.get(
+    "/quota",
+    summary="高德配额状态",
+    description="查看各高德Key各工具的当天用量和排队情况"
+)
+async def quota_status():
+    """
+    高德配额状态
+    """
+    return get_quota_manager().status()
+
 @router.get(
     "/health",
     summary="健康检查",
@@ -139,18 +276,19 @@ async def health_check():
     """
     健康检查
     """
-    try:
-        # 获取服务实例
-        service = get_amap_service()
-
-        return {
-            "status": "healthy",
-            "service": "map-service",
-            "mcp_tools_count": len(service.mcp_tools)
-        }
-
-    except Exception as e:
+    mcp_tools = get_readiness().status()["components"]["mcp_tools"]
+    if mcp_tools["state"] != "ready":
         raise HTTPException(
             status_code=503,
-            detail=f"地图服务不可用:{str(e)}"
-        )
\ No newline at end of file
+            detail=f"地图服务不可用:{mcp_tools.get('error', 'MCP工具尚未加载')}"
+        )
+
+    # 获取服务实例(MCP工具在服务第一次调用时才绑定, 此时mcp_tools可能为None)
+    service = get_amap_service()
+
+    return {
+        "status": "healthy",
+        "service": "map-service",
+        "mcp_tools_count": len(service.mcp_tools or []),
+        "mcp_tools": mcp_tools.get("detail")
+    }
\ No newline at end of file
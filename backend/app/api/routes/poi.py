@@ -1,12 +1,16 @@
 """POI相关API路由"""
 
-from fastapi import APIRouter, HTTPException
+import logging
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
 from typing import List, Optional
+from ..responses import etag_response
 from ...models.schemas import POIDetailResponse
 from ...services.amap_service import get_amap_service
 from ...services.unsplash_service import get_unsplash_service
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/poi",tags=["POI"])
 
 @router.get(
@@ -15,7 +19,7 @@ router = APIRouter(prefix="/poi",tags=["POI"])
     summary="获取POI详情",
     description="根据POI ID获取详情"
 )
-async def get_poi_detail(poi_id: str):
+async def get_poi_detail(request: Request, poi_id: str):
     """
     获取POI详情
     Args:
@@ -28,46 +32,54 @@ async def get_poi_detail(poi_id: str):
         service = get_amap_service()
 
         # 调用高德地图POI详情API
-        result = service.get_poi_detail(poi_id)
+        result = await service.get_poi_detail(poi_id)
 
-        return POIDetailResponse(
-            success=True,
-            message="获取POI详情成功",
-            data=result
-        )
     except Exception as e:
-        print(f"❌ 获取POI详情失败: {str(e)}")
+        logger.error(f"❌ 获取POI详情失败: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"获取POI详情失败: {str(e)}"
         )
 
+    if not result:
+        raise HTTPException(
+            status_code=502,
+            detail=f"获取POI详情失败: 高德未返回POI {poi_id}的详情"
+        )
+
+    return etag_response(request, POIDetailResponse(
+        success=True,
+        message="获取POI详情成功",
+        data=result
+    ))
+
 @router.get(
     "/search",
     summary="搜索POI",
     description="根据关键词搜索POI"
 )
-async def search_poi(keywords: str, city: str = "北京"):
+async def search_poi(request: Request, keywords: str, city: str = "北京", type: str = ""):
     """
     搜索POI
     Args:
         keywords: 搜索关键词
         city: 城市名称
+        type: POI类型过滤
     Returns:
         搜索结果
     """
     try:
         amap_service = get_amap_service()
-        result = amap_service.search_poi(keywords, city)
+        result = await amap_service.search_poi(keywords, city, poi_type=type)
 
-        return {
+        return etag_response(request, {
             "success": True,
             "message": "搜索成功",
             "data": result
-        }
+        })
 
     except Exception as e:
-        print(f"❌ 搜索POI失败: {str(e)}")
+        logger.error(f"❌ 搜索POI失败: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"搜索POI失败: {str(e)}"
@@ -78,7 +90,7 @@ async def search_poi(keywords: str, city: str = "北京"):
     summary="获取景点图片",
     description="根据景点名称从Unsplash获取图片"
 )
-async def get_attraction_photo(name: str):
+async def get_attraction_photo(request: Request, name: str):
     """
     获取景点图片
     Args:
@@ -97,17 +109,17 @@ async def get_attraction_photo(name: str):
             # 如果没找到,尝试只用景点名称搜索
             result = service.get_photo_url(name)
 
-        return {
+        return etag_response(request, {
             "success": True,
             "message": f"成功获取{name}景点图片",
             "data": {
                 "name": name,
                 "photo_url": result
             }
-        }
+        })
 
     except Exception as e:
-        print(f"❌ 获取景点图片失败: {str(e)}")
+        logger.error(f"❌ 获取景点图片失败: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"获取景点图片失败: {str(e)}"
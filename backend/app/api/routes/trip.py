@@ -1,12 +1,29 @@
 """旅行规划API路由"""
 
-from fastapi import APIRouter, HTTPException
+import logging
+import uuid
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from ..responses import FastJSONResponse, etag_response
+from ...config import get_settings
 from ...models.schemas import (
     TripRequest,
+    TripBatchRequest,
+    TripPlanPatch,
+    TripReplanResponse,
     TripPlanResponse,
+    MultiCityTripRequest,
+    MultiCityTripPlanResponse,
     ErrorResponse
 )
 from ...agents.multi_agents import get_multi_agents
+from ...agents.replanner import Replanner
+from ...services.prewarm_service import get_prewarm_service
+from ...services.readiness import get_readiness
+from ...services.batch_service import get_batch_planner
+from ...services.multi_city_service import get_multi_city_planner
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/trip",tags=["旅行计划"])
 
@@ -25,47 +42,201 @@ async def plan_trip(request: TripRequest):
         旅行计划响应
     """
     try:
-        print("🔄 获取多智能体系统实例...")
+        # 记录请求的城市和偏好,用于学习需要预热的城市
+        get_prewarm_service().record_request(request.city, request.preferences)
+
+        logger.debug("🔄 获取多智能体系统实例...")
         multi_agents = await get_multi_agents()
 
-        print("🚀 开始生成旅行计划...")
-        trip_plan = await multi_agents.plan_trip(request=request)
+        logger.info("🚀 开始生成旅行计划...")
+        plan_id = uuid.uuid4().hex
+        trip_plan = await multi_agents.plan_trip(request=request, plan_id=plan_id)
 
         # print("返回到前端的相应数据:\n"+"data=trip_plan:\n"+str(trip_plan)+"\n")
 
-        return TripPlanResponse(
-            success=True,
-            message="旅行计划生成成功",
-            data=trip_plan
-        )
-    
     except Exception as e:
-        print(f"❌ 生成旅行计划失败：{str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ 生成旅行计划失败：{str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"生成旅行计划失败：{str(e)}"
         )
 
-@ router.get(
-    "/health",
-    summary="健康检查",
-    description="检查旅行规划服务是否正常"
+    if trip_plan is None:
+        # 生成失败且没有可用的降级计划(上游不可用且本地没有候选景点), 不返回success=True的空计划
+        raise HTTPException(
+            status_code=503,
+            detail="生成旅行计划失败：上游服务不可用且没有可用的降级计划, 请稍后重试"
+        )
+
+    # 直接返回序列化后的响应, 不再按response_model重新校验整份计划
+    return FastJSONResponse(TripPlanResponse(
+        success=True,
+        message="旅行计划部分生成" if trip_plan.partial else "旅行计划生成成功",
+        plan_id=plan_id,
+        data=trip_plan
+    ))
+
+@router.get(
+    "/plan/{plan_id}",
+    response_model=TripPlanResponse,
+    summary="获取已生成的旅行计划",
+    description="读取保存的旅行计划(带ETag, 内容未变化时返回304)"
 )
-async def health_check():
-    """健康检查"""
+async def get_trip_plan(http_request: Request, plan_id: str):
+    """
+    获取已生成的旅行计划
+    Args:
+        http_request: HTTP请求(读取If-None-Match)
+        plan_id: 生成计划时返回的计划ID
+    Returns:
+        旅行计划响应
+    """
+    multi_agents = await get_multi_agents()
+    plan = multi_agents.stored_plan(plan_id)
+    if plan is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"计划不存在或已过期: {plan_id}"
+        )
+
+    return etag_response(http_request, {
+        "success": True,
+        "message": "获取旅行计划成功",
+        "plan_id": plan_id,
+        "data": plan
+    })
+
+@router.patch(
+    "/plan/{plan_id}",
+    response_model=TripReplanResponse,
+    summary="局部重新规划",
+    description="修改已生成计划的某一天或某个属性,只重新运行受影响的助手和天,返回新计划和差异"
+)
+async def replan_trip(plan_id: str, patch: TripPlanPatch):
+    """
+    局部重新规划
+    Args:
+        plan_id: 生成计划时返回的计划ID
+        patch: 修改内容
+    Returns:
+        新计划和与上一版计划的差异
+    """
     try:
         multi_agents = await get_multi_agents()
+        plan, diff, days, agents = await Replanner(multi_agents).replan(plan_id, patch)
+
+        return FastJSONResponse(TripReplanResponse(
+            success=True,
+            message="旅行计划更新成功",
+            plan_id=plan_id,
+            replanned_days=days,
+            rerun_agents=agents,
+            diff=diff,
+            data=plan
+        ))
+
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"计划不存在或已过期: {plan_id}"
+        )
+    except Exception as e:
+        logger.error(f"❌ 局部重新规划失败：{str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"局部重新规划失败：{str(e)}"
+        )
+
+@router.post(
+    "/plan/batch",
+    summary="批量生成旅行计划",
+    description="一次提交多个旅行请求,相同城市的调研只做一次,各请求并发规划,"
+                "结果按完成顺序以NDJSON格式逐行返回(每行一个TripBatchItem)"
+)
+async def plan_trip_batch(batch: TripBatchRequest):
+    """
+    批量生成旅行计划
+    Args:
+        batch: 批量旅行请求
+    Returns:
+        NDJSON流,每行包含请求下标和对应的旅行计划
+    """
+    settings = get_settings()
+    if len(batch.requests) > settings.batch_max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"批量请求数量超过上限{settings.batch_max_size}"
+        )
 
-        return {
-            "status" : "health",
-            "service" : "trip",
-            "agents_name" : multi_agents.supervisor_agent.name
-        }
+    for request in batch.requests:
+        get_prewarm_service().record_request(request.city, request.preferences)
 
+    # 在开始返回数据之前初始化, 初始化失败时仍可返回错误状态码
+    try:
+        multi_agents = await get_multi_agents()
     except Exception as e:
         raise HTTPException(
             status_code=503,
             detail=f"服务不可用:{str(e)}"
-        )
\ No newline at end of file
+        )
+
+    async def stream():
+        async for item in get_batch_planner().run(multi_agents, batch.requests):
+            yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@router.post(
+    "/plan/multi-city",
+    response_model=MultiCityTripPlanResponse,
+    summary="生成多城市旅行计划",
+    description="各城市的行程并发规划,再合并为一份包含城市间交通和总预算的计划"
+)
+async def plan_multi_city_trip(request: MultiCityTripRequest):
+    """
+    生成多城市旅行计划
+    Args:
+        request: 多城市旅行请求
+    Returns:
+        多城市旅行计划响应
+    """
+    try:
+        for leg in request.legs:
+            get_prewarm_service().record_request(leg.city, leg.preferences or request.preferences)
+
+        multi_agents = await get_multi_agents()
+        plan = await get_multi_city_planner().plan(multi_agents, request)
+
+        return FastJSONResponse(MultiCityTripPlanResponse(
+            success=True,
+            message="多城市旅行计划生成成功",
+            data=plan
+        ))
+
+    except Exception as e:
+        logger.error(f"❌ 生成多城市旅行计划失败：{str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"生成多城市旅行计划失败：{str(e)}"
+        )
+
+@ router.get(
+    "/health",
+    summary="健康检查",
+    description="检查旅行规划服务是否正常"
+)
+async def health_check():
+    """健康检查(只读取就绪状态, 不会触发多智能体初始化)"""
+    readiness = get_readiness()
+    components = readiness.status()["components"]
+    if not readiness.is_ready("agents") or not readiness.is_ready("graph"):
+        raise HTTPException(
+            status_code=503,
+            detail=f"服务不可用:{components['agents'].get('error', '多智能体系统尚未初始化')}"
+        )
+
+    return {
+        "status" : "health",
+        "service" : "trip",
+        "agents" : components["agents"].get("detail")
+    }
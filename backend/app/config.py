@@ -1,5 +1,6 @@
 """配置管理模块"""
 
+import logging
 import os
 from pathlib import Path
 from typing import List
@@ -10,6 +11,8 @@ from dotenv import load_dotenv
 # 首先尝试加载当前目录的.env
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class Settings(BaseSettings):
     """应用配置"""
 
@@ -28,6 +31,11 @@ class Settings(BaseSettings):
 
     # 高德地图API配置
     amap_api_key: str = ""
+    amap_api_keys: str = ""            # 额外的高德Key(逗号分隔), 与AMAP_API_KEY轮换使用
+    amap_qps: float = 3.0              # 每个Key每个工具的QPS(同一台机器上的worker合计, 多台机器时按机器数均分)
+    amap_daily_quota: int = 5000       # 每个Key每个工具的每日配额
+    amap_tool_limits: str = ""         # 按工具覆盖限额, 如 maps_weather=10:100000 (QPS:每日配额)
+    amap_quota_path: str = "cache/amap_quota.db"  # 每日用量存储(多个worker共用, 重启后保留)
 
     # Unsplash API配置
     unsplash_access_key: str = ""
@@ -37,9 +45,130 @@ class Settings(BaseSettings):
     llm_model_id: str = ""
     llm_api_key: str = ""
     llm_base_url: str = ""
+    llm_timeout: int = 60   # 单次LLM请求超时(秒)
+
+    # 调用工具的助手使用的小模型(留空的项沿用上面的主模型配置)
+    llm_tool_model_id: str = ""
+    llm_tool_api_key: str = ""
+    llm_tool_base_url: str = ""
+    # 使用小模型的角色,逗号分隔(可选 attraction,weather,hotel,supervisor,synthesis)
+    llm_tool_roles: str = "attraction,weather,hotel"
+    llm_max_concurrency: int = 16   # 同时进行的LLM请求数量(包括对冲请求)
+
+    # 多个LLM服务/密钥(JSON列表), 配置后替代上面的主模型地址和密钥, 按权重和未完成请求数分摊请求:
+    # [{"base_url": "...", "api_key": "...", "weight": 2, "model": "可选"}]
+    llm_endpoints: str = ""
+    llm_endpoint_backoff: float = 5.0        # 服务出错或限流后首次摘除的时间(秒), 连续失败时翻倍
+    llm_endpoint_max_backoff: float = 120.0  # 最长摘除时间(秒)
+
+    # LLM对冲请求: 超过阈值(最近请求首个token延迟的分位数)仍未返回时发出重复请求, 取先返回的结果
+    llm_hedge_enabled: bool = False
+    llm_hedge_roles: str = "supervisor,synthesis"  # 开启对冲的角色
+    llm_hedge_quantile: float = 0.95
+    llm_hedge_min_delay: float = 1.0       # 最小阈值(秒)
+    llm_hedge_initial_delay: float = 15.0  # 样本不足时的阈值(秒)
+    llm_hedge_loser_sample_rate: float = 0.05  # 对冲请求胜出时让主请求继续运行的比例, 用于估计对冲节省的时间
+    # 对冲请求使用的备用服务(留空的项沿用主模型配置)
+    llm_hedge_model_id: str = ""
+    llm_hedge_api_key: str = ""
+    llm_hedge_base_url: str = ""
+
+    # 启动模式: eager 启动时同步初始化工具和智能体后再接收请求;
+    # background 立即开始监听端口, 工具和智能体在后台初始化
+    startup_mode: str = "background"
+    startup_retry_interval: int = 10   # 后台初始化失败后的重试间隔(秒)
+
+    # 多智能体检查点存储: postgres 使用checkpoint_db_url(为空或连接失败时使用内存检查点);
+    # memory 单机/开发环境不需要Postgres, 使用有内存上限的进程内检查点
+    checkpoint_backend: str = "postgres"
+    checkpoint_db_url: str = ""
+    # 内存检查点: 超过上限时淘汰最久未使用的线程; 配置checkpoint_spill_path时被淘汰的线程写入本地文件, 再次访问时读回
+    checkpoint_memory_max_bytes: int = 256 * 1024 * 1024   # 内存中检查点数据总大小上限(字节)
+    checkpoint_memory_max_threads: int = 0                  # 内存中的线程数上限, 0表示只按大小限制
+    checkpoint_spill_path: str = ""                         # 为空时被淘汰的线程直接丢弃
+    checkpoint_spill_max_bytes: int = 1024 * 1024 * 1024   # 本地文件总大小上限(字节), 超出后删除最早写入的线程
+    # 检查点序列化: compact 压缩(已安装zstandard时用zstd, 否则zlib), 同一线程的检查点中重复的工具结果只保存一次;
+    # default 使用LangGraph默认的序列化器. 两种方式都能读取已有的检查点
+    checkpoint_serializer: str = "compact"
+    checkpoint_compression_level: int = 3      # 压缩级别(zstd 1~22, zlib 1~9)
+    checkpoint_compress_min_size: int = 256    # 小于该大小(字节)的值不压缩
+    checkpoint_dedupe_min_size: int = 1024     # 不小于该长度(字符)的工具结果单独保存
+
+    # 响应压缩配置(已安装brotli时优先使用brotli, 否则使用gzip)
+    response_compression: bool = True
+    compression_min_size: int = 1024   # 小于该大小(字节)的响应不压缩
+    gzip_level: int = 5                # gzip压缩级别(1~9)
+    brotli_quality: int = 4            # brotli压缩质量(0~11)
+
+    # 并发配置
+    plan_max_concurrency: int = 4    # 同时运行的多智能体规划数量(每个规划同一时间约占用一个LLM调用)
+    amap_max_concurrency: int = 8    # 同时调用高德MCP工具的数量
+    batch_max_size: int = 500        # 批量规划单次最多的请求数
+
+    # 超时与熔断配置(秒): 尾延迟由配置决定, 不取决于最慢的上游
+    tool_call_timeout: float = 20.0    # 单次高德MCP工具调用
+    agent_step_timeout: float = 120.0  # 单个助手的一次运行/按天生成中的一天
+    plan_timeout: float = 300.0        # 整个行程的生成, 超时后返回部分计划
+    breaker_failure_threshold: int = 5 # 连续失败多少次后熔断
+    breaker_reset_timeout: float = 30.0  # 熔断多久后允许试探调用
+
+    # 规划模式: single 监督者一次生成整个行程; per_day 助手调研后每天一次LLM调用并发生成;
+    # auto 天数达到per_day_min_days时使用per_day
+    planning_mode: str = "auto"
+    per_day_min_days: int = 5
+    day_synthesis_concurrency: int = 4   # 按天生成时同时进行的LLM调用数量
+
+    # 行程优化配置
+    itinerary_time_budget_ms: float = 1.0   # 单日路线2-opt优化的时间预算(毫秒)
+
+    # 路线矩阵配置: 为每天相邻地点之间的每一段计算高德路线时间
+    route_matrix_enabled: bool = True
+    route_max_concurrency: int = 4           # 同时进行的路线规划数量
+    route_matrix_timeout: float = 15.0       # 整个计划的路线计算时间上限(秒), 超时的路段按直线距离估算
+    route_walk_max_distance: float = 1500.0  # 直线距离不超过该值(米)的路段按步行计算
+    route_cache_ttl: int = 86400             # 路段(起点,终点,方式)缓存有效期(秒)
+
+    # 缓存配置
+    weather_cache_ttl: int = 1800   # 天气缓存有效期(秒)
+    poi_cache_ttl: int = 86400      # 本地POI数据有效期(秒),过期后关键词搜索回退到高德
+    poi_store_max_size: int = 200000 # 本地POI存储的数量上限,超出后淘汰最久未更新的POI,0表示不限
+    tool_cache_ttl: int = 3600      # MCP工具调用结果缓存有效期(秒)
+    geocode_cache_ttl: int = 604800 # 地理编码缓存有效期(秒)
+    photo_cache_ttl: int = 604800   # 景点图片URL缓存有效期(秒)
+    plan_cache_ttl: int = 3600      # 相同请求的旅行计划缓存有效期(秒),0表示不缓存
+    plan_store_ttl: int = 604800    # 已生成计划的保存时间(秒),在此期间可以局部重新规划
+
+    # 缓存后端: memory 每个进程独立缓存; sqlite 同一台机器上的多个worker共用一个SQLite(WAL)文件
+    cache_backend: str = "memory"
+    cache_path: str = "cache/shared_cache.db"
+    cache_max_bytes: int = 256 * 1024 * 1024   # 共享缓存总大小上限(字节),超出后按最近访问时间淘汰
+
+    # 缓存预热配置
+    prewarm_cities: str = "北京,上海"                       # 预热的城市,逗号分隔
+    prewarm_preferences: str = "景点,历史文化,美食,公园"      # 预热的偏好标签(作为POI搜索关键词)
+    prewarm_accommodations: str = "酒店,经济型酒店,五星级酒店"  # 预热的住宿关键词
+    prewarm_learned_cities: int = 5    # 额外预热最近请求量最高的前N个城市
+    prewarm_interval: int = 3600       # 定时预热间隔(秒),0表示只在启动时预热一次
+    prewarm_rate: float = 1.0          # 预热时每秒最多调用高德的次数
+
+    # 本地POI数据目录(启动时导入其中的.jsonl/.csv文件,文件名作为默认城市)
+    poi_data_dir: str = ""
+
+    # 管理员令牌(请求头X-Admin-Token), 为空时关闭管理API和请求分析
+    admin_token: str = ""
+    # 按请求性能分析: 管理员的请求带X-Profile: 1请求头或profile=1参数时, 在采样分析器下运行该请求
+    profile_sample_interval_ms: float = 5.0   # 采样间隔(毫秒)
+    profile_max_seconds: float = 300.0        # 单个请求的最长采样时间(秒)
+    profile_max_stored: int = 50              # 保存的分析结果数量
+    profile_ttl: int = 3600                   # 分析结果保存时间(秒)
 
     # 日志配置
     log_level: str = "INFO"
+    log_format: str = "json"               # json(每行一条JSON) / text(本地开发)
+    log_file: str = ""                     # 同时写入的日志文件, 为空时只输出到stdout
+    log_queue_size: int = 10000            # 日志队列长度, 队列满时丢弃新日志而不阻塞请求
+    log_payload_sample_rate: float = 0.01  # 完整计划/LLM输出等大对象日志的采样率(DEBUG级别)
+    log_payload_max_chars: int = 2000      # 大对象日志的最大长度
 
     class Config:
         env_file = ".env"   # 从.env读取配置
@@ -74,29 +203,30 @@ def validate_config():
         raise ValueError(error_msg)
     
     if warnings:
-        print("\n⚠️  配置警告:")
         for w in warnings:
-            print(f"\n - {w}")
+            logger.warning(f"⚠️  配置警告: {w}")
     
     return True
 
 # 打印配置信息
 def print_config():
     """打印当前配置(隐藏敏感信息)"""
-    print(f"应用名称: {settings.app_name}")
-    print(f"版本: {settings.app_version}")
-    print(f"服务器: {settings.host}:{settings.port}")
-    print(f"高德地图API Key: {'已配置' if settings.amap_api_key else '未配置'}")
+    logger.info(f"应用名称: {settings.app_name}")
+    logger.info(f"版本: {settings.app_version}")
+    logger.info(f"服务器: {settings.host}:{settings.port}")
+    logger.info(f"高德地图API Key: {'已配置' if settings.amap_api_key else '未配置'}")
 
     # 检查LLM配置
     llm_api_key = os.getenv("LLM_API_KEY") or os.getenv("OPENAI_API_KEY")
     llm_base_url = os.getenv("LLM_BASE_URL") or settings.llm_base_url
     llm_model = os.getenv("LLM_MODEL_ID") or settings.llm_model_id
 
-    print(f"LLM API Key: {'已配置' if llm_api_key else '未配置'}")
-    print(f"LLM Base URL: {llm_base_url}")
-    print(f"LLM Model: {llm_model}")
-    print(f"日志级别: {settings.log_level}")
+    logger.info(f"LLM API Key: {'已配置' if llm_api_key else '未配置'}")
+    logger.info(f"LLM Base URL: {llm_base_url}")
+    logger.info(f"LLM Model: {llm_model}")
+    if settings.llm_tool_model_id:
+        logger.info(f"LLM Tool Model: {settings.llm_tool_model_id} ({settings.llm_tool_roles})")
+    logger.info(f"日志级别: {settings.log_level}")
 
     
 
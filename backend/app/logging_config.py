@@ -0,0 +1,184 @@
+"""日志模块(队列异步输出、JSON结构化日志、请求ID、大对象日志采样)"""
+
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+from pydantic import BaseModel
+from .config import get_settings
+
+try:
+    import orjson
+except ImportError:  # 未安装orjson时使用标准库json
+    orjson = None
+
+# 当前请求的ID(由请求ID中间件设置, 请求中创建的任务会继承)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# LogRecord自带的属性, 其余属性(extra)作为结构化字段输出
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id", "payload"}
+
+
+def _dumps(data: Any) -> str:
+    """序列化为JSON字符串"""
+    if orjson is not None:
+        return orjson.dumps(data, default=str).decode("utf-8")
+    return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def _render_payload(payload: Any, max_chars: int) -> str:
+    """把大对象转换为字符串(在日志线程中执行), 超过max_chars时截断"""
+    if isinstance(payload, BaseModel):
+        text = payload.model_dump_json()
+    elif isinstance(payload, str):
+        text = payload
+    else:
+        text = _dumps(payload)
+    if len(text) > max_chars:
+        text = text[:max_chars] + f"...(共{len(text)}字符)"
+    return text
+
+
+class JsonFormatter(logging.Formatter):
+    """JSON格式: 每条日志一行, 包含时间、级别、模块、请求ID、消息和extra字段"""
+
+    def __init__(self, payload_max_chars: int = 2000):
+        super().__init__()
+        self.payload_max_chars = payload_max_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if getattr(record, "payload", None) is not None:
+            data["payload"] = _render_payload(record.payload, self.payload_max_chars)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return _dumps(data)
+
+
+class TextFormatter(logging.Formatter):
+    """文本格式(本地开发时阅读)"""
+
+    def __init__(self, payload_max_chars: int = 2000):
+        super().__init__("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+        self.payload_max_chars = payload_max_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        if getattr(record, "payload", None) is not None:
+            text += "\n" + _render_payload(record.payload, self.payload_max_chars)
+        return text
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """把日志放入队列后立即返回, 由后台线程格式化和输出; 队列满时丢弃并计数, 不阻塞事件循环"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        在调用线程中只做必要的工作: 合并消息参数、记录请求ID、格式化异常堆栈
+        (堆栈中的对象不能跨线程保留); JSON序列化和payload转换在日志线程中进行
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.request_id = request_id_var.get()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# 日志队列的后台线程
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def setup_logging() -> None:
+    """
+    按配置初始化日志(重复调用时只初始化一次):
+    根日志器只挂一个队列处理器, 输出到stdout(和log_file)的工作由后台线程完成
+    """
+    global _listener, _queue_handler
+
+    if _listener is not None:
+        return
+
+    settings = get_settings()
+    formatter_class = JsonFormatter if settings.log_format == "json" else TextFormatter
+    formatter = formatter_class(settings.log_payload_max_chars)
+
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if settings.log_file:
+        handlers.append(logging.FileHandler(settings.log_file, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(settings.log_level.upper())
+    # 每次HTTP请求都会输出INFO日志的第三方库
+    for name in ("httpx", "httpcore", "mcp"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """输出队列中剩余的日志并停止后台线程"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_logs() -> int:
+    """队列满时丢弃的日志数量"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def log_payload(logger: logging.Logger, message: str, payload: Any, level: int = logging.DEBUG) -> None:
+    """
+    记录大对象(完整计划、LLM原始输出、工具描述等): 只有级别开启且被采样时才记录,
+    对象的序列化在日志线程中进行
+    Args:
+        logger: 日志器
+        message: 日志消息
+        payload: 大对象(pydantic模型/dict/字符串)
+        level: 日志级别
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if random.random() >= get_settings().log_payload_sample_rate:
+        return
+    logger.log(level, message, extra={"payload": payload})
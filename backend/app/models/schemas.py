@@ -1,7 +1,7 @@
 """数据模型定义"""
 
-from typing import List,Optional,Union
-from pydantic import BaseModel,Field,field_validator
+from typing import Any,List,Optional,Union
+from pydantic import BaseModel,Field,field_validator,model_validator
 from datetime import date
 
 # ============ 请求模型 ============
@@ -31,6 +31,91 @@ class TripRequest(BaseModel):
             }
         } 
 
+class TripBatchRequest(BaseModel):
+    """批量旅行规划请求"""
+    requests: List[TripRequest] = Field(...,description="旅行规划请求列表",min_length=1)
+
+class TripPlanPatch(BaseModel):
+    """局部重新规划请求: 只填写需要修改的字段"""
+    days: Optional[List[int]] = Field(default=None,description="需要重新规划的天(day_index,从0开始),为空时由修改内容决定")
+    instruction: Optional[str] = Field(default=None,description="对行程的修改要求",example="第2天换成室内景点")
+    preferences: Optional[List[str]] = Field(default=None,description="新的旅行偏好标签",example=["历史文化","美食"])
+    accommodation: Optional[str] = Field(default=None,description="新的住宿偏好")
+    transportation: Optional[str] = Field(default=None,description="新的交通方式")
+    free_text_input: Optional[str] = Field(default=None,description="新的额外要求")
+    city: Optional[str] = Field(default=None,description="新的目的地城市(会重新规划整个行程)")
+    start_date: Optional[str] = Field(default=None,description="新的开始日期(会重新规划整个行程)")
+    end_date: Optional[str] = Field(default=None,description="新的结束日期(会重新规划整个行程)")
+    travel_days: Optional[int] = Field(default=None,description="新的旅行天数(会重新规划整个行程)",ge=1,le=30)
+
+class TripLeg(BaseModel):
+    """多城市行程中的一段(一个城市)"""
+    city: str = Field(...,description="城市",example="北京")
+    start_date: str = Field(...,description="在该城市的开始日期 YYYY-MM-DD",example="2025-06-01")
+    end_date: str = Field(...,description="在该城市的结束日期 YYYY-MM-DD",example="2025-06-03")
+    preferences: Optional[List[str]] = Field(default=None,description="该段的偏好标签,为空时使用整体偏好")
+
+    @property
+    def travel_days(self) -> int:
+        """该段的天数"""
+        return (date.fromisoformat(self.end_date) - date.fromisoformat(self.start_date)).days + 1
+
+class MultiCityTripRequest(BaseModel):
+    """多城市旅行规划请求"""
+    legs: List[TripLeg] = Field(...,description="按时间顺序排列的各段行程",min_length=2,max_length=10)
+    transportation: str = Field(...,description="城市内交通方式",example="公共交通")
+    intercity_transportation: str = Field(default="高铁",description="城市间交通方式: 高铁/飞机/自驾/大巴",example="高铁")
+    accommodation: str = Field(...,description="住宿偏好",example="经济型酒店")
+    preferences: List[str] = Field(default_factory=list,description="旅行偏好标签",example=["历史文化","美食"])
+    free_text_input: Optional[str] = Field(default="", description="额外要求")
+
+    @model_validator(mode="after")
+    def check_legs(self):
+        """各段日期必须合法、按顺序且不重叠"""
+        previous_end = None
+        for leg in self.legs:
+            try:
+                start, end = date.fromisoformat(leg.start_date), date.fromisoformat(leg.end_date)
+            except ValueError:
+                raise ValueError(f"{leg.city}的日期格式应为YYYY-MM-DD")
+            if end < start:
+                raise ValueError(f"{leg.city}的结束日期早于开始日期")
+            if previous_end is not None and start <= previous_end:
+                raise ValueError(f"{leg.city}的开始日期必须晚于上一段的结束日期")
+            previous_end = end
+        if sum(leg.travel_days for leg in self.legs) > 30:
+            raise ValueError("多城市行程总天数不能超过30天")
+        return self
+
+    def leg_request(self, index: int) -> TripRequest:
+        """把第index段转换为单城市请求"""
+        leg = self.legs[index]
+        return TripRequest(
+            city=leg.city,
+            start_date=leg.start_date,
+            end_date=leg.end_date,
+            travel_days=leg.travel_days,
+            transportation=self.transportation,
+            accommodation=self.accommodation,
+            preferences=leg.preferences if leg.preferences is not None else self.preferences,
+            free_text_input=self.free_text_input
+        )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "legs": [
+                    {"city": "北京", "start_date": "2025-06-01", "end_date": "2025-06-03"},
+                    {"city": "上海", "start_date": "2025-06-04", "end_date": "2025-06-05"}
+                ],
+                "transportation": "公共交通",
+                "intercity_transportation": "高铁",
+                "accommodation": "经济型酒店",
+                "preferences": ["历史文化", "美食"],
+                "free_text_input": ""
+            }
+        }
+
 class POISearchRequest(BaseModel):
     """POI搜索请求"""
     keywords: str = Field(...,description="搜索关键词",example="故宫")
@@ -92,6 +177,26 @@ class Budget(BaseModel):
     total_transportation: int = Field(default=0,description="交通总费用")
     total: int = Field(default=0,description="总费用")
 
+class TransferInfo(BaseModel):
+    """城市间交通"""
+    from_city: str = Field(...,description="出发城市")
+    to_city: str = Field(...,description="到达城市")
+    date: str = Field(...,description="出发日期")
+    transportation: str = Field(...,description="交通方式")
+    distance: float = Field(default=0,description="两城市间直线距离（米）")
+    estimated_cost: int = Field(default=0,description="预估费用（元）")
+    description: str = Field(default="",description="说明")
+
+class RouteInfo(BaseModel):
+    """路线信息"""
+    distance: float = Field(..., description="距离(米)")
+    duration: int = Field(..., description="时间(秒)")
+    route_type: str = Field(..., description="路线类型")
+    description: str = Field(..., description="路线描述")
+    origin: Optional[str] = Field(default=None, description="起点名称（行程中的一段路线）")
+    destination: Optional[str] = Field(default=None, description="终点名称（行程中的一段路线）")
+    estimated: bool = Field(default=False, description="是否为按直线距离估算(高德路线规划不可用时)")
+
 class DayPlan(BaseModel):
     """单日行程"""
     date: str = Field(...,description="日期")
@@ -102,6 +207,11 @@ class DayPlan(BaseModel):
     hotel: Optional[Hotel] = Field(default=None,description="酒店信息")
     attractions: List[Attraction] = Field(default_factory=list,description="景点信息")
     meals: List[Meal] = Field(default_factory=list,description="餐饮安排")
+    travel_distance: float = Field(default=0,description="当日交通总距离（米）")
+    travel_duration: int = Field(default=0,description="当日交通总时间（秒）")
+    routes: List[RouteInfo] = Field(default_factory=list,description="当日各段路线（酒店→早餐→景点→晚餐→酒店）")
+    city: Optional[str] = Field(default=None,description="所在城市（多城市行程）")
+    transfer: Optional[TransferInfo] = Field(default=None,description="当日的城市间交通（多城市行程）")
 
 class WeatherInfo(BaseModel):
     """天气信息"""
@@ -135,11 +245,62 @@ class TripPlan(BaseModel):
     weather_info: List[WeatherInfo] = Field(default_factory=list,description="天气信息")
     overall_suggestions: str = Field(...,description="总体建议")
     budget: Optional[Budget] = Field(default=None,description="预算信息")
+    total_travel_distance: float = Field(default=0,description="全程交通总距离（米）")
+    partial: bool = Field(default=False,description="是否为部分计划(超时或上游服务不可用时降级生成)")
+    missing: List[str] = Field(default_factory=list,description="计划中缺失的部分: weather/hotel/meals/suggestions")
 
 class TripPlanResponse(BaseModel):
     """旅行计划响应"""
     success: bool = Field(...,description="是否成功")
     message: str = Field(default="",description="消息")
+    plan_id: Optional[str] = Field(default=None,description="计划ID,用于局部重新规划")
+    data: Optional[TripPlan] = Field(default=None,description="旅行计划数据")
+
+class PlanChange(BaseModel):
+    """计划中的一处修改"""
+    path: str = Field(...,description="修改的字段,如 days[1].attractions")
+    old: Any = Field(default=None,description="修改前的值")
+    new: Any = Field(default=None,description="修改后的值")
+
+class PlanDiff(BaseModel):
+    """两个计划之间的差异"""
+    changed_days: List[int] = Field(default_factory=list,description="有修改的天(day_index)")
+    changes: List[PlanChange] = Field(default_factory=list,description="修改列表")
+
+class TripReplanResponse(BaseModel):
+    """局部重新规划响应"""
+    success: bool = Field(...,description="是否成功")
+    message: str = Field(default="",description="消息")
+    plan_id: str = Field(...,description="计划ID")
+    replanned_days: List[int] = Field(default_factory=list,description="重新规划的天")
+    rerun_agents: List[str] = Field(default_factory=list,description="重新运行的助手")
+    diff: PlanDiff = Field(default_factory=PlanDiff,description="与上一版计划的差异")
+    data: Optional[TripPlan] = Field(default=None,description="新的旅行计划")
+
+class MultiCityTripPlan(BaseModel):
+    """多城市旅行计划"""
+    cities: List[str] = Field(...,description="按顺序经过的城市")
+    start_date: str = Field(...,description="开始日期")
+    end_date: str = Field(...,description="结束日期")
+    days: List[DayPlan] = Field(default_factory=list,description="合并后的每日行程(含城市间交通日)")
+    legs: List[TripPlan] = Field(default_factory=list,description="各城市的旅行计划")
+    transfers: List[TransferInfo] = Field(default_factory=list,description="城市间交通")
+    weather_info: List[WeatherInfo] = Field(default_factory=list,description="天气信息")
+    overall_suggestions: str = Field(default="",description="总体建议")
+    budget: Optional[Budget] = Field(default=None,description="合并后的预算信息(含城市间交通)")
+    total_travel_distance: float = Field(default=0,description="全程城市内交通总距离（米）")
+
+class MultiCityTripPlanResponse(BaseModel):
+    """多城市旅行计划响应"""
+    success: bool = Field(...,description="是否成功")
+    message: str = Field(default="",description="消息")
+    data: Optional[MultiCityTripPlan] = Field(default=None,description="多城市旅行计划数据")
+
+class TripBatchItem(BaseModel):
+    """批量规划中单个请求的结果(按完成顺序逐行返回)"""
+    index: int = Field(...,description="请求在批量请求中的下标")
+    success: bool = Field(...,description="是否成功")
+    message: str = Field(default="",description="消息")
     data: Optional[TripPlan] = Field(default=None,description="旅行计划数据")
 
 class POIInfo(BaseModel):
@@ -163,13 +324,6 @@ class POIDetailResponse(BaseModel):
     message: str = Field(...,description="消息")
     data: Optional[dict] = Field(default=None,description="")
 
-class RouteInfo(BaseModel):
-    """路线信息"""
-    distance: float = Field(..., description="距离(米)")
-    duration: int = Field(..., description="时间(秒)")
-    route_type: str = Field(..., description="路线类型")
-    description: str = Field(..., description="路线描述")
-
 
 class RouteResponse(BaseModel):
     """路线规划响应"""
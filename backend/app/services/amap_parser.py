@@ -0,0 +1,188 @@
+"""高德地图MCP工具返回结果解析"""
+
+import json
+from typing import Any, Dict, List, Optional
+from ..models.schemas import Location, POIInfo, RouteInfo, WeatherInfo
+
+
+def normalize_city(city: str) -> str:
+    """统一城市名作为缓存键,如 北京市 -> 北京"""
+    city = (city or "").strip()
+    return city[:-1] if len(city) > 2 and city.endswith("市") else city
+
+
+def tool_result_text(result: Any) -> str:
+    """
+    把MCP工具的返回值统一转换为字符串
+    Args:
+        result: 工具返回值(字符串/内容块列表/ToolMessage)
+    Returns:
+        文本内容
+    """
+    if hasattr(result, "content"):
+        result = result.content
+    if isinstance(result, str):
+        return result
+    if isinstance(result, list):
+        parts = []
+        for block in result:
+            if isinstance(block, dict):
+                parts.append(block.get("text", ""))
+            else:
+                parts.append(getattr(block, "text", str(block)))
+        return "".join(parts)
+    return str(result)
+
+
+def tool_result_json(result: Any) -> Optional[Dict[str, Any]]:
+    """把MCP工具的返回值解析为dict,无法解析时返回None"""
+    text = tool_result_text(result).strip()
+    if not text:
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        # 有些版本的工具会在JSON前后附带说明文字
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end <= start:
+            return None
+        try:
+            data = json.loads(text[start:end + 1])
+        except ValueError:
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def parse_location(value: Any) -> Optional[Location]:
+    """解析高德坐标: "116.397,39.916" 或 {"longitude":..,"latitude":..}"""
+    try:
+        if isinstance(value, str) and "," in value:
+            lng, lat = value.split(",")[:2]
+            return Location(longitude=float(lng), latitude=float(lat))
+        if isinstance(value, dict):
+            return Location(
+                longitude=float(value.get("longitude", value.get("lng"))),
+                latitude=float(value.get("latitude", value.get("lat")))
+            )
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def parse_pois(result: Any) -> List[POIInfo]:
+    """
+    解析maps_text_search/maps_around_search的返回结果
+    Args:
+        result: 工具返回值
+    Returns:
+        POI信息列表(没有坐标的POI会被丢弃)
+    """
+    data = tool_result_json(result)
+    if not data:
+        return []
+
+    pois = []
+    for item in data.get("pois") or []:
+        location = parse_location(item.get("location"))
+        if location is None:
+            continue
+        tel = item.get("tel")
+        pois.append(POIInfo(
+            id=str(item.get("id", "")),
+            name=str(item.get("name", "")),
+            type=str(item.get("type") or item.get("typecode") or ""),
+            address=item.get("address") if isinstance(item.get("address"), str) else "",
+            location=location,
+            tel=tel if isinstance(tel, str) and tel else None
+        ))
+    return pois
+
+
+def parse_weather(result: Any) -> List[WeatherInfo]:
+    """
+    解析maps_weather的返回结果
+    Args:
+        result: 工具返回值
+    Returns:
+        按日期排列的天气信息列表
+    """
+    data = tool_result_json(result)
+    if not data:
+        return []
+
+    forecasts = data.get("forecasts") or []
+    # 高德天气API原始格式: {"forecasts": [{"casts": [...]}]}
+    if forecasts and isinstance(forecasts[0], dict) and "casts" in forecasts[0]:
+        forecasts = forecasts[0]["casts"]
+
+    weather = []
+    for cast in forecasts:
+        try:
+            weather.append(WeatherInfo(
+                date=cast["date"],
+                day_weather=cast.get("dayweather", ""),
+                night_weather=cast.get("nightweather", ""),
+                day_temp=cast.get("daytemp", 0),
+                night_temp=cast.get("nighttemp", 0),
+                wind_direction=cast.get("daywind", ""),
+                wind_power=cast.get("daypower", "")
+            ))
+        except (KeyError, ValueError):
+            continue
+    return weather
+
+
+def parse_geocode(result: Any) -> Optional[Location]:
+    """
+    解析maps_geo的返回结果
+    Args:
+        result: 工具返回值
+    Returns:
+        第一个匹配地址的坐标,没有结果时返回None
+    """
+    data = tool_result_json(result)
+    if not data:
+        return None
+    for item in data.get("results") or data.get("geocodes") or []:
+        if isinstance(item, dict):
+            location = parse_location(item.get("location"))
+            if location is not None:
+                return location
+    return None
+
+
+ROUTE_TYPE_NAMES = {"walking": "步行", "driving": "驾车", "transit": "公共交通"}
+
+
+def parse_route(result: Any, route_type: str) -> Optional[RouteInfo]:
+    """
+    解析maps_direction_*的返回结果
+    Args:
+        result: 工具返回值
+        route_type: 路线类型 (walking/driving/transit)
+    Returns:
+        第一条方案的距离和时间,没有方案时返回None
+    """
+    data = tool_result_json(result)
+    if not data:
+        return None
+    # 高德路径规划API原始格式: {"route": {"paths": [...]}} / {"route": {"transits": [...]}}
+    route = data.get("route") if isinstance(data.get("route"), dict) else data
+    plans = route.get("transits") or route.get("paths") or []
+    if not plans or not isinstance(plans[0], dict):
+        return None
+
+    first = plans[0]
+    try:
+        duration = int(float(first.get("duration") or 0))
+        distance = float(first.get("distance") or route.get("distance") or 0)
+    except (TypeError, ValueError):
+        return None
+    if duration <= 0 and distance <= 0:
+        return None
+    return RouteInfo(
+        distance=distance,
+        duration=duration,
+        route_type=route_type,
+        description=f"{ROUTE_TYPE_NAMES.get(route_type, route_type)}约{distance / 1000:.1f}公里,{max(1, round(duration / 60))}分钟"
+    )
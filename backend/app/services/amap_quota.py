@@ -0,0 +1,362 @@
+"""高德API配额管理模块(按Key和工具限速、统计每日用量, 多个Key轮换)"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    day TEXT NOT NULL,
+    key_id TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    exhausted INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, key_id, tool)
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    key_id TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    tat REAL NOT NULL,
+    PRIMARY KEY (key_id, tool)
+);
+"""
+
+# 其他worker的用量和配额用完标记最多延迟多少秒可见
+USAGE_REFRESH = 5.0
+
+# 高德返回的限流/配额错误
+QPS_ERRORS = ("CUQPS_HAS_EXCEEDED_THE_LIMIT", "QPS_HAS_EXCEEDED_THE_LIMIT")
+DAILY_ERRORS = ("DAILY_QUERY_OVER_LIMIT",)
+
+
+class QuotaExceededError(Exception):
+    """所有Key当天的配额都已用完"""
+
+
+def key_id(api_key: str) -> str:
+    """Key的标识(只保存哈希, 不把Key写入文件)"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class TokenBucket:
+    """令牌桶(按预约时间排队, 不会因超出速率而失败)
+
+    每次预约返回需要等待的时间: 桶中有令牌时为0, 否则排在已预约的调用之后,
+    等待时间按速率依次递增, 所以并发的调用按到达顺序均匀地发出。
+    桶的状态只有下一个令牌的理论可用时间(tat), 保存在QuotaStore中, 同一台机器上的多个worker共用一个桶。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        初始化
+        Args:
+            rate: 每秒补充的令牌数(QPS)
+            capacity: 桶容量(允许的突发调用数)
+        """
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.capacity = max(1.0, capacity)
+
+    def wait_time(self, tat: float, now: float) -> float:
+        """
+        理论可用时间为tat时, 现在预约需要等待的时间(秒)
+        Args:
+            tat: 预约前下一个令牌的理论可用时间
+            now: 当前时间
+        Returns:
+            等待时间(秒)
+        """
+        return max(0.0, tat - now - (self.capacity - 1) * self.interval)
+
+
+class QuotaStore:
+    """每日用量和令牌桶状态存储(SQLite WAL, 同一台机器上的多个worker共用, 重启后保留)"""
+
+    def __init__(self, path: str):
+        """
+        初始化
+        Args:
+            path: SQLite文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前进程的连接"""
+        if self._conn is None or self._pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def increment(self, day: str, key: str, tool: str) -> int:
+        """用量加一, 返回加一后的用量(多个进程同时调用时也是准确的)"""
+        with self._lock:
+            row = self._connection().execute(
+                "INSERT INTO usage (day, key_id, tool, count) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT (day, key_id, tool) DO UPDATE SET count = count + 1 RETURNING count",
+                (day, key, tool)
+            ).fetchone()
+        return row[0]
+
+    def decrement(self, day: str, key: str, tool: str) -> int:
+        """用量减一(不小于0), 返回减一后的用量"""
+        with self._lock:
+            row = self._connection().execute(
+                "UPDATE usage SET count = max(count - 1, 0) WHERE day = ? AND key_id = ? AND tool = ? RETURNING count",
+                (day, key, tool)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def mark_exhausted(self, day: str, key: str, tool: str) -> None:
+        """高德返回当日配额用完时标记(即使本地计数未达到上限)"""
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO usage (day, key_id, tool, count, exhausted) VALUES (?, ?, ?, 0, 1) "
+                "ON CONFLICT (day, key_id, tool) DO UPDATE SET exhausted = 1",
+                (day, key, tool)
+            )
+
+    def load(self, day: str) -> Dict[Tuple[str, str], Tuple[int, bool]]:
+        """当天的用量: (Key标识, 工具) -> (用量, 是否已用完)"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT key_id, tool, count, exhausted FROM usage WHERE day = ?", (day,)
+            ).fetchall()
+        return {(k, t): (c, bool(e)) for k, t, c, e in rows}
+
+    def prune(self, keep_after: str) -> None:
+        """删除早于keep_after的记录"""
+        with self._lock:
+            self._connection().execute("DELETE FROM usage WHERE day < ?", (keep_after,))
+
+    def bucket_tats(self, tool: str) -> Dict[str, float]:
+        """工具各Key令牌桶的理论可用时间: Key标识 -> tat"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT key_id, tat FROM buckets WHERE tool = ?", (tool,)
+            ).fetchall()
+        return dict(rows)
+
+    def reserve(self, key: str, tool: str, now: float, interval: float) -> float:
+        """
+        预约一个令牌(多个进程同时预约时按顺序排队)
+        Args:
+            key: Key标识
+            tool: 工具名称
+            now: 当前时间(time.time(), 多个进程共用的时钟)
+            interval: 令牌间隔(秒)
+        Returns:
+            预约前的理论可用时间(不早于now)
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "INSERT INTO buckets (key_id, tool, tat) VALUES (?, ?, ?) "
+                "ON CONFLICT (key_id, tool) DO UPDATE SET tat = max(tat, ?) + ? RETURNING tat",
+                (key, tool, now + interval, now, interval)
+            ).fetchone()
+        return row[0] - interval
+
+    def delay_bucket(self, key: str, tool: str, until: float) -> None:
+        """把令牌桶的理论可用时间推迟到until(高德返回QPS超限时)"""
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO buckets (key_id, tool, tat) VALUES (?, ?, ?) "
+                "ON CONFLICT (key_id, tool) DO UPDATE SET tat = max(tat, excluded.tat)",
+                (key, tool, until)
+            )
+
+
+class AmapQuotaManager:
+    """高德API配额管理
+
+    所有MCP工具调用都先在这里预约: 在当天配额未用完的Key中选择等待时间最短的令牌桶,
+    超出QPS的调用排队等待而不是失败; 调用实际发出时(record_sent)才计入用量,
+    熔断拒绝、排队时取消和高德QPS超限的调用不计入。用量写入SQLite, 重启后继续累计。
+    所有Key的配额都用完时抛出QuotaExceededError。
+    令牌桶和用量都保存在amap_quota_path的SQLite中, 同一台机器上的多个worker合计不超过amap_qps;
+    多台机器部署时各机器分别限速, 需要把amap_qps设为Key的QPS除以机器数。
+    """
+
+    def __init__(self, api_keys: List[str], store: QuotaStore):
+        """
+        初始化
+        Args:
+            api_keys: 高德Key列表(下标与MCP会话一一对应)
+            store: 每日用量存储
+        """
+        settings = get_settings()
+        self.key_ids = [key_id(k) for k in api_keys]
+        self.store = store
+        self.default_qps = settings.amap_qps
+        self.default_daily = settings.amap_daily_quota
+        self.tool_limits = self._parse_limits(settings.amap_tool_limits)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._day = ""
+        self._usage: Dict[Tuple[str, str], Tuple[int, bool]] = {}
+        self._usage_loaded = 0.0
+        self.queued = 0
+        self.total_wait = 0.0
+
+    @staticmethod
+    def _parse_limits(value: str) -> Dict[str, Tuple[float, int]]:
+        """解析按工具的限额配置: "maps_weather=10:100000,maps_text_search=3:5000" (QPS:每日配额)"""
+        limits = {}
+        for item in value.split(","):
+            if "=" not in item:
+                continue
+            tool, limit = item.split("=", 1)
+            qps, _, daily = limit.partition(":")
+            limits[tool.strip()] = (float(qps), int(daily) if daily.strip() else 0)
+        return limits
+
+    def limits(self, tool: str) -> Tuple[float, int]:
+        """工具的(每个Key的QPS, 每个Key的每日配额)"""
+        qps, daily = self.tool_limits.get(tool, (0.0, 0))
+        return qps or self.default_qps, daily or self.default_daily
+
+    def _bucket(self, tool: str) -> TokenBucket:
+        """工具的令牌桶参数(每个Key的桶状态保存在store中)"""
+        bucket = self._buckets.get(tool)
+        if bucket is None:
+            qps, _ = self.limits(tool)
+            bucket = self._buckets[tool] = TokenBucket(qps, qps)
+        return bucket
+
+    def _refresh_day(self) -> str:
+        """重新加载当天的用量(跨天或超过USAGE_REFRESH秒时, 读取其他worker的用量和配额用完标记)"""
+        today = date.today().isoformat()
+        if today != self._day or time.monotonic() - self._usage_loaded > USAGE_REFRESH:
+            if today != self._day:
+                self.store.prune(today)
+            self._day = today
+            self._usage = self.store.load(today)
+            self._usage_loaded = time.monotonic()
+        return today
+
+    def _available(self, tool: str) -> List[int]:
+        """当天配额未用完的Key下标"""
+        _, daily = self.limits(tool)
+        available = []
+        for index, kid in enumerate(self.key_ids):
+            count, exhausted = self._usage.get((kid, tool), (0, False))
+            if not exhausted and count < daily:
+                available.append(index)
+        return available
+
+    async def acquire(self, tool: str, exclude: Tuple[int, ...] = ()) -> int:
+        """
+        预约一次工具调用, 需要时排队等待(不计入用量, 发出调用时再调用record_sent)
+        Args:
+            tool: 工具名称
+            exclude: 本次调用已经失败过的Key下标
+        Returns:
+            使用的Key下标
+        """
+        self._refresh_day()
+        candidates = [i for i in self._available(tool) if i not in exclude]
+        if not candidates:
+            raise QuotaExceededError(f"高德Key今日{tool}配额已用完")
+
+        bucket = self._bucket(tool)
+        tats = self.store.bucket_tats(tool)
+        now = time.time()
+        index = min(candidates, key=lambda i: bucket.wait_time(tats.get(self.key_ids[i], 0.0), now))
+        kid = self.key_ids[index]
+        wait = bucket.wait_time(self.store.reserve(kid, tool, now, bucket.interval), now)
+        if wait > 0:
+            self.queued += 1
+            self.total_wait += wait
+            await asyncio.sleep(wait)
+        return index
+
+    def record_sent(self, index: int, tool: str) -> None:
+        """
+        工具调用实际发出时计入当天用量
+        Args:
+            index: Key下标
+            tool: 工具名称
+        """
+        day = self._refresh_day()
+        kid = self.key_ids[index]
+        count = self.store.increment(day, kid, tool)
+        self._usage[(kid, tool)] = (count, self._usage.get((kid, tool), (0, False))[1])
+
+    def report(self, index: int, tool: str, content: Any) -> Optional[str]:
+        """
+        检查高德返回的限流/配额错误
+        Args:
+            index: Key下标
+            tool: 工具名称
+            content: 工具返回内容
+        Returns:
+            qps(需要稍后重试) / daily(换一个Key重试) / None(正常)
+        """
+        text = content if isinstance(content, str) else str(content)
+        if any(e in text for e in DAILY_ERRORS):
+            kid = self.key_ids[index]
+            self.store.mark_exhausted(self._day, kid, tool)
+            self._usage[(kid, tool)] = (self._usage.get((kid, tool), (0, False))[0], True)
+            logger.warning(f"⚠️  高德Key {kid} 今日{tool}配额已用完, 切换到其他Key")
+            return "daily"
+        if any(e in text for e in QPS_ERRORS):
+            kid = self.key_ids[index]
+            self.store.delay_bucket(kid, tool, time.time() + 1.0)
+            # 被QPS限流拒绝的调用不计入当日配额, 退回用量
+            count = self.store.decrement(self._day, kid, tool)
+            self._usage[(kid, tool)] = (count, self._usage.get((kid, tool), (0, False))[1])
+            return "qps"
+        return None
+
+    def status(self) -> Dict[str, Any]:
+        """配额状态: 各Key各工具的当天用量"""
+        self._refresh_day()
+        usage: Dict[str, Dict[str, Any]] = {kid: {} for kid in self.key_ids}
+        for (kid, tool), (count, exhausted) in self._usage.items():
+            if kid in usage:
+                _, daily = self.limits(tool)
+                usage[kid][tool] = {"used": count, "daily_quota": daily, "exhausted": exhausted or count >= daily}
+        return {
+            "day": self._day,
+            "keys": len(self.key_ids),
+            "queued_calls": self.queued,
+            "avg_wait_ms": round(self.total_wait / self.queued * 1000, 1) if self.queued else 0.0,
+            "usage": usage,
+        }
+
+
+def amap_api_keys() -> List[str]:
+    """配置的高德Key: AMAP_API_KEY + AMAP_API_KEYS(去重)"""
+    settings = get_settings()
+    keys = [settings.amap_api_key] + [k.strip() for k in settings.amap_api_keys.split(",")]
+    return list(dict.fromkeys(k for k in keys if k))
+
+
+# 全局配额管理实例
+_quota_manager = None
+
+def get_quota_manager() -> AmapQuotaManager:
+    """获取高德配额管理实例(单例模式)"""
+    global _quota_manager
+
+    if _quota_manager is None:
+        _quota_manager = AmapQuotaManager(
+            amap_api_keys() or [""],
+            QuotaStore(get_settings().amap_quota_path)
+        )
+
+    return _quota_manager
@@ -1,10 +1,15 @@
 """高德地图MCP服务封装"""
 
+import logging
 from typing import List, Dict, Any, Optional
-from hello_agents.tools import MCPTool
 from ..config import get_settings
-from ..models.schemas import Location, POIInfo, WeatherInfo
-from ..agents.tools import get_tools
+from ..models.schemas import Location, POIInfo, RouteInfo, WeatherInfo
+from ..agents.tools import bypass_local_cache, get_tools
+from .amap_parser import normalize_city, parse_geocode, parse_pois, parse_route, parse_weather, tool_result_json
+from .cache import create_cache
+from .poi_store import get_poi_store, local_poi_hit
+
+logger = logging.getLogger(__name__)
 
 
 class AmapService:
@@ -12,21 +17,30 @@ class AmapService:
 
     def __init__(self):
         """初始化服务"""
+        settings = get_settings()
         self.mcp_tools = None
+        self.weather_cache = create_cache("weather", maxsize=512, ttl=settings.weather_cache_ttl)
+        self.geocode_cache = create_cache("geocode", maxsize=4096, ttl=settings.geocode_cache_ttl)
     
     async def _create(self):
-        self.mcp_tools = await get_tools()
+        if self.mcp_tools is None:
+            self.mcp_tools = await get_tools()
 
-    async def search_poi(self, keywords: str, city: str, citylimit: bool) -> List[POIInfo]:
+    async def search_poi(self, keywords: str, city: str, citylimit: bool = True, poi_type: str = "") -> List[POIInfo]:
         """
-        搜索POI
+        搜索POI(本地结果满一页或该关键词已从高德导入过且未过期时直接返回,否则调用高德)
         Args：
             keywords: 搜索关键词
             city： 城市
             citylimit：是否限制在城市范围内
+            poi_type: 只返回类型中包含该关键词的POI
         Returns:
             POI信息列表
         """
+        local = [] if bypass_local_cache.get() else local_poi_hit(keywords, city, poi_type)
+        if local:
+            return local
+
         try:
             # 得到所有的工具列表List[BaseTool]
             await self._create()
@@ -37,36 +51,100 @@ class AmapService:
                 None
             )
             if not maps_text_search_tool:
-                print("mcp工具集中无法找到maps_text_search工具")
-            else:
-                print(f"找到m{maps_text_search_tool.name}工具,准备进行调用...")
+                logger.warning("mcp工具集中无法找到maps_text_search工具")
+                return []
+            logger.debug("找到%s工具,准备进行调用...", maps_text_search_tool.name)
 
-            # 调用该工具
-            result = maps_text_search_tool.invoke({
+            # 调用该工具(MCP工具只支持异步调用, 结果会自动写入本地POI存储)
+            result = await maps_text_search_tool.ainvoke({
                 "keywords":keywords,
                 "city": city,
                 "citylimit": str(citylimit).lower()
             })
 
             # MCP工具返回的是字符串，需要解析为JSON
-            # 先简化，不解析，打印结果进行查看
-            print(f"POI搜索结果:{result[:200]}")
+            pois = parse_pois(result)
+            return [p for p in pois if poi_type in p.type] if poi_type else pois
 
-            # TODO: 实际解析的代码
+        except Exception as e:
+            logger.error(f"❌ POI搜索失败: {str(e)}")
             return []
 
+    async def search_nearby(
+        self,
+        location: Location,
+        radius: int = 1000,
+        keywords: str = "",
+        limit: int = 20
+    ) -> List[POIInfo]:
+        """
+        周边搜索(优先使用本地POI存储,本地无结果时再调用高德周边搜)
+        Args:
+            location: 中心坐标
+            radius: 半径(米)
+            keywords: 类型/名称关键词,如"酒店"、"景点"
+            limit: 最大返回数量
+        Returns:
+            按距离排列的POI信息列表
+        """
+        local = get_poi_store().search_radius(location, radius, keywords, limit)
+        if local:
+            return [poi for poi, _ in local]
+
+        try:
+            await self._create()
+
+            maps_around_search_tool = next(
+                (t for t in self.mcp_tools if "maps_around_search" in t.name),
+                None
+            )
+            if not maps_around_search_tool:
+                logger.warning("mcp工具集中无法找到maps_around_search工具")
+                return []
+
+            result = await maps_around_search_tool.ainvoke({
+                "location": f"{location.longitude},{location.latitude}",
+                "radius": str(radius),
+                "keywords": keywords
+            })
+            return parse_pois(result)[:limit]
+
         except Exception as e:
-            print(f"❌ POI搜索失败: {str(e)}")
+            logger.error(f"❌ 周边搜索失败: {str(e)}")
             return []
-        
+
+    def search_in_bounds(
+        self,
+        min_lng: float,
+        min_lat: float,
+        max_lng: float,
+        max_lat: float,
+        keywords: str = "",
+        limit: int = 100
+    ) -> List[POIInfo]:
+        """
+        矩形范围内搜索本地POI存储(地图可视范围内的POI, 不调用高德)
+        Args:
+            min_lng/min_lat/max_lng/max_lat: 矩形范围
+            keywords: 类型/名称关键词
+            limit: 最大返回数量
+        Returns:
+            POI信息列表
+        """
+        return get_poi_store().search_bounds(min_lng, min_lat, max_lng, max_lat, keywords, limit)
+
     async def get_weather(self, city: str) -> List[WeatherInfo]:
         """
-        查询天气
+        查询天气(优先读取天气缓存)
         Args:
             city: 要查天气的城市名称
         Returns:
             天气信息列表
         """
+        cached = [] if bypass_local_cache.get() else self.get_cached_weather(city)
+        if cached:
+            return cached
+
         try:
             # 得到所有的工具列表List[BaseTool]
             await self._create()
@@ -76,24 +154,34 @@ class AmapService:
                 None
             )
             if not maps_weather_tool:
-                print("mcp工具集中无法找到maps_weather工具")
-            else:
-                print(f"找到{maps_weather_tool.name}工具,准备进行调用...")
-            # 调用该工具
-            result = maps_weather_tool.invoke({
+                logger.warning("mcp工具集中无法找到maps_weather工具")
+                return []
+            logger.debug("找到%s工具,准备进行调用...", maps_weather_tool.name)
+
+            # 调用该工具(MCP工具只支持异步调用)
+            result = await maps_weather_tool.ainvoke({
                 "city": city
             })
 
             # MCP工具返回的是字符串，需要解析为JSON
-            # 先简化，不解析，打印结果进行查看
-            print(f"天气查询结果:{result[:200]}")
+            weather = parse_weather(result)
+            self.cache_weather(city, weather)
 
-            return []
+            return weather
             
         except Exception as e:
-            print(f"❌ 天气查询失败: {str(e)}")
+            logger.error(f"❌ 天气查询失败: {str(e)}")
             return []
 
+    def cache_weather(self, city: str, weather: List[WeatherInfo]) -> None:
+        """写入天气缓存(智能体的天气工具调用结果也会写入这里)"""
+        if weather:
+            self.weather_cache.set(normalize_city(city), weather)
+
+    def get_cached_weather(self, city: str) -> List[WeatherInfo]:
+        """读取天气缓存,未命中时返回空列表"""
+        return self.weather_cache.get(normalize_city(city)) or []
+
 
     async def plan_route(
         self,
@@ -102,7 +190,7 @@ class AmapService:
         origin_city: Optional[str] = None,
         destination_city: Optional[str] = None,
         route_type: str = "walking"
-    ) -> Dict[str, Any]:
+    ) -> Optional[RouteInfo]:
         """
         规划路线
         Args:
@@ -112,7 +200,7 @@ class AmapService:
             destination_city: 终点城市
             route_type: 路线类型 (walking/driving/transit)
         Returns:
-            路线信息
+            路线信息, 规划失败或没有方案时返回None
         """
         try:
             await self._create()
@@ -125,17 +213,20 @@ class AmapService:
             }
             # 获取对应工具
             plan_route_tool_name = tool_map.get(route_type)
+            if not plan_route_tool_name:
+                logger.warning(f"不支持的路线类型: {route_type}")
+                return None
             plan_route_tool = next(
                 (t for t in self.mcp_tools if plan_route_tool_name in t.name),
                 None
             )
             if not plan_route_tool:
-                print(f"mcp工具集中无法找到{plan_route_tool_name}工具")
-            else:
-                print(f"找到{plan_route_tool.name}工具,准备进行调用...")
+                logger.warning(f"mcp工具集中无法找到{plan_route_tool_name}工具")
+                return None
+            logger.debug("找到%s工具,准备进行调用...", plan_route_tool.name)
 
-            # 调用该工具
-            result = plan_route_tool.invoke({
+            # 调用该工具(MCP工具只支持异步调用)
+            result = await plan_route_tool.ainvoke({
                 "origin_address": origin_address,
                 "destination_address": destination_address,
                 "origin_city": origin_city or "",
@@ -143,14 +234,11 @@ class AmapService:
             })
 
             # MCP工具返回的是字符串，需要解析为JSON
-            # 先简化，不解析，打印结果进行查看
-            print(f"路线规划结果:{result[:200]}...")
-
-            return {}
+            return parse_route(result, route_type)
 
         except Exception as e:
-            print(f"❌ 路线规划失败: {str(e)}")
-            return []
+            logger.error(f"❌ 路线规划失败: {str(e)}")
+            return None
 
 
     async def geocode(self, address: str, city: Optional[str] = None) -> Optional[Location]:
@@ -164,6 +252,11 @@ class AmapService:
         Returns:
             经纬度坐标
         """
+        key = f"{normalize_city(city or '')}:{address}"
+        cached = self.geocode_cache.get(key)
+        if cached is not None:
+            return cached
+
         try:
             # 得到所有的工具列表List[BaseTool]
             await self._create()
@@ -174,24 +267,23 @@ class AmapService:
                 None
             )
             if not geocode_tool:
-                print("mcp工具集中无法找到maps_geocode工具")
-            else:
-                print(f"找到{geocode_tool.name}工具,准备进行调用...")
+                logger.warning("mcp工具集中无法找到maps_geocode工具")
+                return None
+            logger.debug("找到%s工具,准备进行调用...", geocode_tool.name)
 
             # 调用该工具
-            result = geocode_tool.invoke({
+            result = await geocode_tool.ainvoke({
                 "address": address,
                 "city": city or ""
             })
 
-            # MCP工具返回的是字符串，需要解析为JSON
-            # 先简化，不解析，打印结果进行查看
-            print(f"地理编码结果:{result[:200]}...")
-
-            return None
+            location = parse_geocode(result)
+            if location is not None:
+                self.geocode_cache.set(key, location)
+            return location
         
         except Exception as e:
-            print(f"❌ 地理编码失败: {str(e)}")
+            logger.error(f"❌ 地理编码失败: {str(e)}")
             return None
 
 
@@ -203,7 +295,7 @@ class AmapService:
             poi_id: POI ID
 
         Returns:
-            POI详情信息
+            POI详情信息, 查询失败时返回空dict
         """
         try:
             # 得到所有的工具列表List[BaseTool]
@@ -211,27 +303,24 @@ class AmapService:
 
             # 获取POI详情工具
             poi_detail_tool = next(
-                (t for t in self.mcp_tools if "maps_search_detail" in t),
+                (t for t in self.mcp_tools if "maps_search_detail" in t.name),
                 None
             )
             if not poi_detail_tool:
-                print("mcp工具集中无法找到maps_search_detail工具")
-            else:
-                print(f"找到{poi_detail_tool.name}工具,准备进行调用...")
-            
-            # 调用该工具
-            result = poi_detail_tool.invoke({
-                "poi_id": poi_id
+                logger.warning("mcp工具集中无法找到maps_search_detail工具")
+                return {}
+            logger.debug("找到%s工具,准备进行调用...", poi_detail_tool.name)
+
+            # 调用该工具(MCP工具只支持异步调用)
+            result = await poi_detail_tool.ainvoke({
+                "id": poi_id
             })
 
             # MCP工具返回的是字符串，需要解析为JSON
-            # 先简化，不解析，打印结果进行查看
-            print(f"POI详情结果:{result[:200]}...")
-
-            return {}
+            return tool_result_json(result) or {}
         
         except Exception as e:
-            print(f"❌ 获取POI详情失败: {str(e)}")
+            logger.error(f"❌ 获取POI详情失败: {str(e)}")
             return {}
 
 # 创建全局服务实例
@@ -0,0 +1,104 @@
+"""批量旅行规划模块"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from ..models.schemas import TripBatchItem, TripPlan, TripRequest
+from .amap_parser import normalize_city
+from .amap_service import get_amap_service
+
+logger = logging.getLogger(__name__)
+
+
+class BatchPlanner:
+    """批量规划
+
+    1. 内容完全相同的请求只规划一次;
+    2. 每个城市的天气/偏好景点/住宿只调研一次, 写入天气缓存、工具结果缓存和本地POI存储,
+       之后各请求的智能体工具调用直接命中缓存;
+    3. 各请求并发规划(受plan_max_concurrency和amap_max_concurrency限制), 按完成顺序返回。
+    """
+
+    async def research_city(self, city: str, requests: List[TripRequest]) -> None:
+        """
+        调研城市的公共数据(失败不影响后续规划, 智能体会自行查询)
+        Args:
+            city: 城市
+            requests: 该城市的所有请求
+        """
+        service = get_amap_service()
+        keywords = list(OrderedDict.fromkeys(
+            [p for r in requests for p in r.preferences] + [r.accommodation for r in requests]
+        ))
+        results = await asyncio.gather(
+            service.get_weather(city),
+            *(service.search_poi(keyword, city) for keyword in keywords),
+            return_exceptions=True
+        )
+        errors = sum(1 for r in results if isinstance(r, BaseException))
+        logger.info(f"🔎 批量规划: {city} 调研 {len(keywords)} 个关键词和天气完成" + (f", {errors}个失败" if errors else ""))
+
+    async def run(self, multi_agents, requests: List[TripRequest]) -> AsyncIterator[TripBatchItem]:
+        """
+        批量规划
+        Args:
+            multi_agents: 已初始化的多智能体系统
+            requests: 旅行请求列表
+        Yields:
+            每个请求的结果(按完成顺序)
+        """
+        # 相同请求合并: 缓存键 -> 请求下标列表
+        groups: Dict[str, List[int]] = OrderedDict()
+        for index, request in enumerate(requests):
+            groups.setdefault(multi_agents.plan_cache_key(request), []).append(index)
+
+        by_city: Dict[str, List[TripRequest]] = OrderedDict()
+        for indexes in groups.values():
+            request = requests[indexes[0]]
+            by_city.setdefault(normalize_city(request.city), []).append(request)
+        research = {
+            city: asyncio.create_task(self.research_city(city, city_requests))
+            for city, city_requests in by_city.items()
+        }
+        logger.info(f"📦 批量规划: {len(requests)}个请求, 去重后{len(groups)}个, 涉及{len(by_city)}个城市")
+
+        async def plan_group(indexes: List[int]) -> Tuple[List[int], Optional[TripPlan], str]:
+            request = requests[indexes[0]]
+            try:
+                # 等城市调研完成后再规划, 让智能体的工具调用命中缓存
+                await research[normalize_city(request.city)]
+                plan = await multi_agents.plan_trip(request=request)
+                return indexes, plan, "" if plan is not None else "未能生成有效的旅行计划"
+            except Exception as e:
+                return indexes, None, str(e)
+
+        tasks = [asyncio.create_task(plan_group(indexes)) for indexes in groups.values()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                indexes, plan, error = await next_done
+                for index in indexes:
+                    yield TripBatchItem(
+                        index=index,
+                        success=plan is not None,
+                        message="旅行计划生成成功" if plan is not None else f"生成旅行计划失败：{error}",
+                        data=plan
+                    )
+        finally:
+            # 客户端断开时取消尚未完成的规划
+            for task in [*tasks, *research.values()]:
+                if not task.done():
+                    task.cancel()
+
+
+# 全局批量规划实例
+_batch_planner = None
+
+def get_batch_planner() -> BatchPlanner:
+    """获取批量规划实例(单例模式)"""
+    global _batch_planner
+
+    if _batch_planner is None:
+        _batch_planner = BatchPlanner()
+
+    return _batch_planner
@@ -0,0 +1,102 @@
+"""缓存模块(进程内缓存, 以及按配置选择进程内/跨进程共享缓存)"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from ..config import get_settings
+
+_MISSING = object()
+
+
+class TTLCache:
+    """带过期时间和容量上限(LRU淘汰)的缓存"""
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300):
+        """
+        初始化缓存
+        Args:
+            name: 缓存名称(用于统计)
+            maxsize: 最大条目数
+            ttl: 默认过期时间(秒)
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # key -> (过期时间, 写入时间, 值)
+        self._data: "OrderedDict[Hashable, Tuple[float, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存,过期或不存在时返回default"""
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING or item[0] < time.time():
+                if item is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[2]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存"""
+        now = time.time()
+        with self._lock:
+            self._data[key] = (now + (self.ttl if ttl is None else ttl), now, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """返回缓存条目已存在的秒数,不存在或已过期时返回None"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.time():
+                return None
+            return time.time() - item[1]
+
+    def pop(self, key: Hashable) -> None:
+        """删除缓存条目"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+def create_cache(name: str, maxsize: int = 1024, ttl: float = 300):
+    """
+    按配置创建缓存: cache_backend为sqlite时多个worker共用同一个缓存文件
+    Args:
+        name: 缓存名称(共享缓存中作为命名空间)
+        maxsize: 进程内缓存的最大条目数(共享缓存按cache_max_bytes统一限制大小)
+        ttl: 默认过期时间(秒)
+    Returns:
+        TTLCache或SharedCache
+    """
+    if get_settings().cache_backend == "sqlite":
+        from .shared_cache import SharedCache, get_sqlite_store
+
+        return SharedCache(name, get_sqlite_store(), ttl=ttl)
+    return TTLCache(name, maxsize=maxsize, ttl=ttl)
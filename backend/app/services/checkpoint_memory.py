@@ -0,0 +1,308 @@
+"""内存检查点存储模块(限制内存占用, 按最近使用淘汰线程, 可选写入本地文件)"""
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 每个条目(检查点/通道值/写入)在序列化数据之外的字典和元组开销(字节, 估计值)
+_ENTRY_OVERHEAD = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    spilled_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_threads_spilled ON threads (spilled_at);
+"""
+
+
+class SpillStore:
+    """被淘汰线程的本地文件(SQLite WAL), 总大小超过上限时删除最早写入的线程"""
+
+    def __init__(self, path: str, max_bytes: int):
+        """
+        初始化
+        Args:
+            path: SQLite文件路径
+            max_bytes: 文件中线程数据的总大小上限(字节)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前进程的连接"""
+        if self._conn is None or self._pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def save(self, thread_id: str, data: bytes) -> None:
+        """写入线程(覆盖同名线程), 超过上限时删除最早写入的线程"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO threads VALUES (?, ?, ?, ?)",
+                (thread_id, data, len(data), time.time())
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM threads").fetchone()[0]
+            if total > self.max_bytes:
+                removed, victims = 0, []
+                for victim, size in conn.execute("SELECT thread_id, size FROM threads ORDER BY spilled_at").fetchall():
+                    if total - removed <= int(self.max_bytes * 0.9):
+                        break
+                    victims.append((victim,))
+                    removed += size
+                conn.executemany("DELETE FROM threads WHERE thread_id = ?", victims)
+
+    def take(self, thread_id: str) -> Optional[bytes]:
+        """读取并删除线程(读回内存后以内存中的数据为准), 不存在时返回None"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT data FROM threads WHERE thread_id = ?", (thread_id,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
+        return row[0] if row is not None else None
+
+    def delete(self, thread_id: str) -> None:
+        """删除线程"""
+        with self._lock:
+            self._connection().execute("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
+
+    def usage(self) -> Dict[str, int]:
+        """线程数和数据大小"""
+        with self._lock:
+            row = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM threads").fetchone()
+        return {"threads": row[0], "bytes": row[1]}
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """有内存上限的内存检查点存储
+
+    按线程统计序列化后的数据大小, 总大小超过max_bytes(或线程数超过max_threads)时淘汰最久未使用的线程;
+    配置了SpillStore时被淘汰的线程写入本地文件, 再次访问时读回内存, 否则直接丢弃。
+    正在写入的线程不会被淘汰; 不指定线程的list()只列出内存中的线程。
+    """
+
+    def __init__(
+        self,
+        *,
+        serde: Optional[SerializerProtocol] = None,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_threads: int = 0,
+        spill: Optional[SpillStore] = None
+    ):
+        """
+        初始化
+        Args:
+            serde: 序列化器
+            max_bytes: 内存中检查点数据的总大小上限(字节)
+            max_threads: 内存中的线程数上限, 0表示只按大小限制
+            spill: 被淘汰线程的本地文件, 为空时直接丢弃
+        """
+        super().__init__(serde=serde)
+        self.max_bytes = max_bytes
+        self.max_threads = max_threads
+        self.spill = spill
+        self._lock = threading.RLock()
+        # 线程ID -> 数据大小(按最近使用排序)
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        # 线程的通道值和写入的键, 淘汰和删除线程时不需要遍历所有线程
+        self._blob_keys: Dict[str, Set[Tuple]] = {}
+        self._write_keys: Dict[str, Set[Tuple]] = {}
+        self.evicted = 0
+        self.spilled = 0
+        self.restored = 0
+
+    # ---------- 大小统计与淘汰 ----------
+
+    def _add_size(self, thread_id: str, size: int) -> None:
+        """增加线程的数据大小并标记为最近使用"""
+        self._sizes[thread_id] = self._sizes.get(thread_id, 0) + size
+        self._sizes.move_to_end(thread_id)
+        self._bytes += size
+
+    def _touch(self, thread_id: str) -> None:
+        """访问线程: 标记为最近使用, 线程已被写入本地文件时读回内存"""
+        if thread_id in self._sizes:
+            self._sizes.move_to_end(thread_id)
+            return
+        if self.spill is None:
+            return
+        try:
+            data = self.spill.take(thread_id)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  读取检查点线程{thread_id}失败: {str(e)}")
+            return
+        if data is not None:
+            self._restore(thread_id, pickle.loads(data))
+            self.restored += 1
+            self._evict(keep=thread_id)
+
+    def _evict(self, keep: str) -> None:
+        """超过上限时淘汰最久未使用的线程(不淘汰keep)"""
+        while self._sizes and (
+            self._bytes > self.max_bytes or (self.max_threads and len(self._sizes) > self.max_threads)
+        ):
+            thread_id = next(iter(self._sizes))
+            if thread_id == keep:
+                if len(self._sizes) == 1:
+                    break
+                self._sizes.move_to_end(thread_id)
+                continue
+            data = self._remove(thread_id)
+            self.evicted += 1
+            if self.spill is not None:
+                try:
+                    self.spill.save(thread_id, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+                    self.spilled += 1
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️  检查点线程{thread_id}写入本地文件失败, 直接丢弃: {str(e)}")
+
+    def _remove(self, thread_id: str) -> Dict[str, Any]:
+        """从内存中移除线程, 返回线程的数据(检查点、写入、通道值, 键中去掉线程ID)"""
+        self._bytes -= self._sizes.pop(thread_id, 0)
+        storage = self.storage.pop(thread_id, {})
+        writes = {k[1:]: self.writes.pop(k) for k in self._write_keys.pop(thread_id, ()) if k in self.writes}
+        blobs = {k[1:]: self.blobs.pop(k) for k in self._blob_keys.pop(thread_id, ()) if k in self.blobs}
+        return {"storage": {ns: dict(checkpoints) for ns, checkpoints in storage.items()}, "writes": writes, "blobs": blobs}
+
+    def _restore(self, thread_id: str, data: Dict[str, Any]) -> None:
+        """把本地文件中的线程放回内存"""
+        size = 0
+        for ns, checkpoints in data["storage"].items():
+            self.storage[thread_id][ns].update(checkpoints)
+            size += sum(len(c[1]) + len(m[1]) + _ENTRY_OVERHEAD for c, m, _ in checkpoints.values())
+        write_keys = self._write_keys.setdefault(thread_id, set())
+        for key, writes in data["writes"].items():
+            self.writes[(thread_id, *key)] = writes
+            write_keys.add((thread_id, *key))
+            size += sum(len(w[2][1]) + _ENTRY_OVERHEAD for w in writes.values())
+        blob_keys = self._blob_keys.setdefault(thread_id, set())
+        for key, blob in data["blobs"].items():
+            self.blobs[(thread_id, *key)] = blob
+            blob_keys.add((thread_id, *key))
+            size += len(blob[1] or b"") + _ENTRY_OVERHEAD
+        self._add_size(thread_id, size)
+
+    def _discard_empty(self, thread_id: str) -> None:
+        """读取不存在的线程时InMemorySaver会创建空的条目, 读取后删除"""
+        if thread_id not in self._sizes and not any(self.storage.get(thread_id, {}).values()):
+            self.storage.pop(thread_id, None)
+
+    # ---------- InMemorySaver ----------
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            self._touch(thread_id)
+            result = super().get_tuple(config)
+            self._discard_empty(thread_id)
+        return result
+
+    def list(self, config, *, filter=None, before=None, limit=None) -> Iterator:
+        with self._lock:
+            if config:
+                self._touch(config["configurable"]["thread_id"])
+            items = list(super().list(config, filter=filter, before=before, limit=limit))
+            if config:
+                self._discard_empty(config["configurable"]["thread_id"])
+        yield from items
+
+    def get_delta_channel_history(self, *, config, channels):
+        with self._lock:
+            self._touch(config["configurable"]["thread_id"])
+            return super().get_delta_channel_history(config=config, channels=channels)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            self._touch(thread_id)
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            saved_checkpoint, saved_metadata, _ = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            size = len(saved_checkpoint[1]) + len(saved_metadata[1]) + _ENTRY_OVERHEAD
+            blob_keys = self._blob_keys.setdefault(thread_id, set())
+            for channel, version in new_versions.items():
+                key = (thread_id, checkpoint_ns, channel, version)
+                if key not in blob_keys:
+                    blob_keys.add(key)
+                    size += len(self.blobs[key][1] or b"") + _ENTRY_OVERHEAD
+            self._add_size(thread_id, size)
+            self._evict(keep=thread_id)
+        return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        key = (thread_id, config["configurable"].get("checkpoint_ns", ""), config["configurable"]["checkpoint_id"])
+        with self._lock:
+            self._touch(thread_id)
+            before = set(self.writes.get(key, ()))
+            super().put_writes(config, writes, task_id, task_path)
+            stored = self.writes.get(key, {})
+            size = sum(len(stored[k][2][1]) + _ENTRY_OVERHEAD for k in stored if k not in before)
+            self._write_keys.setdefault(thread_id, set()).add(key)
+            self._add_size(thread_id, size)
+            self._evict(keep=thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._remove(thread_id)
+        if self.spill is not None:
+            self.spill.delete(thread_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """内存占用和淘汰统计"""
+        with self._lock:
+            stats = {
+                "threads": len(self._sizes),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_threads": self.max_threads,
+                "evicted": self.evicted,
+                "spilled": self.spilled,
+                "restored": self.restored,
+            }
+        if self.spill is not None:
+            stats["spill"] = {**self.spill.usage(), "max_bytes": self.spill.max_bytes, "path": self.spill.path}
+        return stats
+
+
+def create_memory_saver(serde: Optional[SerializerProtocol] = None) -> BoundedMemorySaver:
+    """
+    按配置创建内存检查点存储
+    Args:
+        serde: 序列化器
+    Returns:
+        BoundedMemorySaver
+    """
+    settings = get_settings()
+    spill = None
+    if settings.checkpoint_spill_path:
+        spill = SpillStore(settings.checkpoint_spill_path, settings.checkpoint_spill_max_bytes)
+    return BoundedMemorySaver(
+        serde=serde,
+        max_bytes=settings.checkpoint_memory_max_bytes,
+        max_threads=settings.checkpoint_memory_max_threads,
+        spill=spill
+    )
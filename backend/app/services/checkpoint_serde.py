@@ -0,0 +1,377 @@
+"""检查点序列化模块(压缩的二进制编码, 同一线程的检查点中重复的工具结果只保存一次)"""
+
+import hashlib
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set, Tuple
+from langchain_core.messages import ToolMessage
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from ..config import get_settings
+
+try:
+    import zstandard
+except ImportError:  # 未安装zstandard时使用zlib
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# 工具结果在消息中替换为引用: 前缀 + 内容哈希
+REF_PREFIX = "\x00ckpt-ref:"
+# 工具结果在checkpoint_blobs中保存为单独的行(不在channel_versions中, 不会被读取为通道值)
+PAYLOAD_CHANNEL = "__payload__:"
+
+# 正在写入的检查点: 哈希 -> 工具结果(由CompactPostgresSaver设置, 未设置时工具结果保存在值中)
+_payload_sink: ContextVar[Optional[Dict[str, str]]] = ContextVar("checkpoint_payload_sink", default=None)
+# 正在读取的检查点所在线程的工具结果: 哈希 -> 工具结果
+_payload_source: ContextVar[Optional[Dict[str, str]]] = ContextVar("checkpoint_payload_source", default=None)
+
+
+def _compress(codec: str, data: bytes, level: int) -> bytes:
+    """压缩"""
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return zlib.compress(data, level)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    """解压"""
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("检查点使用zstd压缩, 需要安装zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _payload_hash(text: str) -> str:
+    """工具结果的内容哈希"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class CompactSerializer(SerializerProtocol):
+    """紧凑的检查点序列化器
+
+    - 先用LangGraph默认的序列化器(msgpack)编码, 超过compress_min_size的值再用zstd(未安装时zlib)压缩,
+      类型标记记录压缩算法, 例如 msgpack+zstd;
+    - 写入Postgres时, 消息中不小于dedupe_min_size的工具结果替换为内容哈希, 工具结果由
+      CompactPostgresSaver单独保存, 同一线程后续的检查点只保存引用;
+    - 读取时不带压缩后缀的类型标记(已有的检查点)交给默认序列化器, 与已有数据兼容。
+    """
+
+    # 缓存哈希的工具结果数量
+    MAX_DIGESTS = 1024
+
+    def __init__(self, compression_level: int = 3, compress_min_size: int = 256, dedupe_min_size: int = 1024):
+        """
+        初始化
+        Args:
+            compression_level: 压缩级别(zstd 1~22, zlib 1~9)
+            compress_min_size: 最小压缩大小(字节)
+            dedupe_min_size: 单独保存的工具结果的最小长度(字符)
+        """
+        self.inner = JsonPlusSerializer()
+        self.codec = "zstd" if zstandard is not None else "zlib"
+        self.level = compression_level if self.codec == "zstd" else min(compression_level, 9)
+        self.compress_min_size = compress_min_size
+        self.dedupe_min_size = dedupe_min_size
+        self._lock = threading.Lock()
+        self._digests: "OrderedDict[str, str]" = OrderedDict()
+        self._stats = {
+            "values": 0,            # 序列化的值的数量
+            "raw_bytes": 0,         # 默认序列化器的输出大小
+            "stored_bytes": 0,      # 实际写入的大小(不含单独保存的工具结果)
+            "payload_refs": 0,      # 替换为引用的工具结果数量
+            "payloads_stored": 0,   # 单独保存的工具结果数量(每个线程每个结果一次)
+            "payload_bytes": 0,     # 单独保存的工具结果大小
+            "dump_seconds": 0.0,    # 序列化耗时
+            "puts": 0,              # 写入的检查点数量
+            "put_seconds": 0.0,     # 写入检查点的耗时(含序列化和数据库)
+        }
+
+    # ---------- 工具结果去重 ----------
+
+    def _digest(self, text: str) -> str:
+        """工具结果的哈希(消息历史每个检查点都会重新序列化, 同一个结果只计算一次)"""
+        with self._lock:
+            digest = self._digests.get(text)
+            if digest is not None:
+                self._digests.move_to_end(text)
+                return digest
+        digest = _payload_hash(text)
+        with self._lock:
+            self._digests[text] = digest
+            while len(self._digests) > self.MAX_DIGESTS:
+                self._digests.popitem(last=False)
+        return digest
+
+    def _extract(self, value: Any, sink: Dict[str, str]) -> Tuple[Any, int]:
+        """
+        把消息列表中较大的工具结果替换为引用(复制消息, 不修改图中的状态)
+        Returns:
+            (替换后的值, 被替换的工具结果的总长度)
+        """
+        if not isinstance(value, list):
+            return value, 0
+        result, removed = [], 0
+        for item in value:
+            if isinstance(item, ToolMessage):
+                content, size = self._extract_content(item.content, sink)
+                if size:
+                    item = item.model_copy(update={"content": content})
+                    removed += size
+            result.append(item)
+        return (result, removed) if removed else (value, 0)
+
+    def _extract_content(self, content: Any, sink: Dict[str, str]) -> Tuple[Any, int]:
+        """工具结果为字符串或文本块列表(MCP工具)"""
+        if isinstance(content, str):
+            if len(content) < self.dedupe_min_size:
+                return content, 0
+            digest = self._digest(content)
+            sink[digest] = content
+            return REF_PREFIX + digest, len(content)
+        if isinstance(content, list):
+            blocks, removed = [], 0
+            for block in content:
+                if isinstance(block, dict) and block.get("type") == "text" and isinstance(block.get("text"), str):
+                    text, size = self._extract_content(block["text"], sink)
+                    if size:
+                        block = {**block, "text": text}
+                        removed += size
+                blocks.append(block)
+            return blocks, removed
+        return content, 0
+
+    @staticmethod
+    def _restore(value: Any, source: Optional[Dict[str, str]]) -> Any:
+        """把消息中的引用替换回工具结果"""
+        if not isinstance(value, list):
+            return value
+        for item in value:
+            if not isinstance(item, ToolMessage):
+                continue
+            if isinstance(item.content, str):
+                if item.content.startswith(REF_PREFIX):
+                    item.content = CompactSerializer._resolve(item.content, source)
+            elif isinstance(item.content, list):
+                for block in item.content:
+                    if isinstance(block, dict) and isinstance(block.get("text"), str) and block["text"].startswith(REF_PREFIX):
+                        block["text"] = CompactSerializer._resolve(block["text"], source)
+        return value
+
+    @staticmethod
+    def _resolve(ref: str, source: Optional[Dict[str, str]]) -> str:
+        """引用对应的工具结果, 找不到时保留引用"""
+        digest = ref[len(REF_PREFIX):]
+        if source is not None and digest in source:
+            return source[digest]
+        logger.warning(f"⚠️  检查点中的工具结果 {digest} 不存在")
+        return ref
+
+    # ---------- SerializerProtocol ----------
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        start = time.perf_counter()
+        sink = _payload_sink.get()
+        removed = 0
+        if sink is not None and self.dedupe_min_size > 0:
+            obj, removed = self._extract(obj, sink)
+        type_, data = self.inner.dumps_typed(obj)
+        raw_size = len(data) + removed
+        if len(data) >= self.compress_min_size:
+            type_, data = f"{type_}+{self.codec}", _compress(self.codec, data, self.level)
+        elif removed:
+            # 没有压缩但包含引用: 也要带上后缀, 读取时才会替换引用
+            type_ = f"{type_}+raw"
+        with self._lock:
+            self._stats["values"] += 1
+            self._stats["raw_bytes"] += raw_size
+            self._stats["stored_bytes"] += len(data)
+            self._stats["dump_seconds"] += time.perf_counter() - start
+        return type_, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        inner_type, _, codec = type_.partition("+")
+        if not codec:
+            return self.inner.loads_typed(data)
+        if codec != "raw":
+            payload = _decompress(codec, payload)
+        return self._restore(self.inner.loads_typed((inner_type, payload)), _payload_source.get())
+
+    # ---------- 单独保存的工具结果 ----------
+
+    def dump_payload(self, text: str) -> Tuple[str, bytes]:
+        """单独保存的工具结果(压缩后的UTF-8文本)"""
+        return f"payload+{self.codec}", _compress(self.codec, text.encode("utf-8"), self.level)
+
+    @staticmethod
+    def load_payload(type_: str, data: bytes) -> str:
+        """读取单独保存的工具结果"""
+        _, _, codec = type_.partition("+")
+        return _decompress(codec, data).decode("utf-8")
+
+    def record(self, **values: float) -> None:
+        """累加统计值"""
+        with self._lock:
+            for key, value in values.items():
+                self._stats[key] += value
+
+    def stats(self) -> Dict[str, Any]:
+        """序列化统计: 写入字节数相对默认序列化器的减少比例、平均写入耗时"""
+        with self._lock:
+            stats = dict(self._stats)
+        written = stats["stored_bytes"] + stats["payload_bytes"]
+        stats["codec"] = self.codec
+        stats["written_bytes"] = written
+        stats["reduction"] = round(1 - written / stats["raw_bytes"], 3) if stats["raw_bytes"] else 0.0
+        stats["avg_put_ms"] = round(stats["put_seconds"] / stats["puts"] * 1000, 2) if stats["puts"] else 0.0
+        stats["dump_seconds"] = round(stats["dump_seconds"], 3)
+        stats["put_seconds"] = round(stats["put_seconds"], 3)
+        return stats
+
+
+def _select_with_payloads(select_sql: str) -> str:
+    """
+    在AsyncPostgresSaver的检查点查询中加入线程的工具结果(payloads列)
+    查询语句是langgraph-checkpoint-postgres的内部实现, 升级后格式变化时直接报错, 不会静默地读不到工具结果
+    Args:
+        select_sql: AsyncPostgresSaver.SELECT_SQL
+    Returns:
+        加入payloads列后的查询语句
+    """
+    marker = "from checkpoints "
+    if select_sql.count(marker) != 1:
+        raise RuntimeError(
+            "langgraph-checkpoint-postgres的SELECT_SQL格式已变化, 无法加入工具结果查询, "
+            "请更新CompactPostgresSaver或设置CHECKPOINT_SERIALIZER=default"
+        )
+    return select_sql.replace(
+        marker,
+        f""",
+    (
+        select array_agg(array[pl.channel::bytea, pl.type::bytea, pl.blob])
+        from checkpoint_blobs pl
+        where pl.thread_id = checkpoints.thread_id
+            and pl.checkpoint_ns = checkpoints.checkpoint_ns
+            and starts_with(pl.channel, '{PAYLOAD_CHANNEL}')
+    ) as payloads
+{marker}"""
+    )
+
+
+class CompactPostgresSaver(AsyncPostgresSaver):
+    """单独保存工具结果的Postgres检查点存储
+
+    工具结果作为通道名为 __payload__:<哈希> 的行写入checkpoint_blobs, 与检查点的其他数据在同一批
+    语句中、检查点行之前写入; 读取检查点时一并查询所在线程的工具结果。删除线程时这些行随线程一起删除。
+    """
+
+    SELECT_SQL = _select_with_payloads(AsyncPostgresSaver.SELECT_SQL)
+
+    # 记录已写入工具结果的线程数上限(超出后淘汰最久未写入的线程, 之后最多重复写入一次)
+    MAX_TRACKED_THREADS = 4096
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (线程ID, 命名空间) -> 已写入的工具结果哈希
+        self._written: "OrderedDict[Tuple[str, str], Set[str]]" = OrderedDict()
+        self._written_lock = threading.Lock()
+
+    def _written_hashes(self, thread_id: str, checkpoint_ns: str) -> Set[str]:
+        """线程已写入的工具结果哈希"""
+        with self._written_lock:
+            return set(self._written.get((thread_id, checkpoint_ns), ()))
+
+    def _mark_written(self, thread_id: str, checkpoint_ns: str, hashes: List[str]) -> None:
+        """检查点写入成功后记录工具结果已写入"""
+        with self._written_lock:
+            key = (thread_id, checkpoint_ns)
+            self._written.setdefault(key, set()).update(hashes)
+            self._written.move_to_end(key)
+            while len(self._written) > self.MAX_TRACKED_THREADS:
+                self._written.popitem(last=False)
+
+    def _forget_threads(self, thread_ids: List[str]) -> None:
+        """线程被删除后, 它的工具结果需要重新写入"""
+        ids = set(thread_ids)
+        with self._written_lock:
+            for key in [k for k in self._written if k[0] in ids]:
+                del self._written[key]
+
+    def _dump_blobs(self, thread_id, checkpoint_ns, values, versions):
+        rows = super()._dump_blobs(thread_id, checkpoint_ns, values, versions)
+        sink = _payload_sink.get()
+        if not sink or not isinstance(self.serde, CompactSerializer):
+            return rows
+        written = self._written_hashes(thread_id, checkpoint_ns)
+        payload_bytes, new = 0, []
+        for digest, text in sink.items():
+            if digest in written:
+                continue
+            type_, data = self.serde.dump_payload(text)
+            rows.append((thread_id, checkpoint_ns, PAYLOAD_CHANNEL + digest, "1", type_, data))
+            payload_bytes += len(data)
+            new.append(digest)
+        self.serde.record(payload_refs=len(sink), payloads_stored=len(new), payload_bytes=payload_bytes)
+        return rows
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        start = time.perf_counter()
+        sink: Dict[str, str] = {}
+        token = _payload_sink.set(sink)
+        try:
+            # _dump_blobs在线程中执行, 线程复制当前上下文, 写入的是同一个sink
+            next_config = await super().aput(config, checkpoint, metadata, new_versions)
+        finally:
+            _payload_sink.reset(token)
+        configurable = config["configurable"]
+        self._mark_written(configurable["thread_id"], configurable.get("checkpoint_ns", ""), list(sink))
+        if isinstance(self.serde, CompactSerializer):
+            self.serde.record(puts=1, put_seconds=time.perf_counter() - start)
+        return next_config
+
+    async def _load_checkpoint_tuple(self, value):
+        source: Dict[str, str] = {}
+        for channel, type_, data in value.pop("payloads", None) or []:
+            if data is not None:
+                source[channel.decode()[len(PAYLOAD_CHANNEL):]] = CompactSerializer.load_payload(type_.decode(), data)
+        token = _payload_source.set(source)
+        try:
+            return await super()._load_checkpoint_tuple(value)
+        finally:
+            _payload_source.reset(token)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await super().adelete_thread(thread_id)
+        self._forget_threads([str(thread_id)])
+
+    async def aprune(self, thread_ids, *, strategy: str = "keep_latest") -> None:
+        await super().aprune(thread_ids, strategy=strategy)
+        if strategy == "delete":
+            self._forget_threads([str(t) for t in thread_ids])
+
+
+# 全局序列化器实例
+_checkpoint_serde = None
+
+def get_checkpoint_serde() -> Optional[CompactSerializer]:
+    """获取检查点序列化器实例(单例模式), 配置为default时返回None(使用LangGraph默认序列化器)"""
+    global _checkpoint_serde
+
+    settings = get_settings()
+    if settings.checkpoint_serializer != "compact":
+        return None
+    if _checkpoint_serde is None:
+        _checkpoint_serde = CompactSerializer(
+            compression_level=settings.checkpoint_compression_level,
+            compress_min_size=settings.checkpoint_compress_min_size,
+            dedupe_min_size=settings.checkpoint_dedupe_min_size
+        )
+
+    return _checkpoint_serde
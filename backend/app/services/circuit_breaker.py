@@ -0,0 +1,124 @@
+"""熔断器模块(上游连续失败时快速失败, 不再等待超时)"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态, 调用被拒绝"""
+
+
+class CircuitBreaker:
+    """熔断器
+
+    - closed: 正常调用, 连续失败达到failure_threshold次后打开;
+    - open: 直接抛出CircuitOpenError, 经过reset_timeout秒后进入half_open;
+    - half_open: 只放行一个试探调用, 成功则关闭, 失败则重新打开。
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        """
+        初始化
+        Args:
+            name: 名称(用于日志)
+            failure_threshold: 连续失败多少次后打开
+            reset_timeout: 打开后多少秒允许试探
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probing = False
+
+    def before_call(self) -> None:
+        """调用前检查, 熔断时抛出CircuitOpenError"""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name}熔断中, 暂停调用")
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name}熔断恢复试探中, 暂停调用")
+            self._probing = True
+
+    def record_success(self) -> None:
+        """记录一次成功调用"""
+        if self.state != "closed":
+            logger.info(f"✅ {self.name}熔断恢复")
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """记录一次失败调用"""
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"⚠️  {self.name}连续失败{self.failures}次, 熔断{self.reset_timeout:g}秒")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """调用被取消(既不是成功也不是失败)时释放试探名额, 之后的调用可以重新试探"""
+        self._probing = False
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        通过熔断器执行调用(超时和异常都计为失败, 取消不计)
+        Args:
+            fn: 无参协程函数
+        Returns:
+            调用结果
+        """
+        self.before_call()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self.release_probe()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        """熔断器状态"""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+
+# 各上游的熔断器
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    获取上游服务的熔断器(单例模式)
+    Args:
+        name: amap(高德MCP会话) / llm(LLM服务)
+    Returns:
+        熔断器
+    """
+    if name not in _breakers:
+        settings = get_settings()
+        _breakers[name] = CircuitBreaker(name, settings.breaker_failure_threshold, settings.breaker_reset_timeout)
+    return _breakers[name]
+
+
+def breaker_status() -> Dict[str, Dict[str, Any]]:
+    """所有熔断器的状态"""
+    return {name: breaker.status() for name, breaker in _breakers.items()}
@@ -0,0 +1,87 @@
+"""并发控制模块(外部服务并发上限、相同调用合并)"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from ..config import get_settings
+
+
+class _Flight:
+    """一次正在执行的调用: 执行调用的任务和等待它的调用方数量"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """合并并发的相同调用: 同一个key同时只执行一次, 其余调用等待并共享结果
+
+    调用在SingleFlight持有的任务中执行, 不属于任何一个调用方: 某个调用方被取消(超时、客户端断开)时
+    只是它不再等待, 其他调用方照常得到结果; 所有调用方都取消后才取消任务。
+    """
+
+    def __init__(self):
+        """初始化"""
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行调用(相同key正在执行时等待其结果)
+        Args:
+            key: 调用的唯一标识
+            fn: 无参协程函数
+        Returns:
+            调用结果
+        """
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = self._inflight[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda task: self._finish(key, flight))
+        else:
+            self.shared += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            # 只有这个调用方被取消时不影响任务; 最后一个调用方也取消时不再需要结果
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finish(self, key: Hashable, flight: _Flight) -> None:
+        """任务结束后移除(之后相同key的调用重新执行)"""
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        # 没有调用方等待时避免"exception was never retrieved"警告
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+
+# 各外部服务的并发上限
+_limiters: Dict[str, asyncio.Semaphore] = {}
+
+def get_limiter(name: str) -> asyncio.Semaphore:
+    """
+    获取外部服务的并发信号量(单例模式)
+    Args:
+        name: amap(高德MCP工具调用) / plan(同时运行的多智能体规划, 每个规划同一时间约占用一个LLM调用) /
+              llm(同时进行的LLM请求, 包括对冲请求) / route(同时进行的路线规划, 避免占满高德并发)
+    Returns:
+        信号量
+    """
+    if name not in _limiters:
+        settings = get_settings()
+        limits = {
+            "amap": settings.amap_max_concurrency,
+            "plan": settings.plan_max_concurrency,
+            "llm": settings.llm_max_concurrency,
+            "route": settings.route_max_concurrency,
+        }
+        _limiters[name] = asyncio.Semaphore(max(1, limits[name]))
+    return _limiters[name]
@@ -0,0 +1,158 @@
+"""向量化地理距离计算模块(酒店选择与邻近查询)"""
+
+from typing import Iterable, List, Optional, Sequence
+import numpy as np
+from ..models.schemas import Hotel, Location, POIInfo, TripPlan
+
+# 地球平均半径(米)
+EARTH_RADIUS_M = 6371008.8
+
+# 住宿偏好 -> 高德POI类型/名称中的关键词
+ACCOMMODATION_TIERS = {
+    "经济型": ["经济型", "快捷", "连锁", "青年旅舍", "宾馆", "招待所"],
+    "舒适型": ["三星级", "舒适型", "精品"],
+    "高档型": ["四星级", "高档"],
+    "豪华型": ["五星级", "豪华"],
+    "民宿": ["民宿", "客栈", "公寓"],
+}
+
+
+def to_radians(points: Iterable[Location]) -> np.ndarray:
+    """把坐标列表转换为(n, 2)的弧度数组, 列顺序为(经度, 纬度)"""
+    arr = np.array([(p.longitude, p.latitude) for p in points], dtype=np.float64)
+    return np.radians(arr.reshape(-1, 2))
+
+
+def haversine_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    批量计算两组点之间的haversine距离矩阵
+    Args:
+        a: (n, 2) 弧度数组(经度, 纬度)
+        b: (m, 2) 弧度数组(经度, 纬度)
+    Returns:
+        (n, m) 距离矩阵(米)
+    """
+    lon1, lat1 = a[:, 0:1], a[:, 1:2]
+    lon2, lat2 = b[:, 0], b[:, 1]
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def weighted_centroid(points: Sequence[Location], weights: Optional[Sequence[float]] = None) -> Location:
+    """计算一组坐标的加权中心(城市尺度下直接对经纬度加权平均即可)"""
+    arr = np.array([(p.longitude, p.latitude) for p in points], dtype=np.float64)
+    w = np.ones(len(arr)) if weights is None else np.asarray(weights, dtype=np.float64)
+    lng, lat = (arr * w[:, None]).sum(axis=0) / w.sum()
+    return Location(longitude=float(lng), latitude=float(lat))
+
+
+def format_distance(meters: float) -> str:
+    """把距离格式化为展示文本"""
+    if meters < 1000:
+        return f"{int(round(meters))}米"
+    return f"{meters / 1000:.1f}公里"
+
+
+def match_accommodation(candidate_text: str, accommodation: str) -> bool:
+    """判断候选酒店是否属于用户要求的住宿档次"""
+    for tier, keywords in ACCOMMODATION_TIERS.items():
+        if tier in accommodation or any(k in accommodation for k in keywords):
+            return any(k in candidate_text for k in keywords)
+    # 未识别的住宿偏好直接用原文匹配
+    return accommodation in candidate_text
+
+
+class GeoService:
+    """地理距离服务: 基于NumPy批量计算距离矩阵"""
+
+    def nearest(self, query: Location, points: Sequence[Location], k: int = 1) -> List[int]:
+        """
+        查找距离query最近的k个点
+        Args:
+            query: 查询坐标
+            points: 候选坐标
+            k: 返回数量
+        Returns:
+            按距离升序排列的下标
+        """
+        if not points:
+            return []
+        dist = haversine_matrix(to_radians([query]), to_radians(points))[0]
+        k = min(k, len(points))
+        idx = np.argpartition(dist, k - 1)[:k]
+        return idx[np.argsort(dist[idx])].tolist()
+
+    def within_radius(self, query: Location, points: Sequence[Location], radius: float) -> List[int]:
+        """查找距离query在radius(米)以内的点的下标"""
+        if not points:
+            return []
+        dist = haversine_matrix(to_radians([query]), to_radians(points))[0]
+        return np.flatnonzero(dist <= radius).tolist()
+
+    def assign_hotels(self, plan: TripPlan, candidates: Sequence[Hotel], accommodation: str = "") -> TripPlan:
+        """
+        为每一天选择距离当日景点中心最近的酒店, 并用真实距离填写Hotel.distance
+        Args:
+            plan: 旅行计划
+            candidates: 候选酒店(必须带坐标)
+            accommodation: 住宿偏好, 用于筛选酒店档次
+        Returns:
+            更新后的旅行计划(新对象)
+        """
+        candidates = [h for h in candidates if h.location is not None]
+        if accommodation:
+            tiered = [h for h in candidates if match_accommodation(f"{h.type}{h.name}", accommodation)]
+            # 没有符合档次的候选时退回全部候选
+            candidates = tiered or candidates
+
+        day_indices = [i for i, day in enumerate(plan.days) if day.attractions]
+        if not candidates or not day_indices:
+            return plan
+
+        # 各天景点中心(按游览时长加权), 一次性计算候选酒店 x 天 的距离矩阵
+        centroids = [
+            weighted_centroid(
+                [a.location for a in plan.days[i].attractions],
+                [a.visit_duration for a in plan.days[i].attractions]
+            )
+            for i in day_indices
+        ]
+        dist = haversine_matrix(to_radians(h.location for h in candidates), to_radians(centroids))
+        best = dist.argmin(axis=0)
+
+        days = list(plan.days)
+        for col, i in enumerate(day_indices):
+            chosen = candidates[int(best[col])]
+            previous = days[i].hotel
+            hotel = chosen.model_copy(update={"distance": f"距离当日景点中心约{format_distance(float(dist[best[col], col]))}"})
+            # 候选酒店没有价格时沿用原计划同档次酒店的预估费用
+            if previous is not None:
+                hotel.estimated_cost = hotel.estimated_cost or previous.estimated_cost
+                hotel.price_range = hotel.price_range or previous.price_range
+                hotel.type = hotel.type or previous.type
+            days[i] = days[i].model_copy(update={"hotel": hotel})
+
+        return plan.model_copy(update={"days": days})
+
+    @staticmethod
+    def hotels_from_pois(pois: Iterable[POIInfo]) -> List[Hotel]:
+        """把POI搜索结果中的住宿类POI转换为候选酒店"""
+        hotels = []
+        for poi in pois:
+            if not any(k in f"{poi.type}{poi.name}" for k in ("住宿", "酒店", "宾馆", "旅馆", "民宿", "客栈")):
+                continue
+            hotels.append(Hotel(name=poi.name, address=poi.address, location=poi.location, type=poi.type))
+        return hotels
+
+
+# 全局服务实例
+_geo_service = None
+
+def get_geo_service() -> GeoService:
+    """获取地理距离服务实例(单例模式)"""
+    global _geo_service
+
+    if _geo_service is None:
+        _geo_service = GeoService()
+
+    return _geo_service
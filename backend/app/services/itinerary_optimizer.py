@@ -0,0 +1,231 @@
+"""行程路线优化模块(基于经纬度的TSP启发式排序)"""
+
+import math
+import time
+from typing import List, Optional, Tuple
+from ..config import get_settings
+from ..models.schemas import DayPlan, Location, Meal, TripPlan
+from .geo_service import EARTH_RADIUS_M, haversine_matrix, to_radians
+
+
+def haversine(a: Location, b: Location) -> float:
+    """
+    计算两点之间的球面距离
+    Args:
+        a: 起点坐标
+        b: 终点坐标
+    Returns:
+        距离(米)
+    """
+    lon1, lat1 = math.radians(a.longitude), math.radians(a.latitude)
+    lon2, lat2 = math.radians(b.longitude), math.radians(b.latitude)
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(h)))
+
+
+def build_distance_matrix(points: List[Location]) -> List[List[float]]:
+    """构建两两之间的haversine距离矩阵(米)"""
+    if not points:
+        return []
+    rad = to_radians(points)
+    return haversine_matrix(rad, rad).tolist()
+
+
+class ItineraryOptimizer:
+    """单日行程路线优化器
+
+    每天的路线视为: 酒店 -> 早餐 -> 景点(待排序) -> 晚餐 -> 酒店,
+    午餐插入到绕路最少的两个景点之间。景点顺序先用最近邻构造初始解,
+    再用2-opt在时间预算内改进。
+    """
+
+    def __init__(self, time_budget_ms: Optional[float] = None):
+        """
+        初始化优化器
+        Args:
+            time_budget_ms: 单日2-opt改进的时间预算(毫秒)
+        """
+        if time_budget_ms is None:
+            time_budget_ms = get_settings().itinerary_time_budget_ms
+        self.time_budget_ms = time_budget_ms
+
+    def optimize_day(self, day: DayPlan) -> DayPlan:
+        """
+        重新排序单日景点并计算当日交通总距离
+        Args:
+            day: 单日行程
+        Returns:
+            排序后的单日行程(新对象)
+        """
+        attractions = list(day.attractions)
+        hotel_loc = day.hotel.location if day.hotel and day.hotel.location else None
+        breakfast = self._meal_location(day.meals, "breakfast")
+        dinner = self._meal_location(day.meals, "dinner")
+
+        # 路线的固定起终点: 有早餐/晚餐坐标用餐厅, 否则用酒店
+        start = breakfast or hotel_loc
+        end = dinner or hotel_loc
+
+        # 点集: [景点..., 起点?, 终点?]
+        points = [a.location for a in attractions]
+        start_idx = end_idx = None
+        if start is not None:
+            start_idx = len(points)
+            points.append(start)
+        if end is not None:
+            end_idx = len(points)
+            points.append(end)
+
+        matrix = build_distance_matrix(points)
+        order = self._solve(len(attractions), matrix, start_idx, end_idx)
+        ordered = [attractions[i] for i in order]
+
+        # 计算总距离: 酒店 -> 早餐 -> 景点(含午餐) -> 晚餐 -> 酒店
+        stops = [loc for _, loc in day_stops(day.model_copy(update={"attractions": ordered}))]
+        distance = sum(haversine(stops[k], stops[k + 1]) for k in range(len(stops) - 1))
+
+        return day.model_copy(update={"attractions": ordered, "travel_distance": round(distance, 1)})
+
+    def optimize_plan(self, plan: TripPlan) -> TripPlan:
+        """
+        优化旅行计划中每一天的景点顺序
+        Args:
+            plan: 旅行计划
+        Returns:
+            优化后的旅行计划(新对象)
+        """
+        days = [self.optimize_day(day) for day in plan.days]
+        total = round(sum(day.travel_distance for day in days), 1)
+        return plan.model_copy(update={"days": days, "total_travel_distance": total})
+
+    def _solve(
+        self,
+        n: int,
+        matrix: List[List[float]],
+        start_idx: Optional[int],
+        end_idx: Optional[int]
+    ) -> List[int]:
+        """最近邻 + 2-opt求解固定起终点的开放路径, 返回景点下标顺序"""
+        if n <= 1:
+            return list(range(n))
+
+        route = self._nearest_neighbour(n, matrix, start_idx)
+        if start_idx is not None:
+            route.insert(0, start_idx)
+        if end_idx is not None:
+            route.append(end_idx)
+
+        # 固定的起终点不参与翻转
+        lo = 1 if start_idx is not None else 0
+        hi = len(route) - (2 if end_idx is not None else 1)
+        route = self._two_opt(route, matrix, lo, hi)
+
+        return [i for i in route if i < n]
+
+    @staticmethod
+    def _nearest_neighbour(n: int, matrix: List[List[float]], start_idx: Optional[int]) -> List[int]:
+        """最近邻构造初始解"""
+        remaining = set(range(n))
+        if start_idx is not None:
+            current = start_idx
+        else:
+            # 无起点时从最"边缘"的景点出发, 避免从中间开始来回折返
+            current = max(remaining, key=lambda i: sum(matrix[i][j] for j in range(n)))
+            remaining.discard(current)
+        route = [] if start_idx is not None else [current]
+        while remaining:
+            nxt = min(remaining, key=lambda j: matrix[current][j])
+            remaining.discard(nxt)
+            route.append(nxt)
+            current = nxt
+        return route
+
+    def _two_opt(self, route: List[int], matrix: List[List[float]], lo: int, hi: int) -> List[int]:
+        """
+        在[lo, hi]区间内做2-opt改进, 超过时间预算即停止
+        Args:
+            route: 完整路径(含固定起终点)
+            matrix: 距离矩阵
+            lo: 可翻转区间起点下标
+            hi: 可翻转区间终点下标
+        Returns:
+            改进后的路径
+        """
+        deadline = time.perf_counter() + self.time_budget_ms / 1000
+        last = len(route) - 1
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            for i in range(lo, hi):
+                for j in range(i + 1, hi + 1):
+                    # 翻转route[i..j], 比较两条边的变化
+                    a = matrix[route[i - 1]][route[i]] if i > 0 else 0.0
+                    b = matrix[route[j]][route[j + 1]] if j < last else 0.0
+                    c = matrix[route[i - 1]][route[j]] if i > 0 else 0.0
+                    d = matrix[route[i]][route[j + 1]] if j < last else 0.0
+                    if c + d < a + b - 1e-9:
+                        route[i:j + 1] = reversed(route[i:j + 1])
+                        improved = True
+        return route
+
+    @staticmethod
+    def _meal_location(meals: List[Meal], meal_type: str) -> Optional[Location]:
+        """获取指定餐次的坐标"""
+        meal = next((m for m in meals if m.type == meal_type and m.location), None)
+        return meal.location if meal else None
+
+
+def _insert_lunch(stops: List[Tuple[str, Location]], lunch: Optional[Tuple[str, Location]]) -> List[Tuple[str, Location]]:
+    """把午餐插入到绕路最少的两个景点之间"""
+    if lunch is None:
+        return stops
+    if len(stops) < 2:
+        return stops + [lunch]
+    best_pos, best_cost = 1, math.inf
+    for k in range(1, len(stops)):
+        prev, nxt = stops[k - 1][1], stops[k][1]
+        cost = haversine(prev, lunch[1]) + haversine(lunch[1], nxt) - haversine(prev, nxt)
+        if cost < best_cost:
+            best_pos, best_cost = k, cost
+    return stops[:best_pos] + [lunch] + stops[best_pos:]
+
+
+def day_stops(day: DayPlan) -> List[Tuple[str, Location]]:
+    """
+    单日路线经过的地点(按景点当前顺序): 酒店 -> 早餐 -> 景点(含午餐) -> 晚餐 -> 酒店
+    Args:
+        day: 单日行程
+    Returns:
+        (名称, 坐标)列表, 没有坐标的地点不计入
+    """
+    def meal(meal_type: str) -> Optional[Tuple[str, Location]]:
+        found = next((m for m in day.meals if m.type == meal_type and m.location), None)
+        return (found.name, found.location) if found else None
+
+    hotel = (day.hotel.name, day.hotel.location) if day.hotel and day.hotel.location else None
+    breakfast, lunch, dinner = meal("breakfast"), meal("lunch"), meal("dinner")
+
+    stops: List[Tuple[str, Location]] = []
+    if hotel is not None:
+        stops.append(hotel)
+    if breakfast is not None:
+        stops.append(breakfast)
+    stops.extend(_insert_lunch([(a.name, a.location) for a in day.attractions], lunch))
+    if dinner is not None:
+        stops.append(dinner)
+    if hotel is not None:
+        stops.append(hotel)
+    return stops
+
+
+# 全局优化器实例
+_itinerary_optimizer = None
+
+def get_itinerary_optimizer() -> ItineraryOptimizer:
+    """获取行程优化器实例(单例模式)"""
+    global _itinerary_optimizer
+
+    if _itinerary_optimizer is None:
+        _itinerary_optimizer = ItineraryOptimizer()
+
+    return _itinerary_optimizer
@@ -0,0 +1,60 @@
+"""LLM调用回调模块(记录各角色的延迟和token用量, 在创建LLM实例时才导入)"""
+
+import time
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from .llm_metrics import LLMMetrics
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """记录LLM调用延迟和token用量的回调(挂在每个角色的LLM实例上)"""
+
+    run_inline = True
+
+    def __init__(self, role: str, model: str, metrics: LLMMetrics):
+        """
+        初始化
+        Args:
+            role: 角色
+            model: 模型名称
+            metrics: 指标汇总
+        """
+        self.role = role
+        self.model = model
+        self.metrics = metrics
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        input_tokens, output_tokens = _token_usage(response)
+        self.metrics.record(self.role, self.model, self._elapsed(run_id), input_tokens, output_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.metrics.record(self.role, self.model, self._elapsed(run_id), error=True)
+
+    def _elapsed(self, run_id: UUID) -> float:
+        """本次调用的耗时(秒)"""
+        started: Optional[float] = self._started.pop(run_id, None)
+        return time.perf_counter() - started if started is not None else 0.0
+
+
+def _token_usage(response: Any) -> Tuple[int, int]:
+    """从LLMResult中读取(输入token, 输出token), 兼容usage_metadata和llm_output两种格式"""
+    input_tokens = output_tokens = 0
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    if not input_tokens and not output_tokens:
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        input_tokens = usage.get("prompt_tokens", 0)
+        output_tokens = usage.get("completion_tokens", 0)
+    return input_tokens, output_tokens
@@ -0,0 +1,304 @@
+"""LLM客户端模块(在ChatOpenAI外加熔断、并发预算、多服务负载均衡和对冲请求, 在创建LLM实例时才导入)"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+from .circuit_breaker import get_breaker
+from .concurrency import get_limiter
+from .llm_endpoints import Endpoint
+from .llm_hedging import Hedger, get_hedger
+
+
+# 服务池中各服务的客户端: (服务名称, 模型) -> ChatOpenAI
+_endpoint_clients: Dict[Tuple[str, str], ChatOpenAI] = {}
+# 采样后继续运行的落后主请求(保留引用, 避免任务被回收)
+_sampled_losers: Set[asyncio.Task] = set()
+
+
+def _is_rate_limited(error: BaseException) -> bool:
+    """是否为429限流错误"""
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+async def _first_success(primary: asyncio.Task, hedge: asyncio.Task, keep_primary: bool = False) -> asyncio.Task:
+    """
+    等待两个请求中先成功的一个, 取消另一个; 都失败时抛出主请求的异常
+    Args:
+        primary: 主请求
+        hedge: 对冲请求
+        keep_primary: 对冲请求胜出时不取消主请求(采样对冲的收益)
+    Returns:
+        先成功的请求
+    """
+    pending = {primary, hedge}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() is None:
+                for other in pending:
+                    if not (keep_primary and other is primary):
+                        other.cancel()
+                return task
+    return primary
+
+
+def _sample_loser(hedger: Hedger, primary: asyncio.Task, start: float, served: float) -> None:
+    """
+    对冲请求胜出后让主请求在后台继续运行到返回, 记录对冲节省的时间
+    Args:
+        hedger: 角色的对冲统计
+        primary: 主请求
+        start: 调用开始时间
+        served: 对冲请求返回时的耗时
+    """
+    async def finish():
+        try:
+            await primary
+        except Exception:
+            # 主请求失败, 没有可比较的延迟
+            return
+        hedger.record_loser(time.perf_counter() - start, served)
+
+    task = asyncio.ensure_future(finish())
+    _sampled_losers.add(task)
+    task.add_done_callback(_sampled_losers.discard)
+
+
+async def _close_stream(stream: AsyncIterator, task: Optional[asyncio.Task]) -> None:
+    """取消并关闭落后的流式请求"""
+    if task is not None and not task.done():
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    await stream.aclose()
+
+
+class ResilientChatOpenAI(ChatOpenAI):
+    """带熔断、并发预算和对冲请求的ChatOpenAI
+
+    - LLM服务连续失败后直接抛出CircuitOpenError, 不再等待超时;
+    - 所有LLM请求共用llm_max_concurrency的并发预算;
+    - 配置了多个服务(LLM_ENDPOINTS)时按负载选择服务, 失败或限流的服务暂时摘除并换一个服务重试;
+    - 开启对冲的角色: 超过自适应阈值仍没有返回首个token时, 在并发预算有空余的情况下
+      向备用服务(未配置时为同一服务)发出重复请求, 取先返回的结果并取消另一个。
+    """
+
+    breaker_name: str = "llm"
+    # 开启对冲时的角色(用于统计和阈值), 为空时不对冲
+    hedge_role: Optional[str] = None
+    # 对冲请求使用的备用服务, 为空时向同一服务发出重复请求
+    hedge_client: Optional[Any] = None
+    # 多服务负载均衡(EndpointPool), 为空时只使用base_url
+    pool: Optional[Any] = None
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        async with get_limiter("llm"):
+            if self.hedge_role is None:
+                return await self._generate_once(messages, stop, run_manager, **kwargs)
+            return await self._hedged_generate(messages, stop, run_manager, **kwargs)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async with get_limiter("llm"):
+            stream = self._stream_once(messages, stop, run_manager, **kwargs) if self.hedge_role is None \
+                else self._hedged_stream(messages, stop, run_manager, **kwargs)
+            async for chunk in stream:
+                yield chunk
+
+    async def _generate_once(self, messages, stop, run_manager, **kwargs) -> ChatResult:
+        """发出一次请求(经过熔断器, 配置了服务池时由服务池选择服务)"""
+        if self.pool is not None:
+            return await self._generate_pooled(messages, stop, run_manager, **kwargs)
+        return await get_breaker(self.breaker_name).call(
+            lambda: super(ResilientChatOpenAI, self)._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        )
+
+    async def _stream_once(self, messages, stop, run_manager, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        """发出一次流式请求(经过熔断器, 配置了服务池时由服务池选择服务)"""
+        if self.pool is not None:
+            async for chunk in self._stream_pooled(messages, stop, run_manager, **kwargs):
+                yield chunk
+            return
+        breaker = get_breaker(self.breaker_name)
+        breaker.before_call()
+        try:
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            # 取消或提前关闭(如对冲请求先返回)不计入成败, 但要释放试探名额, 否则熔断器一直停在half_open
+            breaker.release_probe()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+
+    def _endpoint_client(self, endpoint: Endpoint) -> ChatOpenAI:
+        """服务池中某个服务的客户端(不自动重试, 失败后由服务池换一个服务)"""
+        model = endpoint.model or self.model_name
+        key = (endpoint.name, model)
+        if key not in _endpoint_clients:
+            _endpoint_clients[key] = ChatOpenAI(
+                model=model,
+                base_url=endpoint.base_url,
+                api_key=endpoint.api_key,
+                temperature=self.temperature,
+                timeout=self.request_timeout,
+                max_retries=0,
+                stream_usage=True
+            )
+        return _endpoint_clients[key]
+
+    async def _generate_pooled(self, messages, stop, run_manager, **kwargs) -> ChatResult:
+        """按负载选择服务发出请求, 失败时换一个服务(每个服务最多尝试一次)"""
+        tried: List[str] = []
+        while True:
+            endpoint = self.pool.acquire(exclude=tried)
+            start = time.perf_counter()
+            try:
+                result = await self._endpoint_client(endpoint)._agenerate(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                )
+            except asyncio.CancelledError:
+                self.pool.release(endpoint)
+                raise
+            except Exception as e:
+                self.pool.failure(endpoint, rate_limited=_is_rate_limited(e))
+                tried.append(endpoint.name)
+                if len(tried) >= len(self.pool):
+                    raise
+                continue
+            self.pool.success(endpoint, time.perf_counter() - start)
+            return result
+
+    async def _stream_pooled(self, messages, stop, run_manager, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        """按负载选择服务发出流式请求, 返回首个token之前失败时换一个服务"""
+        tried: List[str] = []
+        while True:
+            endpoint = self.pool.acquire(exclude=tried)
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in self._endpoint_client(endpoint)._astream(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                ):
+                    started = True
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                self.pool.release(endpoint)
+                raise
+            except Exception as e:
+                self.pool.failure(endpoint, rate_limited=_is_rate_limited(e))
+                tried.append(endpoint.name)
+                if started or len(tried) >= len(self.pool):
+                    raise
+                continue
+            self.pool.success(endpoint, time.perf_counter() - start)
+            return
+
+    async def _hedge_generate(self, messages, stop, **kwargs) -> ChatResult:
+        """对冲请求: 占用一个并发预算, 不触发token回调"""
+        target = self.hedge_client or self
+        async with get_limiter("llm"):
+            return await target._generate_once(messages, stop, None, **kwargs)
+
+    async def _hedge_stream(self, messages, stop, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        """对冲流式请求: 占用一个并发预算, 不触发token回调"""
+        target = self.hedge_client or self
+        async with get_limiter("llm"):
+            async for chunk in target._stream_once(messages, stop, None, **kwargs):
+                yield chunk
+
+    async def _hedged_generate(self, messages, stop, run_manager, **kwargs) -> ChatResult:
+        """主请求超过阈值未返回时发出对冲请求"""
+        hedger = get_hedger(self.hedge_role)
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(self._generate_once(messages, stop, run_manager, **kwargs))
+        hedge = None
+        # 流式输出时落后的主请求会触发token回调, 只对非流式调用采样
+        keep_primary = not self.streaming and hedger.sample_loser()
+        sampled = False
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=hedger.delay())
+            if not done:
+                if get_limiter("llm").locked():
+                    hedger.record_skip()
+                else:
+                    hedge = asyncio.ensure_future(self._hedge_generate(messages, stop, **kwargs))
+            if hedge is None:
+                result = await primary
+                hedger.observe(time.perf_counter() - start)
+                return result
+
+            winner = await _first_success(primary, hedge, keep_primary)
+            result = winner.result()
+            elapsed = time.perf_counter() - start
+            hedger.record_hedge(elapsed, hedge_won=winner is hedge)
+            if winner is hedge and keep_primary and not primary.done():
+                sampled = True
+                _sample_loser(hedger, primary, start, elapsed)
+            return result
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done() and not (sampled and task is primary):
+                    task.cancel()
+
+    async def _hedged_stream(self, messages, stop, run_manager, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        """主请求超过阈值仍没有返回首个token时发出对冲请求, 之后只读取先返回首个token的流"""
+        hedger = get_hedger(self.hedge_role)
+        start = time.perf_counter()
+        primary = self._stream_once(messages, stop, run_manager, **kwargs)
+        primary_first = asyncio.ensure_future(primary.__anext__())
+        hedge = hedge_first = None
+        winner, winner_first = primary, primary_first
+        try:
+            done, _ = await asyncio.wait({primary_first}, timeout=hedger.delay())
+            if not done and get_limiter("llm").locked():
+                hedger.record_skip()
+            elif not done:
+                hedge = self._hedge_stream(messages, stop, **kwargs)
+                hedge_first = asyncio.ensure_future(hedge.__anext__())
+                winner_first = await _first_success(primary_first, hedge_first)
+                if winner_first is hedge_first:
+                    winner = hedge
+                    await _close_stream(primary, primary_first)
+                else:
+                    await _close_stream(hedge, hedge_first)
+
+            try:
+                chunk = await winner_first
+            except StopAsyncIteration:
+                return
+            first_token = time.perf_counter() - start
+            if winner is hedge:
+                # 对冲请求没有token回调, 由这里补发
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            async for chunk in winner:
+                if winner is hedge and run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+
+            if hedge is None:
+                hedger.observe(first_token)
+            else:
+                hedger.record_hedge(first_token, hedge_won=winner is hedge)
+        finally:
+            await _close_stream(primary, primary_first)
+            if hedge is not None:
+                await _close_stream(hedge, hedge_first)
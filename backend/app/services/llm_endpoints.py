@@ -0,0 +1,187 @@
+"""LLM多服务负载均衡模块(按权重选择未完成请求最少的服务, 出错或限流时暂时摘除)"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class Endpoint:
+    """一个LLM服务(地址+密钥)"""
+
+    def __init__(self, name: str, base_url: str, api_key: str, weight: float = 1.0, model: str = ""):
+        """
+        初始化
+        Args:
+            name: 名称(用于日志和健康状态)
+            base_url: 服务地址
+            api_key: API密钥
+            weight: 权重, 权重越大分到的请求越多
+            model: 模型名称, 为空时使用角色配置的模型
+        """
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.weight = max(weight, 0.01)
+        self.model = model
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.total_latency = 0.0
+
+    def available(self, now: float) -> bool:
+        """是否未被摘除"""
+        return now >= self.ejected_until
+
+    def status(self, now: float) -> Dict[str, Any]:
+        """健康状态"""
+        succeeded = self.requests - self.errors
+        return {
+            "base_url": self.base_url,
+            "weight": self.weight,
+            "healthy": self.available(now),
+            "ejected_for_s": round(max(0.0, self.ejected_until - now), 1),
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "avg_latency_ms": round(self.total_latency / succeeded * 1000, 1) if succeeded else 0.0,
+        }
+
+
+class EndpointPool:
+    """LLM服务池
+
+    - 选择: 在未被摘除的服务中选 (未完成请求数+1)/权重 最小的, 请求会随服务数量和权重分摊;
+    - 摘除: 请求失败(包括429限流)后摘除一段时间, 连续失败时退避时间翻倍, 成功后恢复;
+    - 所有服务都被摘除时选择最早恢复的服务, 不直接拒绝请求。
+    """
+
+    def __init__(self, endpoints: List[Endpoint], backoff: float, max_backoff: float):
+        """
+        初始化
+        Args:
+            endpoints: 服务列表
+            backoff: 首次摘除的时间(秒)
+            max_backoff: 最长摘除时间(秒)
+        """
+        self.endpoints = endpoints
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def acquire(self, exclude: Iterable[str] = ()) -> Endpoint:
+        """
+        选择一个服务并记为未完成请求
+        Args:
+            exclude: 本次请求已经失败过的服务名称
+        Returns:
+            服务
+        """
+        exclude = set(exclude)
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.name not in exclude] or self.endpoints
+            available = [e for e in candidates if e.available(now)]
+            if available:
+                endpoint = min(available, key=lambda e: ((e.outstanding + 1) / e.weight, e.requests / e.weight))
+            else:
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def success(self, endpoint: Endpoint, latency: float) -> None:
+        """请求成功"""
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.total_latency += latency
+            if endpoint.failures:
+                logger.info(f"✅ LLM服务{endpoint.name}恢复")
+            endpoint.failures = 0
+            endpoint.ejected_until = 0.0
+
+    def failure(self, endpoint: Endpoint, rate_limited: bool = False) -> None:
+        """请求失败: 摘除服务, 连续失败时退避时间翻倍"""
+        now = time.monotonic()
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.errors += 1
+            endpoint.rate_limited += int(rate_limited)
+            if not endpoint.available(now):
+                # 摘除前已发出的并发请求失败, 不重复计算退避
+                return
+            endpoint.failures += 1
+            backoff = min(self.max_backoff, self.backoff * 2 ** (endpoint.failures - 1))
+            endpoint.ejected_until = now + backoff
+        reason = "限流" if rate_limited else "请求失败"
+        logger.warning(f"⚠️  LLM服务{endpoint.name}{reason}, 摘除{backoff:g}秒")
+
+    def release(self, endpoint: Endpoint) -> None:
+        """请求被取消(不计成功或失败)"""
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.requests -= 1
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """各服务的健康状态"""
+        now = time.monotonic()
+        with self._lock:
+            return {e.name: e.status(now) for e in self.endpoints}
+
+
+def parse_endpoints(value: str) -> List[Endpoint]:
+    """
+    解析LLM_ENDPOINTS配置
+    Args:
+        value: JSON列表, 如 [{"base_url": "...", "api_key": "...", "weight": 2, "model": "..."}]
+    Returns:
+        服务列表
+    """
+    endpoints = []
+    for index, item in enumerate(json.loads(value)):
+        endpoints.append(Endpoint(
+            name=item.get("name") or f"endpoint-{index}",
+            base_url=item["base_url"],
+            api_key=item.get("api_key", ""),
+            weight=float(item.get("weight", 1.0)),
+            model=item.get("model", "")
+        ))
+    return endpoints
+
+
+# 全局服务池实例
+_endpoint_pool = None
+_endpoint_pool_loaded = False
+
+def get_endpoint_pool() -> Optional[EndpointPool]:
+    """获取LLM服务池(单例模式), 没有配置LLM_ENDPOINTS时为None"""
+    global _endpoint_pool, _endpoint_pool_loaded
+
+    if not _endpoint_pool_loaded:
+        settings = get_settings()
+        if settings.llm_endpoints.strip():
+            _endpoint_pool = EndpointPool(
+                parse_endpoints(settings.llm_endpoints),
+                settings.llm_endpoint_backoff,
+                settings.llm_endpoint_max_backoff
+            )
+        _endpoint_pool_loaded = True
+
+    return _endpoint_pool
+
+
+def endpoint_status() -> Dict[str, Dict[str, Any]]:
+    """各LLM服务的健康状态, 没有配置服务池时为空"""
+    pool = get_endpoint_pool()
+    return pool.status() if pool is not None else {}
@@ -0,0 +1,177 @@
+"""LLM对冲请求模块(慢请求超过自适应阈值时发出重复请求, 取先返回的结果)"""
+
+import random
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+import numpy as np
+from ..config import get_settings
+
+# 计算阈值使用的最近延迟样本数量, 样本少于MIN_SAMPLES时使用初始阈值
+LATENCY_WINDOW = 256
+MIN_SAMPLES = 20
+
+
+def _weighted_quantile(samples: Deque[Tuple[float, float]], q: float) -> Optional[float]:
+    """带权重的分位数, 没有样本时返回None"""
+    if not samples:
+        return None
+    values, weights = np.array(samples).T
+    order = np.argsort(values)
+    cumulative = np.cumsum(weights[order])
+    index = int(np.searchsorted(cumulative, q * cumulative[-1]))
+    return float(values[order][min(index, len(values) - 1)])
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+class Hedger:
+    """单个角色的对冲阈值和统计
+
+    阈值取最近请求首个token延迟的分位数(默认p95), 不低于llm_hedge_min_delay。
+    对冲请求先返回时主请求已取消, 真实延迟未知, 但不小于对冲请求返回时的耗时(此时已超过阈值),
+    按这个耗时记录截尾样本; 如果不计入这些调用, 样本会缺少慢尾, 阈值逐渐偏低, 对冲越来越多。
+
+    对冲的收益: 只比较对冲/未对冲调用的平均耗时没有意义(发出对冲的本来就是慢请求),
+    所以非流式调用对冲请求胜出时, 按loser_sample_rate的比例让主请求继续运行到返回,
+    得到这些调用不对冲时的真实延迟和节省的时间。不对冲时的首个token分位数由未对冲调用、
+    主请求胜出的调用和按1/loser_sample_rate加权的采样调用估计, 与实际(对冲后)的分位数对比。
+    """
+
+    def __init__(
+        self,
+        role: str,
+        quantile: float,
+        min_delay: float,
+        initial_delay: float,
+        loser_sample_rate: float = 0.0
+    ):
+        """
+        初始化
+        Args:
+            role: 角色
+            quantile: 阈值分位数(0~1)
+            min_delay: 最小阈值(秒)
+            initial_delay: 样本不足时的阈值(秒)
+            loser_sample_rate: 对冲请求胜出时让主请求继续运行的比例(0~1)
+        """
+        self.role = role
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.loser_sample_rate = loser_sample_rate
+        # 调用方实际得到首个token的延迟
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        # 不对冲时主请求的首个token延迟和权重
+        self.baseline: Deque[Tuple[float, float]] = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.fired = 0
+        self.hedge_wins = 0
+        self.budget_skips = 0
+        self.loser_samples = 0
+        self.saved = 0.0
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """当前的对冲阈值(秒)"""
+        with self._lock:
+            if len(self.latencies) < MIN_SAMPLES:
+                return self.initial_delay
+            threshold = float(np.quantile(np.array(self.latencies), self.quantile))
+        return max(self.min_delay, threshold)
+
+    def sample_loser(self) -> bool:
+        """本次对冲请求胜出时是否让主请求继续运行(用于估计对冲的收益)"""
+        return self.loser_sample_rate > 0 and random.random() < self.loser_sample_rate
+
+    def observe(self, first_token_latency: float) -> None:
+        """
+        记录一次没有发出对冲请求的调用
+        Args:
+            first_token_latency: 首个token延迟(秒), 非流式调用等于总耗时
+        """
+        with self._lock:
+            self.calls += 1
+            self.latencies.append(first_token_latency)
+            self.baseline.append((first_token_latency, 1.0))
+
+    def record_hedge(self, first_token_latency: float, hedge_won: bool) -> None:
+        """
+        记录一次发出了对冲请求的调用
+        Args:
+            first_token_latency: 先返回的请求的首个token延迟(秒), 非流式调用等于总耗时;
+                对冲请求先返回时作为主请求延迟的下界(截尾样本)
+            hedge_won: 对冲请求是否先返回
+        """
+        with self._lock:
+            self.calls += 1
+            self.latencies.append(first_token_latency)
+            self.fired += 1
+            self.hedge_wins += int(hedge_won)
+            if not hedge_won:
+                self.baseline.append((first_token_latency, 1.0))
+
+    def record_loser(self, primary_latency: float, served_latency: float) -> None:
+        """
+        记录一次采样的落后主请求(对冲请求胜出后继续运行到返回首个token)
+        Args:
+            primary_latency: 主请求的首个token延迟(秒), 即不对冲时的延迟
+            served_latency: 对冲请求返回首个token的延迟(秒)
+        """
+        with self._lock:
+            self.loser_samples += 1
+            self.saved += primary_latency - served_latency
+            self.baseline.append((primary_latency, 1.0 / self.loser_sample_rate))
+
+    def record_skip(self) -> None:
+        """超过阈值但LLM并发预算已满, 没有发出对冲请求"""
+        with self._lock:
+            self.budget_skips += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """统计快照: 对冲次数、对冲请求胜出次数, 对冲前后首个token延迟的p95/p99和胜出时节省的时间"""
+        threshold = self.delay()
+        with self._lock:
+            served = np.array(self.latencies)
+            # 有对冲请求胜出但没有采样时, 不对冲的延迟缺少慢尾, 不作估计
+            baseline_known = self.loser_samples > 0 or self.hedge_wins == 0
+            return {
+                "threshold_ms": round(threshold * 1000, 1),
+                "samples": len(self.latencies),
+                "calls": self.calls,
+                "fired": self.fired,
+                "fire_rate": round(self.fired / self.calls, 4) if self.calls else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "budget_skips": self.budget_skips,
+                "first_token_p95_ms": _ms(float(np.quantile(served, 0.95))) if len(served) else None,
+                "first_token_p99_ms": _ms(float(np.quantile(served, 0.99))) if len(served) else None,
+                # 未采样的对冲胜出调用不计入, 采样调用按权重代表它们
+                "unhedged_p95_ms": _ms(_weighted_quantile(self.baseline, 0.95)) if baseline_known else None,
+                "unhedged_p99_ms": _ms(_weighted_quantile(self.baseline, 0.99)) if baseline_known else None,
+                "loser_samples": self.loser_samples,
+                "avg_saved_ms": _ms(self.saved / self.loser_samples) if self.loser_samples else None,
+            }
+
+
+# 各角色的对冲统计
+_hedgers: Dict[str, Hedger] = {}
+
+def get_hedger(role: str) -> Hedger:
+    """获取角色的对冲统计(单例模式)"""
+    if role not in _hedgers:
+        settings = get_settings()
+        _hedgers[role] = Hedger(
+            role,
+            settings.llm_hedge_quantile,
+            settings.llm_hedge_min_delay,
+            settings.llm_hedge_initial_delay,
+            settings.llm_hedge_loser_sample_rate
+        )
+    return _hedgers[role]
+
+
+def hedging_status() -> Dict[str, Dict[str, Any]]:
+    """所有角色的对冲统计"""
+    return {role: hedger.snapshot() for role, hedger in sorted(_hedgers.items())}
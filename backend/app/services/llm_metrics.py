@@ -0,0 +1,105 @@
+"""LLM调用指标模块(按角色统计延迟和token用量)"""
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict
+import numpy as np
+
+# 每个角色保留最近的延迟样本数量(用于计算分位数)
+LATENCY_WINDOW = 512
+
+
+class RoleStats:
+    """单个角色的LLM调用统计"""
+
+    def __init__(self, model: str):
+        """
+        初始化
+        Args:
+            model: 模型名称
+        """
+        self.model = model
+        self.calls = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.total_latency = 0.0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """统计快照"""
+        latencies = np.array(self.latencies) if self.latencies else None
+        completed = self.calls - self.errors
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "errors": self.errors,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "avg_input_tokens": round(self.input_tokens / completed, 1) if completed else 0.0,
+            "avg_output_tokens": round(self.output_tokens / completed, 1) if completed else 0.0,
+            "avg_latency_ms": round(self.total_latency / self.calls * 1000, 1) if self.calls else 0.0,
+            "p50_latency_ms": round(float(np.percentile(latencies, 50)) * 1000, 1) if latencies is not None else 0.0,
+            "p95_latency_ms": round(float(np.percentile(latencies, 95)) * 1000, 1) if latencies is not None else 0.0,
+        }
+
+
+class LLMMetrics:
+    """按角色(attraction/weather/hotel/supervisor/synthesis)汇总LLM调用的延迟和token用量"""
+
+    def __init__(self):
+        """初始化"""
+        self._roles: Dict[str, RoleStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        role: str,
+        model: str,
+        latency: float,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        error: bool = False
+    ) -> None:
+        """
+        记录一次LLM调用
+        Args:
+            role: 调用方角色
+            model: 模型名称
+            latency: 耗时(秒)
+            input_tokens/output_tokens: token用量
+            error: 是否失败
+        """
+        with self._lock:
+            stats = self._roles.get(role)
+            if stats is None:
+                stats = self._roles[role] = RoleStats(model)
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.input_tokens += input_tokens
+            stats.output_tokens += output_tokens
+            stats.total_latency += latency
+            stats.latencies.append(latency)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """所有角色的统计快照"""
+        with self._lock:
+            return {role: stats.snapshot() for role, stats in sorted(self._roles.items())}
+
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            self._roles.clear()
+
+
+# 全局LLM指标实例
+_llm_metrics = None
+
+def get_llm_metrics() -> LLMMetrics:
+    """获取LLM指标实例(单例模式)"""
+    global _llm_metrics
+
+    if _llm_metrics is None:
+        _llm_metrics = LLMMetrics()
+
+    return _llm_metrics
@@ -1,33 +1,94 @@
 """LLM服务模块"""
-from langchain_openai import ChatOpenAI
+import logging
+from typing import TYPE_CHECKING, Dict, Tuple
 from ..config import get_settings
 
-# 全局LLM实例
-_llm_instance = None
+logger = logging.getLogger(__name__)
 
-def get_llm() -> ChatOpenAI:
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+# 各角色: attraction/weather/hotel 为调用工具的助手, supervisor 为监督者, synthesis 为计划生成/修复
+ROLES = ("attraction", "weather", "hotel", "supervisor", "synthesis")
+DEFAULT_ROLE = "synthesis"
+
+# 全局LLM实例: 角色 -> 实例
+_llm_instances: Dict[str, "ChatOpenAI"] = {}
+
+def resolve_llm_config(role: str = DEFAULT_ROLE) -> Tuple[str, str, str]:
+    """
+    角色使用的模型配置: 属于llm_tool_roles的角色使用LLM_TOOL_*配置, 未配置的项沿用主模型
+    Args:
+        role: 角色
+    Returns:
+        (模型名称, 服务地址, API密钥)
     """
-    获取LLM实例(单例模式)
+    settings = get_settings()
+    tool_roles = [r.strip() for r in settings.llm_tool_roles.split(",") if r.strip()]
+    if role in tool_roles:
+        return (
+            settings.llm_tool_model_id or settings.llm_model_id,
+            settings.llm_tool_base_url or settings.llm_base_url,
+            settings.llm_tool_api_key or settings.llm_api_key
+        )
+    return settings.llm_model_id, settings.llm_base_url, settings.llm_api_key
+
+def get_llm(role: str = DEFAULT_ROLE) -> "ChatOpenAI":
+    """
+    获取LLM实例(每个角色一个实例, 单例模式)
+    Args:
+        role: 角色, 见ROLES
     Returns:
         CharOpenAI实例
     """
-    global _llm_instance
+    if role not in _llm_instances:
+        from .llm_callbacks import LLMMetricsCallback
+        from .llm_client import ResilientChatOpenAI
+        from .llm_endpoints import get_endpoint_pool
+        from .llm_metrics import get_llm_metrics
 
-    if not _llm_instance:
         settings = get_settings()
-        _llm_instance = ChatOpenAI(
-            model=settings.llm_model_id,
-            base_url=settings.llm_base_url,
-            api_key=settings.llm_api_key,
-            temperature=0.1
+        model, base_url, api_key = resolve_llm_config(role)
+        # 主模型和小模型不在同一服务时分别熔断
+        _llm_instances[role] = ResilientChatOpenAI(
+            breaker_name="llm" if base_url == settings.llm_base_url else "llm_tool",
+            model=model,
+            base_url=base_url,
+            api_key=api_key,
+            temperature=0.1,
+            timeout=settings.llm_timeout,
+            # 流式调用时也返回token用量, 用于按角色统计
+            stream_usage=True,
+            callbacks=[LLMMetricsCallback(role, model, get_llm_metrics())],
+            # 配置了多个服务时, 使用主模型服务的角色由服务池分摊请求
+            pool=get_endpoint_pool() if base_url == settings.llm_base_url else None
+        )
+
+        pool = _llm_instances[role].pool
+        logger.info(
+            f"✅ LLM服务初始化成功, 角色: {role}, 模型: {model}"
+            + (f", 负载均衡: {len(pool)}个服务" if pool is not None else ""),
+            extra={"role": role, "model": model}
         )
 
-        print(f"✅ LLM服务初始化成功")
-        print(f"   模型: {_llm_instance.model_name}")
+        hedge_roles = [r.strip() for r in settings.llm_hedge_roles.split(",") if r.strip()]
+        if settings.llm_hedge_enabled and role in hedge_roles:
+            instance = _llm_instances[role]
+            instance.hedge_role = role
+            if settings.llm_hedge_base_url or settings.llm_hedge_model_id or settings.llm_hedge_api_key:
+                instance.hedge_client = ResilientChatOpenAI(
+                    breaker_name="llm_hedge",
+                    model=settings.llm_hedge_model_id or model,
+                    base_url=settings.llm_hedge_base_url or base_url,
+                    api_key=settings.llm_hedge_api_key or api_key,
+                    temperature=0.1,
+                    timeout=settings.llm_timeout,
+                    stream_usage=True
+                )
+            logger.info(f"{role}已开启对冲请求(备用服务: {settings.llm_hedge_base_url or '同一服务'})")
 
-    return _llm_instance
+    return _llm_instances[role]
 
 def reset_llm():
     """重置LLM实例(用于测试或重新配置)"""
-    global _llm_instance
-    _llm_instance = None
\ No newline at end of file
+    _llm_instances.clear()
@@ -0,0 +1,208 @@
+"""多城市行程规划模块(各城市并发规划后合并)"""
+
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import List, Optional
+from ..models.schemas import (
+    Budget,
+    DayPlan,
+    Location,
+    MultiCityTripPlan,
+    MultiCityTripRequest,
+    TransferInfo,
+    TripPlan
+)
+from .geo_service import format_distance, haversine_matrix, to_radians, weighted_centroid
+
+logger = logging.getLogger(__name__)
+
+# 城市间交通每公里的大致费用(元)和实际路程相对直线距离的系数
+INTERCITY_COST_PER_KM = {
+    "高铁": 0.46,
+    "火车": 0.30,
+    "飞机": 0.75,
+    "自驾": 0.90,
+    "大巴": 0.30,
+}
+ROAD_FACTOR = 1.3
+
+
+class MultiCityPlanner:
+    """多城市行程规划
+
+    每个城市作为一个单城市请求并发交给多智能体规划(总耗时约等于最慢的一段),
+    然后按日期合并为一份行程: 在两段之间插入城市间交通, 合并天气、建议和预算。
+    """
+
+    async def plan(self, multi_agents, request: MultiCityTripRequest) -> MultiCityTripPlan:
+        """
+        规划多城市行程
+        Args:
+            multi_agents: 已初始化的多智能体系统
+            request: 多城市旅行请求
+        Returns:
+            多城市旅行计划
+        """
+        leg_requests = [request.leg_request(i) for i in range(len(request.legs))]
+        logger.info(f"🧭 多城市行程: {' -> '.join(r.city for r in leg_requests)}, 各段并发规划")
+
+        leg_plans = await asyncio.gather(
+            *(multi_agents.plan_trip(request=leg) for leg in leg_requests),
+            return_exceptions=True
+        )
+        failed = [leg.city for leg, plan in zip(leg_requests, leg_plans) if not isinstance(plan, TripPlan)]
+        if failed:
+            raise ValueError(f"以下城市的行程生成失败: {', '.join(failed)}")
+
+        return self.merge(request, list(leg_plans))
+
+    def merge(self, request: MultiCityTripRequest, leg_plans: List[TripPlan]) -> MultiCityTripPlan:
+        """
+        合并各城市的计划
+        Args:
+            request: 多城市旅行请求
+            leg_plans: 与request.legs一一对应的单城市计划
+        Returns:
+            多城市旅行计划
+        """
+        days: List[DayPlan] = []
+        transfers: List[TransferInfo] = []
+
+        for index, (leg, plan) in enumerate(zip(request.legs, leg_plans)):
+            leg_days = [day.model_copy(update={"city": leg.city}) for day in plan.days]
+
+            if index > 0:
+                previous = request.legs[index - 1]
+                transfer = self.estimate_transfer(
+                    leg_plans[index - 1], plan, previous.city, leg.city,
+                    request.intercity_transportation,
+                    (date.fromisoformat(previous.end_date) + timedelta(days=1)).isoformat()
+                )
+                transfers.append(transfer)
+
+                # 两段之间有空档时插入交通日, 否则在下一段第一天出发
+                gap_days = self._gap_days(previous.end_date, leg.start_date, leg.city, request.intercity_transportation)
+                if gap_days:
+                    gap_days[0] = gap_days[0].model_copy(update={"transfer": transfer})
+                    days.extend(gap_days)
+                elif leg_days:
+                    first = leg_days[0]
+                    leg_days[0] = first.model_copy(update={
+                        "transfer": transfer,
+                        "description": f"{transfer.description}。{first.description}"
+                    })
+
+            days.extend(leg_days)
+
+        for day_index, day in enumerate(days):
+            day.day_index = day_index
+
+        return MultiCityTripPlan(
+            cities=[leg.city for leg in request.legs],
+            start_date=request.legs[0].start_date,
+            end_date=request.legs[-1].end_date,
+            days=days,
+            legs=leg_plans,
+            transfers=transfers,
+            weather_info=[w for plan in leg_plans for w in plan.weather_info],
+            overall_suggestions="\n".join(
+                f"【{leg.city}】{plan.overall_suggestions}"
+                for leg, plan in zip(request.legs, leg_plans) if plan.overall_suggestions
+            ),
+            budget=self.merge_budget(leg_plans, transfers),
+            total_travel_distance=sum(plan.total_travel_distance for plan in leg_plans)
+        )
+
+    @staticmethod
+    def estimate_transfer(
+        from_plan: TripPlan,
+        to_plan: TripPlan,
+        from_city: str,
+        to_city: str,
+        transportation: str,
+        transfer_date: str
+    ) -> TransferInfo:
+        """
+        估算城市间交通: 用两段行程的景点中心作为城市位置, 按直线距离估算费用
+        Args:
+            from_plan/to_plan: 出发城市和到达城市的计划
+            from_city/to_city: 城市名称
+            transportation: 城市间交通方式
+            transfer_date: 出发日期
+        Returns:
+            城市间交通信息
+        """
+        from_center = MultiCityPlanner._center(from_plan)
+        to_center = MultiCityPlanner._center(to_plan)
+        distance = 0.0
+        if from_center is not None and to_center is not None:
+            distance = float(haversine_matrix(to_radians([from_center]), to_radians([to_center]))[0, 0])
+
+        cost_per_km = next((v for k, v in INTERCITY_COST_PER_KM.items() if k in transportation), 0.5)
+        estimated_cost = int(round(distance / 1000 * ROAD_FACTOR * cost_per_km)) if distance else 0
+
+        description = f"从{from_city}乘坐{transportation}前往{to_city}"
+        if distance:
+            description += f"(直线距离约{format_distance(distance)})"
+        return TransferInfo(
+            from_city=from_city,
+            to_city=to_city,
+            date=transfer_date,
+            transportation=transportation,
+            distance=distance,
+            estimated_cost=estimated_cost,
+            description=description
+        )
+
+    @staticmethod
+    def merge_budget(leg_plans: List[TripPlan], transfers: List[TransferInfo]) -> Budget:
+        """合并各段预算, 城市间交通计入交通费用"""
+        budgets = [plan.budget or Budget() for plan in leg_plans]
+        budget = Budget(
+            total_attractions=sum(b.total_attractions for b in budgets),
+            total_meals=sum(b.total_meals for b in budgets),
+            total_hotels=sum(b.total_hotels for b in budgets),
+            total_transportation=sum(b.total_transportation for b in budgets)
+                                 + sum(t.estimated_cost for t in transfers)
+        )
+        budget.total = budget.total_attractions + budget.total_meals + budget.total_hotels + budget.total_transportation
+        return budget
+
+    @staticmethod
+    def _gap_days(previous_end: str, next_start: str, city: str, transportation: str) -> List[DayPlan]:
+        """两段之间没有安排的日期(作为交通日/自由活动日)"""
+        current = date.fromisoformat(previous_end) + timedelta(days=1)
+        end = date.fromisoformat(next_start)
+        days = []
+        while current < end:
+            days.append(DayPlan(
+                date=current.isoformat(),
+                day_index=0,
+                description="城市间交通" if not days else "自由活动",
+                transportation=transportation,
+                accommodation="",
+                city=city
+            ))
+            current += timedelta(days=1)
+        return days
+
+    @staticmethod
+    def _center(plan: TripPlan) -> Optional[Location]:
+        """计划中所有景点和酒店的中心, 没有坐标时返回None"""
+        points = [a.location for day in plan.days for a in day.attractions]
+        points.extend(day.hotel.location for day in plan.days if day.hotel and day.hotel.location)
+        return weighted_centroid(points) if points else None
+
+
+# 全局多城市规划实例
+_multi_city_planner = None
+
+def get_multi_city_planner() -> MultiCityPlanner:
+    """获取多城市规划实例(单例模式)"""
+    global _multi_city_planner
+
+    if _multi_city_planner is None:
+        _multi_city_planner = MultiCityPlanner()
+
+    return _multi_city_planner
@@ -0,0 +1,68 @@
+"""旅行计划差异比较模块"""
+
+from typing import Any, List
+from ..models.schemas import DayPlan, PlanChange, PlanDiff, TripPlan
+
+# 逐项比较的字段(列表字段只比较名称, 避免差异中出现大量坐标)
+_PLAN_FIELDS = ("city", "start_date", "end_date", "overall_suggestions")
+_DAY_FIELDS = ("date", "description", "transportation", "accommodation")
+
+
+def _names(items: List[Any]) -> List[str]:
+    """景点/餐饮列表的名称"""
+    return [item.name for item in items]
+
+
+def _day_changes(index: int, old: DayPlan, new: DayPlan) -> List[PlanChange]:
+    """比较同一天的两个版本"""
+    changes = []
+    for field in _DAY_FIELDS:
+        if getattr(old, field) != getattr(new, field):
+            changes.append(PlanChange(path=f"days[{index}].{field}", old=getattr(old, field), new=getattr(new, field)))
+    for field in ("attractions", "meals"):
+        old_names, new_names = _names(getattr(old, field)), _names(getattr(new, field))
+        if old_names != new_names:
+            changes.append(PlanChange(path=f"days[{index}].{field}", old=old_names, new=new_names))
+    old_hotel = old.hotel.name if old.hotel else None
+    new_hotel = new.hotel.name if new.hotel else None
+    if old_hotel != new_hotel:
+        changes.append(PlanChange(path=f"days[{index}].hotel", old=old_hotel, new=new_hotel))
+    return changes
+
+
+def diff_plans(old: TripPlan, new: TripPlan) -> PlanDiff:
+    """
+    比较两个版本的旅行计划
+    Args:
+        old: 修改前的计划
+        new: 修改后的计划
+    Returns:
+        计划差异
+    """
+    changes = [
+        PlanChange(path=field, old=getattr(old, field), new=getattr(new, field))
+        for field in _PLAN_FIELDS if getattr(old, field) != getattr(new, field)
+    ]
+
+    changed_days = []
+    for index in range(max(len(old.days), len(new.days))):
+        if index >= len(old.days) or index >= len(new.days):
+            changes.append(PlanChange(
+                path=f"days[{index}]",
+                old=old.days[index].date if index < len(old.days) else None,
+                new=new.days[index].date if index < len(new.days) else None
+            ))
+            changed_days.append(index)
+            continue
+        day_changes = _day_changes(index, old.days[index], new.days[index])
+        if day_changes:
+            changes.extend(day_changes)
+            changed_days.append(index)
+
+    old_budget = old.budget.model_dump() if old.budget else {}
+    new_budget = new.budget.model_dump() if new.budget else {}
+    for key in sorted(set(old_budget) | set(new_budget)):
+        if old_budget.get(key) != new_budget.get(key):
+            changes.append(PlanChange(path=f"budget.{key}", old=old_budget.get(key), new=new_budget.get(key)))
+
+    return PlanDiff(changed_days=changed_days, changes=changes)
@@ -0,0 +1,233 @@
+"""旅行计划校验与修复模块(无需调用LLM即可修复的常见缺陷)"""
+
+import logging
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from ..models.schemas import TripPlan, TripRequest, WeatherInfo
+from .amap_parser import parse_location
+
+logger = logging.getLogger(__name__)
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def to_int(value: Any, default: int = 0) -> int:
+    """把 "60元"/"16°C"/"15~20"/60.0 等转换为整数,无法解析时返回default"""
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        if match:
+            return int(float(match.group()))
+    return default
+
+
+def parse_date(value: Any) -> Optional[date]:
+    """解析YYYY-MM-DD格式的日期"""
+    try:
+        return datetime.strptime(str(value).strip()[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def missing_parts(plan: TripPlan) -> List[str]:
+    """
+    计划中缺失的部分(上游超时或失败时生成的部分计划会缺少这些内容)
+    Returns:
+        weather(没有天气) / hotel(有一天没有酒店) / meals(有一天没有餐饮) / suggestions(没有总体建议)
+    """
+    missing = []
+    if not plan.weather_info:
+        missing.append("weather")
+    if any(day.hotel is None for day in plan.days):
+        missing.append("hotel")
+    if any(not day.meals for day in plan.days):
+        missing.append("meals")
+    if not plan.overall_suggestions:
+        missing.append("suggestions")
+    return missing
+
+
+class PlanRepairer:
+    """旅行计划修复器
+
+    在把LLM输出转换为TripPlan之前,先在代码中修复可以确定性修复的缺陷:
+    预算与明细不一致、日期/序号与开始日期不一致、超出旅行天数的天、缺失的天气、字符串形式的数字等。
+    仍无法通过校验的缺陷才交给LLM处理。
+    """
+
+    def repair(
+        self,
+        data: Dict[str, Any],
+        request: TripRequest,
+        weather: Optional[List[WeatherInfo]] = None
+    ) -> Tuple[Optional[TripPlan], List[str]]:
+        """
+        修复并校验计划数据
+        Args:
+            data: LLM输出解析得到的dict
+            request: 旅行请求
+            weather: 天气缓存中的天气信息,用于补全缺失的天气
+        Returns:
+            (旅行计划, 无法修复的问题列表), 未通过校验时旅行计划为None
+        """
+        data = dict(data)
+        fixes: List[str] = []
+
+        self._fix_header(data, request, fixes)
+        self._fix_days(data, request, fixes)
+        self._fix_weather(data, weather or [], fixes)
+        self._fix_budget(data, fixes)
+
+        if fixes:
+            logger.info(f"🔧 自动修复计划: {'; '.join(fixes)}")
+
+        # 天数不足无法在代码中补齐,需要交给LLM
+        errors: List[str] = []
+        if len(data["days"]) < request.travel_days:
+            errors.append(f"days: 只有{len(data['days'])}天,需要{request.travel_days}天")
+
+        try:
+            return TripPlan.model_validate(data), errors
+        except ValidationError as e:
+            errors.extend(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}"
+                for err in e.errors()
+            )
+            return None, errors
+
+    def _fix_header(self, data: Dict[str, Any], request: TripRequest, fixes: List[str]) -> None:
+        """补全城市、起止日期和总体建议"""
+        for key in ("city", "start_date", "end_date"):
+            expected = getattr(request, key)
+            if data.get(key) != expected:
+                if data.get(key):
+                    fixes.append(f"{key}: {data.get(key)} -> {expected}")
+                data[key] = expected
+        if not isinstance(data.get("overall_suggestions"), str):
+            data["overall_suggestions"] = ""
+
+    def _fix_days(self, data: Dict[str, Any], request: TripRequest, fixes: List[str]) -> None:
+        """按开始日期对齐每天的day_index/date,去掉超出旅行天数的天,并修正数字字段"""
+        days = [d for d in data.get("days") or [] if isinstance(d, dict)]
+        days.sort(key=lambda d: to_int(d.get("day_index"), default=len(days)))
+        if len(days) > request.travel_days:
+            fixes.append(f"删除多出的{len(days) - request.travel_days}天(共{len(days)}天,需要{request.travel_days}天)")
+            days = days[:request.travel_days]
+        start = parse_date(request.start_date)
+
+        for index, day in enumerate(days):
+            day = days[index] = dict(day)
+            if day.get("day_index") != index:
+                fixes.append(f"day_index {day.get('day_index')} -> {index}")
+                day["day_index"] = index
+            if start is not None:
+                expected = (start + timedelta(days=index)).isoformat()
+                if day.get("date") != expected:
+                    fixes.append(f"第{index + 1}天日期 {day.get('date')} -> {expected}")
+                    day["date"] = expected
+            day.setdefault("description", "")
+            day.setdefault("transportation", request.transportation)
+            day.setdefault("accommodation", request.accommodation)
+
+            attractions = []
+            for attraction in day.get("attractions") or []:
+                if not isinstance(attraction, dict):
+                    continue
+                attraction = dict(attraction)
+                self._fix_location(attraction)
+                attraction["ticket_price"] = max(0, to_int(attraction.get("ticket_price")))
+                if to_int(attraction.get("visit_duration")) <= 0:
+                    attraction["visit_duration"] = 120
+                else:
+                    attraction["visit_duration"] = to_int(attraction.get("visit_duration"))
+                attraction.setdefault("description", "")
+                attractions.append(attraction)
+            day["attractions"] = attractions
+
+            meals = []
+            for meal in day.get("meals") or []:
+                if not isinstance(meal, dict):
+                    continue
+                meal = dict(meal)
+                self._fix_location(meal)
+                meal["estimated_cost"] = max(0, to_int(meal.get("estimated_cost")))
+                meals.append(meal)
+            day["meals"] = meals
+
+            if isinstance(day.get("hotel"), dict):
+                hotel = day["hotel"] = dict(day["hotel"])
+                self._fix_location(hotel)
+                hotel["estimated_cost"] = max(0, to_int(hotel.get("estimated_cost")))
+                for key in ("price_range", "rating", "distance", "type", "address"):
+                    if hotel.get(key) is None:
+                        hotel[key] = ""
+                    elif not isinstance(hotel[key], str):
+                        hotel[key] = str(hotel[key])
+
+        data["days"] = days
+
+    @staticmethod
+    def _fix_location(item: Dict[str, Any]) -> None:
+        """把 "116.39,39.91" 形式的坐标转换为dict"""
+        if isinstance(item.get("location"), str):
+            location = parse_location(item["location"])
+            item["location"] = location.model_dump() if location else None
+
+    def _fix_weather(self, data: Dict[str, Any], weather: List[WeatherInfo], fixes: List[str]) -> None:
+        """修正温度格式,并用天气缓存补全缺失日期的天气"""
+        by_date: Dict[str, Dict[str, Any]] = {}
+        for item in data.get("weather_info") or []:
+            if not isinstance(item, dict) or not item.get("date"):
+                continue
+            item = dict(item)
+            item["day_temp"] = to_int(item.get("day_temp"))
+            item["night_temp"] = to_int(item.get("night_temp"))
+            for key in ("day_weather", "night_weather", "wind_direction", "wind_power"):
+                item[key] = str(item.get(key) or "")
+            by_date[str(item["date"])] = item
+
+        cached = {w.date: w for w in weather}
+        for day in data.get("days", []):
+            if day.get("date") in by_date:
+                continue
+            if day.get("date") in cached:
+                by_date[day["date"]] = cached[day["date"]].model_dump()
+                fixes.append(f"补全{day['date']}天气")
+
+        data["weather_info"] = [by_date[k] for k in sorted(by_date)]
+
+    def _fix_budget(self, data: Dict[str, Any], fixes: List[str]) -> None:
+        """根据门票、餐饮、酒店明细重新计算预算"""
+        days = data.get("days", [])
+        budget = data.get("budget") if isinstance(data.get("budget"), dict) else {}
+
+        recomputed = {
+            "total_attractions": sum(a["ticket_price"] for d in days for a in d["attractions"]),
+            "total_meals": sum(m["estimated_cost"] for d in days for m in d["meals"]),
+            "total_hotels": sum(d["hotel"]["estimated_cost"] for d in days if isinstance(d.get("hotel"), dict)),
+            # 交通费用没有明细,沿用LLM的估算
+            "total_transportation": max(0, to_int(budget.get("total_transportation")))
+        }
+        recomputed["total"] = sum(recomputed.values())
+
+        if any(to_int(budget.get(k), default=-1) != v for k, v in recomputed.items()):
+            fixes.append(f"重新计算预算 total: {budget.get('total')} -> {recomputed['total']}")
+        data["budget"] = recomputed
+
+
+# 全局修复器实例
+_plan_repairer = None
+
+def get_plan_repairer() -> PlanRepairer:
+    """获取计划修复器实例(单例模式)"""
+    global _plan_repairer
+
+    if _plan_repairer is None:
+        _plan_repairer = PlanRepairer()
+
+    return _plan_repairer
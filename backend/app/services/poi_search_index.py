@@ -0,0 +1,200 @@
+"""POI关键词倒排索引模块(适合中文的字符n-gram分词)"""
+
+import re
+from array import array
+from typing import Dict, List, Set
+import numpy as np
+
+# 去掉空白和常见标点,保留中文、字母和数字
+_STRIP = re.compile(r"[\s\-_,，.。;；:：/\\|()（）\[\]【】·'\"“”]+")
+
+
+def normalize_text(text: str) -> str:
+    """统一大小写并去掉空白和标点"""
+    return _STRIP.sub("", text or "").lower()
+
+
+def ngrams(text: str) -> Set[str]:
+    """
+    把文本切分为字符n-gram: 单字 + 相邻两字
+    中文没有空格分词, 用二元组即可覆盖"故宫""历史文化"这类关键词
+    Args:
+        text: 原始文本
+    Returns:
+        n-gram集合
+    """
+    text = normalize_text(text)
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def query_grams(text: str) -> Set[str]:
+    """查询分词: 多字查询只用二元组(更有区分度), 单字查询用单字"""
+    text = normalize_text(text)
+    if len(text) <= 1:
+        return set(text)
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class POISearchIndex:
+    """POI倒排索引
+
+    名称和全文(名称+类型+地址)各有一份n-gram倒排表。查询时先在名称索引中求交集,
+    名称命中不足再用全文索引补充; 城市和类型编码为整数, 过滤全部在NumPy中完成。
+    文档更新后旧posting不会删除, 只对被更新过的文档在返回前做一次校验。
+    """
+
+    def __init__(self):
+        """初始化索引"""
+        self._name_postings: Dict[str, array] = {}
+        self._full_postings: Dict[str, array] = {}
+        self._names: List[str] = []
+        self._fields: List[str] = []
+        self._name_lengths = array("H")
+        # 城市/类型编码为整数, 便于批量过滤
+        self._city_codes = array("I")
+        self._type_codes = array("I")
+        self._cities: Dict[str, int] = {}
+        self._types: Dict[str, int] = {}
+        # 被更新过的文档, 查询结果中需要校验
+        self._updated: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, doc_id: int, name: str, poi_type: str, address: str, city: str) -> None:
+        """
+        写入/更新文档(doc_id与POIStore中的下标一致, 新文档的doc_id必须连续)
+        Args:
+            doc_id: 文档号
+            name: 名称
+            poi_type: 类型
+            address: 地址
+            city: 城市
+        """
+        name_grams = ngrams(name)
+        full_grams = name_grams | ngrams(poi_type) | ngrams(address)
+        city_code = self._cities.setdefault(city, len(self._cities))
+        type_code = self._types.setdefault(poi_type or "", len(self._types))
+        normalized_name = normalize_text(name)
+        fields = "\n".join((normalized_name, normalize_text(poi_type), normalize_text(address)))
+
+        if doc_id < len(self._names):
+            # 更新: 只追加新增的n-gram; 有n-gram不再匹配时才需要在查询时校验
+            old_name_grams = ngrams(self._names[doc_id])
+            old_full_grams = set().union(*(ngrams(f) for f in self._fields[doc_id].split("\n")))
+            if not (old_name_grams <= name_grams and old_full_grams <= full_grams):
+                self._updated.add(doc_id)
+            name_grams -= old_name_grams
+            full_grams -= old_full_grams
+            self._names[doc_id] = normalized_name
+            self._fields[doc_id] = fields
+            self._name_lengths[doc_id] = min(len(normalized_name), 65535)
+            self._city_codes[doc_id] = city_code
+            self._type_codes[doc_id] = type_code
+        else:
+            self._names.append(normalized_name)
+            self._fields.append(fields)
+            self._name_lengths.append(min(len(normalized_name), 65535))
+            self._city_codes.append(city_code)
+            self._type_codes.append(type_code)
+
+        for gram in name_grams:
+            self._name_postings.setdefault(gram, array("I")).append(doc_id)
+        for gram in full_grams:
+            self._full_postings.setdefault(gram, array("I")).append(doc_id)
+
+    def search(
+        self,
+        keywords: str,
+        city: str = "",
+        poi_type: str = "",
+        limit: int = 20
+    ) -> List[int]:
+        """
+        关键词搜索(要求命中全部查询n-gram)
+        Args:
+            keywords: 关键词
+            city: 只返回该城市的POI(为空时不限)
+            poi_type: 只返回类型中包含该关键词的POI(如"风景名胜"、"住宿服务")
+            limit: 最大返回数量
+        Returns:
+            按相关度排序的文档号: 名称命中优先, 同类按名称长度升序
+        """
+        grams = query_grams(keywords)
+        if not grams or (city and city not in self._cities):
+            return []
+
+        allowed_types = None
+        if poi_type:
+            allowed_types = np.array([code for t, code in self._types.items() if poi_type in t], dtype=np.uint32)
+            if allowed_types.size == 0:
+                return []
+
+        results: List[int] = []
+        for postings, field in ((self._name_postings, "name"), (self._full_postings, "full")):
+            candidates = self._filter(self._intersect(postings, grams), city, allowed_types)
+            if results and candidates.size:
+                candidates = candidates[~np.isin(candidates, results)]
+            if candidates.size == 0:
+                continue
+            results.extend(self._top(candidates, grams, field, limit - len(results)))
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        """索引规模统计"""
+        return {
+            "documents": len(self._names),
+            "grams": len(self._full_postings),
+            "postings": sum(len(p) for p in self._full_postings.values())
+                        + sum(len(p) for p in self._name_postings.values())
+        }
+
+    def _intersect(self, postings: Dict[str, array], grams: Set[str]) -> np.ndarray:
+        """求所有查询n-gram的posting交集(从最短的posting开始)"""
+        lists = sorted((postings.get(g) for g in grams), key=lambda p: 0 if p is None else len(p))
+        if lists[0] is None or len(lists[0]) == 0:
+            return np.empty(0, dtype=np.int64)
+        # 只有文档被更新过时posting中才可能出现重复的文档号
+        unique = not self._updated
+        result = np.frombuffer(lists[0], dtype=np.uint32)
+        if not unique:
+            result = np.unique(result)
+        for posting in lists[1:]:
+            result = np.intersect1d(result, np.frombuffer(posting, dtype=np.uint32), assume_unique=unique)
+            if result.size == 0:
+                break
+        return result.astype(np.int64)
+
+    def _filter(self, candidates: np.ndarray, city: str, allowed_types) -> np.ndarray:
+        """按城市和类型编码过滤"""
+        if city and candidates.size:
+            city_codes = np.frombuffer(self._city_codes, dtype=np.uint32)[candidates]
+            candidates = candidates[city_codes == self._cities[city]]
+        if allowed_types is not None and candidates.size:
+            type_codes = np.frombuffer(self._type_codes, dtype=np.uint32)[candidates]
+            candidates = candidates[np.isin(type_codes, allowed_types)]
+        return candidates
+
+    def _top(self, candidates: np.ndarray, grams: Set[str], field: str, limit: int) -> List[int]:
+        """按名称长度取前limit个, 被更新过的文档需要校验仍然命中"""
+        lengths = np.frombuffer(self._name_lengths, dtype=np.uint16)[candidates]
+        if self._updated or candidates.size <= limit * 2:
+            order = np.argsort(lengths, kind="stable")
+        else:
+            part = np.argpartition(lengths, limit * 2)[:limit * 2]
+            order = part[np.argsort(lengths[part], kind="stable")]
+
+        results = []
+        for doc_id in candidates[order].tolist():
+            if doc_id in self._updated:
+                text = self._names[doc_id] if field == "name" else self._fields[doc_id]
+                if not all(g in text for g in grams):
+                    continue
+            results.append(doc_id)
+            if len(results) >= limit:
+                break
+        return results
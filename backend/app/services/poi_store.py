@@ -0,0 +1,461 @@
+"""本地POI空间索引模块(按网格索引的紧凑数组存储)"""
+
+import csv
+import json
+import logging
+import math
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from ..config import get_settings
+from ..models.schemas import Location, POIInfo
+from .amap_parser import normalize_city, parse_location
+from .geo_service import EARTH_RADIUS_M, haversine_matrix
+from .poi_search_index import POISearchIndex
+
+logger = logging.getLogger(__name__)
+
+# 网格边长(度), 0.01度约为1公里
+GRID_SIZE = 0.01
+# 没有ID的POI按(名称, 坐标)去重时坐标保留的小数位数, 4位约为10米
+DEDUPE_PRECISION = 4
+# 超过数量上限时淘汰到上限的这个比例, 避免每次写入都重建
+EVICT_TARGET = 0.8
+
+
+def _cell(longitude: float, latitude: float) -> Tuple[int, int]:
+    """计算坐标所在的网格"""
+    return int(math.floor(longitude / GRID_SIZE)), int(math.floor(latitude / GRID_SIZE))
+
+
+def _dedupe_key(name: str, longitude: float, latitude: float) -> Tuple[str, float, float]:
+    """没有ID的POI的去重键: (名称, 取整后的坐标)"""
+    return name, round(longitude, DEDUPE_PRECISION), round(latitude, DEDUPE_PRECISION)
+
+
+class POIStore:
+    """本地POI存储
+
+    坐标存放在连续的double数组中, 文本字段按列存放, 网格索引记录每个网格内的POI下标。
+    半径/矩形查询先取出覆盖范围内的网格, 再用NumPy批量计算精确距离;
+    关键词查询使用同一下标的n-gram倒排索引。
+    POI数量超过max_size时淘汰最久没有写入的POI: 数组和索引都依赖连续的下标, 所以按保留的POI重建。
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        """
+        初始化存储
+        Args:
+            max_size: POI数量上限, 默认poi_store_max_size, 0表示不限
+        """
+        self.max_size = get_settings().poi_store_max_size if max_size is None else max_size
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        """清空存储"""
+        self._lng = array("d")
+        self._lat = array("d")
+        self._ids: List[str] = []
+        self._names: List[str] = []
+        self._types: List[str] = []
+        self._addresses: List[str] = []
+        self._tels: List[Optional[str]] = []
+        self._cities: List[str] = []
+        # 每个POI最近一次写入的时间
+        self._touched = array("d")
+        self._index_by_id: Dict[str, int] = {}
+        # (名称, 取整后的坐标) -> 下标, 用于合并没有ID的POI
+        self._index_by_key: Dict[Tuple[str, float, float], int] = {}
+        self._grid: Dict[Tuple[int, int], array] = {}
+        self._text_index = POISearchIndex()
+        # 城市 -> 最近一次写入时间
+        self._city_updated: Dict[str, float] = {}
+        # (城市, 关键词) -> 最近一次从高德完整导入该关键词搜索结果的时间
+        self._covered: Dict[Tuple[str, str], float] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, poi: POIInfo, city: str = "") -> int:
+        """
+        写入单个POI(相同ID的POI会被覆盖; 没有ID时名称和坐标相同的POI会被覆盖)
+        Args:
+            poi: POI信息
+            city: 所属城市
+        Returns:
+            POI在存储中的下标
+        """
+        with self._lock:
+            index = self._add(poi, city)
+            if self._evict_if_full():
+                # 刚写入的POI最新, 一定会保留, 只是下标变了
+                key = _dedupe_key(poi.name, poi.location.longitude, poi.location.latitude)
+                index = self._index_by_id.get(poi.id) if poi.id else self._index_by_key[key]
+            return index
+
+    def bulk_load(self, pois: Iterable[POIInfo], city: str = "") -> int:
+        """
+        批量写入POI
+        Args:
+            pois: POI列表
+            city: 所属城市
+        Returns:
+            写入数量
+        """
+        count = 0
+        with self._lock:
+            for poi in pois:
+                self._add(poi, city)
+                count += 1
+            self._evict_if_full()
+        return count
+
+    def load_file(self, path: str, city: str = "") -> int:
+        """
+        从JSONL或CSV导出文件批量导入POI
+        每行/每条记录包含 id,name,type,address,location(或longitude/latitude),tel,city 字段
+        Args:
+            path: 文件路径(.jsonl/.csv)
+            city: 记录中没有city字段时使用的城市
+        Returns:
+            导入数量
+        """
+        file = Path(path)
+        if file.suffix == ".csv":
+            with file.open(encoding="utf-8", newline="") as f:
+                records = list(csv.DictReader(f))
+        else:
+            with file.open(encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+
+        count = 0
+        with self._lock:
+            for record in records:
+                poi = self._record_to_poi(record)
+                if poi is None:
+                    continue
+                self._add(poi, record.get("city") or record.get("cityname") or city)
+                count += 1
+            self._evict_if_full()
+        logger.info(f"✅ 从{file.name}导入{count}个POI")
+        return count
+
+    def get(self, poi_id: str) -> Optional[POIInfo]:
+        """按ID读取POI"""
+        index = self._index_by_id.get(poi_id)
+        return None if index is None else self._poi(index)
+
+    def city_of(self, index: int) -> str:
+        """返回POI所属城市"""
+        return self._cities[index]
+
+    def updated_at(self, city: str) -> Optional[float]:
+        """返回城市数据最近一次写入的时间戳"""
+        return self._city_updated.get(normalize_city(city))
+
+    def mark_covered(self, keywords: str, city: str) -> None:
+        """记录该城市该关键词的高德搜索结果已导入(之后本地结果不足一页也视为命中)"""
+        self._covered[(normalize_city(city), keywords.strip().lower())] = time.time()
+
+    def covered_at(self, keywords: str, city: str) -> Optional[float]:
+        """返回该城市该关键词的高德搜索结果最近一次导入的时间戳"""
+        return self._covered.get((normalize_city(city), keywords.strip().lower()))
+
+    def cities(self) -> Dict[str, int]:
+        """各城市的POI数量"""
+        counts: Dict[str, int] = {}
+        for city in self._cities:
+            counts[city] = counts.get(city, 0) + 1
+        return counts
+
+    def search_radius(
+        self,
+        location: Location,
+        radius: float,
+        type_keyword: str = "",
+        limit: int = 20
+    ) -> List[Tuple[POIInfo, float]]:
+        """
+        半径查询
+        Args:
+            location: 中心坐标
+            radius: 半径(米)
+            type_keyword: 只返回类型或名称中包含该关键词的POI
+            limit: 最大返回数量
+        Returns:
+            按距离升序排列的(POI, 距离米)列表
+        """
+        # 半径换算为经纬度跨度, 确定需要扫描的网格
+        dlat = math.degrees(radius / EARTH_RADIUS_M)
+        dlng = dlat / max(math.cos(math.radians(location.latitude)), 1e-6)
+        # 持锁读取, 避免并发写入时数组扩容与NumPy视图冲突
+        with self._lock:
+            candidates = self._cells_in_bounds(
+                location.longitude - dlng, location.latitude - dlat,
+                location.longitude + dlng, location.latitude + dlat
+            )
+            candidates = self._filter_type(candidates, type_keyword)
+            if candidates.size == 0:
+                return []
+
+            coords = self._coords(candidates)
+            center = np.radians(np.array([[location.longitude, location.latitude]]))
+            dist = haversine_matrix(center, coords)[0]
+            mask = dist <= radius
+            candidates, dist = candidates[mask], dist[mask]
+            order = np.argsort(dist)[:limit]
+            return [(self._poi(int(candidates[i])), float(dist[i])) for i in order]
+
+    def search_bounds(
+        self,
+        min_lng: float,
+        min_lat: float,
+        max_lng: float,
+        max_lat: float,
+        type_keyword: str = "",
+        limit: int = 100
+    ) -> List[POIInfo]:
+        """
+        矩形范围查询
+        Args:
+            min_lng/min_lat/max_lng/max_lat: 矩形范围
+            type_keyword: 只返回类型或名称中包含该关键词的POI
+            limit: 最大返回数量
+        Returns:
+            POI列表
+        """
+        with self._lock:
+            candidates = self._cells_in_bounds(min_lng, min_lat, max_lng, max_lat)
+            if candidates.size == 0:
+                return []
+            lng = np.frombuffer(self._lng, dtype=np.float64)[candidates]
+            lat = np.frombuffer(self._lat, dtype=np.float64)[candidates]
+            mask = (lng >= min_lng) & (lng <= max_lng) & (lat >= min_lat) & (lat <= max_lat)
+            candidates = self._filter_type(candidates[mask], type_keyword)
+            return [self._poi(int(i)) for i in candidates[:limit]]
+
+    def search_text(
+        self,
+        keywords: str,
+        city: str = "",
+        poi_type: str = "",
+        limit: int = 20,
+        max_age: Optional[float] = None
+    ) -> List[POIInfo]:
+        """
+        关键词查询
+        Args:
+            keywords: 关键词,如"故宫"、"历史文化"
+            city: 只返回该城市的POI
+            poi_type: 只返回类型中包含该关键词的POI
+            limit: 最大返回数量
+            max_age: 只返回最近max_age秒内写入过的POI(为空时不限)
+        Returns:
+            按相关度排序的POI列表
+        """
+        with self._lock:
+            doc_ids = self._text_index.search(keywords, normalize_city(city), poi_type, limit)
+            if max_age is not None:
+                oldest = time.time() - max_age
+                doc_ids = [i for i in doc_ids if self._touched[i] >= oldest]
+            return [self._poi(i) for i in doc_ids]
+
+    def _add(self, poi: POIInfo, city: str) -> int:
+        """写入单个POI(调用方持有锁)"""
+        city = normalize_city(city)
+        lng, lat = poi.location.longitude, poi.location.latitude
+        key = _dedupe_key(poi.name, lng, lat)
+        index = self._index_by_id.get(poi.id) if poi.id else None
+        if index is None:
+            index = self._index_by_key.get(key)
+            # 有ID的POI只合并之前没有ID的同一POI, 不覆盖另一个ID的POI
+            if index is not None and poi.id and self._ids[index]:
+                index = None
+
+        if index is None:
+            index = len(self._ids)
+            self._lng.append(lng)
+            self._lat.append(lat)
+            self._ids.append(poi.id)
+            self._names.append(poi.name)
+            self._types.append(poi.type)
+            self._addresses.append(poi.address)
+            self._tels.append(poi.tel)
+            self._cities.append(city)
+            self._touched.append(0.0)
+            if poi.id:
+                self._index_by_id[poi.id] = index
+            self._grid.setdefault(_cell(lng, lat), array("I")).append(index)
+        else:
+            old_key = _dedupe_key(self._names[index], self._lng[index], self._lat[index])
+            if old_key != key and self._index_by_key.get(old_key) == index:
+                del self._index_by_key[old_key]
+            if poi.id and not self._ids[index]:
+                self._ids[index] = poi.id
+                self._index_by_id[poi.id] = index
+            # 坐标所在网格变化时移动到新网格
+            old_cell, new_cell = _cell(self._lng[index], self._lat[index]), _cell(lng, lat)
+            if old_cell != new_cell:
+                self._grid[old_cell] = array("I", (i for i in self._grid[old_cell] if i != index))
+                self._grid.setdefault(new_cell, array("I")).append(index)
+            self._lng[index], self._lat[index] = lng, lat
+            self._names[index] = poi.name
+            self._types[index] = poi.type
+            self._addresses[index] = poi.address
+            self._tels[index] = poi.tel
+            self._cities[index] = city or self._cities[index]
+
+        self._index_by_key.setdefault(key, index)
+        self._text_index.add(index, poi.name, poi.type, poi.address, self._cities[index])
+        now = time.time()
+        self._touched[index] = now
+        self._city_updated[self._cities[index]] = now
+        return index
+
+    def _evict_if_full(self) -> bool:
+        """
+        超过数量上限时只保留最近写入的POI, 重建数组和索引(调用方持有锁)
+        Returns:
+            是否发生了淘汰(淘汰后下标会变化)
+        """
+        if not self.max_size or len(self._ids) <= self.max_size:
+            return False
+        target = int(self.max_size * EVICT_TARGET)
+        touched = np.frombuffer(self._touched, dtype=np.float64)
+        # 保留最近写入的target个POI, 按原来的顺序重新写入
+        keep = np.sort(np.argsort(-touched, kind="stable")[:target])
+        pois = [(self._poi(int(i)), self._cities[int(i)], self._touched[int(i)]) for i in keep]
+        covered = self._covered
+        evicted = len(self._ids) - len(pois)
+
+        self._reset()
+        for poi, city, touched_at in pois:
+            index = self._add(poi, city)
+            self._touched[index] = touched_at
+            self._city_updated[city] = max(self._city_updated.get(city, 0.0), touched_at)
+        # 城市的POI全部被淘汰后, 关键词覆盖记录也失效
+        self._covered = {key: at for key, at in covered.items() if key[0] in self._city_updated}
+        self.evicted += evicted
+        logger.info(f"🧹 本地POI超过上限{self.max_size}, 淘汰最久未更新的{evicted}个")
+        return True
+
+    def _cells_in_bounds(self, min_lng: float, min_lat: float, max_lng: float, max_lat: float) -> np.ndarray:
+        """取出与矩形相交的所有网格中的POI下标"""
+        x0, y0 = _cell(min_lng, min_lat)
+        x1, y1 = _cell(max_lng, max_lat)
+        buckets = []
+        # 范围过大时直接扫描已有的网格, 避免枚举大量空网格
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self._grid):
+            for (x, y), bucket in self._grid.items():
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    buckets.append(bucket)
+        else:
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    bucket = self._grid.get((x, y))
+                    if bucket:
+                        buckets.append(bucket)
+        if not buckets:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.frombuffer(b, dtype=np.uint32) for b in buckets]).astype(np.int64)
+
+    def _filter_type(self, candidates: np.ndarray, type_keyword: str) -> np.ndarray:
+        """按类型/名称关键词过滤"""
+        if not type_keyword or candidates.size == 0:
+            return candidates
+        keep = [i for i in candidates.tolist() if type_keyword in self._types[i] or type_keyword in self._names[i]]
+        return np.array(keep, dtype=np.int64)
+
+    def _coords(self, candidates: np.ndarray) -> np.ndarray:
+        """取出候选POI的弧度坐标 (n, 2)"""
+        lng = np.frombuffer(self._lng, dtype=np.float64)[candidates]
+        lat = np.frombuffer(self._lat, dtype=np.float64)[candidates]
+        return np.radians(np.stack([lng, lat], axis=1))
+
+    def _poi(self, index: int) -> POIInfo:
+        """按下标还原POIInfo"""
+        return POIInfo(
+            id=self._ids[index],
+            name=self._names[index],
+            type=self._types[index],
+            address=self._addresses[index],
+            location=Location(longitude=self._lng[index], latitude=self._lat[index]),
+            tel=self._tels[index]
+        )
+
+    @staticmethod
+    def _record_to_poi(record: Dict[str, Any]) -> Optional[POIInfo]:
+        """把导出文件中的一条记录转换为POIInfo"""
+        location = parse_location(record.get("location"))
+        if location is None and record.get("longitude") not in (None, ""):
+            location = parse_location({"longitude": record["longitude"], "latitude": record.get("latitude")})
+        if location is None or not record.get("name"):
+            return None
+        return POIInfo(
+            id=str(record.get("id") or ""),
+            name=str(record["name"]),
+            type=str(record.get("type") or ""),
+            address=str(record.get("address") or ""),
+            location=location,
+            tel=record.get("tel") or None
+        )
+
+
+# 全局POI存储实例
+_poi_store = None
+
+def get_poi_store() -> POIStore:
+    """获取本地POI存储实例(单例模式)"""
+    global _poi_store
+
+    if _poi_store is None:
+        _poi_store = POIStore()
+
+    return _poi_store
+
+
+def search_local_poi(keywords: str, city: str, poi_type: str = "", limit: int = 20) -> List[POIInfo]:
+    """
+    在本地POI倒排索引中搜索, 城市数据超过有效期时视为未命中
+    Args:
+        keywords: 搜索关键词
+        city: 城市
+        poi_type: 类型过滤
+        limit: 最大返回数量
+    Returns:
+        POI信息列表, 未命中或数据过期时为空
+    """
+    store = get_poi_store()
+    updated = store.updated_at(city)
+    if updated is None or time.time() - updated > get_settings().poi_cache_ttl:
+        return []
+    return store.search_text(keywords, city, poi_type, limit)
+
+
+def local_poi_hit(keywords: str, city: str, poi_type: str = "", limit: int = 20) -> List[POIInfo]:
+    """
+    关键词搜索是否可以只用本地数据回答: 本地结果满一页(limit个), 或者该城市该关键词的高德结果
+    已经导入过且未过期时返回本地结果; 否则本地可能只有其他搜索顺带写入的少量POI, 返回空列表, 调用方需要查询高德
+    Args:
+        keywords: 搜索关键词
+        city: 城市
+        poi_type: 类型过滤
+        limit: 最大返回数量
+    Returns:
+        POI信息列表, 不能只用本地数据回答时为空
+    """
+    ttl = get_settings().poi_cache_ttl
+    local = search_local_poi(keywords, city, poi_type, limit)
+    if not local:
+        return []
+    covered = get_poi_store().covered_at(keywords, city)
+    if covered is not None and time.time() - covered <= ttl:
+        return local
+    # 满一页时也要求这些POI在有效期内写入过(城市的其他数据更新不代表这些结果是新的)
+    fresh = get_poi_store().search_text(keywords, city, poi_type, limit, max_age=ttl)
+    return fresh if len(fresh) >= limit else []
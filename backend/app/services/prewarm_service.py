@@ -0,0 +1,204 @@
+"""缓存预热模块(热门城市的POI、天气、酒店数据)"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from ..agents.tools import bypass_local_cache, get_tool_cache
+from ..config import get_settings
+from .amap_parser import normalize_city
+from .amap_service import get_amap_service
+from .poi_store import get_poi_store
+
+logger = logging.getLogger(__name__)
+
+
+def _split(value: str) -> List[str]:
+    """解析逗号分隔的配置项"""
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+class RateLimiter:
+    """简单的异步限速器: 两次调用之间至少间隔 1/rate 秒"""
+
+    def __init__(self, rate: float):
+        """
+        初始化限速器
+        Args:
+            rate: 每秒最多调用次数
+        """
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """等待直到允许下一次调用"""
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+
+class PrewarmService:
+    """缓存预热服务
+
+    启动时和定时任务中, 通过AmapService为配置的城市(以及近期请求量最高的城市)
+    预先填充工具结果缓存、天气缓存和本地POI存储。调用高德时限速, 不挤占线上请求。
+    """
+
+    def __init__(self):
+        """初始化服务"""
+        self.settings = get_settings()
+        self._limiter = RateLimiter(self.settings.prewarm_rate)
+        # 近期请求统计: 城市 -> 次数, (城市, 偏好) -> 次数
+        self._city_traffic: Counter = Counter()
+        self._preference_traffic: Counter = Counter()
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record_request(self, city: str, preferences: List[str]) -> None:
+        """记录一次旅行规划请求, 用于学习需要预热的城市和偏好"""
+        city = normalize_city(city)
+        self._city_traffic[city] += 1
+        for preference in preferences:
+            self._preference_traffic[(city, preference)] += 1
+
+    def target_cities(self) -> List[str]:
+        """需要预热的城市: 配置的城市 + 请求量最高的前N个城市"""
+        cities = [normalize_city(c) for c in _split(self.settings.prewarm_cities)]
+        for city, _ in self._city_traffic.most_common(self.settings.prewarm_learned_cities):
+            if city not in cities:
+                cities.append(city)
+        return cities
+
+    def warm_tasks(self, city: str) -> List[Tuple[str, str]]:
+        """城市的预热任务列表: (类型, 关键词)"""
+        keywords = _split(self.settings.prewarm_preferences)
+        learned = sorted(
+            ((count, pref) for (c, pref), count in self._preference_traffic.items() if c == city),
+            reverse=True
+        )
+        for _, preference in learned[:3]:
+            if preference not in keywords:
+                keywords.append(preference)
+
+        tasks = [("weather", city)]
+        tasks.extend(("poi", keyword) for keyword in keywords)
+        tasks.extend(("hotel", keyword) for keyword in _split(self.settings.prewarm_accommodations))
+        return tasks
+
+    async def warm_city(self, city: str) -> None:
+        """
+        预热单个城市
+        Args:
+            city: 城市名称
+        """
+        service = get_amap_service()
+        tasks = self.warm_tasks(city)
+        status = self._status.setdefault(city, {})
+        status.update({"state": "running", "done": 0, "total": len(tasks), "errors": 0})
+
+        # 强制调用高德刷新数据, 而不是读取已有缓存
+        token = bypass_local_cache.set(True)
+        try:
+            for kind, keyword in tasks:
+                await self._limiter.acquire()
+                try:
+                    if kind == "weather":
+                        result = await service.get_weather(city)
+                    else:
+                        result = await service.search_poi(keyword, city, True)
+                    if not result:
+                        status["errors"] += 1
+                except Exception as e:
+                    status["errors"] += 1
+                    logger.warning(f"⚠️  预热{city}的{keyword}失败: {str(e)}")
+                status["done"] += 1
+        finally:
+            bypass_local_cache.reset(token)
+
+        status["state"] = "done"
+        status["last_warmed_at"] = time.time()
+
+    async def run_once(self) -> None:
+        """按顺序预热所有目标城市"""
+        cities = self.target_cities()
+        logger.info(f"🔥 开始缓存预热: {', '.join(cities)}")
+        for city in cities:
+            self._status.setdefault(city, {"state": "pending"})
+        for city in cities:
+            await self.warm_city(city)
+        logger.info("✅ 缓存预热完成")
+
+    async def _loop(self) -> None:
+        """启动时预热一次, 之后按间隔定时预热"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"❌ 缓存预热失败: {str(e)}")
+            if self.settings.prewarm_interval <= 0:
+                return
+            await asyncio.sleep(self.settings.prewarm_interval)
+
+    def start(self) -> None:
+        """在后台启动预热任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """停止预热任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        """
+        每个城市的预热进度和数据新鲜度
+        Returns:
+            城市 -> 状态信息
+        """
+        service = get_amap_service()
+        store = get_poi_store()
+        poi_counts = store.cities()
+        now = time.time()
+
+        result = {}
+        for city in self.target_cities():
+            status = dict(self._status.get(city, {"state": "pending"}))
+            if status.get("last_warmed_at"):
+                status["last_warmed_at"] = datetime.fromtimestamp(status["last_warmed_at"]).isoformat(timespec="seconds")
+            poi_updated = store.updated_at(city)
+            weather_age = service.weather_cache.age(city)
+            status.update({
+                "requests": self._city_traffic.get(city, 0),
+                "poi_count": poi_counts.get(city, 0),
+                "poi_age_seconds": None if poi_updated is None else int(now - poi_updated),
+                "weather_age_seconds": None if weather_age is None else int(weather_age),
+            })
+            result[city] = status
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "cities": result,
+            "tool_cache": get_tool_cache().stats()
+        }
+
+
+# 全局服务实例
+_prewarm_service = None
+
+def get_prewarm_service() -> PrewarmService:
+    """获取缓存预热服务实例(单例模式)"""
+    global _prewarm_service
+
+    if _prewarm_service is None:
+        _prewarm_service = PrewarmService()
+
+    return _prewarm_service
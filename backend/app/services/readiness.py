@@ -0,0 +1,69 @@
+"""服务就绪状态模块(记录各组件的初始化进度, 供/readyz使用)"""
+
+import time
+from typing import Any, Dict, Optional
+
+# 需要全部就绪后实例才接收流量的组件
+COMPONENTS = ("llm", "mcp_tools", "checkpointer", "agents", "graph")
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+
+class Readiness:
+    """组件就绪状态表"""
+
+    def __init__(self):
+        """初始化状态表, 所有组件为pending"""
+        self._started_at = time.time()
+        self._components: Dict[str, Dict[str, Any]] = {name: {"state": PENDING} for name in COMPONENTS}
+
+    def mark_ready(self, name: str, detail: Optional[str] = None) -> None:
+        """
+        标记组件已就绪
+        Args:
+            name: 组件名称
+            detail: 附加说明(如工具数量、检查点存储类型)
+        """
+        self._components[name] = {
+            "state": READY,
+            "ready_after": round(time.time() - self._started_at, 3),
+            **({"detail": detail} if detail else {})
+        }
+
+    def mark_failed(self, name: str, error: str) -> None:
+        """标记组件初始化失败"""
+        self._components[name] = {"state": FAILED, "error": error}
+
+    def is_ready(self, name: Optional[str] = None) -> bool:
+        """
+        判断组件(为空时判断全部组件)是否已就绪
+        Args:
+            name: 组件名称
+        Returns:
+            是否就绪
+        """
+        names = [name] if name else self._components
+        return all(self._components.get(n, {}).get("state") == READY for n in names)
+
+    def status(self) -> Dict[str, Any]:
+        """各组件的就绪状态"""
+        return {
+            "ready": self.is_ready(),
+            "uptime": round(time.time() - self._started_at, 3),
+            "components": {name: dict(info) for name, info in self._components.items()}
+        }
+
+
+# 全局就绪状态实例
+_readiness = None
+
+def get_readiness() -> Readiness:
+    """获取就绪状态实例(单例模式)"""
+    global _readiness
+
+    if _readiness is None:
+        _readiness = Readiness()
+
+    return _readiness
@@ -0,0 +1,397 @@
+"""按请求性能分析模块(采样分析器、asyncio任务跟踪、状态图各节点耗时)
+
+只有管理员显式开启的请求才会被分析: 普通请求不会启动采样线程、不会替换任务工厂,
+LangChain回调钩子在上下文变量为空时不添加任何回调。
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+from .cache import create_cache
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 事件循环没有在运行任务(等待网络I/O)或正在运行其他请求的任务时的采样
+IDLE_STACK = "(idle: waiting for I/O)"
+OTHER_STACK = "(other tasks)"
+# 单个请求记录的任务数上限
+MAX_TASKS = 2000
+# 栈的最大深度
+MAX_DEPTH = 128
+
+
+class ProfileCallback(BaseCallbackHandler):
+    """记录状态图各节点、LLM调用和工具调用耗时的回调"""
+
+    run_inline = True
+
+    def __init__(self):
+        self._started: Dict[UUID, tuple] = {}
+        # 正在运行的节点(子图本身和子图所在的节点使用同一个命名空间, 只记录一次)
+        self._active_ns: set = set()
+        self.totals: Dict[str, Dict[str, float]] = {}
+
+    def _record(self, key: str, elapsed: float, error: bool = False) -> None:
+        """累加耗时"""
+        item = self.totals.setdefault(key, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0})
+        item["calls"] += 1
+        item["total_ms"] += elapsed * 1000
+        item["max_ms"] = max(item["max_ms"], elapsed * 1000)
+        item["errors"] += int(error)
+
+    def on_chain_start(self, serialized: Any, inputs: Any, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        ns = metadata.get("langgraph_checkpoint_ns", "")
+        if node is None or kwargs.get("name") != node or ns in self._active_ns:
+            return
+        self._active_ns.add(ns)
+        # 命名空间 "attraction_agent:<id>|agent:<id>" -> 节点路径 "attraction_agent/agent"
+        path = "/".join(part.split(":", 1)[0] for part in ns.split("|")) if ns else node
+        self._started[run_id] = ("node:" + path, time.perf_counter(), ns)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        # 节点被中断(GraphInterrupt)或交接控制权时也会触发, 计为一次调用
+        self._finish(run_id, error=True)
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        model = (metadata or {}).get("ls_model_name") or "llm"
+        self._started[run_id] = (f"llm:{model}", time.perf_counter(), None)
+
+    def on_llm_start(self, serialized: Any, prompts: Any, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        model = (metadata or {}).get("ls_model_name") or "llm"
+        self._started[run_id] = (f"llm:{model}", time.perf_counter(), None)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, error=True)
+
+    def on_tool_start(self, serialized: Any, input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        self._started[run_id] = (f"tool:{name}", time.perf_counter(), None)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, error=True)
+
+    def _finish(self, run_id: UUID, error: bool = False) -> None:
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        key, start, ns = started
+        if ns is not None:
+            self._active_ns.discard(ns)
+        self._record(key, time.perf_counter() - start, error)
+
+
+# 正在分析的请求的回调: 设置后该请求中创建的所有LangChain/LangGraph运行都会带上这个回调
+_profile_callback: ContextVar[Optional[ProfileCallback]] = ContextVar("profile_callback", default=None)
+register_configure_hook(_profile_callback, inheritable=True)
+
+# 当前上下文所属的分析(请求中创建的任务会继承)
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+class RequestProfile:
+    """一个请求的分析数据"""
+
+    def __init__(self, method: str, path: str, request_id: str):
+        """
+        初始化
+        Args:
+            method: 请求方法
+            path: 请求路径
+            request_id: 请求ID
+        """
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.request_id = request_id
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = 0.0
+        self.status_code = 0
+        # 折叠栈 -> 采样时间(秒)
+        self.samples: Counter = Counter()
+        self.callback = ProfileCallback()
+        self.tasks: List[Dict[str, Any]] = []
+        self.truncated = False
+        self._tokens: tuple = ()
+
+    def elapsed_ms(self) -> float:
+        """开始分析以来的时间(毫秒)"""
+        return round((time.perf_counter() - self._start) * 1000, 3)
+
+    def add_task(self, task: asyncio.Task) -> None:
+        """记录请求中创建的任务, 结束时记录耗时和结果"""
+        if len(self.tasks) >= MAX_TASKS:
+            self.truncated = True
+            return
+        coro = task.get_coro()
+        entry = {
+            "name": task.get_name(),
+            "coro": getattr(coro, "__qualname__", type(coro).__name__),
+            "created_ms": self.elapsed_ms(),
+            "done_ms": None,
+            "state": "pending",
+        }
+        self.tasks.append(entry)
+
+        def on_done(t: asyncio.Task) -> None:
+            entry["done_ms"] = self.elapsed_ms()
+            entry["duration_ms"] = round(entry["done_ms"] - entry["created_ms"], 3)
+            if t.cancelled():
+                entry["state"] = "cancelled"
+            elif t.exception() is not None:
+                entry["state"] = f"error: {type(t.exception()).__name__}"
+            else:
+                entry["state"] = "done"
+
+        task.add_done_callback(on_done)
+
+    def to_dict(self, interval_ms: float) -> Dict[str, Any]:
+        """分析结果: 采样汇总、节点耗时和任务跟踪"""
+        total = sum(self.samples.values()) * 1000
+        idle = self.samples.get(IDLE_STACK, 0) * 1000
+        other = self.samples.get(OTHER_STACK, 0) * 1000
+        leaf_times: Counter = Counter()
+        for stack, seconds in self.samples.items():
+            leaf_times[stack.rsplit(";", 1)[-1]] += seconds * 1000
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "request_id": self.request_id,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "sampling": {
+                "interval_ms": interval_ms,
+                "stacks": len(self.samples),
+                "sampled_ms": round(total, 3),
+                # 运行本请求的任务 / 没有任务在运行(等待LLM、高德等网络I/O) / 运行其他请求的任务
+                "own_ms": round(total - idle - other, 3),
+                "idle_ms": round(idle, 3),
+                "other_tasks_ms": round(other, 3),
+                # 按栈顶函数汇总(自身时间), 完整的栈见collapsed
+                "top_functions": [{"function": f, "ms": round(ms, 3)} for f, ms in leaf_times.most_common(30)],
+            },
+            # 状态图节点(node:监督者/助手/助手内的节点)、LLM调用和工具调用的耗时
+            "breakdown": {
+                key: {**value, "total_ms": round(value["total_ms"], 3), "max_ms": round(value["max_ms"], 3)}
+                for key, value in sorted(self.callback.totals.items(), key=lambda kv: -kv[1]["total_ms"])
+            },
+            "tasks": self.tasks,
+            "tasks_truncated": self.truncated,
+        }
+
+    def collapsed(self) -> str:
+        """折叠栈格式(每行"函数;函数;... 微秒数"), 可用flamegraph.pl或speedscope查看"""
+        return "\n".join(f"{stack} {round(seconds * 1_000_000)}" for stack, seconds in self.samples.most_common()) + "\n"
+
+
+def _frame_name(frame: Any) -> str:
+    """栈帧的名称: 函数限定名(文件名:定义行号)"""
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame: Any) -> str:
+    """把栈帧转换为折叠栈(从外到内, 用;分隔)"""
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class RequestProfiler:
+    """请求分析器
+
+    有请求在分析时, 后台线程按固定间隔采样事件循环线程的调用栈: 事件循环当前运行的任务属于被分析的请求时
+    记录完整的栈, 没有任务在运行时记为等待I/O, 运行其他请求的任务时记为其他任务。
+    分析期间替换事件循环的任务工厂, 记录请求中创建的任务(创建时间、结束时间和结果)。
+    """
+
+    def __init__(self, interval_ms: float = 5.0, max_seconds: float = 300, max_stored: int = 50, ttl: float = 3600):
+        """
+        初始化
+        Args:
+            interval_ms: 采样间隔(毫秒)
+            max_seconds: 单个请求的最长采样时间(秒)
+            max_stored: 保存的分析结果数量
+            ttl: 分析结果保存时间(秒)
+        """
+        self.interval_ms = interval_ms
+        self.max_seconds = max_seconds
+        self._profiles: Dict[str, RequestProfile] = {}
+        # 任务 -> 所属的分析(采样线程读取)
+        self._owners: Dict[asyncio.Task, RequestProfile] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread = 0
+        self._previous_factory: Any = None
+        self._stop: Optional[threading.Event] = None
+        # 已完成的分析(create_cache: cache_backend为sqlite时多个worker共用), 以及本进程最近的分析ID
+        self.store = create_cache("profiles", maxsize=max_stored, ttl=ttl)
+        self._recent: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._max_stored = max_stored
+
+    def start(self, method: str, path: str, request_id: str) -> RequestProfile:
+        """
+        开始分析当前请求(在请求所在的任务中调用)
+        Args:
+            method: 请求方法
+            path: 请求路径
+            request_id: 请求ID
+        Returns:
+            分析数据
+        """
+        profile = RequestProfile(method, path, request_id)
+        loop = asyncio.get_running_loop()
+        if not self._profiles:
+            self._install(loop)
+        self._profiles[profile.id] = profile
+        # 结束分析时在同一个上下文中恢复
+        profile._tokens = (_current_profile.set(profile), _profile_callback.set(profile.callback))
+        task = asyncio.current_task()
+        if task is not None:
+            self._own(task, profile)
+        return profile
+
+    def stop(self, profile: RequestProfile, status_code: int) -> None:
+        """
+        结束分析并保存结果
+        Args:
+            profile: 分析数据
+            status_code: 响应状态码
+        """
+        profile.duration = time.perf_counter() - profile._start
+        profile.status_code = status_code
+        _current_profile.reset(profile._tokens[0])
+        _profile_callback.reset(profile._tokens[1])
+        self._profiles.pop(profile.id, None)
+        for task in [t for t, p in self._owners.items() if p is profile]:
+            self._owners.pop(task, None)
+        if not self._profiles:
+            self._uninstall()
+
+        summary = profile.to_dict(self.interval_ms)
+        self.store.set(profile.id, {"summary": summary, "collapsed": profile.collapsed()})
+        self._recent[profile.id] = {
+            key: summary[key] for key in ("id", "method", "path", "request_id", "status_code", "started_at", "duration_ms")
+        }
+        while len(self._recent) > self._max_stored:
+            self._recent.popitem(last=False)
+        logger.info(f"🔬 请求分析完成: {profile.method} {profile.path} {summary['duration_ms']}ms, 分析ID {profile.id}")
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """已保存的分析结果: {"summary": ..., "collapsed": ...}"""
+        return self.store.get(profile_id)
+
+    def recent(self) -> List[Dict[str, Any]]:
+        """本进程最近的分析(新的在前)"""
+        return list(reversed(self._recent.values()))
+
+    def _own(self, task: asyncio.Task, profile: RequestProfile) -> None:
+        """记录任务属于这个请求"""
+        self._owners[task] = profile
+        task.add_done_callback(lambda t: self._owners.pop(t, None))
+
+    def _install(self, loop: asyncio.AbstractEventLoop) -> None:
+        """第一个请求开始分析时: 替换任务工厂并启动采样线程"""
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._previous_factory = loop.get_task_factory()
+        previous = self._previous_factory
+
+        def task_factory(loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Task:
+            if previous is not None:
+                task = previous(loop, coro, **kwargs)
+            else:
+                task = asyncio.Task(coro, loop=loop, **kwargs)
+            # 任务工厂在创建任务的上下文中调用, 请求中创建的任务继承请求的分析
+            profile = _current_profile.get()
+            if profile is not None and profile.id in self._profiles:
+                self._own(task, profile)
+                profile.add_task(task)
+            return task
+
+        loop.set_task_factory(task_factory)
+        # 每个采样线程使用自己的停止事件, 停止后立即开始的新分析不会让旧线程继续运行
+        self._stop = threading.Event()
+        threading.Thread(
+            target=self._sample, args=(loop, self._loop_thread, self._stop), name="request-profiler", daemon=True
+        ).start()
+
+    def _uninstall(self) -> None:
+        """最后一个请求结束分析时: 恢复任务工厂并停止采样线程"""
+        if self._loop is not None:
+            self._loop.set_task_factory(self._previous_factory)
+        if self._stop is not None:
+            self._stop.set()
+        self._stop = None
+        self._loop = None
+
+    def _sample(self, loop: asyncio.AbstractEventLoop, thread_id: int, stop: threading.Event) -> None:
+        """采样线程"""
+        # 事件循环 -> 正在运行的任务(asyncio内部字典, 不可用时无法区分任务, 只记录等待I/O和其他任务)
+        current_tasks: Dict[Any, asyncio.Task] = getattr(asyncio.tasks, "_current_tasks", {})
+        interval = self.interval_ms / 1000
+        last = time.perf_counter()
+        while not stop.wait(interval):
+            # 采样线程需要等待GIL, 实际间隔可能比设定的长: 每个样本按距上一个样本的实际时间计权
+            now = time.perf_counter()
+            weight, last = now - last, now
+            profiles = list(self._profiles.values())
+            task = current_tasks.get(loop)
+            owner = self._owners.get(task) if task is not None else None
+            stack = None
+            if owner is not None:
+                frame = sys._current_frames().get(thread_id)
+                stack = _collapse(frame) if frame is not None else None
+            for profile in profiles:
+                if now - profile._start > self.max_seconds:
+                    continue
+                if task is None:
+                    profile.samples[IDLE_STACK] += weight
+                elif profile is owner and stack:
+                    profile.samples[stack] += weight
+                else:
+                    profile.samples[OTHER_STACK] += weight
+
+
+# 全局分析器实例
+_request_profiler = None
+
+def get_request_profiler() -> RequestProfiler:
+    """获取请求分析器实例(单例模式)"""
+    global _request_profiler
+
+    if _request_profiler is None:
+        settings = get_settings()
+        _request_profiler = RequestProfiler(
+            settings.profile_sample_interval_ms,
+            settings.profile_max_seconds,
+            settings.profile_max_stored,
+            settings.profile_ttl
+        )
+
+    return _request_profiler
@@ -0,0 +1,235 @@
+"""路线矩阵模块(并发计算每天相邻地点之间各段路线的距离和时间, 按路段缓存)"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from ..config import get_settings
+from ..agents.tools import get_tools
+from ..models.schemas import DayPlan, Location, RouteInfo, TripPlan
+from .amap_parser import ROUTE_TYPE_NAMES, parse_route
+from .cache import create_cache
+from .concurrency import SingleFlight, get_limiter
+from .itinerary_optimizer import day_stops, haversine
+
+logger = logging.getLogger(__name__)
+
+# 高德路线规划工具(按坐标)
+ROUTE_TOOLS = {
+    "walking": "maps_direction_walking_by_coordinates",
+    "driving": "maps_direction_driving_by_coordinates",
+    "transit": "maps_direction_transit_integrated_by_coordinates",
+}
+
+# 估算时使用的速度(米/秒)和绕路系数, 公共交通额外加上等车时间(秒)
+ESTIMATE_SPEED = {"walking": 1.2, "driving": 8.3, "transit": 5.5}
+DETOUR_FACTOR = 1.3
+TRANSIT_WAIT = 300
+
+# 起终点距离小于该值(米)时视为同一地点, 不需要路线
+SAME_PLACE_DISTANCE = 30.0
+
+# 一段路线: (路线类型, 起点, 终点)
+Leg = Tuple[str, Location, Location]
+
+
+def leg_key(route_type: str, origin: Location, destination: Location) -> str:
+    """路段缓存键(坐标保留5位小数, 约1米)"""
+    return (
+        f"{route_type}:{origin.longitude:.5f},{origin.latitude:.5f}"
+        f":{destination.longitude:.5f},{destination.latitude:.5f}"
+    )
+
+
+def estimate_route(route_type: str, origin: Location, destination: Location) -> RouteInfo:
+    """按直线距离估算路线(高德路线规划不可用时)"""
+    distance = haversine(origin, destination)
+    duration = distance * DETOUR_FACTOR / ESTIMATE_SPEED[route_type]
+    if route_type == "transit":
+        duration += TRANSIT_WAIT
+    return RouteInfo(
+        distance=round(distance, 1),
+        duration=int(duration),
+        route_type=route_type,
+        description=f"{ROUTE_TYPE_NAMES[route_type]}约{distance / 1000:.1f}公里,约{max(1, round(duration / 60))}分钟(估算)",
+        estimated=True
+    )
+
+
+class RouteMatrixService:
+    """路线矩阵服务
+
+    为计划中每一天的路线(酒店 -> 早餐 -> 景点(含午餐) -> 晚餐 -> 酒店)逐段计算距离和时间:
+    整个计划的所有路段去重后一次并发请求(同时进行的数量受route_max_concurrency限制),
+    结果按(路线类型, 起点, 终点)缓存, 重复的路段不再调用高德;
+    超时或失败的路段按直线距离估算, 不影响计划返回。
+    """
+
+    def __init__(self):
+        """初始化服务"""
+        settings = get_settings()
+        self.settings = settings
+        self.route_cache = create_cache("route", maxsize=8192, ttl=settings.route_cache_ttl)
+        self._single_flight = SingleFlight()
+
+    def route_type(self, transportation: str, distance: float) -> str:
+        """
+        选择路段的路线类型
+        Args:
+            transportation: 当日交通方式
+            distance: 路段直线距离(米)
+        Returns:
+            walking/driving/transit
+        """
+        if distance <= self.settings.route_walk_max_distance:
+            return "walking"
+        if any(k in transportation for k in ("自驾", "驾车", "打车", "出租", "包车")):
+            return "driving"
+        return "transit"
+
+    def day_legs(self, day: DayPlan) -> List[Tuple[str, str, Optional[Leg]]]:
+        """
+        单日路线的各段
+        Returns:
+            (起点名称, 终点名称, 路段)列表, 起终点为同一地点时路段为None
+        """
+        stops = day_stops(day)
+        legs = []
+        for (origin_name, origin), (destination_name, destination) in zip(stops, stops[1:]):
+            distance = haversine(origin, destination)
+            if distance < SAME_PLACE_DISTANCE:
+                legs.append((origin_name, destination_name, None))
+            else:
+                legs.append((origin_name, destination_name, (self.route_type(day.transportation, distance), origin, destination)))
+        return legs
+
+    async def annotate_plan(self, plan: TripPlan, days: Optional[Iterable[int]] = None) -> TripPlan:
+        """
+        为计划中每一天计算各段路线, 写入routes/travel_duration, 并用路线距离更新travel_distance
+        Args:
+            plan: 旅行计划(景点顺序已优化)
+            days: 只计算这些天(下标), 为空时计算所有天
+        Returns:
+            新的旅行计划
+        """
+        indexes = set(range(len(plan.days)) if days is None else days)
+        day_legs = {i: self.day_legs(plan.days[i]) for i in indexes}
+        unique: Dict[str, Tuple[Leg, str]] = {}
+        for i, legs in day_legs.items():
+            city = plan.days[i].city or plan.city
+            for _, _, leg in legs:
+                if leg is not None:
+                    unique.setdefault(leg_key(*leg), (leg, city))
+
+        start = time.perf_counter()
+        routes, hits = await self._resolve(unique)
+        estimated = 0
+
+        updated = list(plan.days)
+        for i, legs in day_legs.items():
+            day_routes = []
+            for origin_name, destination_name, leg in legs:
+                if leg is None:
+                    route = RouteInfo(distance=0, duration=0, route_type="walking", description="同一地点")
+                else:
+                    route = routes.get(leg_key(*leg))
+                    if route is None:
+                        route = estimate_route(*leg)
+                        estimated += 1
+                day_routes.append(route.model_copy(update={"origin": origin_name, "destination": destination_name}))
+            updated[i] = updated[i].model_copy(update={
+                "routes": day_routes,
+                "travel_distance": round(sum(r.distance for r in day_routes), 1),
+                "travel_duration": sum(r.duration for r in day_routes)
+            })
+
+        if unique:
+            logger.info(
+                f"🧭 路线矩阵: {len(unique)}个路段, 缓存命中{hits}, 估算{estimated}, "
+                f"耗时{time.perf_counter() - start:.2f}秒"
+            )
+        return plan.model_copy(update={
+            "days": updated,
+            "total_travel_distance": round(sum(d.travel_distance for d in updated), 1)
+        })
+
+    async def _resolve(self, unique: Dict[str, Tuple[Leg, str]]) -> Tuple[Dict[str, RouteInfo], int]:
+        """
+        并发计算所有路段(整体受route_matrix_timeout限制)
+        Returns:
+            (路段缓存键 -> 路线, 缓存命中数), 超时或失败的路段不在结果中
+        """
+        routes: Dict[str, RouteInfo] = {}
+        tasks: Dict[asyncio.Task, str] = {}
+        for key, (leg, city) in unique.items():
+            cached = self.route_cache.get(key)
+            if cached is not None:
+                routes[key] = cached
+            else:
+                tasks[asyncio.create_task(self._fetch_leg(key, leg, city))] = key
+        hits = len(routes)
+        if not tasks:
+            return routes, hits
+
+        done, pending = await asyncio.wait(tasks, timeout=self.settings.route_matrix_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(f"⏱️  {len(pending)}个路段超过{self.settings.route_matrix_timeout:g}秒未返回, 按直线距离估算")
+        for task in done:
+            if not task.cancelled() and task.exception() is None and task.result() is not None:
+                routes[tasks[task]] = task.result()
+        return routes, hits
+
+    async def _fetch_leg(self, key: str, leg: Leg, city: str) -> Optional[RouteInfo]:
+        """计算一个路段(并发的相同路段只请求一次), 成功时写入缓存"""
+        async def fetch():
+            async with get_limiter("route"):
+                route = await self._call_route_tool(leg, city)
+            if route is not None:
+                self.route_cache.set(key, route)
+            return route
+
+        return await self._single_flight.do(key, fetch)
+
+    async def _call_route_tool(self, leg: Leg, city: str) -> Optional[RouteInfo]:
+        """调用高德路线规划工具, 工具不存在或没有结果时返回None"""
+        route_type, origin, destination = leg
+        tool_name = ROUTE_TOOLS[route_type]
+        tools = await get_tools()
+        tool = next((t for t in tools if tool_name in t.name), None)
+        if tool is None:
+            return None
+
+        # 不同版本的高德MCP Server参数名不同, 只传工具声明的参数
+        params = {
+            "origin": f"{origin.longitude},{origin.latitude}",
+            "destination": f"{destination.longitude},{destination.latitude}",
+            "city": city,
+            "cityd": city,
+            "origin_city": city,
+            "destination_city": city,
+        }
+        args = getattr(tool, "args", None) or {}
+        if args:
+            params = {k: v for k, v in params.items() if k in args}
+        try:
+            result = await tool.ainvoke(params)
+        except Exception as e:
+            logger.error(f"❌ 路线规划失败: {str(e)}")
+            return None
+        return parse_route(result, route_type)
+
+
+# 全局路线矩阵服务实例
+_route_matrix_service = None
+
+def get_route_matrix_service() -> RouteMatrixService:
+    """获取路线矩阵服务实例(单例模式)"""
+    global _route_matrix_service
+
+    if _route_matrix_service is None:
+        _route_matrix_service = RouteMatrixService()
+
+    return _route_matrix_service
@@ -0,0 +1,240 @@
+"""跨进程共享缓存模块(SQLite WAL, 同一台机器上的多个worker共用)"""
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# 访问时间的更新间隔(秒): 读多写少, 不在每次命中时都写库
+_TOUCH_INTERVAL = 60
+# 每写入多少次检查一次容量
+_EVICT_CHECK_EVERY = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at);
+"""
+
+
+class SQLiteStore:
+    """SQLite缓存文件(所有命名空间共用一个文件和容量上限)
+
+    WAL模式下多个进程可以同时读, 写入在单条语句的事务中完成, 不会读到写了一半的数据。
+    总大小超过上限时按最近访问时间淘汰, 先删除已过期的条目。
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        """
+        初始化缓存文件
+        Args:
+            path: SQLite文件路径
+            max_bytes: 缓存数据总大小上限(字节)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前进程的连接(fork出的worker不能复用父进程的连接)"""
+        if self._conn is None or self._pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, namespace: str, key: str) -> Any:
+        """读取未过期的条目, 不存在时返回_MISSING"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None or row[1] < now:
+                return _MISSING
+            if now - row[2] > _TOUCH_INTERVAL:
+                conn.execute(
+                    "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key)
+                )
+        return pickle.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """写入条目(覆盖同名条目)"""
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, data, len(data), now + ttl, now, now)
+            )
+            self._writes += 1
+            if self._writes % _EVICT_CHECK_EVERY == 0:
+                self._evict(conn)
+
+    def created_at(self, namespace: str, key: str) -> Optional[float]:
+        """返回未过期条目的写入时间"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT created_at, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def delete(self, namespace: str, key: Optional[str] = None) -> None:
+        """删除条目, key为空时删除整个命名空间"""
+        with self._lock:
+            conn = self._connection()
+            if key is None:
+                conn.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+            else:
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def usage(self, namespace: Optional[str] = None) -> Dict[str, int]:
+        """条目数和数据大小"""
+        with self._lock:
+            conn = self._connection()
+            if namespace is None:
+                row = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache WHERE namespace = ?", (namespace,)
+                ).fetchone()
+        return {"entries": row[0], "bytes": row[1]}
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """删除过期条目, 总大小仍超过上限时按最近访问时间淘汰到上限的90%"""
+        conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = total - int(self.max_bytes * 0.9)
+        removed = 0
+        victims = []
+        cursor = conn.execute("SELECT namespace, key, size FROM cache ORDER BY accessed_at")
+        for namespace, key, size in cursor:
+            victims.append((namespace, key))
+            removed += size
+            if removed >= target:
+                break
+        cursor.close()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("DELETE FROM cache WHERE namespace = ? AND key = ?", victims)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class SharedCache:
+    """与TTLCache接口相同的共享缓存(一个命名空间)"""
+
+    def __init__(self, name: str, store: SQLiteStore, ttl: float = 300):
+        """
+        初始化缓存
+        Args:
+            name: 缓存名称(作为命名空间)
+            store: SQLite缓存文件
+            ttl: 默认过期时间(秒)
+        """
+        self.name = name
+        self.ttl = ttl
+        self.store = store
+        # 命中统计只记录本进程
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存,过期或不存在时返回default"""
+        try:
+            value = self.store.get(self.name, str(key))
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  读取共享缓存{self.name}失败: {str(e)}")
+            value = _MISSING
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存"""
+        try:
+            self.store.set(self.name, str(key), value, self.ttl if ttl is None else ttl)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  写入共享缓存{self.name}失败: {str(e)}")
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """返回缓存条目已存在的秒数,不存在或已过期时返回None"""
+        created = self.store.created_at(self.name, str(key))
+        return None if created is None else time.time() - created
+
+    def pop(self, key: Hashable) -> None:
+        """删除缓存条目"""
+        self.store.delete(self.name, str(key))
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self.store.delete(self.name)
+
+    def __len__(self) -> int:
+        return self.store.usage(self.name)["entries"]
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        total = self.hits + self.misses
+        usage = self.store.usage(self.name)
+        return {
+            "name": self.name,
+            "backend": "sqlite",
+            "size": usage["entries"],
+            "bytes": usage["bytes"],
+            "max_bytes": self.store.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+# 全局缓存文件实例
+_sqlite_store = None
+
+def get_sqlite_store() -> SQLiteStore:
+    """获取共享缓存文件实例(单例模式)"""
+    global _sqlite_store
+
+    if _sqlite_store is None:
+        settings = get_settings()
+        _sqlite_store = SQLiteStore(settings.cache_path, settings.cache_max_bytes)
+
+    return _sqlite_store
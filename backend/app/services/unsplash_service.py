@@ -1,8 +1,12 @@
 """Unsplash图片服务模块"""
 
+import logging
 import requests
 from typing import List, Optional
 from ..config import get_settings
+from .cache import create_cache
+
+logger = logging.getLogger(__name__)
 
 class UnsplashService:
     """Unsplash图片服务类"""
@@ -12,6 +16,8 @@ class UnsplashService:
         settings = get_settings()
         self.access_key = settings.unsplash_access_key
         self.base_url = "https://api.unsplash.com"
+        # 图片URL缓存: 查询词 -> URL(没有结果时缓存空字符串,避免重复请求)
+        self.photo_cache = create_cache("photo", maxsize=2048, ttl=settings.photo_cache_ttl)
     
     def search_photos(self, query: str, per_page: int = 5) -> List[dict]:
         """
@@ -50,7 +56,7 @@ class UnsplashService:
             return photos
 
         except Exception as e:
-            print(f"❌ Unsplash搜索图片失败: {str(e)}")
+            logger.error(f"❌ Unsplash搜索图片失败: {str(e)}")
             return []
         
     def get_photo_url(self, query: str) -> Optional[str]:
@@ -61,10 +67,18 @@ class UnsplashService:
         Returns:
             图片URL
         """
+        cached = self.photo_cache.get(query)
+        if cached is not None:
+            return cached or None
+
         photos = self.search_photos(query)
-        if photos:
-            return photos[0].get("url")
-        return None
+        url = photos[0].get("url") if photos else None
+        if url:
+            self.photo_cache.set(query, url)
+        elif self.access_key:
+            # 没有找到图片时只短暂缓存
+            self.photo_cache.set(query, "", ttl=600)
+        return url
     
 # 全局服务实例
 _unsplash_service = None
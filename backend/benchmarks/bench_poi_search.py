@@ -0,0 +1,91 @@
+"""本地POI关键词倒排索引基准测试
+
+用法(在backend目录下):
+    python -m benchmarks.bench_poi_search --size 200000 --queries 2000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from app.models.schemas import Location, POIInfo
+from app.services.poi_store import POIStore
+
+DISTRICTS = ["东城", "西城", "朝阳", "海淀", "丰台", "石景山", "通州", "昌平", "大兴", "顺义", "房山", "门头沟"]
+CATEGORIES = {
+    "风景名胜;风景名胜;国家级景点": ["故宫", "天坛", "颐和园", "圆明园", "长城", "景山", "北海", "什刹海", "雍和宫", "恭王府"],
+    "科教文化服务;博物馆;博物馆": ["历史文化博物馆", "自然博物馆", "科技馆", "美术馆", "民俗博物馆", "文化馆"],
+    "风景名胜;公园广场;公园": ["公园", "森林公园", "湿地公园", "植物园", "广场", "历史文化街区"],
+    "住宿服务;宾馆酒店;经济型连锁酒店": ["如家酒店", "汉庭酒店", "七天酒店", "锦江之星", "全季酒店", "速8酒店"],
+    "住宿服务;宾馆酒店;五星级宾馆": ["希尔顿酒店", "万豪酒店", "洲际酒店", "香格里拉大酒店", "丽思卡尔顿酒店"],
+    "餐饮服务;中餐厅;北京菜": ["全聚德烤鸭店", "四季民福", "护国寺小吃", "东来顺", "便宜坊", "老北京炸酱面"],
+    "购物服务;商场;购物中心": ["万达广场", "大悦城", "SKP", "来福士", "合生汇", "王府井百货"],
+}
+QUERIES = ["故宫", "历史文化", "酒店", "如家", "烤鸭", "博物馆", "公园", "朝阳大悦城", "香格里拉", "炸酱面", "湿地", "天坛公园"]
+
+
+def make_dataset(size: int, seed: int = 42):
+    """生成一个大城市规模的合成POI数据集"""
+    rng = random.Random(seed)
+    categories = list(CATEGORIES.items())
+    pois = []
+    for i in range(size):
+        poi_type, names = rng.choice(categories)
+        district = rng.choice(DISTRICTS)
+        name = f"{rng.choice(names)}({district}{rng.randint(1, 99)}号店)"
+        pois.append(POIInfo(
+            id=f"B{i:08d}",
+            name=name,
+            type=poi_type,
+            address=f"北京市{district}区{rng.choice(['建国路', '长安街', '中关村大街', '望京街', '西单北大街'])}{rng.randint(1, 300)}号",
+            location=Location(longitude=116.1 + rng.random() * 0.6, latitude=39.7 + rng.random() * 0.4)
+        ))
+    return pois
+
+
+def percentile(values, q):
+    """计算百分位数"""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地POI倒排索引基准测试")
+    parser.add_argument("--size", type=int, default=200000, help="POI数量")
+    parser.add_argument("--queries", type=int, default=2000, help="查询次数")
+    args = parser.parse_args()
+
+    pois = make_dataset(args.size)
+    store = POIStore()
+
+    start = time.perf_counter()
+    store.bulk_load(pois, city="北京")
+    build = time.perf_counter() - start
+    print(f"导入 {args.size} 个POI: {build:.2f}s ({args.size / build:.0f} POI/s)")
+    print(f"索引规模: {store._text_index.stats()}")
+
+    rng = random.Random(0)
+    latencies = []
+    hits = 0
+    for _ in range(args.queries):
+        keywords = rng.choice(QUERIES)
+        poi_type = rng.choice(["", "", "住宿服务", "风景名胜"])
+        start = time.perf_counter()
+        result = store.search_text(keywords, "北京", poi_type, limit=20)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += bool(result)
+
+    # 对比: 不使用索引的线性扫描
+    start = time.perf_counter()
+    for keywords in QUERIES:
+        [p for p in pois if keywords in p.name][:20]
+    scan = (time.perf_counter() - start) * 1000 / len(QUERIES)
+
+    print(f"查询 {args.queries} 次, 命中率 {hits / args.queries:.1%}")
+    print(f"倒排索引: p50 {percentile(latencies, 0.5):.3f}ms  p95 {percentile(latencies, 0.95):.3f}ms  "
+          f"p99 {percentile(latencies, 0.99):.3f}ms  mean {statistics.mean(latencies):.3f}ms")
+    print(f"线性扫描: mean {scan:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
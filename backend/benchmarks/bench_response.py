@@ -0,0 +1,143 @@
+"""旅行计划响应序列化与压缩基准测试
+
+对比3/7/30天的TripPlanResponse:
+- 序列化耗时: FastAPI默认方式(jsonable_encoder + json.dumps)、按response_model校验后序列化、
+  FastJSONResponse(model_dump_json)、orjson(model_dump);
+- 传输大小: 未压缩、gzip、brotli(已安装brotli时)。
+
+用法(在backend目录下):
+    python -m benchmarks.bench_response --repeat 50
+"""
+
+import argparse
+import gzip
+import json
+import random
+import statistics
+import time
+from typing import Callable, List
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app.api.compression import brotli
+from app.api.responses import dumps, orjson
+from app.config import get_settings
+from app.models.schemas import (
+    Attraction, Budget, DayPlan, Hotel, Location, Meal, RouteInfo, TripPlan, TripPlanResponse, WeatherInfo
+)
+
+ATTRACTIONS = ["故宫博物院", "天坛公园", "颐和园", "八达岭长城", "南锣鼓巷", "什刹海", "雍和宫", "圆明园遗址公园", "景山公园", "北海公园"]
+RESTAURANTS = ["四季民福烤鸭店", "护国寺小吃", "东来顺饭庄", "便宜坊烤鸭店", "老北京炸酱面大王", "庆丰包子铺"]
+
+
+def make_plan(days: int, seed: int = 42) -> TripPlanResponse:
+    """生成一个包含景点、餐饮、酒店、路线和天气的合成旅行计划"""
+    rng = random.Random(seed)
+
+    def location() -> Location:
+        return Location(longitude=116.2 + rng.random() * 0.4, latitude=39.8 + rng.random() * 0.2)
+
+    day_plans = []
+    for i in range(days):
+        attractions = [
+            Attraction(
+                name=f"{rng.choice(ATTRACTIONS)}{j}",
+                address=f"北京市东城区景山前街{rng.randint(1, 300)}号",
+                location=location(),
+                visit_duration=rng.choice([60, 90, 120, 180]),
+                description="明清两代的皇家宫殿, 世界上现存规模最大、保存最为完整的木质结构古建筑之一。",
+                category="历史文化",
+                rating=f"{4 + rng.random():.1f}",
+                image_url="https://images.unsplash.com/photo-1547981609-4b6bfe67ca0b",
+                ticket_price=rng.choice([0, 30, 60])
+            )
+            for j in range(rng.randint(2, 4))
+        ]
+        meals = [
+            Meal(type=meal_type, name=rng.choice(RESTAURANTS), address="北京市东城区前门大街", location=location(),
+                 description="老字号, 推荐烤鸭和炸酱面", estimated_cost=rng.randint(30, 200))
+            for meal_type in ("breakfast", "lunch", "dinner")
+        ]
+        routes = [
+            RouteInfo(distance=rng.randint(500, 9000), duration=rng.randint(300, 3600), route_type="transit",
+                      description="公共交通约3.2公里,25分钟", origin=f"地点{k}", destination=f"地点{k + 1}")
+            for k in range(len(attractions) + 3)
+        ]
+        day_plans.append(DayPlan(
+            date=f"2026-11-{i % 28 + 1:02d}",
+            day_index=i,
+            description="上午参观故宫, 下午游览景山公园和北海公园, 晚上前往什刹海。",
+            transportation="公共交通",
+            accommodation="经济型酒店",
+            hotel=Hotel(name="如家酒店(王府井店)", address="北京市东城区王府井大街", location=location(),
+                        price_range="300-400元", rating="4.5", distance="距离景点1.2公里", type="经济型酒店",
+                        estimated_cost=350),
+            attractions=attractions,
+            meals=meals,
+            travel_distance=sum(r.distance for r in routes),
+            travel_duration=sum(r.duration for r in routes),
+            routes=routes
+        ))
+
+    weather = [
+        WeatherInfo(date=f"2026-11-{i % 28 + 1:02d}", day_weather="晴", night_weather="多云", day_temp=15,
+                    night_temp=3, wind_direction="北", wind_power="3级")
+        for i in range(min(days, 4))
+    ]
+    plan = TripPlan(
+        city="北京",
+        start_date="2026-11-01",
+        end_date=f"2026-11-{days % 28 + 1:02d}",
+        days=day_plans,
+        weather_info=weather,
+        overall_suggestions="建议提前预约故宫门票, 携带身份证件; 早晚温差较大, 注意添加衣物。",
+        budget=Budget(total_attractions=600, total_hotels=350 * days, total_meals=300 * days,
+                      total_transportation=50 * days, total=1000 * days)
+    )
+    return TripPlanResponse(success=True, message="旅行计划生成成功", plan_id="0" * 32, data=plan)
+
+
+def timeit(fn: Callable[[], bytes], repeat: int) -> float:
+    """多次运行取中位数(毫秒)"""
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="旅行计划响应序列化与压缩基准测试")
+    parser.add_argument("--repeat", type=int, default=50, help="每项测试的重复次数")
+    parser.add_argument("--days", type=str, default="3,7,30", help="计划天数, 逗号分隔")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    adapter = TypeAdapter(TripPlanResponse)
+    print(f"orjson: {'已安装' if orjson else '未安装'}  brotli: {'已安装' if brotli else '未安装'}")
+    print(f"{'天数':>4} | {'默认(ms)':>9} {'校验+dump(ms)':>13} {'FastJSON(ms)':>12} {'orjson(ms)':>10} | "
+          f"{'原始(B)':>9} {'gzip(B)':>9} {'br(B)':>9} {'gzip(ms)':>8} {'br(ms)':>7}")
+
+    for days in [int(d) for d in args.days.split(",")]:
+        response = make_plan(days)
+        body = dumps(response)
+
+        default_ms = timeit(lambda: json.dumps(jsonable_encoder(response), ensure_ascii=False).encode("utf-8"), args.repeat)
+        validated_ms = timeit(lambda: adapter.dump_json(adapter.validate_python(response)), args.repeat)
+        fast_ms = timeit(lambda: dumps(response), args.repeat)
+        orjson_ms = timeit(lambda: orjson.dumps(response.model_dump(mode="json")), args.repeat) if orjson else float("nan")
+
+        gzip_body = gzip.compress(body, compresslevel=settings.gzip_level)
+        gzip_ms = timeit(lambda: gzip.compress(body, compresslevel=settings.gzip_level), args.repeat)
+        if brotli is not None:
+            br_size = len(brotli.compress(body, quality=settings.brotli_quality))
+            br_ms = timeit(lambda: brotli.compress(body, quality=settings.brotli_quality), args.repeat)
+        else:
+            br_size, br_ms = 0, float("nan")
+
+        print(f"{days:>4} | {default_ms:>9.2f} {validated_ms:>13.2f} {fast_ms:>12.2f} {orjson_ms:>10.2f} | "
+              f"{len(body):>9} {len(gzip_body):>9} {br_size or '-':>9} {gzip_ms:>8.2f} {br_ms:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
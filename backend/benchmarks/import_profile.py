@@ -0,0 +1,76 @@
+"""应用导入耗时分析
+
+在子进程中用 python -X importtime 导入应用模块, 按顶层包汇总累计耗时,
+用于检查冷启动时是否误导入了langgraph/langchain等重量级依赖。
+
+用法(在backend目录下):
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --module app.agents.multi_agents --top 30
+"""
+
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# 应该延迟导入的重量级依赖
+HEAVY_PACKAGES = ["langgraph", "langgraph_supervisor", "langchain_openai", "langchain_mcp_adapters", "langchain_core", "hello_agents"]
+
+
+def profile_imports(module: str) -> List[Tuple[str, int, int]]:
+    """
+    在子进程中导入模块并解析 -X importtime 的输出
+    Args:
+        module: 模块名
+    Returns:
+        (模块名, 自身耗时us, 累计耗时us)列表
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else f"导入{module}失败")
+
+    records = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        records.append((name.strip(), int(self_us), int(cumulative_us)))
+    return records
+
+
+def summarize(records: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """按顶层包汇总自身耗时(us)"""
+    totals: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in records:
+        totals[name.split(".")[0]] += self_us
+    return dict(totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="应用导入耗时分析")
+    parser.add_argument("--module", default="app.api.main", help="要导入的模块")
+    parser.add_argument("--top", type=int, default=15, help="显示耗时最多的前N个包")
+    args = parser.parse_args()
+
+    records = profile_imports(args.module)
+    totals = summarize(records)
+    total_us = sum(totals.values())
+
+    print(f"导入 {args.module}: 共{len(records)}个模块, 总耗时 {total_us / 1000:.1f}ms")
+    print(f"{'包':<28}{'耗时(ms)':>10}{'占比':>8}")
+    for package, us in sorted(totals.items(), key=lambda x: -x[1])[:args.top]:
+        print(f"{package:<28}{us / 1000:>10.1f}{us / total_us:>8.1%}")
+
+    loaded = [p for p in HEAVY_PACKAGES if p in totals]
+    if loaded:
+        print(f"\n⚠️  启动时导入了重量级依赖: {', '.join(loaded)}")
+    else:
+        print("\n✅ 启动时没有导入重量级依赖")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""API压测工具: 旅行请求语料、压测场景、LLM/高德的本地替身和报告, 用法见 __main__.py"""
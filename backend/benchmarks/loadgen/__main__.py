@@ -0,0 +1,141 @@
+"""压测命令行
+
+用法(在backend目录下):
+    # 启动使用本地LLM/高德替身的应用, 按并发1/2/4/8压测混合场景, 每档30秒
+    python -m benchmarks.loadgen --spawn --scenario mixed --concurrency 1,2,4,8 --duration 30
+
+    # 按到达率(请求/秒)压测旅行规划, 结果写入JSON
+    python -m benchmarks.loadgen --spawn --scenario plan --rate 0.5,1,2,4 --duration 60 --output plan.json
+
+    # 压测已经运行的应用
+    python -m benchmarks.loadgen --base-url http://localhost:8000 --scenario map --concurrency 4,16,64
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import httpx
+from benchmarks.loadgen.report import find_saturation, format_table
+from benchmarks.loadgen.runner import LoadGenerator
+from benchmarks.loadgen.scenarios import SCENARIOS, RequestContext
+from benchmarks.loadgen.stack import LocalStack
+
+logger = logging.getLogger("benchmarks.loadgen")
+
+
+def _numbers(value: str) -> List[float]:
+    """逗号分隔的数字列表"""
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def _server_metrics(base_url: str) -> Optional[Dict[str, Any]]:
+    """压测结束后应用的LLM指标(/metrics/llm), 读取失败时为None"""
+    try:
+        response = httpx.get(f"{base_url}/metrics/llm", timeout=5)
+        return response.json() if response.status_code == 200 else None
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+async def run(args: argparse.Namespace, base_url: str) -> Dict[str, Any]:
+    """按参数依次运行各阶段, 返回压测报告"""
+    context = RequestContext(seed=args.seed, repeat_rate=args.repeat_rate)
+    headers = dict(h.split(":", 1) for h in args.header)
+    generator = LoadGenerator(base_url, args.scenario, context, timeout=args.timeout, headers=headers)
+    if args.warmup:
+        logger.info(f"🔥 预热: {args.warmup}个请求")
+        await generator.warmup(args.warmup)
+
+    stages = []
+    if args.rate:
+        for rate in _numbers(args.rate):
+            logger.info(f"🚀 到达率 {rate:g} req/s, {args.duration:g}秒")
+            stats = await generator.run_rate(rate, args.duration, args.max_in_flight, args.max_requests)
+            stages.append(stats.summary())
+    else:
+        for concurrency in _numbers(args.concurrency):
+            logger.info(f"🚀 并发 {int(concurrency)}, {args.duration:g}秒")
+            stats = await generator.run_concurrency(int(concurrency), args.duration, args.max_requests)
+            stages.append(stats.summary())
+
+    return {
+        "meta": {
+            "base_url": base_url,
+            "scenario": args.scenario,
+            "mix": dict(SCENARIOS[args.scenario][1]),
+            "mode": "rate" if args.rate else "concurrency",
+            "duration_s": args.duration,
+            "seed": args.seed,
+            "repeat_rate": args.repeat_rate,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "stack": {
+                "llm_args": args.llm_args,
+                "amap_args": args.amap_args,
+                "workers": args.workers,
+                "app_env": args.app_env
+            } if args.spawn else None
+        },
+        "stages": stages,
+        "saturation": find_saturation(stages, args.latency_factor, args.max_error_rate),
+        "server_metrics": _server_metrics(base_url)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="旅行规划API压测")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--base-url", help="已运行的应用地址")
+    target.add_argument("--spawn", action="store_true", help="启动使用本地LLM/高德替身的应用")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed",
+                        help="; ".join(f"{name}: {desc}" for name, (desc, _) in SCENARIOS.items()))
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", default="1,2,4,8", help="固定并发, 逗号分隔的各阶段并发数")
+    load.add_argument("--rate", default="", help="固定到达率, 逗号分隔的各阶段到达率(请求/秒)")
+    parser.add_argument("--duration", type=float, default=30.0, help="每个阶段的时间(秒)")
+    parser.add_argument("--max-requests", type=int, default=0, help="每个阶段最多发出的请求数(0表示不限)")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="固定到达率时的未完成请求数上限")
+    parser.add_argument("--timeout", type=float, default=600.0, help="单个请求的超时时间(秒)")
+    parser.add_argument("--warmup", type=int, default=1, help="开始前依次发出的预热请求数(不计入结果)")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--repeat-rate", type=float, default=0.0, help="旅行请求重复之前请求的比例(观察计划缓存)")
+    parser.add_argument("--header", action="append", default=[], help="附加请求头, 如 X-Admin-Token:xxx")
+    parser.add_argument("--latency-factor", type=float, default=2.0, help="饱和判断: 接口p95延迟相对参考阶段的倍数")
+    parser.add_argument("--max-error-rate", type=float, default=0.05, help="饱和判断: 接口错误率相对参考阶段的增量")
+    parser.add_argument("--output", help="JSON报告的路径")
+    stack = parser.add_argument_group("本地替身(--spawn)")
+    stack.add_argument("--llm-args", default="--ttft-ms 300 --chars-per-sec 2000",
+                       help="fake_llm的参数(延迟、限流、错误率), 见 python -m benchmarks.loadgen.fake_llm -h")
+    stack.add_argument("--amap-args", default="--latency-ms 80", help="fake_amap的参数")
+    stack.add_argument("--workers", type=int, default=1, help="应用的uvicorn worker数量")
+    stack.add_argument("--app-env", action="append", default=[], help="应用的环境变量, 如 PLAN_CACHE_TTL=3600")
+    stack.add_argument("--log-dir", help="应用和替身的日志目录(默认临时目录, 结束后删除)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", stream=sys.stderr)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.spawn:
+        local = LocalStack(
+            llm_args=args.llm_args.split(),
+            amap_args=args.amap_args.split(),
+            workers=args.workers,
+            env=dict(e.split("=", 1) for e in args.app_env),
+            log_dir=args.log_dir
+        )
+        with local:
+            report = asyncio.run(run(args, local.base_url))
+    else:
+        report = asyncio.run(run(args, args.base_url))
+
+    print(format_table(report))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"JSON报告: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
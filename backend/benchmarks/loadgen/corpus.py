@@ -0,0 +1,178 @@
+"""压测语料: 旅行规划请求和地图/POI查询
+
+城市按热度加权(少数热门城市占大部分请求), 天数集中在2-5天, 偶尔有按天并行生成的长行程,
+偏好标签、住宿、交通方式和额外要求按常见组合随机搭配。所有旅行请求都经过TripRequest校验。
+
+单独运行时输出JSONL格式的旅行请求(在backend目录下):
+    python -m benchmarks.loadgen.corpus --count 100 > trips.jsonl
+"""
+
+import argparse
+import json
+import random
+import sys
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from app.models.schemas import TripRequest
+
+# 城市: (中心经度, 中心纬度, 热度权重, 区县, 地标)
+CITIES: Dict[str, Tuple[float, float, int, List[str], List[str]]] = {
+    "北京": (116.397, 39.909, 20, ["东城", "西城", "朝阳", "海淀"], ["故宫", "天坛", "颐和园", "什刹海", "南锣鼓巷", "八达岭长城"]),
+    "上海": (121.474, 31.230, 18, ["黄浦", "静安", "徐汇", "浦东"], ["外滩", "豫园", "东方明珠", "田子坊", "武康路", "上海博物馆"]),
+    "杭州": (120.155, 30.274, 12, ["西湖", "上城", "拱墅", "滨江"], ["西湖", "灵隐寺", "西溪湿地", "河坊街", "雷峰塔", "龙井村"]),
+    "成都": (104.066, 30.572, 12, ["锦江", "青羊", "武侯", "成华"], ["宽窄巷子", "锦里", "武侯祠", "杜甫草堂", "大熊猫基地", "春熙路"]),
+    "西安": (108.940, 34.341, 10, ["碑林", "雁塔", "莲湖", "新城"], ["兵马俑", "大雁塔", "古城墙", "回民街", "钟楼", "陕西历史博物馆"]),
+    "广州": (113.264, 23.129, 8, ["越秀", "天河", "荔湾", "海珠"], ["广州塔", "沙面", "陈家祠", "北京路", "白云山", "永庆坊"]),
+    "重庆": (106.551, 29.563, 8, ["渝中", "江北", "南岸", "沙坪坝"], ["洪崖洞", "解放碑", "磁器口", "李子坝", "南山一棵树", "长江索道"]),
+    "南京": (118.797, 32.060, 6, ["玄武", "秦淮", "鼓楼", "建邺"], ["中山陵", "夫子庙", "玄武湖", "总统府", "明孝陵", "老门东"]),
+    "厦门": (118.089, 24.480, 6, ["思明", "湖里", "集美", "海沧"], ["鼓浪屿", "南普陀寺", "曾厝垵", "环岛路", "厦门大学", "沙坡尾"]),
+    "苏州": (120.585, 31.299, 5, ["姑苏", "吴中", "工业园", "虎丘"], ["拙政园", "平江路", "虎丘", "留园", "苏州博物馆", "金鸡湖"]),
+    "青岛": (120.383, 36.067, 4, ["市南", "市北", "崂山", "李沧"], ["栈桥", "八大关", "崂山", "五四广场", "小鱼山", "青岛啤酒博物馆"]),
+    "昆明": (102.833, 24.880, 3, ["五华", "盘龙", "官渡", "西山"], ["滇池", "翠湖", "石林", "西山", "云南民族村", "斗南花市"]),
+    "长沙": (112.939, 28.228, 3, ["芙蓉", "天心", "岳麓", "开福"], ["橘子洲", "岳麓山", "五一广场", "坡子街", "湖南省博物馆", "太平街"]),
+    "哈尔滨": (126.535, 45.803, 2, ["道里", "南岗", "道外", "松北"], ["中央大街", "圣索菲亚教堂", "冰雪大世界", "太阳岛", "松花江", "老道外"]),
+}
+
+PREFERENCES = ["历史文化", "美食", "自然风光", "博物馆", "公园", "购物", "亲子", "夜景", "古镇", "艺术", "摄影", "小众景点"]
+# 住宿: (偏好, 权重)
+ACCOMMODATIONS = [("经济型酒店", 5), ("舒适型酒店", 4), ("高档型酒店", 2), ("豪华型酒店", 1), ("民宿", 2)]
+TRANSPORTATIONS = [("公共交通", 6), ("自驾", 2), ("步行", 1), ("混合", 2)]
+# 天数: (天数, 权重), 5天及以上默认按天并行生成
+TRAVEL_DAYS = [(1, 2), (2, 6), (3, 10), (4, 6), (5, 4), (7, 2), (10, 1), (14, 1)]
+FREE_TEXTS = [
+    "", "", "", "",
+    "希望多安排一些博物馆",
+    "带老人出行, 行程不要太赶",
+    "想吃当地特色小吃",
+    "预算有限, 尽量选择免费景点",
+    "第一次来, 想看最有代表性的景点",
+    "带5岁小孩, 希望有适合亲子的活动",
+    "喜欢拍照, 希望安排日落和夜景",
+]
+# 地图/POI查询的关键词
+SEARCH_KEYWORDS = ["景点", "博物馆", "公园", "酒店", "美食", "咖啡", "商场", "地铁站", "小吃", "夜市"]
+NEARBY_KEYWORDS = ["酒店", "餐饮", "景点", "咖啡", "停车场", ""]
+POI_TYPES = ["", "", "风景名胜", "住宿服务", "餐饮服务"]
+
+
+def _weighted(rng: random.Random, options: List[Tuple[Any, int]]) -> Any:
+    """按权重选择"""
+    values, weights = zip(*options)
+    return rng.choices(values, weights=weights)[0]
+
+
+def pick_city(rng: random.Random) -> str:
+    """按热度选择城市"""
+    return _weighted(rng, [(name, info[2]) for name, info in CITIES.items()])
+
+
+def find_city(text: str) -> Optional[str]:
+    """文本中出现的第一个语料城市(用于本地替身从提问中识别城市)"""
+    positions = [(text.find(name), name) for name in CITIES if name in text]
+    return min(positions)[1] if positions else None
+
+
+def city_center(city: str) -> Tuple[float, float]:
+    """城市中心坐标, 不在语料中的城市使用北京"""
+    lng, lat, *_ = CITIES.get(city, CITIES["北京"])
+    return lng, lat
+
+
+def make_trip_request(rng: random.Random, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    生成一个旅行规划请求
+    Args:
+        rng: 随机数生成器
+        today: 出发日期的基准, 默认今天(出发日期在基准之后1-90天)
+    Returns:
+        经过TripRequest校验的请求dict
+    """
+    today = today or date.today()
+    city = pick_city(rng)
+    travel_days = _weighted(rng, TRAVEL_DAYS)
+    start = today + timedelta(days=rng.randint(1, 90))
+    preferences = rng.sample(PREFERENCES, k=_weighted(rng, [(0, 2), (1, 4), (2, 5), (3, 3)]))
+    request = TripRequest(
+        city=city,
+        start_date=start.isoformat(),
+        end_date=(start + timedelta(days=travel_days - 1)).isoformat(),
+        travel_days=travel_days,
+        transportation=_weighted(rng, TRANSPORTATIONS),
+        accommodation=_weighted(rng, ACCOMMODATIONS),
+        preferences=preferences,
+        free_text_input=rng.choice(FREE_TEXTS)
+    )
+    return request.model_dump()
+
+
+class TripCorpus:
+    """旅行请求语料: 一部分请求重复之前出现过的请求(热门行程), 用于观察计划缓存的效果"""
+
+    def __init__(self, seed: int = 42, repeat_rate: float = 0.0, today: Optional[date] = None):
+        """
+        初始化
+        Args:
+            seed: 随机种子
+            repeat_rate: 重复之前请求的比例(0-1)
+            today: 出发日期的基准, 默认今天
+        """
+        self.rng = random.Random(seed)
+        self.repeat_rate = repeat_rate
+        self.today = today or date.today()
+        self.history: List[Dict[str, Any]] = []
+
+    def next(self) -> Dict[str, Any]:
+        """下一个旅行请求"""
+        if self.history and self.rng.random() < self.repeat_rate:
+            return self.rng.choice(self.history)
+        request = make_trip_request(self.rng, self.today)
+        self.history.append(request)
+        return request
+
+
+def make_search_query(rng: random.Random) -> Dict[str, Any]:
+    """关键词搜索参数(/api/map/poi, /api/poi/search)"""
+    city = pick_city(rng)
+    landmarks = CITIES[city][4]
+    keywords = rng.choice(landmarks) if rng.random() < 0.3 else rng.choice(SEARCH_KEYWORDS)
+    return {"keywords": keywords, "city": city}
+
+
+def make_nearby_query(rng: random.Random) -> Dict[str, Any]:
+    """周边搜索参数(/api/map/poi/nearby): 城市中心10公里内的随机坐标"""
+    lng, lat = city_center(pick_city(rng))
+    return {
+        "longitude": round(lng + rng.uniform(-0.1, 0.1), 6),
+        "latitude": round(lat + rng.uniform(-0.08, 0.08), 6),
+        "radius": rng.choice([500, 1000, 2000, 3000]),
+        "keywords": rng.choice(NEARBY_KEYWORDS)
+    }
+
+
+def make_route_request(rng: random.Random) -> Dict[str, Any]:
+    """路线规划请求体(/api/map/route): 同一城市的两个地标"""
+    city = pick_city(rng)
+    origin, destination = rng.sample(CITIES[city][4], 2)
+    return {
+        "origin_address": f"{city}{origin}",
+        "destination_address": f"{city}{destination}",
+        "origin_city": city,
+        "destination_city": city,
+        "route_type": rng.choice(["walking", "driving", "transit"])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成旅行规划请求语料(JSONL)")
+    parser.add_argument("--count", type=int, default=100, help="请求数量")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--repeat-rate", type=float, default=0.0, help="重复之前请求的比例")
+    args = parser.parse_args()
+
+    corpus = TripCorpus(seed=args.seed, repeat_rate=args.repeat_rate)
+    for _ in range(args.count):
+        sys.stdout.write(json.dumps(corpus.next(), ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
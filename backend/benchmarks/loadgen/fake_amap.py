@@ -0,0 +1,230 @@
+"""高德地图MCP Server的本地替身(stdio)
+
+提供与amap-mcp-server同名的工具, 按高德原始格式返回确定性的合成数据(相同参数返回相同结果),
+坐标位于语料城市中心附近。每次工具调用按--latency-ms模拟高德接口的延迟。
+
+由压测工具生成的uvx脚本启动(应用用 uvx amap-mcp-server 启动高德MCP Server), 也可以单独运行:
+    python -m benchmarks.loadgen.fake_amap --latency-ms 80
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+from datetime import date, timedelta
+from mcp.server.fastmcp import FastMCP
+from benchmarks.loadgen.corpus import CITIES, city_center, find_city
+
+mcp = FastMCP("amap-mcp-server")
+
+# 模拟的接口延迟(毫秒), 由命令行参数设置
+_latency_ms = 0.0
+_jitter = 0.3
+
+WEATHER = ["晴", "多云", "阴", "小雨", "晴", "多云"]
+WINDS = ["北", "东北", "东", "东南", "南", "西南", "西", "西北"]
+HOTEL_BRANDS = ["如家酒店", "汉庭酒店", "全季酒店", "亚朵酒店", "希尔顿酒店", "万豪酒店", "桔子酒店", "锦江之星"]
+FOOD_NAMES = ["老字号小吃", "家常菜馆", "特色火锅", "面馆", "烧烤", "茶餐厅", "私房菜", "咖啡馆"]
+
+
+def _rng(*parts: str) -> random.Random:
+    """按参数生成的随机数生成器(相同参数返回相同结果)"""
+    seed = hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=8).hexdigest()
+    return random.Random(int(seed, 16))
+
+
+async def _delay() -> None:
+    """模拟接口延迟(对数正态分布)"""
+    if _latency_ms > 0:
+        await asyncio.sleep(_latency_ms / 1000 * random.lognormvariate(0, _jitter))
+
+
+def _poi_type(keywords: str) -> str:
+    """按关键词推断高德POI类型"""
+    if any(k in keywords for k in ("酒店", "宾馆", "民宿", "住宿")):
+        return "住宿服务;宾馆酒店;宾馆酒店"
+    if any(k in keywords for k in ("美食", "餐", "小吃", "咖啡", "火锅", "夜市")):
+        return "餐饮服务;中餐厅;特色/地方风味餐厅"
+    if "博物馆" in keywords:
+        return "科教文化服务;博物馆;博物馆"
+    if any(k in keywords for k in ("商场", "购物")):
+        return "购物服务;商场;购物中心"
+    return "风景名胜;风景名胜;风景名胜"
+
+
+def _pois(rng: random.Random, keywords: str, city: str, lng: float, lat: float, spread: float, count: int):
+    """生成一组POI(高德原始格式)"""
+    poi_type = _poi_type(keywords)
+    _, _, _, districts, landmarks = CITIES.get(city, CITIES["北京"])
+    pois = []
+    for i in range(count):
+        if poi_type.startswith("住宿"):
+            name = f"{rng.choice(HOTEL_BRANDS)}({rng.choice(landmarks)}店)"
+        elif poi_type.startswith("餐饮"):
+            name = f"{rng.choice(landmarks)}{rng.choice(FOOD_NAMES)}"
+        elif i < len(landmarks) and poi_type.startswith("风景"):
+            name = landmarks[i]
+        else:
+            name = f"{rng.choice(landmarks)}{keywords or '景点'}{i + 1}"
+        pois.append({
+            "id": f"B0FFF{rng.randint(10000, 99999)}",
+            "name": name,
+            "type": poi_type,
+            "typecode": "110000",
+            "address": f"{city}市{rng.choice(districts)}区{rng.choice(landmarks)}路{rng.randint(1, 300)}号",
+            "location": f"{lng + rng.uniform(-spread, spread):.6f},{lat + rng.uniform(-spread, spread):.6f}",
+            "tel": f"0{rng.randint(10, 99)}-{rng.randint(10000000, 99999999)}",
+        })
+    return pois
+
+
+def _route(rng: random.Random, origin: str, destination: str, mode: str) -> str:
+    """路线规划结果(高德原始格式): 按直线距离和交通方式估算距离和时间"""
+    try:
+        lng1, lat1 = (float(v) for v in origin.split(",")[:2])
+        lng2, lat2 = (float(v) for v in destination.split(",")[:2])
+        distance = math.hypot((lng2 - lng1) * 96000, (lat2 - lat1) * 111000) * rng.uniform(1.2, 1.5)
+    except ValueError:
+        # 按地址规划时没有坐标
+        distance = rng.uniform(1000, 15000)
+    speed = {"walking": 1.3, "driving": 8.0, "transit": 5.0}[mode]
+    duration = int(distance / speed) + (300 if mode == "transit" else 0)
+    path = {"distance": str(int(distance)), "duration": str(duration)}
+    if mode == "transit":
+        return json.dumps({"route": {"distance": str(int(distance)), "transits": [path]}})
+    return json.dumps({"route": {"paths": [path]}})
+
+
+@mcp.tool()
+async def maps_text_search(keywords: str, city: str = "", citylimit: str = "false") -> str:
+    """关键词搜索POI"""
+    rng = _rng("text", keywords, city)
+    await _delay()
+    city = find_city(city) or "北京"
+    lng, lat = city_center(city)
+    return json.dumps({"pois": _pois(rng, keywords, city, lng, lat, 0.08, rng.randint(10, 20))}, ensure_ascii=False)
+
+
+@mcp.tool()
+async def maps_around_search(location: str, radius: str = "1000", keywords: str = "") -> str:
+    """周边搜索POI"""
+    rng = _rng("around", location, radius, keywords)
+    await _delay()
+    try:
+        lng, lat = (float(v) for v in location.split(",")[:2])
+    except ValueError:
+        lng, lat = city_center("北京")
+    city = min(CITIES, key=lambda c: math.hypot(city_center(c)[0] - lng, city_center(c)[1] - lat))
+    spread = max(100, int(float(radius or 1000))) / 111000
+    return json.dumps({"pois": _pois(rng, keywords, city, lng, lat, spread, rng.randint(5, 15))}, ensure_ascii=False)
+
+
+@mcp.tool()
+async def maps_weather(city: str) -> str:
+    """查询天气(从今天开始4天)"""
+    rng = _rng("weather", city, date.today().isoformat())
+    await _delay()
+    base = rng.randint(-5, 30)
+    casts = []
+    for i in range(4):
+        high = base + rng.randint(-3, 3)
+        casts.append({
+            "date": (date.today() + timedelta(days=i)).isoformat(),
+            "week": str((date.today() + timedelta(days=i)).isoweekday()),
+            "dayweather": rng.choice(WEATHER),
+            "nightweather": rng.choice(WEATHER),
+            "daytemp": str(high),
+            "nighttemp": str(high - rng.randint(5, 12)),
+            "daywind": rng.choice(WINDS),
+            "nightwind": rng.choice(WINDS),
+            "daypower": f"{rng.randint(1, 4)}-{rng.randint(5, 6)}",
+            "nightpower": f"{rng.randint(1, 4)}-{rng.randint(5, 6)}",
+        })
+    return json.dumps({"city": city, "forecasts": casts}, ensure_ascii=False)
+
+
+@mcp.tool()
+async def maps_geo(address: str, city: str = "") -> str:
+    """地理编码"""
+    rng = _rng("geo", address, city)
+    await _delay()
+    lng, lat = city_center(find_city(f"{city}{address}") or "北京")
+    location = f"{lng + rng.uniform(-0.05, 0.05):.6f},{lat + rng.uniform(-0.05, 0.05):.6f}"
+    return json.dumps({"results": [{"country": "中国", "city": city, "location": location}]}, ensure_ascii=False)
+
+
+@mcp.tool()
+async def maps_search_detail(id: str) -> str:
+    """查询POI详情"""
+    rng = _rng("detail", id)
+    await _delay()
+    city = rng.choice(list(CITIES))
+    lng, lat = city_center(city)
+    poi = _pois(rng, "景点", city, lng, lat, 0.08, 1)[0]
+    poi.update(id=id, rating=f"{rng.uniform(3.5, 5):.1f}", cost=str(rng.choice([0, 30, 60, 120])))
+    return json.dumps(poi, ensure_ascii=False)
+
+
+@mcp.tool()
+async def maps_direction_walking_by_coordinates(origin: str, destination: str) -> str:
+    """步行路线规划(经纬度)"""
+    rng = _rng("walking", origin, destination)
+    await _delay()
+    return _route(rng, origin, destination, "walking")
+
+
+@mcp.tool()
+async def maps_direction_driving_by_coordinates(origin: str, destination: str) -> str:
+    """驾车路线规划(经纬度)"""
+    rng = _rng("driving", origin, destination)
+    await _delay()
+    return _route(rng, origin, destination, "driving")
+
+
+@mcp.tool()
+async def maps_direction_transit_integrated_by_coordinates(origin: str, destination: str, city: str = "", cityd: str = "") -> str:
+    """公共交通路线规划(经纬度)"""
+    rng = _rng("transit", origin, destination)
+    await _delay()
+    return _route(rng, origin, destination, "transit")
+
+
+@mcp.tool()
+async def maps_direction_walking_by_address(origin_address: str, destination_address: str, origin_city: str = "", destination_city: str = "") -> str:
+    """步行路线规划(地址)"""
+    rng = _rng("walking", origin_address, destination_address)
+    await _delay()
+    return _route(rng, origin_address, destination_address, "walking")
+
+
+@mcp.tool()
+async def maps_direction_driving_by_address(origin_address: str, destination_address: str, origin_city: str = "", destination_city: str = "") -> str:
+    """驾车路线规划(地址)"""
+    rng = _rng("driving", origin_address, destination_address)
+    await _delay()
+    return _route(rng, origin_address, destination_address, "driving")
+
+
+@mcp.tool()
+async def maps_direction_transit_integrated_by_address(origin_address: str, destination_address: str, origin_city: str = "", destination_city: str = "") -> str:
+    """公共交通路线规划(地址)"""
+    rng = _rng("transit", origin_address, destination_address)
+    await _delay()
+    return _route(rng, origin_address, destination_address, "transit")
+
+
+def main():
+    global _latency_ms, _jitter
+
+    parser = argparse.ArgumentParser(description="高德地图MCP Server的本地替身(stdio)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每次工具调用的延迟中位数(毫秒)")
+    parser.add_argument("--jitter", type=float, default=0.3, help="延迟的对数正态分布sigma")
+    args = parser.parse_args()
+    _latency_ms, _jitter = args.latency_ms, args.jitter
+    mcp.run()
+
+
+if __name__ == "__main__":
+    main()
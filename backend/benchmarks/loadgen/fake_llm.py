@@ -0,0 +1,296 @@
+"""OpenAI兼容LLM服务的本地替身
+
+按请求内容模拟多智能体系统中各角色的回答:
+- 监督者(有transfer_to_*工具): 依次转交景点/天气/酒店助手, 全部完成后返回完整的旅行计划JSON;
+- 助手(有高德工具): 先调用工具, 收到工具结果后返回简短总结;
+- 按天生成/总体建议/计划修正(没有工具): 返回一天的行程JSON、建议文本或原样返回计划。
+
+延迟 = 首个token延迟 + 输出字符数 / 生成速度(对数正态抖动), 支持流式和非流式请求。
+可以模拟服务端限流(超过--max-concurrency的请求返回429)和随机错误。
+
+用法(在backend目录下):
+    python -m benchmarks.loadgen.fake_llm --port 18080 --ttft-ms 300 --chars-per-sec 2000
+"""
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import re
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from benchmarks.loadgen.corpus import CITIES, city_center, find_city
+
+app = FastAPI(title="fake-llm")
+
+AGENTS = ["attraction_agent", "weather_agent", "hotel_agent"]
+MEALS = [("breakfast", "早餐", 25), ("lunch", "午餐", 60), ("dinner", "晚餐", 90)]
+
+# 由命令行参数设置
+options = {"ttft_ms": 300.0, "chars_per_sec": 2000.0, "jitter": 0.3, "max_concurrency": 0, "error_rate": 0.0}
+_in_flight = 0
+_ids = itertools.count()
+
+
+def _text(content: Any) -> str:
+    """消息内容(字符串或内容块列表)转换为文本"""
+    if isinstance(content, list):
+        return "".join(b.get("text", "") for b in content if isinstance(b, dict))
+    return content or ""
+
+
+def _rng(text: str) -> random.Random:
+    """按提问生成的随机数生成器(相同提问返回相同回答)"""
+    return random.Random(int(hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest(), 16))
+
+
+def _trip(text: str) -> Dict[str, Any]:
+    """从提问中解析城市、日期和天数"""
+    city = find_city(text) or "北京"
+    match = re.search(r"(\d{4}-\d{2}-\d{2})\s*至\s*(\d{4}-\d{2}-\d{2})", text)
+    start = date.fromisoformat(match.group(1)) if match else date.today()
+    end = date.fromisoformat(match.group(2)) if match else start
+    days = re.search(r"天数[：:]\s*(\d+)", text)
+    travel_days = int(days.group(1)) if days else (end - start).days + 1
+    return {"city": city, "start": start, "days": max(1, min(travel_days, 30))}
+
+
+def _attraction(rng: random.Random, city: str, name: Optional[str] = None) -> Dict[str, Any]:
+    """合成景点"""
+    lng, lat = city_center(city)
+    return {
+        "name": name or f"{rng.choice(CITIES.get(city, CITIES['北京'])[4])}{rng.randint(1, 99)}",
+        "address": f"{city}市{rng.choice(CITIES.get(city, CITIES['北京'])[3])}区",
+        "location": {"longitude": round(lng + rng.uniform(-0.08, 0.08), 6), "latitude": round(lat + rng.uniform(-0.06, 0.06), 6)},
+        "visit_duration": rng.choice([60, 90, 120, 180]),
+        "description": f"{city}的代表性景点, 适合拍照和了解当地历史文化。",
+        "category": rng.choice(["历史文化", "自然风光", "博物馆", "公园"]),
+        "ticket_price": rng.choice([0, 30, 60, 120])
+    }
+
+
+def _day(rng: random.Random, city: str, day_date: date, index: int, candidates: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """合成一天的行程(景点优先使用提示词中的候选)"""
+    if candidates:
+        attractions = [
+            {**_attraction(rng, city, c.get("name")), "address": c.get("address") or "", "location": c.get("location")}
+            for c in candidates[:3]
+        ]
+    else:
+        attractions = [_attraction(rng, city) for _ in range(rng.randint(2, 3))]
+    return {
+        "date": day_date.isoformat(),
+        "day_index": index,
+        "description": f"第{index + 1}天: " + "、".join(a["name"] for a in attractions),
+        "transportation": "公共交通",
+        "accommodation": "经济型酒店",
+        "attractions": attractions,
+        "meals": [
+            {"type": t, "name": f"{city}特色{label}", "description": f"当地人常去的{label}", "estimated_cost": cost}
+            for t, label, cost in MEALS
+        ],
+        "transportation_cost": rng.choice([20, 30, 50])
+    }
+
+
+def _plan(text: str) -> str:
+    """合成完整的旅行计划(监督者的最终回答)"""
+    trip = _trip(text)
+    rng = _rng(text)
+    city, start = trip["city"], trip["start"]
+    lng, lat = city_center(city)
+    days = []
+    for i in range(trip["days"]):
+        day = _day(rng, city, start + timedelta(days=i), i)
+        day["hotel"] = {
+            "name": f"{city}{rng.choice(['如家', '汉庭', '全季', '亚朵'])}酒店",
+            "address": f"{city}市中心",
+            "location": {"longitude": round(lng + rng.uniform(-0.03, 0.03), 6), "latitude": round(lat + rng.uniform(-0.03, 0.03), 6)},
+            "price_range": "300-500元", "rating": "4.5", "distance": "距离景点2公里", "type": "经济型酒店",
+            "estimated_cost": 400
+        }
+        days.append(day)
+    plan = {
+        "city": city,
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=trip["days"] - 1)).isoformat(),
+        "days": days,
+        "weather_info": [
+            {"date": d["date"], "day_weather": "晴", "night_weather": "多云", "day_temp": 22, "night_temp": 12,
+             "wind_direction": "北", "wind_power": "1-3级"}
+            for d in days
+        ],
+        "overall_suggestions": f"{city}景点较分散, 建议提前预约热门景点门票, 早晚温差较大注意添加衣物。",
+        "budget": {"total_attractions": 0, "total_hotels": 0, "total_meals": 0, "total_transportation": 0, "total": 0}
+    }
+    return "```json\n" + json.dumps(plan, ensure_ascii=False, indent=2) + "\n```"
+
+
+def _day_plan(text: str) -> str:
+    """按天生成: 返回提示词中这一天的行程JSON"""
+    city = find_city(text) or "北京"
+    match = re.search(r"第(\d+)天\((\d{4}-\d{2}-\d{2})\)", text)
+    index = int(match.group(1)) - 1 if match else 0
+    day_date = date.fromisoformat(match.group(2)) if match else date.today()
+    candidates = None
+    section = re.search(r"分配给这一天的景点.*?\n(\[.*?\])\n", text, re.S)
+    if section:
+        try:
+            candidates = json.loads(section.group(1))
+        except ValueError:
+            candidates = None
+    day = _day(_rng(text), city, day_date, index, candidates)
+    return "```json\n" + json.dumps(day, ensure_ascii=False) + "\n```"
+
+
+def respond(body: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    按请求中的工具和消息生成回答
+    Args:
+        body: chat/completions请求体
+    Returns:
+        (回答内容, 工具调用列表)
+    """
+    messages = body.get("messages") or []
+    tools = [t["function"]["name"] for t in body.get("tools") or [] if "function" in t]
+    question = "\n".join(_text(m.get("content")) for m in messages if m.get("role") == "user")
+    called = [
+        call["function"]["name"]
+        for m in messages if m.get("role") == "assistant"
+        for call in m.get("tool_calls") or []
+    ]
+
+    def tool_call(name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        return {"id": f"call_{next(_ids)}", "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments, ensure_ascii=False)}}
+
+    # 监督者: 依次转交各助手
+    if any(name.startswith("transfer_to_") for name in tools):
+        for agent in AGENTS:
+            name = f"transfer_to_{agent}"
+            if name in tools and name not in called:
+                return "", [tool_call(name, {})]
+        return _plan(question), []
+
+    # 助手: 上一次调用的是自己的工具时总结结果, 否则调用工具
+    if tools:
+        last = messages[-1] if messages else {}
+        if last.get("role") == "tool" and called and called[-1] in tools:
+            return f"已查询到结果: {_text(last.get('content'))[:300]}", []
+        city = find_city(question) or "北京"
+        if "maps_weather" in tools:
+            return "", [tool_call("maps_weather", {"city": city})]
+        keywords = "酒店" if "local_nearby_search" in tools else "景点"
+        return "", [tool_call("maps_text_search", {"keywords": keywords, "city": city})]
+
+    # 没有工具的调用
+    if "生成详细行程" in question:
+        return _day_plan(question), []
+    if "总体建议" in question:
+        return "1. 提前预约热门景点门票; 2. 早晚温差较大, 注意添加衣物; 3. 优先使用公共交通出行。", []
+    if "```json" in question:
+        start = question.find("```json") + 7
+        return "```json\n" + question[start:question.find("```", start)].strip() + "\n```", []
+    return "好的。", []
+
+
+def _delay(content: str) -> Tuple[float, float]:
+    """(首个token延迟, 生成耗时), 单位秒"""
+    scale = random.lognormvariate(0, options["jitter"])
+    return options["ttft_ms"] / 1000 * scale, len(content) / options["chars_per_sec"] * scale
+
+
+def _usage(body: Dict[str, Any], content: str) -> Dict[str, int]:
+    """按字符数估算token用量"""
+    prompt = sum(len(_text(m.get("content"))) for m in body.get("messages") or []) // 2
+    completion = max(1, len(content) // 2)
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    global _in_flight
+
+    body = await request.json()
+    if options["max_concurrency"] and _in_flight >= options["max_concurrency"]:
+        return JSONResponse(status_code=429, content={"error": {"message": "rate limited", "type": "rate_limit_exceeded"}})
+    if random.random() < options["error_rate"]:
+        return JSONResponse(status_code=500, content={"error": {"message": "internal error", "type": "server_error"}})
+
+    content, tool_calls = respond(body)
+    ttft, generation = _delay(content + json.dumps(tool_calls, ensure_ascii=False) if tool_calls else content)
+    model = body.get("model", "fake-model")
+    completion_id = f"chatcmpl-{next(_ids)}"
+    created = int(time.time())
+
+    if not body.get("stream"):
+        _in_flight += 1
+        try:
+            await asyncio.sleep(ttft + generation)
+        finally:
+            _in_flight -= 1
+        message = {"role": "assistant", "content": content or None}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        return JSONResponse({
+            "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+            "usage": _usage(body, content)
+        })
+
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra) -> str:
+        data = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    async def stream():
+        global _in_flight
+
+        _in_flight += 1
+        try:
+            await asyncio.sleep(ttft)
+            yield chunk({"role": "assistant", "content": ""})
+            if tool_calls:
+                await asyncio.sleep(generation)
+                yield chunk({"tool_calls": [{"index": i, **call} for i, call in enumerate(tool_calls)]})
+            else:
+                pieces = [content[i:i + 200] for i in range(0, len(content), 200)] or [""]
+                for piece in pieces:
+                    await asyncio.sleep(generation / len(pieces))
+                    yield chunk({"content": piece})
+            yield chunk({}, "tool_calls" if tool_calls else "stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                data = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [], "usage": _usage(body, content)}
+                yield f"data: {json.dumps(data)}\n\n"
+            yield "data: [DONE]\n\n"
+        finally:
+            _in_flight -= 1
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI兼容LLM服务的本地替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--ttft-ms", type=float, default=300.0, help="首个token延迟的中位数(毫秒)")
+    parser.add_argument("--chars-per-sec", type=float, default=2000.0, help="生成速度(字符/秒)")
+    parser.add_argument("--jitter", type=float, default=0.3, help="延迟的对数正态分布sigma")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="同时处理的请求数上限, 超过时返回429(0表示不限)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回500的比例")
+    args = parser.parse_args()
+    options.update(ttft_ms=args.ttft_ms, chars_per_sec=args.chars_per_sec, jitter=args.jitter,
+                   max_concurrency=args.max_concurrency, error_rate=args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""压测报告: 饱和点判断和汇总表"""
+
+from typing import Any, Dict, List, Optional
+
+
+def find_saturation(
+    stages: List[Dict[str, Any]],
+    latency_factor: float = 2.0,
+    max_error_rate: float = 0.05,
+    min_gain: float = 0.1,
+    min_samples: int = 5
+) -> Dict[str, Any]:
+    """
+    找出第一个饱和的阶段(阶段按负载从低到高排列)
+    按接口与参考阶段(该接口请求数不少于min_samples的第一个阶段)比较, 混合场景中规划的长延迟和
+    一直失败的接口不影响其他接口的判断。满足任一条件即视为饱和:
+    - 某个接口的错误率比参考阶段高出max_error_rate以上;
+    - 某个接口的p95延迟超过参考阶段的latency_factor倍(两个阶段都有min_samples个成功请求时才比较);
+    - 固定并发: 并发增加后吞吐量的增长不到按比例增长的min_gain;
+    - 固定到达率: 有请求因未完成请求过多而被丢弃。
+    Args:
+        stages: 各阶段的结果(StageStats.summary())
+        latency_factor: p95延迟相对参考阶段的倍数上限
+        max_error_rate: 错误率相对参考阶段的增量上限
+        min_gain: 吞吐量增长相对负载增长的最低比例
+        min_samples: 比较所需的最少请求数
+    Returns:
+        {"saturated", "stage", "reasons", "last_healthy_stage", "peak_goodput_rps", "peak_stage"}
+    """
+    if not stages:
+        return {"saturated": False, "stage": None, "reasons": [], "last_healthy_stage": None,
+                "peak_goodput_rps": 0.0, "peak_stage": None}
+
+    peak = max(stages, key=lambda s: s["goodput_rps"])
+    result = {
+        "saturated": False,
+        "stage": None,
+        "reasons": [],
+        "last_healthy_stage": stages[-1]["label"],
+        "peak_goodput_rps": peak["goodput_rps"],
+        "peak_stage": peak["label"]
+    }
+
+    # 接口 -> 参考阶段中该接口的结果
+    reference: Dict[str, Dict[str, Any]] = {}
+    previous: Optional[Dict[str, Any]] = None
+    for stage in stages:
+        reasons = []
+        for name, endpoint in stage["endpoints"].items():
+            if endpoint["requests"] < min_samples:
+                continue
+            if name not in reference:
+                reference[name] = {**endpoint, "stage": stage["label"]}
+                continue
+            base = reference[name]
+            if endpoint["error_rate"] > base["error_rate"] + max_error_rate:
+                reasons.append(f"{name} 错误率{endpoint['error_rate']:.1%}({base['stage']}为{base['error_rate']:.1%})")
+            if min(base["requests"] - base["errors"], endpoint["requests"] - endpoint["errors"]) < min_samples:
+                continue
+            base_p95, p95 = base["latency_ms"]["p95"], endpoint["latency_ms"]["p95"]
+            if base_p95 > 0 and p95 > base_p95 * latency_factor:
+                reasons.append(f"{name} p95延迟{p95:.0f}ms, 超过{base['stage']}({base_p95:.0f}ms)的{latency_factor:g}倍")
+        if stage["mode"] == "rate" and stage["dropped"]:
+            reasons.append(f"{stage['dropped']}个请求因未完成请求过多被丢弃")
+        if stage["mode"] == "concurrency" and previous is not None and previous["goodput_rps"] > 0:
+            load_growth = stage["load"] / previous["load"] - 1
+            goodput_growth = stage["goodput_rps"] / previous["goodput_rps"] - 1
+            if load_growth > 0 and goodput_growth < load_growth * min_gain:
+                reasons.append(
+                    f"并发增加{load_growth:.0%}, 吞吐量只增加{goodput_growth:.0%}"
+                    f"({previous['goodput_rps']:.2f} -> {stage['goodput_rps']:.2f} req/s)"
+                )
+        if reasons:
+            result.update(
+                saturated=True,
+                stage=stage["label"],
+                reasons=reasons,
+                last_healthy_stage=previous["label"] if previous is not None else None
+            )
+            break
+        previous = stage
+    return result
+
+
+def format_table(report: Dict[str, Any]) -> str:
+    """
+    汇总表: 每个阶段一行, 之后是各接口的明细和饱和点
+    Args:
+        report: 压测报告(包含stages和saturation)
+    Returns:
+        表格文本
+    """
+    lines = [
+        f"场景: {report['meta']['scenario']}  目标: {report['meta']['base_url']}",
+        f"{'阶段':>8} | {'请求':>6} {'成功':>6} {'错误率':>7} {'丢弃':>5} | {'到达(req/s)':>11} {'吞吐(req/s)':>11} {'有效(req/s)':>11} | "
+        f"{'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9} {'max(ms)':>9}"
+    ]
+    for stage in report["stages"]:
+        latency = stage["latency_ms"]
+        lines.append(
+            f"{stage['label']:>8} | {stage['requests']:>6} {stage['ok']:>6} {stage['error_rate']:>7.1%} {stage['dropped']:>5} | "
+            f"{'-' if stage['offered_rps'] is None else format(stage['offered_rps'], '.2f'):>11} "
+            f"{stage['throughput_rps']:>11.2f} {stage['goodput_rps']:>11.2f} | "
+            f"{latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f} {latency['max']:>9.1f}"
+        )
+
+    lines.append("")
+    lines.append(f"{'阶段':>8} {'接口':<12} | {'请求':>6} {'错误率':>7} | {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9} | 错误")
+    for stage in report["stages"]:
+        for name, endpoint in stage["endpoints"].items():
+            latency = endpoint["latency_ms"]
+            errors = ", ".join(f"{kind}×{count}" for kind, count in endpoint["errors_by_kind"].items()) or "-"
+            lines.append(
+                f"{stage['label']:>8} {name:<12} | {endpoint['requests']:>6} {endpoint['error_rate']:>7.1%} | "
+                f"{latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f} | {errors}"
+            )
+
+    saturation = report["saturation"]
+    lines.append("")
+    lines.append(f"最高有效吞吐: {saturation['peak_goodput_rps']:.2f} req/s ({saturation['peak_stage']})")
+    if saturation["saturated"]:
+        lines.append(
+            f"饱和点: {saturation['stage']} (最后一个未饱和的阶段: {saturation['last_healthy_stage'] or '无'}): "
+            + "; ".join(saturation["reasons"])
+        )
+    else:
+        lines.append("所有阶段均未饱和, 可以继续提高负载")
+    return "\n".join(lines)
@@ -0,0 +1,246 @@
+"""压测执行: 固定并发(闭环)和固定到达率(开环)两种加压方式, 按阶段统计结果"""
+
+import asyncio
+import json
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+import httpx
+import numpy as np
+from benchmarks.loadgen.scenarios import OPERATIONS, RequestContext, pick_operation
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """延迟分位数(毫秒)"""
+    if not latencies:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0, "mean": 0.0}
+    values = np.asarray(latencies)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 1),
+        "p95": round(float(p95), 1),
+        "p99": round(float(p99), 1),
+        "max": round(float(values.max()), 1),
+        "mean": round(float(values.mean()), 1)
+    }
+
+
+class StageStats:
+    """一个压测阶段(一档并发或到达率)的统计"""
+
+    def __init__(self, label: str, mode: str, load: float):
+        """
+        初始化
+        Args:
+            label: 阶段名称, 如 c=8 / r=2.0
+            mode: concurrency(固定并发) / rate(固定到达率)
+            load: 并发数或到达率(请求/秒)
+        """
+        self.label = label
+        self.mode = mode
+        self.load = load
+        self.started = time.perf_counter()
+        self.finished = self.started
+        # 接口 -> 成功请求的延迟(毫秒)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.requests: Counter = Counter()
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        # 返回了部分计划的旅行规划请求
+        self.partial = 0
+        # 开环压测时因未完成请求过多而没有发出的请求
+        self.dropped = 0
+        self.max_in_flight = 0
+        # 固定到达率: 发出请求的时间(秒), 吞吐量至少按这段时间计算
+        self.window = 0.0
+
+    def record(self, operation: str, latency_ms: float, error: Optional[str]) -> None:
+        """记录一个请求的结果"""
+        self.requests[operation] += 1
+        if error:
+            self.errors[operation][error] += 1
+        else:
+            self.latencies[operation].append(latency_ms)
+
+    def summary(self) -> Dict[str, Any]:
+        """阶段结果: 吞吐量、错误率、延迟分位数和各接口的明细"""
+        elapsed = max(self.finished - self.started, self.window, 1e-9)
+        total = sum(self.requests.values())
+        errors = sum(sum(c.values()) for c in self.errors.values())
+        all_latencies = [v for values in self.latencies.values() for v in values]
+        error_kinds: Counter = Counter()
+        for counter in self.errors.values():
+            error_kinds.update(counter)
+        endpoints = {}
+        for operation in sorted(self.requests):
+            failed = sum(self.errors[operation].values())
+            endpoints[operation] = {
+                "requests": self.requests[operation],
+                "errors": failed,
+                "error_rate": round(failed / self.requests[operation], 4),
+                "errors_by_kind": dict(self.errors[operation]),
+                "latency_ms": latency_summary(self.latencies[operation])
+            }
+        return {
+            "label": self.label,
+            "mode": self.mode,
+            "load": self.load,
+            "duration_s": round(elapsed, 2),
+            "requests": total,
+            "ok": total - errors,
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "errors_by_kind": dict(error_kinds),
+            "partial_plans": self.partial,
+            "dropped": self.dropped,
+            "max_in_flight": self.max_in_flight,
+            # 固定到达率时实际的到达率(包括丢弃的请求)
+            "offered_rps": round((total + self.dropped) / self.window, 3) if self.window else None,
+            # 完成的请求(包括失败)和成功的请求
+            "throughput_rps": round(total / elapsed, 3),
+            "goodput_rps": round((total - errors) / elapsed, 3),
+            "latency_ms": latency_summary(all_latencies),
+            "endpoints": endpoints
+        }
+
+
+class LoadGenerator:
+    """按场景向应用发出请求"""
+
+    def __init__(
+        self,
+        base_url: str,
+        scenario: str,
+        context: RequestContext,
+        timeout: float = 600.0,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        """
+        初始化
+        Args:
+            base_url: 应用地址
+            scenario: 场景名称
+            context: 请求生成的共用状态
+            timeout: 单个请求的超时时间(秒)
+            headers: 每个请求附带的请求头
+        """
+        self.base_url = base_url.rstrip("/")
+        self.scenario = scenario
+        self.context = context
+        self.timeout = timeout
+        self.headers = headers or {}
+        self._in_flight = 0
+
+    def _client(self, connections: int) -> httpx.AsyncClient:
+        """HTTP客户端(连接数不少于并发数, 避免客户端成为瓶颈)"""
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            headers=self.headers,
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+        )
+
+    async def _send(self, client: httpx.AsyncClient, stats: Optional[StageStats]) -> None:
+        """发出一个请求并记录结果(stats为None时只发请求, 用于预热)"""
+        operation = pick_operation(self.context.rng, self.scenario)
+        build, check = OPERATIONS[operation]
+        request = build(self.context)
+        self._in_flight += 1
+        if stats is not None:
+            stats.max_in_flight = max(stats.max_in_flight, self._in_flight)
+        start = time.perf_counter()
+        error = None
+        body = None
+        try:
+            response = await client.request(
+                request["method"], request["path"], params=request.get("params"), json=request.get("json")
+            )
+            if response.status_code >= 400:
+                error = f"http_{response.status_code}"
+            else:
+                try:
+                    body = response.json()
+                except json.JSONDecodeError:
+                    error = "invalid_json"
+                else:
+                    error = check(body)
+        except httpx.TimeoutException:
+            error = "timeout"
+        except httpx.TransportError as e:
+            error = f"connection:{type(e).__name__}"
+        finally:
+            self._in_flight -= 1
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        if body is not None:
+            self.context.remember_pois(body)
+        if stats is not None:
+            stats.record(operation, latency_ms, error)
+            if operation == "trip_plan" and not error and (body.get("data") or {}).get("partial"):
+                stats.partial += 1
+
+    async def warmup(self, requests: int) -> None:
+        """依次发出预热请求(不计入结果)"""
+        async with self._client(1) as client:
+            for _ in range(requests):
+                await self._send(client, None)
+
+    async def run_concurrency(self, concurrency: int, duration: float, max_requests: int = 0) -> StageStats:
+        """
+        固定并发(闭环): concurrency个虚拟用户各自收到响应后立即发出下一个请求
+        Args:
+            concurrency: 并发数
+            duration: 持续时间(秒), 到时后不再发出新请求, 等待已发出的请求完成
+            max_requests: 本阶段最多发出的请求数(0表示不限)
+        Returns:
+            阶段统计
+        """
+        stats = StageStats(f"c={concurrency}", "concurrency", concurrency)
+        deadline = time.perf_counter() + duration
+        sent = 0
+
+        async def user(client: httpx.AsyncClient) -> None:
+            nonlocal sent
+            while time.perf_counter() < deadline and (not max_requests or sent < max_requests):
+                sent += 1
+                await self._send(client, stats)
+
+        async with self._client(concurrency) as client:
+            await asyncio.gather(*(user(client) for _ in range(concurrency)))
+        stats.finished = time.perf_counter()
+        return stats
+
+    async def run_rate(self, rate: float, duration: float, max_in_flight: int = 256, max_requests: int = 0) -> StageStats:
+        """
+        固定到达率(开环): 请求按泊松过程到达, 不等待之前的请求完成, 延迟包含应用内的排队时间
+        Args:
+            rate: 到达率(请求/秒)
+            duration: 发出请求的时间(秒), 之后等待已发出的请求完成
+            max_in_flight: 未完成请求数上限, 超过时丢弃新到达的请求(计入dropped)
+            max_requests: 本阶段最多发出的请求数(0表示不限)
+        Returns:
+            阶段统计
+        """
+        stats = StageStats(f"r={rate:g}", "rate", rate)
+        stats.window = duration
+        loop = asyncio.get_running_loop()
+        tasks = set()
+        sent = 0
+        async with self._client(max_in_flight) as client:
+            next_arrival = loop.time()
+            deadline = next_arrival + duration
+            while True:
+                next_arrival += self.context.rng.expovariate(rate)
+                if next_arrival >= deadline or (max_requests and sent >= max_requests):
+                    break
+                await asyncio.sleep(max(0.0, next_arrival - loop.time()))
+                if len(tasks) >= max_in_flight:
+                    stats.dropped += 1
+                    continue
+                sent += 1
+                task = asyncio.create_task(self._send(client, stats))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        stats.finished = time.perf_counter()
+        return stats
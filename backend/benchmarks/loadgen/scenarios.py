@@ -0,0 +1,100 @@
+"""压测场景: 各接口的请求生成、响应校验和场景中的接口比例"""
+
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from benchmarks.loadgen.corpus import TripCorpus, make_nearby_query, make_route_request, make_search_query
+
+
+class RequestContext:
+    """生成请求时共用的状态: 随机数、旅行请求语料和搜索结果中出现过的POI ID"""
+
+    def __init__(self, seed: int = 42, repeat_rate: float = 0.0):
+        """
+        初始化
+        Args:
+            seed: 随机种子
+            repeat_rate: 旅行请求重复之前请求的比例
+        """
+        self.rng = random.Random(seed)
+        self.trips = TripCorpus(seed=seed, repeat_rate=repeat_rate)
+        self.poi_ids: List[str] = []
+
+    def remember_pois(self, body: Any) -> None:
+        """记录搜索结果中的POI ID, 供POI详情请求使用(最多保留1000个)"""
+        data = body.get("data") if isinstance(body, dict) else None
+        if isinstance(data, dict):
+            data = data.get("pois")
+        for poi in data or []:
+            if isinstance(poi, dict) and poi.get("id") and len(self.poi_ids) < 1000:
+                self.poi_ids.append(poi["id"])
+
+
+def _check_success(body: Any) -> Optional[str]:
+    """success为true的响应视为成功"""
+    if not isinstance(body, dict) or body.get("success") is not True:
+        return "unsuccessful"
+    return None
+
+
+def _check_plan(body: Any) -> Optional[str]:
+    """旅行计划: 规划失败时接口返回503(计为http_503), 这里再确认成功的响应带有计划"""
+    error = _check_success(body)
+    if error:
+        return error
+    if not body.get("data"):
+        return "empty_plan"
+    return None
+
+
+# 接口: (请求生成函数, 响应校验函数), 请求为 {"method", "path", "params"/"json"}
+OPERATIONS: Dict[str, Tuple[Callable[[RequestContext], Dict[str, Any]], Callable[[Any], Optional[str]]]] = {
+    "trip_plan": (
+        lambda ctx: {"method": "POST", "path": "/api/trip/plan", "json": ctx.trips.next()},
+        _check_plan
+    ),
+    "map_poi": (
+        lambda ctx: {"method": "GET", "path": "/api/map/poi", "params": make_search_query(ctx.rng)},
+        _check_success
+    ),
+    "map_nearby": (
+        lambda ctx: {"method": "GET", "path": "/api/map/poi/nearby", "params": make_nearby_query(ctx.rng)},
+        _check_success
+    ),
+    "map_weather": (
+        lambda ctx: {"method": "GET", "path": "/api/map/weather", "params": {"city": make_search_query(ctx.rng)["city"]}},
+        _check_success
+    ),
+    # 路线规划接口是带请求体的GET
+    "map_route": (
+        lambda ctx: {"method": "GET", "path": "/api/map/route", "json": make_route_request(ctx.rng)},
+        _check_success
+    ),
+    "poi_search": (
+        lambda ctx: {"method": "GET", "path": "/api/poi/search", "params": make_search_query(ctx.rng)},
+        _check_success
+    ),
+    "poi_detail": (
+        lambda ctx: {
+            "method": "GET",
+            "path": f"/api/poi/detail/{ctx.rng.choice(ctx.poi_ids) if ctx.poi_ids else 'B0FFF12345'}"
+        },
+        _check_success
+    ),
+}
+
+# 场景: (说明, [(接口, 权重)])
+SCENARIOS: Dict[str, Tuple[str, List[Tuple[str, int]]]] = {
+    "plan": ("只请求旅行规划", [("trip_plan", 1)]),
+    "map": ("地图接口: 关键词搜索、周边搜索、天气、路线", [("map_poi", 4), ("map_nearby", 3), ("map_weather", 2), ("map_route", 1)]),
+    "poi": ("POI接口: 搜索和详情", [("poi_search", 4), ("poi_detail", 1)]),
+    "mixed": (
+        "前端的典型比例: 每次规划伴随多次地图/POI查询",
+        [("trip_plan", 1), ("map_poi", 3), ("map_nearby", 2), ("map_weather", 2), ("poi_search", 3), ("poi_detail", 1)]
+    ),
+}
+
+
+def pick_operation(rng: random.Random, scenario: str) -> str:
+    """按场景中的权重选择接口"""
+    names, weights = zip(*SCENARIOS[scenario][1])
+    return rng.choices(names, weights=weights)[0]
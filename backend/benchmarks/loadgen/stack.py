@@ -0,0 +1,190 @@
+"""启动使用本地替身的应用(压测时不调用真实的LLM和高德)
+
+- LLM: fake_llm作为OpenAI兼容服务单独运行, 应用的LLM_BASE_URL指向它;
+- 高德: 应用用 uvx amap-mcp-server 启动高德MCP Server(stdio), 这里在临时目录中生成一个uvx脚本
+  启动fake_amap, 并把临时目录放在应用的PATH最前面;
+- 应用: uvicorn运行app.api.main:app, 使用内存检查点, 默认关闭计划缓存和缓存预热(每个请求都完整规划)。
+"""
+
+import logging
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import httpx
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def free_port() -> int:
+    """系统分配的空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_http(url: str, timeout: float, process: Optional[subprocess.Popen] = None) -> None:
+    """
+    等待URL返回200
+    Args:
+        url: 检查的URL
+        timeout: 最长等待时间(秒)
+        process: 对应的子进程, 提前退出时报错
+    """
+    deadline = time.monotonic() + timeout
+    last_error = ""
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"进程已退出(退出码{process.returncode}): {url}")
+        try:
+            response = httpx.get(url, timeout=2)
+            if response.status_code == 200:
+                return
+            last_error = f"HTTP {response.status_code} {response.text[:200]}"
+        except httpx.HTTPError as e:
+            last_error = str(e)
+        time.sleep(0.5)
+    raise TimeoutError(f"等待{url}超时: {last_error}")
+
+
+class LocalStack:
+    """使用本地LLM和高德替身的应用"""
+
+    def __init__(
+        self,
+        llm_args: Optional[List[str]] = None,
+        amap_args: Optional[List[str]] = None,
+        workers: int = 1,
+        env: Optional[Dict[str, str]] = None,
+        log_dir: Optional[str] = None
+    ):
+        """
+        初始化
+        Args:
+            llm_args: fake_llm的命令行参数(如 --ttft-ms 300)
+            amap_args: fake_amap的命令行参数(如 --latency-ms 80)
+            workers: 应用的uvicorn worker数量
+            env: 应用额外的环境变量(覆盖默认值, 用于对比不同配置)
+            log_dir: 应用和替身日志的目录, 默认临时目录
+        """
+        self.llm_args = llm_args or []
+        self.amap_args = amap_args or []
+        self.workers = workers
+        self.env = env or {}
+        self._tmp = tempfile.TemporaryDirectory(prefix="loadgen-")
+        self.log_dir = Path(log_dir or self._tmp.name)
+        self.processes: List[subprocess.Popen] = []
+        self._logs = []
+        self.base_url = ""
+
+    def _spawn(self, name: str, args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+        """启动子进程, 输出写入日志文件"""
+        log = open(self.log_dir / f"{name}.log", "wb")
+        self._logs.append(log)
+        process = subprocess.Popen(args, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        self.processes.append(process)
+        return process
+
+    def _write_uvx(self) -> Path:
+        """生成启动fake_amap的uvx脚本, 返回所在目录"""
+        bin_dir = Path(self._tmp.name) / "bin"
+        bin_dir.mkdir(exist_ok=True)
+        uvx = bin_dir / "uvx"
+        # MCP客户端只向子进程传递PATH等少数环境变量, 参数直接写在脚本中
+        command = [sys.executable, "-m", "benchmarks.loadgen.fake_amap", *self.amap_args]
+        uvx.write_text(
+            "#!/bin/sh\n"
+            f"cd {shlex.quote(str(BACKEND_DIR))}\n"
+            f"exec {' '.join(shlex.quote(c) for c in command)}\n"
+        )
+        uvx.chmod(0o755)
+        return bin_dir
+
+    def start(self, timeout: float = 120.0) -> str:
+        """
+        启动替身和应用, 等待应用就绪
+        Args:
+            timeout: 等待应用就绪的最长时间(秒)
+        Returns:
+            应用的地址
+        """
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        llm_port, app_port = free_port(), free_port()
+        base_env = {**os.environ, "PYTHONPATH": str(BACKEND_DIR)}
+
+        llm = self._spawn(
+            "fake_llm",
+            [sys.executable, "-m", "benchmarks.loadgen.fake_llm", "--port", str(llm_port), *self.llm_args],
+            base_env
+        )
+        wait_http(f"http://127.0.0.1:{llm_port}/docs", 30, llm)
+
+        app_env = {
+            **base_env,
+            "PATH": f"{self._write_uvx()}{os.pathsep}{os.environ.get('PATH', '')}",
+            "LLM_MODEL_ID": "fake-model",
+            "LLM_API_KEY": "loadgen",
+            "LLM_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+            "LLM_TOOL_MODEL_ID": "",
+            "LLM_TOOL_API_KEY": "",
+            "LLM_TOOL_BASE_URL": "",
+            "LLM_ENDPOINTS": "",
+            "LLM_HEDGE_ENABLED": "false",
+            "AMAP_API_KEY": "loadgen",
+            "AMAP_API_KEYS": "",
+            # 替身没有配额限制, 放开本地限流, 压测的是应用本身
+            "AMAP_QPS": "1000",
+            "AMAP_DAILY_QUOTA": "100000000",
+            "AMAP_QUOTA_PATH": str(Path(self._tmp.name) / "amap_quota.db"),
+            "CHECKPOINT_BACKEND": "memory",
+            "PLAN_CACHE_TTL": "0",
+            "PREWARM_CITIES": "",
+            "PREWARM_LEARNED_CITIES": "0",
+            "UNSPLASH_ACCESS_KEY": "",
+            "LOG_LEVEL": "WARNING",
+            "LOG_FORMAT": "text",
+            **self.env
+        }
+        app = self._spawn(
+            "app",
+            [sys.executable, "-m", "uvicorn", "app.api.main:app", "--host", "127.0.0.1", "--port", str(app_port),
+             "--workers", str(self.workers), "--log-level", "warning", "--no-access-log"],
+            app_env
+        )
+        self.base_url = f"http://127.0.0.1:{app_port}"
+        try:
+            wait_http(f"{self.base_url}/readyz", timeout, app)
+        except Exception:
+            self.stop()
+            raise
+        logger.info(f"✅ 本地替身和应用已就绪: {self.base_url} (日志目录: {self.log_dir})")
+        return self.base_url
+
+    def stop(self) -> None:
+        """停止应用和替身"""
+        for process in reversed(self.processes):
+            if process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        self.processes.clear()
+        for log in self._logs:
+            log.close()
+        self._logs.clear()
+
+    def __enter__(self) -> "LocalStack":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+        self._tmp.cleanup()
@@ -0,0 +1,101 @@
+"""高德配额: 多个worker共用令牌桶和每日用量"""
+
+import asyncio
+import pytest
+from app.agents import tools
+from app.services import amap_quota
+from app.services.amap_quota import AmapQuotaManager, QuotaExceededError, QuotaStore
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def waits(monkeypatch):
+    """记录排队等待的时间(不实际等待)"""
+    recorded = []
+
+    async def fake_sleep(seconds):
+        recorded.append(seconds)
+
+    monkeypatch.setattr(amap_quota.asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+def _workers(tmp_path, count: int = 2):
+    """同一个SQLite文件上的多个配额管理实例(模拟多个worker)"""
+    path = str(tmp_path / "quota.db")
+    return [AmapQuotaManager(["key"], QuotaStore(path)) for _ in range(count)]
+
+
+def test_workers_share_bucket(tmp_path, waits):
+    first, second = _workers(tmp_path)
+    qps = first.default_qps
+
+    async def run():
+        for _ in range(int(qps)):
+            await first.acquire("maps_weather")
+            await second.acquire("maps_weather")
+
+    asyncio.run(run())
+    # 突发容量为qps, 两个worker合计超出的调用按1/qps的间隔排队
+    assert len(waits) == int(qps)
+    assert waits[-1] == pytest.approx(int(qps) / qps, abs=0.05)
+
+
+def test_usage_visible_to_other_workers(tmp_path, waits, monkeypatch):
+    monkeypatch.setattr(amap_quota, "USAGE_REFRESH", 0.0)
+    first, second = _workers(tmp_path)
+    first.default_daily = second.default_daily = 2
+
+    async def run():
+        first.record_sent(await first.acquire("maps_weather"), "maps_weather")
+        first.record_sent(await first.acquire("maps_weather"), "maps_weather")
+        await second.acquire("maps_weather")
+
+    with pytest.raises(QuotaExceededError):
+        asyncio.run(run())
+
+
+def _used(manager: AmapQuotaManager, tool: str = "maps_weather") -> int:
+    return manager.status()["usage"][manager.key_ids[0]].get(tool, {}).get("used", 0)
+
+
+def test_usage_counted_only_for_sent_calls(tmp_path, waits, monkeypatch):
+    manager, = _workers(tmp_path, 1)
+    breaker = CircuitBreaker("amap", failure_threshold=1, reset_timeout=60)
+    monkeypatch.setattr(tools, "get_quota_manager", lambda: manager)
+    monkeypatch.setattr(tools, "get_breaker", lambda name: breaker)
+    responses = iter(['{"info": "CUQPS_HAS_EXCEEDED_THE_LIMIT"}', '{"status": "1"}'])
+
+    async def call(**kwargs):
+        return next(responses)
+
+    class Tool:
+        name = "maps_weather"
+
+    tool = tools._with_quota(Tool(), [call])
+    # 第一次被高德QPS限流拒绝, 重试成功: 只计入一次
+    assert asyncio.run(tool.coroutine(city="北京")) == '{"status": "1"}'
+    assert _used(manager) == 1
+
+    # 熔断时调用没有发出, 不计入
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(tool.coroutine(city="北京"))
+    assert _used(manager) == 1
+
+
+def test_cancelled_while_queued_not_counted(tmp_path, monkeypatch):
+    manager, = _workers(tmp_path, 1)
+    monkeypatch.setattr(manager, "default_qps", 1.0)
+
+    async def run():
+        manager.record_sent(await manager.acquire("maps_weather"), "maps_weather")
+        # 第二次预约需要排队约1秒, 排队时取消
+        queued = asyncio.ensure_future(manager.acquire("maps_weather"))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+    asyncio.run(run())
+    assert _used(manager) == 1
@@ -0,0 +1,131 @@
+"""内存检查点存储: 按大小淘汰线程、写入本地文件后读回、删除线程和大小统计"""
+
+import asyncio
+import operator
+from typing import Annotated, List, TypedDict
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.graph import END, START, StateGraph
+from app.services.checkpoint_memory import BoundedMemorySaver, SpillStore
+
+PAYLOAD = "景点" * 2000
+
+
+class State(TypedDict):
+    items: Annotated[List[str], operator.add]
+
+
+def _graph(saver: BoundedMemorySaver):
+    graph = StateGraph(State)
+    graph.add_node("step", lambda state: {"items": [PAYLOAD]})
+    graph.add_edge(START, "step")
+    graph.add_edge("step", END)
+    return graph.compile(checkpointer=saver)
+
+
+def _config(thread_id: str):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def _run(app, *thread_ids: str) -> None:
+    async def run():
+        for thread_id in thread_ids:
+            await app.ainvoke({"items": []}, _config(thread_id))
+
+    asyncio.run(run())
+
+
+def _saver(tmp_path, max_bytes: int, spill: bool = True) -> BoundedMemorySaver:
+    store = SpillStore(str(tmp_path / "checkpoints.db"), 64 * 1024 * 1024) if spill else None
+    return BoundedMemorySaver(max_bytes=max_bytes, spill=store)
+
+
+def _put(saver: BoundedMemorySaver, thread_id: str, value: str):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"items": value}
+    checkpoint["channel_versions"] = {"items": 1}
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    return saver.put(config, checkpoint, {}, {"items": 1})
+
+
+def test_evicts_least_recently_used_thread_over_max_bytes(tmp_path):
+    saver = _saver(tmp_path, max_bytes=60_000, spill=False)
+    app = _graph(saver)
+    _run(app, "a", "b")
+    one_thread = saver.stats()["bytes"] // 2
+    saver.max_bytes = int(one_thread * 2.5)
+    # 访问a后a是最近使用的, 写入c时淘汰b
+    saver.get_tuple(_config("a"))
+    _run(app, "c")
+
+    stats = saver.stats()
+    assert stats["evicted"] == 1
+    assert stats["bytes"] <= saver.max_bytes
+    assert set(saver._sizes) == {"a", "c"}
+    assert "b" not in saver.storage
+    assert not any(key[0] == "b" for key in list(saver.blobs) + list(saver.writes))
+
+
+def test_spilled_thread_restored_through_aget_state(tmp_path):
+    saver = _saver(tmp_path, max_bytes=1)
+    app = _graph(saver)
+    _run(app, "a", "b")
+    # 上限只容得下正在写入的线程, a已被写入本地文件
+    assert list(saver._sizes) == ["b"]
+    assert saver.stats()["spill"]["threads"] == 1
+
+    state = asyncio.run(app.aget_state(_config("a")))
+    assert state.values["items"] == [PAYLOAD]
+    assert saver.restored == 1
+    # 读回的a成为最近使用的线程, b被写入本地文件
+    assert list(saver._sizes) == ["a"]
+    assert saver.stats()["spill"]["threads"] == 1
+
+
+def test_delete_thread_in_memory_and_spilled(tmp_path):
+    saver = _saver(tmp_path, max_bytes=1)
+    app = _graph(saver)
+    _run(app, "a", "b")
+
+    saver.delete_thread("a")
+    saver.delete_thread("b")
+    assert saver.stats()["bytes"] == 0
+    assert saver.stats()["spill"]["threads"] == 0
+    assert asyncio.run(app.aget_state(_config("a"))).values == {}
+    # 读取不存在的线程不留下空条目
+    assert "a" not in saver.storage and "a" not in saver._sizes
+
+
+def test_byte_accounting_across_put_writes_and_restore(tmp_path):
+    saver = _saver(tmp_path, max_bytes=10 * 1024 * 1024)
+    config = _put(saver, "a", PAYLOAD)
+    after_put = saver.stats()["bytes"]
+    assert after_put > len(PAYLOAD.encode("utf-8"))
+
+    saver.put_writes(config, [("items", PAYLOAD)], task_id="task-1")
+    after_writes = saver.stats()["bytes"]
+    assert after_writes > after_put + len(PAYLOAD.encode("utf-8"))
+    # 同一任务的相同写入不重复计数
+    saver.put_writes(config, [("items", PAYLOAD)], task_id="task-1")
+    assert saver.stats()["bytes"] == after_writes
+
+    # 写入本地文件再读回后, 大小与原来一致
+    saver.max_bytes = 1
+    _put(saver, "b", "x")
+    assert "a" not in saver._sizes
+    b_bytes = saver.stats()["bytes"]
+    saver.max_bytes = 10 * 1024 * 1024
+    assert saver.get_tuple(config) is not None
+    assert saver._sizes["a"] == after_writes
+    assert saver.stats()["bytes"] == after_writes + b_bytes
+
+
+def test_evict_keeps_thread_being_written(tmp_path):
+    saver = _saver(tmp_path, max_bytes=1, spill=False)
+    _put(saver, "a", PAYLOAD)
+    # 单个线程就超过上限时也不淘汰正在写入的线程
+    assert list(saver._sizes) == ["a"]
+    _put(saver, "b", PAYLOAD)
+    _put(saver, "a", PAYLOAD)
+    assert list(saver._sizes) == ["a"]
+    assert saver.evicted == 2
+    assert saver.stats()["bytes"] == saver._sizes["a"]
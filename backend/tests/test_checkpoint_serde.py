@@ -0,0 +1,85 @@
+"""检查点序列化: 默认序列化器写入的旧检查点和compact格式的新检查点都能读回"""
+
+import asyncio
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from app.services.checkpoint_serde import (
+    PAYLOAD_CHANNEL,
+    CompactPostgresSaver,
+    CompactSerializer,
+    _payload_sink,
+    _select_with_payloads,
+)
+
+THREAD, NS = "thread-1", ""
+TOOL_RESULT = '{"pois": [' + ", ".join(f'{{"name": "景点{i}", "location": "116.{i:03d},39.9"}}' for i in range(200)) + "]}"
+
+
+def _messages(step: int):
+    return [
+        HumanMessage(content="规划北京三日游", id="h1"),
+        ToolMessage(content=TOOL_RESULT, tool_call_id="call-1", name="maps_text_search", id="t1"),
+        AIMessage(content=f"第{step}步", id=f"a{step}"),
+    ]
+
+
+def _row(blobs, payloads=None):
+    """模拟SELECT_SQL查询出的一行(bytea列为bytes)"""
+    return {
+        "thread_id": THREAD,
+        "checkpoint_ns": NS,
+        "checkpoint_id": "1",
+        "parent_checkpoint_id": None,
+        "checkpoint": {"v": 1, "id": "1", "ts": "", "channel_versions": {}, "versions_seen": {}},
+        "metadata": {},
+        "channel_values": [(c.encode(), t.encode(), b) for _, _, c, _, t, b in blobs],
+        "pending_writes": [],
+        "payloads": [(c.encode(), t.encode(), b) for _, _, c, _, t, b in payloads or []],
+    }
+
+
+def _dump(saver, step: int):
+    """按CompactPostgresSaver.aput的方式序列化一个检查点, 返回(通道值的行, 工具结果的行)"""
+    sink = {}
+    token = _payload_sink.set(sink)
+    try:
+        rows = saver._dump_blobs(THREAD, NS, {"messages": _messages(step)}, {"messages": str(step)})
+    finally:
+        _payload_sink.reset(token)
+    saver._mark_written(THREAD, NS, list(sink))
+    blobs = [r for r in rows if not r[2].startswith(PAYLOAD_CHANNEL)]
+    payloads = [r for r in rows if r[2].startswith(PAYLOAD_CHANNEL)]
+    return blobs, payloads
+
+
+def test_select_sql_patched():
+    assert "as payloads" in CompactPostgresSaver.SELECT_SQL
+    with pytest.raises(RuntimeError):
+        _select_with_payloads("select * from checkpoint_rows")
+
+
+def test_round_trip_old_and_compact_rows():
+    async def run():
+        serde = CompactSerializer(compress_min_size=64, dedupe_min_size=256)
+        saver = CompactPostgresSaver(None, serde=serde)
+
+        # 旧检查点: 默认序列化器写入, 没有单独保存的工具结果
+        type_, data = JsonPlusSerializer().dumps_typed(_messages(0))
+        old = await saver._load_checkpoint_tuple(_row([(THREAD, NS, "messages", "0", type_, data)]))
+        assert old.checkpoint["channel_values"]["messages"] == _messages(0)
+
+        # 新检查点: 工具结果替换为引用并单独保存一次
+        blobs, payloads = _dump(saver, 1)
+        assert blobs[0][4].endswith(f"+{serde.codec}")
+        assert len(payloads) == 1
+        first = await saver._load_checkpoint_tuple(_row(blobs, payloads))
+        assert first.checkpoint["channel_values"]["messages"] == _messages(1)
+
+        # 同一线程的下一个检查点只保存引用, 读取时使用之前保存的工具结果
+        blobs, new_payloads = _dump(saver, 2)
+        assert new_payloads == []
+        second = await saver._load_checkpoint_tuple(_row(blobs, payloads))
+        assert second.checkpoint["channel_values"]["messages"] == _messages(2)
+
+    asyncio.run(run())
@@ -0,0 +1,121 @@
+"""熔断器状态机和LLM流式请求的试探名额释放"""
+
+import asyncio
+import pytest
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_openai import ChatOpenAI
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.llm_client import ResilientChatOpenAI
+
+
+def _open_breaker(reset_timeout: float = 0.0) -> CircuitBreaker:
+    """连续失败到阈值后打开的熔断器"""
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=reset_timeout)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_threshold():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_success_resets_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_rejects_while_open():
+    breaker = _open_breaker(reset_timeout=60)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.rejected == 1
+
+
+def test_half_open_allows_single_probe():
+    breaker = _open_breaker()
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_probe_success_closes():
+    breaker = _open_breaker()
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_probe_failure_reopens():
+    breaker = _open_breaker()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_cancelled_call_releases_probe():
+    breaker = _open_breaker()
+
+    async def run():
+        task = asyncio.ensure_future(breaker.call(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert breaker.state == "half_open"
+    breaker.before_call()
+
+
+def test_closed_stream_releases_probe(monkeypatch):
+    breaker = _open_breaker()
+    monkeypatch.setitem(circuit_breaker._breakers, "test", breaker)
+
+    async def fake_astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for text in ("a", "b", "c"):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+    monkeypatch.setattr(ChatOpenAI, "_astream", fake_astream)
+    llm = ResilientChatOpenAI(api_key="test", model="test", breaker_name="test")
+
+    async def run():
+        stream = llm._stream_once([HumanMessage(content="hi")], None, None)
+        await stream.__anext__()
+        # 调用方只读取了首个token就关闭流(如对冲请求先返回)
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert breaker.state == "half_open"
+    breaker.before_call()
+
+
+def test_finished_stream_closes_breaker(monkeypatch):
+    breaker = _open_breaker()
+    monkeypatch.setitem(circuit_breaker._breakers, "test", breaker)
+
+    async def fake_astream(self, messages, stop=None, run_manager=None, **kwargs):
+        yield ChatGenerationChunk(message=AIMessageChunk(content="a"))
+
+    monkeypatch.setattr(ChatOpenAI, "_astream", fake_astream)
+    llm = ResilientChatOpenAI(api_key="test", model="test", breaker_name="test")
+
+    async def run():
+        return [chunk async for chunk in llm._stream_once([HumanMessage(content="hi")], None, None)]
+
+    assert len(asyncio.run(run())) == 1
+    assert breaker.state == "closed"
@@ -0,0 +1,110 @@
+"""响应压缩中间件和强ETag: gzip/不压缩、带编码后缀的304、流式响应逐块flush、最小压缩大小"""
+
+import asyncio
+import json
+import zlib
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.api.compression import CompressionMiddleware
+from app.api.responses import etag_for, etag_response, dumps
+
+PLAN = {"days": [{"day_index": i, "description": "游览故宫、景山公园和北海公园" * 20} for i in range(5)]}
+LINES = [{"type": "progress", "step": i, "message": "正在规划第%d天" % i} for i in range(3)]
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=256)
+
+    @app.get("/plan")
+    async def plan(request: Request):
+        return etag_response(request, PLAN)
+
+    @app.get("/small")
+    async def small(request: Request):
+        return etag_response(request, {"ok": True})
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for line in LINES:
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+def test_gzip_and_identity():
+    client = TestClient(_app())
+    plain = client.get("/plan", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] == etag_for(dumps(PLAN))
+    assert plain.json() == PLAN
+
+    compressed = client.get("/plan", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in compressed.headers["vary"].lower()
+    assert int(compressed.headers["content-length"]) < len(plain.content)
+    # 压缩后的响应使用带编码后缀的ETag
+    assert compressed.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert compressed.json() == PLAN
+
+
+def test_not_modified_returns_client_suffixed_etag():
+    client = TestClient(_app())
+    etag = client.get("/plan", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+    assert etag.endswith('-gzip"')
+
+    response = client.get("/plan", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    # 内容变化(客户端的ETag不匹配)时返回完整的响应
+    stale = client.get("/plan", headers={"Accept-Encoding": "gzip", "If-None-Match": '"stale-gzip"'})
+    assert stale.status_code == 200
+    assert stale.json() == PLAN
+
+
+def test_small_response_not_compressed():
+    client = TestClient(_app())
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == etag_for(dumps({"ok": True}))
+    assert response.json() == {"ok": True}
+
+
+def test_ndjson_stream_compressed_incrementally():
+    client = TestClient(_app())
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        body = b"".join(response.iter_raw())
+    assert zlib.decompress(body, 31).decode("utf-8").splitlines() == [json.dumps(l, ensure_ascii=False) for l in LINES]
+
+
+def test_each_stream_chunk_decodable_when_sent():
+    """每个压缩块发出时都已flush, 客户端不用等到响应结束就能解出对应的NDJSON行"""
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/x-ndjson")]})
+        for i, line in enumerate(LINES):
+            body = (json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8")
+            await send({"type": "http.response.body", "body": body, "more_body": i < len(LINES) - 1})
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=1024)(scope, receive, send))
+
+    chunks = [m["body"] for m in sent if m["type"] == "http.response.body"]
+    assert len(chunks) == len(LINES)
+    decoder = zlib.decompressobj(31)
+    for chunk, line in zip(chunks, LINES):
+        assert decoder.decompress(chunk).decode("utf-8") == json.dumps(line, ensure_ascii=False) + "\n"
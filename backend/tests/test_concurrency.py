@@ -0,0 +1,80 @@
+"""相同调用合并: 调用方取消时不影响其他调用方"""
+
+import asyncio
+import pytest
+from app.services.concurrency import SingleFlight
+
+
+def test_shares_result():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", fetch) for _ in range(3)))
+
+    assert asyncio.run(run()) == ["ok", "ok", "ok"]
+    assert calls == 1
+    assert flight.shared == 2
+
+
+def test_cancelled_leader_does_not_cancel_follower():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await follower == "ok"
+        assert not follower.cancelled()
+
+    asyncio.run(run())
+
+
+def test_all_waiters_cancelled_cancels_call():
+    flight = SingleFlight()
+    finished = []
+
+    async def fetch():
+        await asyncio.sleep(1)
+        finished.append(True)
+
+    async def run():
+        waiters = [asyncio.ensure_future(flight.do("key", fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert not flight._inflight
+
+    asyncio.run(run())
+    assert finished == []
+
+
+def test_exception_shared_and_key_released():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert not flight._inflight
+
+    asyncio.run(run())
@@ -0,0 +1,79 @@
+"""行程路线优化: 固定起终点、2-opt不增加距离、午餐插入绕路最少的位置"""
+
+import random
+from app.models.schemas import Attraction, DayPlan, Hotel, Location, Meal
+from app.services.itinerary_optimizer import (
+    ItineraryOptimizer,
+    _insert_lunch,
+    build_distance_matrix,
+    day_stops,
+    haversine,
+)
+
+
+def _loc(lng: float, lat: float) -> Location:
+    return Location(longitude=lng, latitude=lat)
+
+
+def _attraction(name: str, lng: float, lat: float) -> Attraction:
+    return Attraction(name=name, address="", location=_loc(lng, lat), visit_duration=60, description="")
+
+
+def _day(attractions, meals=(), hotel=None) -> DayPlan:
+    return DayPlan(
+        date="2025-06-01", day_index=0, description="", transportation="公共交通", accommodation="经济型酒店",
+        hotel=hotel, attractions=list(attractions), meals=list(meals)
+    )
+
+
+def _path_length(route, matrix) -> float:
+    return sum(matrix[route[k]][route[k + 1]] for k in range(len(route) - 1))
+
+
+def test_fixed_start_and_end_stay_in_place():
+    # 景点自西向东排列, 早餐在最东边, 晚餐在最西边: 路线应从东向西
+    attractions = [_attraction(f"景点{i}", 116.30 + i * 0.02, 39.90) for i in (2, 0, 3, 1)]
+    meals = [
+        Meal(type="breakfast", name="早餐", location=_loc(116.40, 39.90)),
+        Meal(type="dinner", name="晚餐", location=_loc(116.28, 39.90)),
+    ]
+    hotel = Hotel(name="酒店", location=_loc(116.34, 39.95))
+    day = ItineraryOptimizer(time_budget_ms=50).optimize_day(_day(attractions, meals, hotel))
+
+    assert [a.name for a in day.attractions] == ["景点3", "景点2", "景点1", "景点0"]
+    stops = [name for name, _ in day_stops(day)]
+    assert stops[0] == stops[-1] == "酒店"
+    assert stops[1] == "早餐" and stops[-2] == "晚餐"
+    assert day.travel_distance > 0
+
+
+def test_two_opt_never_increases_distance():
+    rng = random.Random(7)
+    optimizer = ItineraryOptimizer(time_budget_ms=50)
+    for _ in range(20):
+        n = rng.randint(3, 9)
+        points = [_loc(116.2 + rng.random() * 0.3, 39.8 + rng.random() * 0.2) for _ in range(n + 2)]
+        matrix = build_distance_matrix(points)
+        start, end = n, n + 1
+        route = [start] + rng.sample(range(n), n) + [end]
+        before = _path_length(route, matrix)
+        improved = optimizer._two_opt(list(route), matrix, 1, len(route) - 2)
+        assert _path_length(improved, matrix) <= before + 1e-6
+        # 固定的起终点不参与翻转
+        assert improved[0] == start and improved[-1] == end
+        assert sorted(improved) == sorted(route)
+
+
+def test_lunch_inserted_at_cheapest_detour():
+    stops = [("A", _loc(116.30, 39.90)), ("B", _loc(116.35, 39.90)), ("C", _loc(116.40, 39.90))]
+    lunch = ("午餐", _loc(116.38, 39.901))
+    assert [name for name, _ in _insert_lunch(stops, lunch)] == ["A", "B", "午餐", "C"]
+
+    # 与逐个位置计算绕路距离的结果一致
+    def detour(k):
+        prev, nxt = stops[k - 1][1], stops[k][1]
+        return haversine(prev, lunch[1]) + haversine(lunch[1], nxt) - haversine(prev, nxt)
+
+    assert min(range(1, len(stops)), key=detour) == 2
+    # 景点不足两个时午餐放在最后
+    assert [name for name, _ in _insert_lunch(stops[:1], lunch)] == ["A", "午餐"]
@@ -0,0 +1,87 @@
+"""对冲阈值样本和对冲调用的计数"""
+
+import asyncio
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from app.services import llm_hedging
+from app.services.llm_client import ResilientChatOpenAI
+from app.services.llm_hedging import MIN_SAMPLES, Hedger
+
+
+def _hedger(initial_delay: float = 0.05) -> Hedger:
+    return Hedger("test", quantile=0.95, min_delay=0.0, initial_delay=initial_delay)
+
+
+def test_hedge_won_keeps_censored_sample():
+    hedger = _hedger()
+    for _ in range(MIN_SAMPLES):
+        hedger.observe(0.1)
+    # 一半的调用主请求很慢, 由对冲请求先返回; 截尾样本不小于当时的耗时, 阈值不会偏低
+    for _ in range(MIN_SAMPLES):
+        hedger.record_hedge(1.0, hedge_won=True)
+    assert hedger.delay() >= 1.0
+    snapshot = hedger.snapshot()
+    assert snapshot["calls"] == 2 * MIN_SAMPLES
+    assert snapshot["fired"] == MIN_SAMPLES
+    assert snapshot["samples"] == 2 * MIN_SAMPLES
+
+
+def test_primary_win_after_hedge_counted_once(monkeypatch):
+    hedger = _hedger(initial_delay=0.02)
+    monkeypatch.setitem(llm_hedging._hedgers, "test", hedger)
+    delays = iter([0.1, 1.0])
+
+    async def fake_generate_once(self, messages, stop, run_manager, **kwargs):
+        # 主请求0.1秒返回, 对冲请求更慢
+        await asyncio.sleep(next(delays))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+    monkeypatch.setattr(ResilientChatOpenAI, "_generate_once", fake_generate_once)
+    llm = ResilientChatOpenAI(api_key="test", model="test", hedge_role="test")
+    result = asyncio.run(llm._hedged_generate([HumanMessage(content="hi")], None, None))
+
+    assert result.generations[0].message.content == "ok"
+    snapshot = hedger.snapshot()
+    assert snapshot["calls"] == 1
+    assert snapshot["fired"] == 1
+    assert snapshot["hedge_wins"] == 0
+    assert snapshot["samples"] == 1
+    # 主请求胜出, 它的延迟就是不对冲时的延迟
+    assert snapshot["unhedged_p95_ms"] == snapshot["first_token_p95_ms"]
+
+
+def test_sampled_loser_measures_time_saved(monkeypatch):
+    hedger = Hedger("test", quantile=0.95, min_delay=0.0, initial_delay=0.02, loser_sample_rate=1.0)
+    monkeypatch.setitem(llm_hedging._hedgers, "test", hedger)
+    delays = iter([0.3, 0.05])
+
+    async def fake_generate_once(self, messages, stop, run_manager, **kwargs):
+        # 主请求0.3秒返回, 对冲请求0.05秒返回
+        await asyncio.sleep(next(delays))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+    async def run():
+        llm = ResilientChatOpenAI(api_key="test", model="test", hedge_role="test")
+        result = await llm._hedged_generate([HumanMessage(content="hi")], None, None)
+        # 采样的主请求没有被取消, 在后台运行到返回
+        await asyncio.sleep(0.4)
+        return result
+
+    monkeypatch.setattr(ResilientChatOpenAI, "_generate_once", fake_generate_once)
+    assert asyncio.run(run()).generations[0].message.content == "ok"
+    snapshot = hedger.snapshot()
+    assert snapshot["hedge_wins"] == 1
+    assert snapshot["loser_samples"] == 1
+    # 对冲请求约在0.07秒返回, 主请求约在0.3秒返回
+    assert 150 < snapshot["avg_saved_ms"] < 300
+    assert snapshot["unhedged_p95_ms"] >= 300 > snapshot["first_token_p95_ms"]
+
+
+def test_unhedged_quantile_unknown_without_loser_samples():
+    hedger = _hedger()
+    hedger.observe(0.1)
+    hedger.record_hedge(1.0, hedge_won=True)
+    snapshot = hedger.snapshot()
+    # 对冲胜出的调用没有采样, 不对冲时的延迟缺少慢尾
+    assert snapshot["unhedged_p95_ms"] is None
+    assert snapshot["first_token_p99_ms"] is not None
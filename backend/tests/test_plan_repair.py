@@ -0,0 +1,86 @@
+"""计划修复: 对齐day_index/日期、数字字段转换、重新计算预算、删除多出的天"""
+
+from app.models.schemas import TripRequest
+from app.services.plan_repair import PlanRepairer, to_int
+
+
+def _request(travel_days: int = 2) -> TripRequest:
+    return TripRequest(
+        city="北京", start_date="2025-06-01", end_date=f"2025-06-0{travel_days}", travel_days=travel_days,
+        transportation="公共交通", accommodation="经济型酒店"
+    )
+
+
+def _day(day_index, date="", ticket="0", meal_cost="0", hotel_cost=None):
+    day = {
+        "day_index": day_index,
+        "date": date,
+        "attractions": [{
+            "name": "故宫", "address": "景山前街4号", "location": "116.397128,39.916527",
+            "visit_duration": "90分钟", "ticket_price": ticket,
+        }],
+        "meals": [{"type": "lunch", "name": "全聚德", "estimated_cost": meal_cost}],
+    }
+    if hotel_cost is not None:
+        day["hotel"] = {"name": "如家", "estimated_cost": hotel_cost, "rating": 4.5}
+    return day
+
+
+def _plan(days, budget=None):
+    return {"city": "北京", "days": days, "overall_suggestions": "", "budget": budget or {}}
+
+
+def test_days_realigned_to_start_date():
+    # LLM输出的天乱序、序号从1开始、日期错误
+    plan, errors = PlanRepairer().repair(_plan([_day(2, "2025-07-02"), _day(1, "2025-07-01")]), _request())
+    assert errors == []
+    assert [(d.day_index, d.date) for d in plan.days] == [(0, "2025-06-01"), (1, "2025-06-02")]
+    assert plan.start_date == "2025-06-01" and plan.end_date == "2025-06-02"
+
+
+def test_numeric_fields_coerced():
+    plan, errors = PlanRepairer().repair(
+        _plan([_day(0, ticket="60元", meal_cost="约80元", hotel_cost="300元/晚"), _day(1, ticket="免费")]),
+        _request()
+    )
+    assert errors == []
+    first = plan.days[0]
+    assert first.attractions[0].ticket_price == 60
+    assert first.attractions[0].visit_duration == 90
+    assert first.attractions[0].location.longitude == 116.397128
+    assert first.meals[0].estimated_cost == 80
+    assert first.hotel.estimated_cost == 300 and first.hotel.rating == "4.5"
+    assert plan.days[1].attractions[0].ticket_price == 0
+    assert to_int("15~20") == 15 and to_int(True, default=-1) == -1
+
+
+def test_budget_recomputed_from_items():
+    plan, _ = PlanRepairer().repair(
+        _plan(
+            [_day(0, ticket="60", meal_cost="80", hotel_cost=300), _day(1, ticket=40, meal_cost=20)],
+            budget={"total_attractions": 1, "total": "9999元", "total_transportation": "50元"}
+        ),
+        _request()
+    )
+    budget = plan.budget
+    assert (budget.total_attractions, budget.total_meals, budget.total_hotels) == (100, 100, 300)
+    # 交通没有明细, 沿用LLM的估算
+    assert budget.total_transportation == 50
+    assert budget.total == 550
+
+
+def test_days_beyond_travel_days_truncated():
+    plan, errors = PlanRepairer().repair(
+        _plan([_day(i, ticket=10) for i in range(4)]),
+        _request(travel_days=2)
+    )
+    assert errors == []
+    assert [d.day_index for d in plan.days] == [0, 1]
+    # 预算只按保留的天计算
+    assert plan.budget.total_attractions == 20
+
+
+def test_missing_days_reported():
+    plan, errors = PlanRepairer().repair(_plan([_day(0)]), _request(travel_days=2))
+    assert plan is not None
+    assert errors == ["days: 只有1天,需要2天"]
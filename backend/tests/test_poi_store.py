@@ -0,0 +1,87 @@
+"""本地POI存储: 写入去重、矩形范围查询和本地命中判断"""
+
+from app.models.schemas import Location, POIInfo
+from app.services import poi_store
+from app.services.poi_store import POIStore, local_poi_hit
+
+
+def _poi(name: str, lng: float, lat: float, poi_id: str = "", poi_type: str = "风景名胜") -> POIInfo:
+    return POIInfo(id=poi_id, name=name, type=poi_type, address="", location=Location(longitude=lng, latitude=lat))
+
+
+def test_poi_without_id_deduped_by_name_and_location():
+    store = POIStore()
+    first = store.add(_poi("故宫", 116.397128, 39.916527), "北京")
+    # 同一POI多次写入, 坐标只有细微差别
+    second = store.add(_poi("故宫", 116.397131, 39.916524), "北京")
+    assert first == second
+    assert len(store) == 1
+    assert store.add(_poi("景山公园", 116.397128, 39.916527), "北京") != first
+    assert len(store) == 2
+
+
+def test_poi_with_id_merges_earlier_poi_without_id():
+    store = POIStore()
+    index = store.add(_poi("故宫", 116.397128, 39.916527), "北京")
+    assert store.add(_poi("故宫", 116.397128, 39.916527, poi_id="B000A8UIN8"), "北京") == index
+    assert len(store) == 1
+    assert store.get("B000A8UIN8") is not None
+    # 另一个ID的同名同坐标POI单独保存
+    store.add(_poi("故宫", 116.397128, 39.916527, poi_id="B000A8UIN9"), "北京")
+    assert len(store) == 2
+
+
+def test_search_bounds():
+    store = POIStore()
+    store.add(_poi("故宫", 116.397, 39.917, poi_id="B1"), "北京")
+    store.add(_poi("颐和园", 116.273, 39.999, poi_id="B2"), "北京")
+    store.add(_poi("全聚德", 116.398, 39.918, poi_id="B3", poi_type="餐饮服务"), "北京")
+    names = {p.name for p in store.search_bounds(116.38, 39.90, 116.42, 39.93)}
+    assert names == {"故宫", "全聚德"}
+    assert [p.name for p in store.search_bounds(116.38, 39.90, 116.42, 39.93, "餐饮")] == ["全聚德"]
+
+
+def test_local_hit_requires_full_page_or_coverage(monkeypatch):
+    store = POIStore()
+    monkeypatch.setattr(poi_store, "_poi_store", store)
+    # 周边搜索顺带写入的一个博物馆, 不代表"博物馆"的关键词搜索结果已经完整
+    store.add(_poi("首都博物馆", 116.34, 39.90, poi_id="B1"), "北京")
+    assert local_poi_hit("博物馆", "北京", limit=3) == []
+
+    store.mark_covered("博物馆", "北京")
+    assert [p.name for p in local_poi_hit("博物馆", "北京", limit=3)] == ["首都博物馆"]
+
+    for i in range(3):
+        store.add(_poi(f"公园{i}", 116.3 + i * 0.01, 39.9, poi_id=f"P{i}"), "北京")
+    assert len(local_poi_hit("公园", "北京", limit=3)) == 3
+
+
+def test_evicts_least_recently_written_over_max_size():
+    store = POIStore(max_size=10)
+    store.bulk_load([_poi(f"公园{i}", 116.3 + i * 0.01, 39.9, poi_id=f"P{i}") for i in range(10)], "北京")
+    # 重新写入P0, 它成为最近写入的POI
+    store.add(_poi("公园0", 116.3, 39.9, poi_id="P0"), "北京")
+    index = store.add(_poi("博物馆", 116.5, 39.9, poi_id="M1"), "北京")
+    assert len(store) == 8
+    assert store.evicted == 3
+    assert store.get("P0") is not None and store.get("P1") is None
+    # 重建后下标、网格和文本索引保持一致
+    assert store.get("M1") == store._poi(index)
+    assert [p.name for p in store.search_bounds(116.49, 39.89, 116.51, 39.91)] == ["博物馆"]
+    assert [p.id for p in store.search_text("博物馆", "北京")] == ["M1"]
+
+
+def test_stale_full_page_is_not_a_local_hit(monkeypatch):
+    store = POIStore()
+    monkeypatch.setattr(poi_store, "_poi_store", store)
+    now = poi_store.time.time()
+    monkeypatch.setattr(poi_store.time, "time", lambda: now - 2 * 86400)
+    for i in range(3):
+        store.add(_poi(f"公园{i}", 116.3 + i * 0.01, 39.9, poi_id=f"P{i}"), "北京")
+    monkeypatch.setattr(poi_store.time, "time", lambda: now)
+    # 城市的其他POI刚更新过, 但"公园"这一页结果本身已经过期
+    store.add(_poi("首都博物馆", 116.34, 39.90, poi_id="B1"), "北京")
+    assert local_poi_hit("公园", "北京", limit=3) == []
+
+    store.bulk_load([_poi(f"公园{i}", 116.3 + i * 0.01, 39.9, poi_id=f"P{i}") for i in range(3)], "北京")
+    assert len(local_poi_hit("公园", "北京", limit=3)) == 3
@@ -45,6 +45,26 @@ export interface Budget {
   total: number
 }
 
+export interface TransferInfo {
+  from_city: string
+  to_city: string
+  date: string
+  transportation: string
+  distance: number
+  estimated_cost: number
+  description: string
+}
+
+export interface RouteInfo {
+  distance: number
+  duration: number
+  route_type: string
+  description: string
+  origin?: string
+  destination?: string
+  estimated?: boolean
+}
+
 export interface DayPlan {
   date: string
   day_index: number
@@ -54,6 +74,11 @@ export interface DayPlan {
   hotel?: Hotel
   attractions: Attraction[]
   meals: Meal[]
+  travel_distance?: number
+  travel_duration?: number
+  routes?: RouteInfo[]
+  city?: string
+  transfer?: TransferInfo
 }
 
 export interface WeatherInfo {
@@ -74,6 +99,9 @@ export interface TripPlan {
   weather_info: WeatherInfo[]
   overall_suggestions: string
   budget?: Budget
+  total_travel_distance?: number
+  partial?: boolean
+  missing?: string[]
 }
 
 export interface TripFormData {
@@ -90,6 +118,7 @@ export interface TripFormData {
 export interface TripPlanResponse {
   success: boolean
   message: string
+  plan_id?: string
   data?: TripPlan
 }
 